@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-17 23:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('atendimentos', '0003_alter_atendimento_origem'),
+        ('core', '0023_indices_consultas'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='atendimento',
+            index=models.Index(fields=['-data', '-hora'], name='atendimento_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='atendimento',
+            index=models.Index(fields=['coordenacao', '-data'], name='atendimento_coord_data_idx'),
+        ),
+    ]
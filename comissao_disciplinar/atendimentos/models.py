@@ -75,6 +75,11 @@ class Atendimento(models.Model):
         ordering = ['-data', '-hora']
         verbose_name = 'Atendimento'
         verbose_name_plural = 'Atendimentos'
+        indexes = [
+            models.Index(fields=['-data', '-hora'], name='atendimento_data_idx'),
+            # atendimento_list filtra pela coordenação do servidor
+            models.Index(fields=['coordenacao', '-data'], name='atendimento_coord_data_idx'),
+        ]
 
     def __str__(self):
         return f"Atendimento #{self.id} - {self.data}"
\ No newline at end of file
@@ -0,0 +1,33 @@
+from django.db.models.signals import post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from core.cards_turma import invalidar_cards_relacionados
+from core.linha_tempo import sincronizar, remover, sincronizar_vinculos
+from .models import Atendimento
+
+
+@receiver(post_save, sender=Atendimento)
+@receiver(pre_delete, sender=Atendimento)
+def invalidar_cards_atendimento(sender, instance, **kwargs):
+    """Atendimentos aparecem nos cards do estudantes_dashboard"""
+    invalidar_cards_relacionados(instance)
+
+
+@receiver(m2m_changed, sender=Atendimento.estudantes.through)
+def invalidar_cards_atendimento_vinculos(sender, instance, action, reverse, pk_set, **kwargs):
+    invalidar_cards_relacionados(instance, action, reverse, pk_set)
+
+
+@receiver(post_save, sender=Atendimento)
+def linha_tempo_atendimento(sender, instance, **kwargs):
+    sincronizar('ATENDIMENTO', [instance.pk])
+
+
+@receiver(post_delete, sender=Atendimento)
+def linha_tempo_atendimento_excluido(sender, instance, **kwargs):
+    remover('ATENDIMENTO', [instance.pk])
+
+
+@receiver(m2m_changed, sender=Atendimento.estudantes.through)
+def linha_tempo_vinculos_atendimento(sender, instance, action, reverse, pk_set, **kwargs):
+    sincronizar_vinculos('ATENDIMENTO', instance, action, reverse, pk_set)
@@ -5,9 +5,11 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse
 from django.db.models import Q
+from django.utils import timezone
 from .models import Atendimento, TipoAtendimento, SituacaoAtendimento
 from .forms import AtendimentoForm
-from core.models import Estudante, Servidor
+from core.models import Estudante, Servidor, Coordenacao
+from core.utils_exportacao import exportar_queryset
 
 
 @login_required
@@ -36,6 +38,30 @@ def atendimento_list(request):
     if data_fim:
         atendimentos = atendimentos.filter(data__lte=data_fim)
 
+    # Exportação (mesmos filtros, uma linha por estudante)
+    formato = request.GET.get('exportar')
+    if formato:
+        coordenacoes = dict(Coordenacao.CHOICES)
+        return exportar_queryset(
+            atendimentos.order_by('-data', '-hora'),
+            colunas=[
+                ('id', 'Nº'),
+                ('data', 'Data'),
+                ('hora', 'Hora'),
+                ('coordenacao', 'Coordenação'),
+                ('estudantes__matricula_sga', 'Matrícula'),
+                ('estudantes__nome', 'Estudante'),
+                ('tipo_atendimento__nome', 'Tipo'),
+                ('situacao__nome', 'Situação'),
+                ('origem', 'Origem'),
+                ('servidor_responsavel__nome', 'Responsável'),
+                ('informacoes', 'Informações'),
+            ],
+            nome_arquivo=f'atendimentos_{timezone.localdate():%Y%m%d}',
+            formato=formato,
+            transformacoes={'coordenacao': lambda valor: coordenacoes.get(valor, valor)},
+        )
+
     context = {
         'atendimentos': atendimentos,
     }
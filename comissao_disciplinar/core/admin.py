@@ -1,9 +1,12 @@
 from django.contrib import admin
+from django.conf import settings
 from django.shortcuts import render
 from django.http import HttpResponseRedirect
 from django.urls import path
 from .models import *
+from django.utils import timezone
 from django.utils.html import format_html
+from .utils import resposta_recibos_termicos
 
 
 @admin.register(Servidor)
@@ -54,8 +57,32 @@ class RecursoAdmin(admin.ModelAdmin):
 
 @admin.register(DocumentoGerado)
 class DocumentoGeradoAdmin(admin.ModelAdmin):
-    list_display = ['ocorrencia', 'tipo_documento', 'data_geracao', 'assinado']
-    list_filter = ['tipo_documento', 'assinado']
+    list_display = ['ocorrencia', 'tipo_documento', 'data_geracao', 'status', 'assinado']
+    list_filter = ['tipo_documento', 'status', 'assinado']
+    readonly_fields = ['hash_conteudo', 'status', 'erro']
+
+
+@admin.register(EnvioNotificacao)
+class EnvioNotificacaoAdmin(admin.ModelAdmin):
+    list_display = ['id', 'canal', 'tipo_ocorrencia', 'ocorrencia_id', 'status', 'tentativas',
+                    'proxima_tentativa', 'enviado_em']
+    list_filter = ['canal', 'status', 'tipo_ocorrencia']
+    search_fields = ['chave_idempotencia', 'ultimo_erro']
+    readonly_fields = ['chave_idempotencia', 'criado_em', 'atualizado_em', 'enviado_em']
+    actions = ['reenfileirar']
+
+    def reenfileirar(self, request, queryset):
+        from .fila_notificacoes import despachar
+        from django.utils import timezone
+
+        envios = list(queryset.filter(status='FALHOU').values_list('pk', 'canal'))
+        queryset.filter(status='FALHOU').update(
+            status='PENDENTE', tentativas=0, proxima_tentativa=timezone.now()
+        )
+        despachar(envios)
+        self.message_user(request, f'{len(envios)} envios reenfileirados.')
+
+    reenfileirar.short_description = 'Reenfileirar envios que falharam'
 
 
 @admin.register(OcorrenciaRapida)
@@ -152,34 +179,21 @@ class OcorrenciaRapidaAdmin(admin.ModelAdmin):
     actions = ['gerar_recibos_termicos', 'duplicar_ocorrencias']
 
     def gerar_recibos_termicos(self, request, queryset):
-        from .utils import gerar_recibo_termico_ocorrencia_rapida
-        from django.core.files.base import ContentFile
-
-        count = 0
-        for ocorrencia in queryset:
-            try:
-                recibo_pdf = gerar_recibo_termico_ocorrencia_rapida(ocorrencia)
-
-                documento = DocumentoGerado.objects.create(
-                    ocorrencia_rapida=ocorrencia,
-                    tipo_documento='RECIBO_TERMICO',
-                    assinado=True
-                )
-
-                nome_arquivo = f"recibo_termico_{ocorrencia.id}_{timezone.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-                documento.arquivo.save(nome_arquivo, ContentFile(recibo_pdf.getvalue()))
-
-                if ocorrencia.responsavel_registro:
-                    documento.assinaturas.add(ocorrencia.responsavel_registro)
-
-                count += 1
-            except Exception as e:
-                self.message_user(request, f"Erro ao gerar recibo para ocorrência #{ocorrencia.id}: {str(e)}",
-                                  level='ERROR')
-
-        self.message_user(request, f'{count} recibos térmicos gerados com sucesso.')
+        """Recibos dos selecionados num único PDF (rolo contínuo), sem gravar DocumentoGerado"""
+        total = queryset.count()
+        limite = getattr(settings, 'RECIBOS_TERMICOS_LIMITE', 500)
+        if total > limite:
+            self.message_user(
+                request, f'{total} ocorrências selecionadas; a impressão de recibos aceita até {limite}.',
+                level='WARNING'
+            )
+            return None
+        return resposta_recibos_termicos(
+            queryset.order_by('data', 'horario', 'id'),
+            f'recibos_termicos_{timezone.localdate():%Y%m%d}'
+        )
 
-    gerar_recibos_termicos.short_description = "🖨️ Gerar recibos térmicos para selecionados"
+    gerar_recibos_termicos.short_description = "🖨️ Imprimir recibos térmicos dos selecionados (um único PDF)"
 
     def duplicar_ocorrencias(self, request, queryset):
         count = 0
@@ -276,14 +290,20 @@ class EstudanteAdmin(admin.ModelAdmin):
     search_fields = ['nome', 'matricula_sga', 'cpf', 'email']
     filter_horizontal = ['responsaveis']
 
-    readonly_fields = ['total_responsaveis_display']
+    readonly_fields = [
+        'total_responsaveis_display',
+        'foto_local_disponivel', 'foto_drive_id', 'foto_checksum', 'foto_verificada_em',
+    ]
 
     fieldsets = (
         ('Identificação', {
             'fields': ('matricula_sga', 'nome', 'cpf', 'data_nascimento')
         }),
         ('Foto de Perfil', {
-            'fields': ('foto', 'foto_url'),
+            'fields': (
+                'foto', 'foto_url',
+                'foto_local_disponivel', 'foto_drive_id', 'foto_checksum', 'foto_verificada_em',
+            ),
             'description': 'Use foto_url para links do Google Drive. Formato: https://drive.google.com/uc?export=view&id=ID_DA_IMAGEM'
         }),
         ('Contatos', {
@@ -0,0 +1,255 @@
+# core/analise_indices.py - EXPLAIN e tempos das consultas quentes (comando analisar_indices)
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Count
+from django.utils import timezone
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Consultas das listas e dashboards: (nome, função(contexto) -> queryset)
+CONSULTAS = [
+    ('Ocorrências por status', lambda c: c['Ocorrencia'].objects.order_by().values_list(
+        'status').annotate(total=Count('id'))),
+    ('Ocorrências dos últimos 30 dias', lambda c: c['Ocorrencia'].objects.filter(
+        data__gte=c['hoje'] - timedelta(days=30)).values('pk')),
+    ('Prazos de defesa vencendo', lambda c: c['Ocorrencia'].objects.filter(
+        status='AGUARDANDO_DEFESA', prazo_defesa__gte=c['hoje'],
+        prazo_defesa__lte=c['hoje'] + timedelta(days=3)).values('pk')),
+    ('Processos em andamento', lambda c: c['Ocorrencia'].objects.filter(
+        status__in=['EM_ANALISE', 'EM_JULGAMENTO', 'AGUARDANDO_DEFESA'])),
+    ('Últimas ocorrências', lambda c: c['Ocorrencia'].objects.order_by('-criado_em')[:10]),
+    ('Ocorrências rápidas da semana', lambda c: c['OcorrenciaRapida'].objects.filter(
+        data__gte=c['hoje'] - timedelta(days=7)).values('pk')),
+    ('Lista de ocorrências rápidas', lambda c: c['OcorrenciaRapida'].objects.order_by('-criado_em')[:50]),
+    ('Alertas de limite do mês', lambda c: c['AlertaLimiteOcorrenciaRapida'].objects.filter(
+        mes_referencia=c['hoje'].replace(day=1))),
+    ('Notificações não lidas', lambda c: c['Notificacao'].objects.filter(
+        usuario_id=c['usuario_id'], lida=False).values('pk')),
+    ('Notificações recentes', lambda c: c['Notificacao'].objects.filter(
+        usuario_id=c['usuario_id']).order_by('-criado_em')[:5]),
+    ('Estudantes ativos da turma', lambda c: c['Estudante'].objects.filter(
+        turma_id=c['turma_id'], situacao='ATIVO')),
+    ('Estudantes ativos por nome', lambda c: c['Estudante'].objects.filter(
+        situacao='ATIVO').order_by('nome')[:50]),
+    ('Atendimentos da coordenação', lambda c: c['Atendimento'].objects.filter(
+        coordenacao='CDPD')[:50]),
+    ('Projetos com relatório vencido', lambda c: c['Projeto'].objects.filter(
+        situacao='ATIVO', proximo_relatorio__lt=c['hoje']).values('pk')),
+]
+
+MODELOS = {
+    'Estudante': 'core.Estudante',
+    'Ocorrencia': 'core.Ocorrencia',
+    'OcorrenciaRapida': 'core.OcorrenciaRapida',
+    'AlertaLimiteOcorrenciaRapida': 'core.AlertaLimiteOcorrenciaRapida',
+    'Notificacao': 'core.Notificacao',
+    'Atendimento': 'atendimentos.Atendimento',
+    'Projeto': 'projetos.Projeto',
+}
+
+
+def contexto_consultas(banco=DEFAULT_DB_ALIAS):
+    """Modelos e parâmetros usados pelas consultas (usuário/turma com mais linhas)"""
+    contexto = {nome: apps.get_model(rotulo) for nome, rotulo in MODELOS.items()}
+    contexto['hoje'] = timezone.localdate()
+    contexto['usuario_id'] = contexto['Notificacao'].objects.using(banco).values('usuario_id').annotate(
+        total=Count('id')).order_by('-total').values_list('usuario_id', flat=True).first()
+    contexto['turma_id'] = contexto['Estudante'].objects.using(banco).values('turma_id').annotate(
+        total=Count('id')).order_by('-total').values_list('turma_id', flat=True).first()
+    return contexto
+
+
+# ====================
+# PLANO E TEMPO
+# ====================
+
+def varreduras_completas(plano):
+    """
+    Linhas do EXPLAIN que leem a tabela inteira
+
+    SQLite: "SCAN tabela" sem índice; PostgreSQL: "Seq Scan"; MySQL: type ALL.
+    """
+    suspeitas = []
+    for linha in plano.splitlines():
+        texto = linha.strip()
+        if 'Seq Scan' in texto or ' ALL ' in f' {texto} ':
+            suspeitas.append(texto)
+        elif 'SCAN ' in texto and 'USING' not in texto and 'CONSTANT ROW' not in texto:
+            suspeitas.append(texto)
+    return suspeitas
+
+
+def medir(queryset, repeticoes=5):
+    """Mediana em ms de avaliar o queryset (cópias sem cache de resultado)"""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        list(queryset.all())
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tempos)
+
+
+def analisar(contexto, repeticoes=5, banco=DEFAULT_DB_ALIAS):
+    """{nome: (ms, plano, varreduras)} de cada consulta monitorada"""
+    resultado = {}
+    for nome, consulta in CONSULTAS:
+        queryset = consulta(contexto).using(banco)
+        plano = queryset.explain()
+        resultado[nome] = (medir(queryset, repeticoes), plano, varreduras_completas(plano))
+    return resultado
+
+
+def atualizar_estatisticas(banco=DEFAULT_DB_ALIAS):
+    """ANALYZE para o planejador considerar os dados semeados"""
+    connection = connections[banco]
+    if connection.vendor in ('sqlite', 'postgresql'):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+
+def remover_indices(banco=DEFAULT_DB_ALIAS):
+    """
+    Apaga os índices declarados em Meta.indexes dos modelos monitorados
+
+    Só faz sentido dentro de uma transação que será desfeita (bancos com
+    DDL transacional).
+
+    Returns:
+        nomes dos índices removidos
+    """
+    connection = connections[banco]
+    modelo_sql = connection.schema_editor(atomic=False).sql_delete_index
+    nome = connection.ops.quote_name
+    removidos = []
+    with connection.cursor() as cursor:
+        for rotulo in MODELOS.values():
+            modelo = apps.get_model(rotulo)
+            for indice in modelo._meta.indexes:
+                cursor.execute(modelo_sql % {'name': nome(indice.name), 'table': nome(modelo._meta.db_table)})
+                removidos.append(indice.name)
+    return removidos
+
+
+# ====================
+# MASSA DE DADOS
+# ====================
+
+def semear(quantidade, semente=42, banco=DEFAULT_DB_ALIAS):
+    """
+    Cria uma massa sintética com bulk_create (sem signals)
+
+    Proporções aproximadas de um campus: `quantidade` ocorrências e
+    ocorrências rápidas, metade disso em atendimentos e notificações, um
+    décimo em estudantes e alertas.
+
+    Returns:
+        {modelo: linhas criadas}
+    """
+    from atendimentos.models import Atendimento, SituacaoAtendimento, TipoAtendimento
+    from projetos.models import Projeto
+    from .models import (
+        AlertaLimiteOcorrenciaRapida, Campus, ConfiguracaoLimiteOcorrenciaRapida, Curso, Estudante,
+        Notificacao, Ocorrencia, OcorrenciaRapida, Servidor, TipoOcorrenciaRapida, Turma,
+    )
+
+    aleatorio = random.Random(semente)
+    hoje = timezone.localdate()
+    sufixo = f"{aleatorio.randrange(10 ** 6):06d}"
+
+    def dia():
+        return hoje - timedelta(days=aleatorio.randrange(730))
+
+    campus = Campus.objects.using(banco).create(nome=f'Campus Análise {sufixo}', sigla=f'A{sufixo}')
+    curso = Curso.objects.using(banco).create(nome='Curso Análise', campus=campus, codigo=f'AN{sufixo}')
+    turmas = Turma.objects.using(banco).bulk_create([
+        Turma(nome=f'T{i}', curso=curso, ano=hoje.year, periodo=f'{hoje.year}.1', semestre=0)
+        for i in range(20)
+    ])
+    usuarios = User.objects.using(banco).bulk_create([
+        User(username=f'analise{sufixo}_{i}', email=f'analise{i}@example.com') for i in range(5)
+    ])
+    servidores = Servidor.objects.using(banco).bulk_create([
+        Servidor(
+            user=usuario, siape=f'{sufixo}{i}', nome=f'Servidor Análise {i}',
+            email=usuario.email, campus=campus,
+        )
+        for i, usuario in enumerate(usuarios)
+    ])
+    estudantes = Estudante.objects.using(banco).bulk_create([
+        Estudante(
+            matricula_sga=f'A{sufixo}{i:06d}', nome=f'Estudante Análise {i:06d}',
+            email=f'a{sufixo}{i}@example.com', turma=aleatorio.choice(turmas), campus=campus,
+            curso=curso, data_ingresso=hoje,
+            situacao='ATIVO' if aleatorio.random() < 0.85 else 'TRANCADO',
+        )
+        for i in range(max(quantidade // 10, 1))
+    ], batch_size=1000)
+
+    status = [valor for valor, _ in Ocorrencia.STATUS_CHOICES]
+    Ocorrencia.objects.using(banco).bulk_create([
+        Ocorrencia(
+            data=dia(), horario=f'{aleatorio.randrange(7, 22):02d}:00', curso=curso,
+            turma=aleatorio.choice(turmas), descricao='Ocorrência sintética',
+            status=aleatorio.choice(status), prazo_defesa=dia() if aleatorio.random() < 0.3 else None,
+            responsavel_registro=aleatorio.choice(servidores),
+        )
+        for _ in range(quantidade)
+    ], batch_size=1000)
+    OcorrenciaRapida.objects.using(banco).bulk_create([
+        OcorrenciaRapida(
+            data=dia(), horario=f'{aleatorio.randrange(7, 22):02d}:00', turma=aleatorio.choice(turmas),
+            descricao='Atraso', responsavel_registro=aleatorio.choice(servidores),
+        )
+        for _ in range(quantidade)
+    ], batch_size=1000)
+
+    tipo = TipoOcorrenciaRapida.objects.using(banco).create(codigo=f'AN{sufixo}', descricao='Tipo de análise')
+    configuracao = ConfiguracaoLimiteOcorrenciaRapida.objects.using(banco).create(tipo_ocorrencia=tipo, limite_mensal=3)
+    meses = sorted({(hoje - timedelta(days=30 * i)).replace(day=1) for i in range(24)})
+    AlertaLimiteOcorrenciaRapida.objects.using(banco).bulk_create([
+        AlertaLimiteOcorrenciaRapida(
+            estudante=estudante, tipo_ocorrencia=tipo, configuracao=configuracao,
+            mes_referencia=aleatorio.choice(meses), quantidade_ocorrencias=3,
+        )
+        for estudante in estudantes
+    ], batch_size=1000)
+    Notificacao.objects.using(banco).bulk_create([
+        Notificacao(
+            usuario=aleatorio.choice(usuarios), tipo='NOVA_OCORRENCIA', titulo='Notificação sintética',
+            mensagem='-', lida=aleatorio.random() < 0.8,
+        )
+        for _ in range(quantidade // 2)
+    ], batch_size=1000)
+
+    tipo_atendimento = TipoAtendimento.objects.using(banco).create(nome='Análise')
+    situacao = SituacaoAtendimento.objects.using(banco).create(nome='Análise')
+    Atendimento.objects.using(banco).bulk_create([
+        Atendimento(
+            coordenacao=aleatorio.choice(['CDPD', 'CDAE', 'CC']), servidor_responsavel=aleatorio.choice(servidores),
+            data=dia(), hora='10:00', tipo_atendimento=tipo_atendimento, situacao=situacao,
+            origem='PRESENCIAL', informacoes='Atendimento sintético',
+        )
+        for _ in range(quantidade // 2)
+    ], batch_size=1000)
+    Projeto.objects.using(banco).bulk_create([
+        Projeto(
+            numero_processo=f'AN{sufixo}/{i}', titulo=f'Projeto {i}', data_inicio=dia(),
+            data_final=hoje + timedelta(days=365), tema='-', area='-',
+            coordenador=aleatorio.choice(servidores),
+            situacao=aleatorio.choice(['ATIVO', 'FINALIZADO', 'PENDENTE']), proximo_relatorio=dia(),
+        )
+        for i in range(max(quantidade // 20, 1))
+    ], batch_size=1000)
+
+    return {
+        'Estudante': len(estudantes), 'Ocorrencia': quantidade, 'OcorrenciaRapida': quantidade,
+        'AlertaLimiteOcorrenciaRapida': len(estudantes), 'Notificacao': quantidade // 2,
+        'Atendimento': quantidade // 2, 'Projeto': max(quantidade // 20, 1),
+    }
@@ -0,0 +1,109 @@
+# core/busca_estudantes.py - Índice de busca por prefixo (sem acento) de estudantes
+import re
+import unicodedata
+
+from django.db import transaction
+from django.db.models import Count
+import logging
+
+from .models import Estudante, TermoBuscaEstudante
+
+logger = logging.getLogger(__name__)
+
+TAMANHO_MAXIMO_TERMO = 20  # = TermoBuscaEstudante.termo.max_length
+SEPARADOR = re.compile(r'[^0-9a-z]+')
+
+
+def normalizar(texto):
+    """'João da Silva' -> 'joao da silva'"""
+    decomposto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(c for c in decomposto if not unicodedata.combining(c)).lower()
+
+
+def tokens(texto):
+    """Palavras normalizadas, truncadas ao tamanho do termo indexado"""
+    return [
+        token[:TAMANHO_MAXIMO_TERMO]
+        for token in SEPARADOR.split(normalizar(texto)) if token
+    ]
+
+
+def termos_de(*textos):
+    """Todos os prefixos (1..TAMANHO_MAXIMO_TERMO) das palavras dos textos"""
+    termos = set()
+    for texto in textos:
+        for token in tokens(texto):
+            termos.update(token[:tamanho] for tamanho in range(1, len(token) + 1))
+    return termos
+
+
+# ====================
+# MANUTENÇÃO DO ÍNDICE
+# ====================
+
+def indexar_estudantes(estudantes):
+    """Regrava os termos dos estudantes informados (com nome e matricula_sga carregados)"""
+    estudantes = list(estudantes)
+    if not estudantes:
+        return 0
+    termos = [
+        TermoBuscaEstudante(estudante_id=estudante.pk, termo=termo)
+        for estudante in estudantes
+        for termo in termos_de(estudante.nome, estudante.matricula_sga)
+    ]
+    with transaction.atomic():
+        TermoBuscaEstudante.objects.filter(estudante_id__in=[e.pk for e in estudantes]).delete()
+        TermoBuscaEstudante.objects.bulk_create(termos, batch_size=1000)
+    return len(termos)
+
+
+def reconstruir_indice(lote=1000):
+    """
+    Recria o índice inteiro (após importações com bulk_create/update)
+
+    Returns:
+        (estudantes, termos)
+    """
+    total_estudantes = total_termos = 0
+    with transaction.atomic():
+        TermoBuscaEstudante.objects.all().delete()
+        estudantes = Estudante.objects.only('id', 'nome', 'matricula_sga').order_by('id')
+        pendentes = []
+        for estudante in estudantes.iterator(chunk_size=lote):
+            pendentes.extend(
+                TermoBuscaEstudante(estudante_id=estudante.pk, termo=termo)
+                for termo in termos_de(estudante.nome, estudante.matricula_sga)
+            )
+            total_estudantes += 1
+            if len(pendentes) >= lote * 10:
+                TermoBuscaEstudante.objects.bulk_create(pendentes, batch_size=1000)
+                total_termos += len(pendentes)
+                pendentes = []
+        TermoBuscaEstudante.objects.bulk_create(pendentes, batch_size=1000)
+        total_termos += len(pendentes)
+    logger.info(f"🔎 Índice de busca reconstruído: {total_estudantes} estudantes, {total_termos} termos")
+    return total_estudantes, total_termos
+
+
+# ====================
+# CONSULTA
+# ====================
+
+def filtrar_por_busca(queryset, busca):
+    """
+    Restringe o queryset de Estudante aos que têm todas as palavras da busca
+    como prefixo de alguma palavra do nome ou da matrícula
+
+    "joao sil" encontra "João da Silva"; a consulta usa só o índice
+    (termo, estudante) de TermoBuscaEstudante.
+    """
+    palavras = sorted(set(tokens(busca)))
+    if not palavras:
+        return queryset
+
+    termos = TermoBuscaEstudante.objects.filter(termo__in=palavras)
+    if len(palavras) > 1:
+        termos = termos.values('estudante_id').annotate(
+            encontrados=Count('termo', distinct=True)
+        ).filter(encontrados=len(palavras))
+    return queryset.filter(pk__in=termos.values('estudante_id'))
@@ -0,0 +1,130 @@
+# core/cards_turma.py - Dados dos cards de estudantes (estudantes_dashboard)
+from django.core.cache import cache
+from django.db.models import Count, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
+import logging
+
+from .models import Estudante, Ocorrencia, OcorrenciaRapida
+from .utils_cache import obter_versao, incrementar_versao
+
+logger = logging.getLogger(__name__)
+
+CHAVE_VERSAO_TURMA = 'core:cards_turma:{turma_id}:versao'
+CHAVE_CARDS = 'core:cards_turma:{turma_id}:v{versao}'
+TEMPO_CACHE_CARDS = 60 * 10  # limita a defasagem de mudanças sem signal (ex.: gravidade da infração)
+GRAVIDADES_ALERTA = ['GRAVE', 'GRAVISSIMA']
+ULTIMOS_ITENS = 3
+
+
+def _contagem(queryset, campo='estudantes'):
+    """
+    COUNT correlacionado ao estudante via Subquery
+
+    Vários Count() com JOIN multiplicariam as linhas entre si; a subquery
+    conta cada relação isoladamente.
+    """
+    contagem = (
+        queryset.filter(**{campo: OuterRef('pk')})
+        .order_by()
+        .values(campo)
+        .annotate(total=Count('pk'))
+        .values('total')[:1]
+    )
+    return Coalesce(Subquery(contagem), 0)
+
+
+def consultar_cards_turma(turma):
+    """
+    Estudantes ativos da turma com contagens e itens recentes
+
+    Número constante de consultas, independente do tamanho da turma: uma
+    para os estudantes (contagens anotadas) e uma por relação pré-carregada
+    (já limitada aos ULTIMOS_ITENS mais recentes de cada estudante).
+    """
+    from atendimentos.models import Atendimento
+
+    estudantes = list(
+        Estudante.objects.filter(
+            turma=turma,
+            situacao='ATIVO'
+        ).select_related(
+            'turma', 'curso'
+        ).annotate(
+            total_ocorrencias=_contagem(Ocorrencia.objects.all()),
+            total_ocorrencias_rapidas=_contagem(OcorrenciaRapida.objects.all()),
+            total_atendimentos=_contagem(Atendimento.objects.all()),
+            total_ocorrencias_graves=_contagem(
+                Ocorrencia.objects.filter(infracao__gravidade__in=GRAVIDADES_ALERTA)
+            ),
+        ).prefetch_related(
+            Prefetch(
+                'ocorrencias',
+                queryset=Ocorrencia.objects.select_related('infracao').order_by('-data', '-pk')[:ULTIMOS_ITENS],
+                to_attr='ultimas_ocorrencias'
+            ),
+            Prefetch(
+                'ocorrencias_rapidas',
+                queryset=OcorrenciaRapida.objects.order_by('-data', '-pk')[:ULTIMOS_ITENS],
+                to_attr='ultimas_ocorrencias_rapidas'
+            ),
+            Prefetch(
+                'atendimentos',
+                queryset=Atendimento.objects.order_by('-data', '-pk')[:ULTIMOS_ITENS],
+                to_attr='ultimos_atendimentos'
+            ),
+        ).order_by('nome')
+    )
+
+    for estudante in estudantes:
+        # Status geral (baseado em ocorrências graves)
+        if estudante.total_ocorrencias_graves > 0:
+            estudante.status_alerta = 'alto'
+        elif estudante.total_ocorrencias > 3:
+            estudante.status_alerta = 'medio'
+        else:
+            estudante.status_alerta = 'baixo'
+
+    return estudantes
+
+
+def cards_da_turma(turma):
+    """Cards da turma, em cache até a próxima mudança nos dados da turma"""
+    versao = obter_versao(CHAVE_VERSAO_TURMA.format(turma_id=turma.pk))
+    chave = CHAVE_CARDS.format(turma_id=turma.pk, versao=versao)
+
+    estudantes = cache.get(chave)
+    if estudantes is None:
+        estudantes = consultar_cards_turma(turma)
+        cache.set(chave, estudantes, TEMPO_CACHE_CARDS)
+    return estudantes
+
+
+def invalidar_cards_turmas(turma_ids):
+    for turma_id in {turma_id for turma_id in turma_ids if turma_id}:
+        incrementar_versao(CHAVE_VERSAO_TURMA.format(turma_id=turma_id))
+
+
+def invalidar_cards_estudantes(estudante_ids):
+    """Invalida os cards das turmas dos estudantes informados"""
+    if not estudante_ids:
+        return
+    invalidar_cards_turmas(
+        Estudante.objects.filter(pk__in=estudante_ids).values_list('turma_id', flat=True).distinct()
+    )
+
+
+def invalidar_cards_relacionados(instance, action=None, reverse=False, pk_set=None):
+    """
+    Invalida as turmas afetadas por mudança em ocorrência/atendimento
+
+    Serve tanto para post_save/pre_delete (instance = ocorrência/atendimento)
+    quanto para m2m_changed em .estudantes (instance pode ser o Estudante).
+    """
+    if action is not None and action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if isinstance(instance, Estudante):
+        invalidar_cards_turmas([instance.turma_id])
+    elif action in ('post_add', 'post_remove') and pk_set:
+        invalidar_cards_estudantes(pk_set)
+    elif instance.pk:
+        invalidar_cards_estudantes(list(instance.estudantes.values_list('pk', flat=True)))
@@ -1,29 +1,25 @@
 # Criar arquivo: comissao_disciplinar/core/context_processors.py
 
-from datetime import datetime
-from django.utils import timezone
-from .models import AlertaLimiteOcorrenciaRapida
+from django.utils.functional import SimpleLazyObject
+from .utils_alertas import contar_alertas_mes
 
 
 def alertas_ativos(request):
     """
     Adiciona contagem de alertas ativos ao contexto global
-    """
-    if request.user.is_authenticated and hasattr(request.user, 'servidor'):
-        # Alertas do mês atual
-        hoje = timezone.now().date()
-        primeiro_dia_mes = hoje.replace(day=1)
-
-        alertas_count = AlertaLimiteOcorrenciaRapida.objects.filter(
-            mes_referencia=primeiro_dia_mes
-        ).count()
 
-        return {
-            'alertas_ativos_count': alertas_count
-        }
+    O valor é preguiçoso (só é calculado se o template usar) e vem de um
+    contador em cache mantido pelos signals de AlertaLimiteOcorrenciaRapida.
+    """
+    def contar():
+        # hasattr(user, 'servidor') também consulta o banco: fica dentro do lazy
+        if request.user.is_authenticated and hasattr(request.user, 'servidor'):
+            # Alertas do mês atual
+            return contar_alertas_mes()
+        return 0
 
     return {
-        'alertas_ativos_count': 0
+        'alertas_ativos_count': SimpleLazyObject(contar)
     }
 
 # Adicionar em settings.py:
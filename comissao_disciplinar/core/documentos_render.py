@@ -0,0 +1,253 @@
+# core/documentos_render.py - Geração de PDFs fora da requisição, reaproveitando arquivos idênticos
+import hashlib
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+import logging
+
+from .models import DocumentoGerado, Ocorrencia, OcorrenciaRapida
+
+logger = logging.getLogger(__name__)
+
+MODO_CELERY = 'celery'
+MODO_THREAD = 'thread'
+MODO_EAGER = 'eager'
+
+# Incrementar quando o layout mudar: documentos antigos deixam de ser reaproveitados
+VERSAO_TEMPLATES = {
+    'RECIBO_TERMICO': 3,
+    'PADRAO': 1,
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _modo():
+    return getattr(settings, 'DOCUMENTOS_RENDER_MODO', MODO_THREAD)
+
+
+def _pendente_maximo():
+    """Segundos em PENDENTE após os quais a renderização é dada como perdida"""
+    return getattr(settings, 'DOCUMENTOS_PENDENTE_MAXIMO', 300)
+
+
+# ====================
+# HASH DO CONTEÚDO
+# ====================
+
+def _dados_ocorrencia(ocorrencia):
+    infracao = ocorrencia.infracao
+    return {
+        'id': ocorrencia.id,
+        'data': ocorrencia.data,
+        'horario': ocorrencia.horario,
+        'status': ocorrencia.status,
+        'descricao': ocorrencia.descricao,
+        'testemunhas': ocorrencia.testemunhas,
+        'medida_preventiva': ocorrencia.medida_preventiva,
+        'prazo_defesa': ocorrencia.prazo_defesa,
+        'infracao': [
+            infracao.codigo, infracao.descricao, infracao.gravidade, infracao.referencia_artigo
+        ] if infracao else None,
+        'registrante': ocorrencia.responsavel_registro.nome,
+        'estudantes': sorted(
+            [e.nome, e.matricula_sga, e.turma.nome if e.turma else '', e.curso.nome if e.curso else '']
+            for e in ocorrencia.estudantes.all()
+        ),
+    }
+
+
+def _dados_ocorrencia_rapida(ocorrencia):
+    return {
+        'id': ocorrencia.id,
+        'data': ocorrencia.data,
+        'horario': ocorrencia.horario,
+        'tipos': sorted(tipo.codigo for tipo in ocorrencia.tipos_rapidos.all()),
+        'turma': [ocorrencia.turma.nome, ocorrencia.turma.curso.nome],
+        'estudantes': sorted([e.nome, e.matricula_sga] for e in ocorrencia.estudantes.all()),
+        'descricao': ocorrencia.descricao,
+        'registrante': [ocorrencia.responsavel_registro.nome, ocorrencia.responsavel_registro.siape],
+    }
+
+
+def hash_documento(ocorrencia, tipo_documento):
+    """SHA-256 dos campos que aparecem no documento + versão do template"""
+    if isinstance(ocorrencia, OcorrenciaRapida):
+        dados = _dados_ocorrencia_rapida(ocorrencia)
+    else:
+        dados = _dados_ocorrencia(ocorrencia)
+    versao = VERSAO_TEMPLATES.get(tipo_documento, VERSAO_TEMPLATES['PADRAO'])
+    bruto = json.dumps(
+        [ocorrencia._meta.model_name, tipo_documento, versao, dados],
+        sort_keys=True, default=str
+    )
+    return hashlib.sha256(bruto.encode()).hexdigest()
+
+
+# ====================
+# SOLICITAÇÃO
+# ====================
+
+def solicitar_documento(ocorrencia, tipo_documento, servidor=None, assinado=False):
+    """
+    Devolve o DocumentoGerado deste conteúdo, agendando a geração se preciso
+
+    Se já existe documento com o mesmo hash (pronto ou em geração), ele é
+    reaproveitado; não há nova renderização. Caso contrário cria um
+    DocumentoGerado PENDENTE e a renderização roda depois do commit, fora da
+    thread da requisição (DOCUMENTOS_RENDER_MODO). Documentos com erro, sem
+    arquivo ou parados em PENDENTE são agendados de novo.
+
+    Returns:
+        DocumentoGerado
+    """
+    hash_conteudo = hash_documento(ocorrencia, tipo_documento)
+    vinculo = 'ocorrencia_rapida' if isinstance(ocorrencia, OcorrenciaRapida) else 'ocorrencia'
+
+    documento = DocumentoGerado.objects.filter(hash_conteudo=hash_conteudo).first()
+    if documento is None:
+        try:
+            with transaction.atomic():
+                documento = DocumentoGerado.objects.create(
+                    tipo_documento=tipo_documento,
+                    hash_conteudo=hash_conteudo,
+                    status='PENDENTE',
+                    assinado=assinado,
+                    **{vinculo: ocorrencia},
+                )
+        except IntegrityError:
+            # Outra requisição criou o mesmo documento ao mesmo tempo
+            documento = DocumentoGerado.objects.get(hash_conteudo=hash_conteudo)
+        else:
+            if servidor:
+                documento.assinaturas.add(servidor)
+            transaction.on_commit(lambda: despachar(documento.pk))
+            return documento
+
+    if documento.status == 'ERRO' or (documento.status == 'PRONTO' and not documento.arquivo):
+        # Tenta de novo: falha anterior ou arquivo removido
+        agora = timezone.now()
+        DocumentoGerado.objects.filter(pk=documento.pk).update(status='PENDENTE', erro='', data_geracao=agora)
+        documento.status = 'PENDENTE'
+        documento.data_geracao = agora
+        transaction.on_commit(lambda: despachar(documento.pk))
+    else:
+        retomar_se_parado(documento)
+
+    if servidor:
+        documento.assinaturas.add(servidor)
+    return documento
+
+
+def retomar_se_parado(documento):
+    """
+    Agenda de novo um documento PENDENTE há mais de DOCUMENTOS_PENDENTE_MAXIMO
+
+    A renderização se perde se o worker reinicia com a thread em andamento
+    ou a tarefa do Celery some; sem isto o documento ficaria PENDENTE para
+    sempre, já que o hash impede criar outro. data_geracao marca o início
+    da geração atual, e o UPDATE condicional garante um único reagendamento.
+
+    Returns:
+        bool: True se foi reagendado
+    """
+    if documento.status != 'PENDENTE':
+        return False
+    if documento.data_geracao > timezone.now() - timedelta(seconds=_pendente_maximo()):
+        return False
+
+    agora = timezone.now()
+    reagendado = DocumentoGerado.objects.filter(
+        pk=documento.pk, status='PENDENTE', data_geracao=documento.data_geracao
+    ).update(data_geracao=agora)
+    if not reagendado:
+        return False
+    logger.warning(f"Documento #{documento.pk} parado em geração desde {documento.data_geracao}; reagendando")
+    documento.data_geracao = agora
+    transaction.on_commit(lambda: despachar(documento.pk))
+    return True
+
+
+def despachar(documento_id):
+    """Entrega a renderização ao executor do modo configurado"""
+    modo = _modo()
+    if modo == MODO_CELERY:
+        from .tasks import renderizar_documento_task
+        renderizar_documento_task.delay(documento_id)
+    elif modo == MODO_THREAD:
+        _obter_executor().submit(_renderizar_em_thread, documento_id)
+    else:
+        renderizar_documento(documento_id)
+
+
+def _obter_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'DOCUMENTOS_RENDER_CONCORRENCIA', 2),
+                thread_name_prefix='documentos'
+            )
+        return _executor
+
+
+def _renderizar_em_thread(documento_id):
+    try:
+        renderizar_documento(documento_id)
+    finally:
+        close_old_connections()
+
+
+# ====================
+# RENDERIZAÇÃO
+# ====================
+
+def _carregar_ocorrencia(documento):
+    if documento.ocorrencia_rapida_id:
+        return OcorrenciaRapida.objects.select_related(
+            'turma__curso', 'responsavel_registro'
+        ).prefetch_related('estudantes', 'tipos_rapidos').get(pk=documento.ocorrencia_rapida_id)
+    return Ocorrencia.objects.select_related(
+        'infracao', 'responsavel_registro'
+    ).prefetch_related('estudantes__turma', 'estudantes__curso').get(pk=documento.ocorrencia_id)
+
+
+def _gerar_pdf(ocorrencia, tipo_documento, emitido_em):
+    from .utils import gerar_documento_pdf, gerar_recibo_termico_ocorrencia_rapida
+
+    if tipo_documento == 'RECIBO_TERMICO':
+        return gerar_recibo_termico_ocorrencia_rapida(ocorrencia, emitido_em=emitido_em)
+    return gerar_documento_pdf(ocorrencia, tipo_documento, emitido_em=emitido_em)
+
+
+def renderizar_documento(documento_id):
+    """Gera o PDF de um DocumentoGerado PENDENTE e marca como PRONTO (ou ERRO)"""
+    documento = DocumentoGerado.objects.filter(pk=documento_id, status='PENDENTE').first()
+    if documento is None:
+        return None
+
+    try:
+        ocorrencia = _carregar_ocorrencia(documento)
+        # A data impressa é a do registro: o hash não cobre datas, e o PDF
+        # reaproveitado precisa mostrar a mesma data que o DocumentoGerado
+        emitido_em = timezone.localtime(documento.data_geracao).replace(tzinfo=None)
+        pdf = _gerar_pdf(ocorrencia, documento.tipo_documento, emitido_em)
+        prefixo = 'recibo_termico' if documento.tipo_documento == 'RECIBO_TERMICO' else 'documento'
+        nome_arquivo = f"{prefixo}_{ocorrencia.id}_{documento.tipo_documento}_{documento.hash_conteudo[:12]}.pdf"
+        documento.arquivo.save(nome_arquivo, ContentFile(pdf.getvalue()), save=False)
+        documento.status = 'PRONTO'
+        documento.erro = ''
+    except Exception as e:
+        logger.error(f"❌ Erro ao gerar documento #{documento_id}: {str(e)}", exc_info=True)
+        documento.status = 'ERRO'
+        documento.erro = str(e)[:1000]
+
+    documento.save(update_fields=['arquivo', 'status', 'erro'])
+    return documento
@@ -0,0 +1,95 @@
+# core/drive_falso.py - Servidor local que imita o endpoint de miniaturas do Google Drive
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from urllib.parse import parse_qs, urlparse
+import hashlib
+import threading
+import time
+import logging
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+def gerar_jpeg(cor=(120, 160, 200), largura=600, altura=800):
+    """JPEG sólido, usado como 'foto' pelo servidor falso"""
+    saida = BytesIO()
+    Image.new('RGB', (largura, altura), cor).save(saida, 'JPEG')
+    return saida.getvalue()
+
+
+class _HandlerDrive(BaseHTTPRequestHandler):
+    def log_message(self, formato, *args):
+        logger.debug(formato, *args)
+
+    def do_GET(self):
+        servidor = self.server.falso
+        time.sleep(servidor.latencia)
+
+        url = urlparse(self.path)
+        file_id = parse_qs(url.query).get('id', [''])[0]
+        with servidor.lock:
+            servidor.requisicoes.append(file_id)
+            conteudo = servidor.fotos.get(file_id)
+
+        if url.path != '/thumbnail' or conteudo is None:
+            # O Drive responde HTML para ids inexistentes/privados
+            self.send_response(404)
+            self.send_header('Content-Type', 'text/html')
+            self.end_headers()
+            self.wfile.write(b'<html>not found</html>')
+            return
+
+        etag = '"%s"' % hashlib.md5(conteudo).hexdigest()
+        if self.headers.get('If-None-Match') == etag:
+            with servidor.lock:
+                servidor.nao_modificadas += 1
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/jpeg')
+        self.send_header('Content-Length', str(len(conteudo)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(conteudo)
+
+
+class ServidorDriveFalso:
+    """
+    Responde /thumbnail?id=...&sz=... com as fotos cadastradas, ETag e 304
+
+    Uso:
+        with ServidorDriveFalso(fotos={'abc123...': gerar_jpeg()}) as drive:
+            with override_settings(FOTOS_DRIVE_URL=drive.url): ...
+    """
+
+    def __init__(self, fotos=None, latencia=0.0):
+        self.fotos = dict(fotos or {})
+        self.latencia = latencia
+        self.requisicoes = []
+        self.nao_modificadas = 0
+        self.lock = threading.Lock()
+        self._servidor = None
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self._servidor.server_address[1]}/thumbnail'
+
+    def trocar_foto(self, file_id, conteudo):
+        with self.lock:
+            self.fotos[file_id] = conteudo
+
+    def __enter__(self):
+        self._servidor = ThreadingHTTPServer(('127.0.0.1', 0), _HandlerDrive)
+        self._servidor.daemon_threads = True
+        self._servidor.falso = self
+        threading.Thread(target=self._servidor.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._servidor.shutdown()
+        self._servidor.server_close()
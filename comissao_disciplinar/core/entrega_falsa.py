@@ -0,0 +1,121 @@
+# core/entrega_falsa.py - Servidor SMTP e transporte Twilio falsos (benchmark/testes offline)
+import json
+import socketserver
+import threading
+import time
+import uuid
+import logging
+
+from twilio.http import HttpClient
+from twilio.http.response import Response
+
+logger = logging.getLogger(__name__)
+
+
+class _SessaoSMTP(socketserver.StreamRequestHandler):
+    """Implementa o mínimo de SMTP que o backend do Django usa"""
+
+    def _responder(self, linha):
+        self.wfile.write(f'{linha}\r\n'.encode())
+
+    def handle(self):
+        servidor = self.server.falso
+        # Simula o custo de abrir a conexão (TCP + TLS) de um servidor real
+        time.sleep(servidor.latencia_conexao)
+        if servidor.fora_do_ar():
+            self._responder('421 smtp-falso fora do ar')
+            return
+        with servidor.lock:
+            servidor.conexoes += 1
+        self._responder('220 smtp-falso pronto')
+
+        while True:
+            linha = self.rfile.readline()
+            if not linha:
+                return
+            comando = linha.decode(errors='replace').strip().upper()
+
+            if comando.startswith(('EHLO', 'HELO')):
+                self._responder('250 smtp-falso')
+            elif comando == 'DATA':
+                self._responder('354 fim com <CRLF>.<CRLF>')
+                while self.rfile.readline() not in (b'.\r\n', b'.\n', b''):
+                    pass
+                time.sleep(servidor.latencia_mensagem)
+                if servidor.fora_do_ar():
+                    return  # derruba a conexão no meio do envio
+                with servidor.lock:
+                    servidor.mensagens += 1
+                self._responder('250 OK')
+            elif comando == 'QUIT':
+                self._responder('221 tchau')
+                return
+            else:
+                # MAIL FROM, RCPT TO, RSET, NOOP...
+                self._responder('250 OK')
+
+
+class _ServidorTCP(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class ServidorSMTPFalso:
+    """
+    Servidor SMTP local, em thread, que só conta conexões e mensagens
+
+    Uso:
+        with ServidorSMTPFalso(latencia_conexao=0.05) as smtp:
+            conexao = get_connection('django.core.mail.backends.smtp.EmailBackend',
+                                     host='127.0.0.1', port=smtp.porta)
+    """
+
+    def __init__(self, latencia_conexao=0.0, latencia_mensagem=0.0, limite_mensagens=None):
+        self.latencia_conexao = latencia_conexao
+        self.latencia_mensagem = latencia_mensagem
+        self.limite_mensagens = limite_mensagens  # depois disso o servidor "cai"
+        self.conexoes = 0
+        self.mensagens = 0
+        self.lock = threading.Lock()
+        self._servidor = None
+
+    def fora_do_ar(self):
+        return self.limite_mensagens is not None and self.mensagens >= self.limite_mensagens
+
+    @property
+    def porta(self):
+        return self._servidor.server_address[1]
+
+    def __enter__(self):
+        self._servidor = _ServidorTCP(('127.0.0.1', 0), _SessaoSMTP)
+        self._servidor.falso = self
+        threading.Thread(target=self._servidor.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+
+class TwilioHttpClientFalso(HttpClient):
+    """Transporte HTTP do Twilio que responde localmente, sem rede"""
+
+    enviados = []
+
+    def __init__(self, latencia=0.0):
+        super().__init__(logger=logger, is_async=False)
+        self.latencia = latencia
+
+    def request(self, method, uri, params=None, data=None, headers=None,
+                auth=None, timeout=None, allow_redirects=False):
+        time.sleep(self.latencia)
+        data = data or {}
+        TwilioHttpClientFalso.enviados.append({'to': data.get('To'), 'body': data.get('Body')})
+        corpo = {
+            'sid': f'SM{uuid.uuid4().hex}',
+            'status': 'queued',
+            'to': data.get('To'),
+            'from': data.get('From'),
+            'body': data.get('Body'),
+        }
+        return Response(201, json.dumps(corpo))
@@ -0,0 +1,160 @@
+# core/entrega_notificacoes.py - Entrega em lote (SMTP/Twilio) com conexões reaproveitadas
+import threading
+import time
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.utils.module_loading import import_string
+import logging
+
+logger = logging.getLogger(__name__)
+
+_clientes_twilio = {}
+_clientes_lock = threading.Lock()
+_limitadores = {}
+_limitadores_lock = threading.Lock()
+
+
+class LimitadorTaxa:
+    """Token bucket: no máximo `por_segundo` envios por segundo neste processo"""
+
+    def __init__(self, por_segundo):
+        self.intervalo = 1.0 / por_segundo if por_segundo else 0
+        self._proximo = 0.0
+        self._lock = threading.Lock()
+
+    def aguardar(self):
+        if not self.intervalo:
+            return
+        with self._lock:
+            agora = time.monotonic()
+            espera = self._proximo - agora
+            self._proximo = max(agora, self._proximo) + self.intervalo
+        if espera > 0:
+            time.sleep(espera)
+
+
+def limitador(canal):
+    """Limitador compartilhado do canal (NOTIFICACOES_TAXA, mensagens/segundo)"""
+    with _limitadores_lock:
+        if canal not in _limitadores:
+            taxa = getattr(settings, 'NOTIFICACOES_TAXA', {}).get(canal)
+            _limitadores[canal] = LimitadorTaxa(taxa)
+        return _limitadores[canal]
+
+
+# ====================
+# EMAIL
+# ====================
+
+def enviar_emails(mensagens, connection=None):
+    """
+    Envia várias mensagens pela mesma conexão SMTP (um único handshake TLS)
+
+    Args:
+        mensagens: dict {chave: EmailMessage}
+        connection: conexão já aberta (opcional); senão usa get_connection()
+
+    Falhas de conexão não interrompem o lote: as mensagens que não puderam
+    sair recebem o erro e as já enviadas continuam no resultado.
+
+    Returns:
+        dict {chave: '' se enviado, ou a mensagem de erro}
+    """
+    resultado = {}
+    if not mensagens:
+        return resultado
+
+    conexao = connection or get_connection()
+    taxa = limitador('EMAIL')
+    pendentes = list(mensagens.items())
+    try:
+        try:
+            conexao.open()
+        except Exception as e:
+            logger.error(f"Erro ao abrir conexão SMTP: {str(e)}")
+            pendentes = []
+            resultado = dict.fromkeys(mensagens, str(e) or e.__class__.__name__)
+        for posicao, (chave, mensagem) in enumerate(pendentes):
+            taxa.aguardar()
+            try:
+                enviados = conexao.send_messages([mensagem])
+                resultado[chave] = '' if enviados else 'Servidor SMTP recusou a mensagem'
+            except Exception as e:
+                logger.error(f"Erro ao enviar email ({chave}): {str(e)}")
+                resultado[chave] = str(e) or e.__class__.__name__
+                # Conexão pode ter caído: reabre para as próximas
+                try:
+                    conexao.close()
+                    conexao.open()
+                except Exception as erro_conexao:
+                    logger.error(f"Erro ao reabrir conexão SMTP: {str(erro_conexao)}")
+                    falha = str(erro_conexao) or erro_conexao.__class__.__name__
+                    for chave_restante, _ in pendentes[posicao + 1:]:
+                        resultado[chave_restante] = falha
+                    break
+    finally:
+        if connection is None:
+            try:
+                conexao.close()
+            except Exception:
+                pass
+
+    logger.info(f"📧 Lote de emails: {sum(1 for erro in resultado.values() if not erro)}/{len(resultado)} enviados")
+    return resultado
+
+
+# ====================
+# SMS (TWILIO)
+# ====================
+
+def cliente_twilio():
+    """
+    Cliente Twilio reaproveitado pelo processo (sessão HTTP com keep-alive)
+
+    NOTIFICACOES_TWILIO_HTTP_CLIENT permite trocar o transporte HTTP (ex.:
+    core.entrega_falsa.TwilioHttpClientFalso para benchmark/testes offline).
+    """
+    from twilio.rest import Client
+    from twilio.http.http_client import TwilioHttpClient
+
+    credenciais = (settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+    with _clientes_lock:
+        cliente = _clientes_twilio.get(credenciais)
+        if cliente is None:
+            classe_http = getattr(settings, 'NOTIFICACOES_TWILIO_HTTP_CLIENT', None)
+            if classe_http:
+                http_client = import_string(classe_http)()
+            else:
+                http_client = TwilioHttpClient(
+                    pool_connections=True,
+                    timeout=getattr(settings, 'REQUESTS_TIMEOUT', 10),
+                    max_retries=2,
+                )
+            cliente = Client(*credenciais, http_client=http_client)
+            _clientes_twilio[credenciais] = cliente
+        return cliente
+
+
+def descartar_clientes():
+    """Esquece clientes e limitadores (troca de credenciais/configuração)"""
+    with _clientes_lock:
+        _clientes_twilio.clear()
+    with _limitadores_lock:
+        _limitadores.clear()
+
+
+def enviar_sms(numero, mensagem):
+    """
+    Envia um SMS pelo cliente compartilhado, respeitando a taxa do provedor
+
+    Returns:
+        str: SID da mensagem
+    """
+    limitador('SMS').aguardar()
+    resposta = cliente_twilio().messages.create(
+        body=mensagem,
+        from_=settings.TWILIO_PHONE_NUMBER,
+        to=numero
+    )
+    return resposta.sid
@@ -0,0 +1,103 @@
+# core/estado_fotos.py - Reconciliação em lote do estado das fotos (Estudante.foto_*) com o disco
+import os
+
+from django.conf import settings
+from django.utils import timezone
+import logging
+
+from .cards_turma import invalidar_cards_turmas
+from .fotos_drive import checksum, extrair_drive_id
+from .models import Estudante
+
+logger = logging.getLogger(__name__)
+
+CAMPOS_ESTADO = ['foto_local_disponivel', 'foto_drive_id', 'foto_checksum']
+
+
+def _arquivos_em_disco(nomes):
+    """
+    Conjunto de arquivos existentes, listando cada diretório uma única vez
+
+    Args:
+        nomes: nomes relativos a MEDIA_ROOT (como gravados em Estudante.foto)
+    """
+    existentes = set()
+    for diretorio in {os.path.dirname(nome) for nome in nomes}:
+        caminho = os.path.join(settings.MEDIA_ROOT, diretorio)
+        if not os.path.isdir(caminho):
+            continue
+        prefixo = f'{diretorio}/' if diretorio else ''
+        existentes.update(
+            prefixo + entrada.name for entrada in os.scandir(caminho) if entrada.is_file()
+        )
+    return existentes
+
+
+def _checksum_arquivo(nome):
+    with open(os.path.join(settings.MEDIA_ROOT, nome), 'rb') as arquivo:
+        return checksum(iter(lambda: arquivo.read(64 * 1024), b''))
+
+
+def reconciliar_estado_fotos(corrigir=True, calcular_checksum=False, queryset=None):
+    """
+    Compara Estudante.foto_* com o disco e corrige as divergências em lote
+
+    Args:
+        corrigir: grava as correções (bulk_update); False só relata
+        calcular_checksum: relê os arquivos locais e confere o SHA-256
+        queryset: restringe os estudantes verificados
+
+    Returns:
+        dict com contagens, locais_invalidas [(matricula, nome)] e
+        detalhes [(matricula, nome, local, tem_foto, tem_drive)]
+    """
+    queryset = Estudante.objects.all() if queryset is None else queryset
+    estudantes = list(queryset.only(
+        'id', 'matricula_sga', 'nome', 'turma_id', 'foto', 'foto_url', *CAMPOS_ESTADO
+    ).order_by('matricula_sga'))
+    existentes = _arquivos_em_disco([e.foto.name for e in estudantes if e.foto])
+
+    resultado = {
+        'total': len(estudantes), 'locais': 0, 'apenas_drive': 0, 'ambas': 0, 'sem_foto': 0,
+        'locais_invalidas': [], 'checksums_alterados': 0, 'corrigidos': 0,
+        'detalhes': [],
+    }
+    alterados = []
+    for estudante in estudantes:
+        local = bool(estudante.foto) and estudante.foto.name in existentes
+        drive_id = extrair_drive_id(estudante.foto_url)
+        soma = estudante.foto_checksum if local else ''
+        if local and calcular_checksum:
+            soma = _checksum_arquivo(estudante.foto.name)
+            if estudante.foto_checksum and soma != estudante.foto_checksum:
+                resultado['checksums_alterados'] += 1
+
+        if local and estudante.foto_url:
+            resultado['ambas'] += 1
+        elif local:
+            resultado['locais'] += 1
+        elif estudante.foto_url:
+            resultado['apenas_drive'] += 1
+        else:
+            resultado['sem_foto'] += 1
+        resultado['detalhes'].append(
+            (estudante.matricula_sga, estudante.nome, local, bool(estudante.foto), bool(estudante.foto_url))
+        )
+        if estudante.foto and not local:
+            resultado['locais_invalidas'].append((estudante.matricula_sga, estudante.nome))
+
+        estado = (local, drive_id, soma)
+        if estado != (estudante.foto_local_disponivel, estudante.foto_drive_id, estudante.foto_checksum):
+            estudante.foto_local_disponivel, estudante.foto_drive_id, estudante.foto_checksum = estado
+            alterados.append(estudante)
+
+    resultado['corrigidos'] = len(alterados)
+    if corrigir:
+        Estudante.objects.bulk_update(alterados, CAMPOS_ESTADO, batch_size=500)
+        queryset.update(foto_verificada_em=timezone.now())
+        # bulk_update não dispara signals: invalida os cards das turmas aqui
+        invalidar_cards_turmas({estudante.turma_id for estudante in alterados})
+        if alterados:
+            logger.info(f"📸 Estado de foto corrigido para {len(alterados)} estudantes")
+
+    return resultado
@@ -0,0 +1,409 @@
+# core/fila_notificacoes.py - Fila de notificações aos responsáveis
+import hashlib
+import os
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+import logging
+
+from .fotos_drive import _destrancar, _trancar
+from .models import EnvioNotificacao, Estudante, Responsavel
+
+logger = logging.getLogger(__name__)
+
+MODO_CELERY = 'celery'
+MODO_THREAD = 'thread'
+MODO_EAGER = 'eager'
+
+ARQUIVO_VAGA = '{canal}-{indice}.lock'
+TEMPO_ENVIANDO = 300  # segundos; envio preso em ENVIANDO (worker morto) volta para a fila
+ESPERA_VAGA_THREAD = 30
+TAMANHO_LOTE = 50  # envios por conexão em processar_pendentes
+
+_executores = {}
+_executores_lock = threading.Lock()
+
+
+class VagaIndisponivel(Exception):
+    """Todas as vagas de envio do canal estão ocupadas"""
+
+
+def _modo():
+    return getattr(settings, 'NOTIFICACOES_FILA_MODO', MODO_THREAD)
+
+
+def _limite(canal):
+    return getattr(settings, 'NOTIFICACOES_CONCORRENCIA', {}).get(canal, 1)
+
+
+def _max_tentativas():
+    return getattr(settings, 'NOTIFICACOES_MAX_TENTATIVAS', 5)
+
+
+def _atraso(tentativas):
+    """Backoff exponencial: base, 2x base, 4x base..."""
+    base = getattr(settings, 'NOTIFICACOES_ATRASO_BASE', 60)
+    return timedelta(seconds=base * 2 ** max(tentativas - 1, 0))
+
+
+def chave_idempotencia(tipo_ocorrencia, ocorrencia_id, canal, alvo_id):
+    """Mesma ocorrência + canal + destinatário = mesmo envio"""
+    bruto = f'{tipo_ocorrencia}:{ocorrencia_id}:{canal}:{alvo_id}'
+    return hashlib.sha256(bruto.encode()).hexdigest()
+
+
+# ====================
+# ENFILEIRAMENTO
+# ====================
+
+def enfileirar_notificacoes_responsaveis(ocorrencia, tipo_ocorrencia='ocorrencia'):
+    """
+    Cria os envios (um email por responsável, um SMS por estudante) e agenda
+    o despacho para depois do commit. Envios já existentes são ignorados.
+
+    Returns:
+        int: quantidade de envios novos
+    """
+    from .services import ServicoNotificacao
+
+    estudantes = list(ocorrencia.estudantes.prefetch_related('responsaveis'))
+
+    envios = {}
+    emails = {}
+    for estudante in estudantes:
+        responsaveis = list(estudante.responsaveis.all())
+        for responsavel in responsaveis:
+            if responsavel.preferencia_contato in ServicoNotificacao.PREFERENCIAS_EMAIL:
+                emails.setdefault(responsavel.pk, []).append(estudante.pk)
+
+        # SMS: uma vez por estudante, tentando MÃE → PAI → outros
+        ordem_sms = ServicoNotificacao._ordenar_responsaveis_sms(responsaveis)
+        if ordem_sms:
+            chave = chave_idempotencia(tipo_ocorrencia, ocorrencia.pk, 'SMS', estudante.pk)
+            envios[chave] = EnvioNotificacao(
+                chave_idempotencia=chave,
+                canal='SMS',
+                tipo_ocorrencia=tipo_ocorrencia,
+                ocorrencia_id=ocorrencia.pk,
+                responsaveis=[r.pk for r in ordem_sms],
+                estudantes=[estudante.pk],
+            )
+
+    for responsavel_id, estudante_ids in emails.items():
+        chave = chave_idempotencia(tipo_ocorrencia, ocorrencia.pk, 'EMAIL', responsavel_id)
+        envios[chave] = EnvioNotificacao(
+            chave_idempotencia=chave,
+            canal='EMAIL',
+            tipo_ocorrencia=tipo_ocorrencia,
+            ocorrencia_id=ocorrencia.pk,
+            responsaveis=[responsavel_id],
+            estudantes=estudante_ids,
+        )
+
+    if not envios:
+        return 0
+
+    existentes = set(EnvioNotificacao.objects.filter(
+        chave_idempotencia__in=list(envios)
+    ).values_list('chave_idempotencia', flat=True))
+    novos = [envio for chave, envio in envios.items() if chave not in existentes]
+    if not novos:
+        return 0
+
+    EnvioNotificacao.objects.bulk_create(novos, ignore_conflicts=True)
+    pendentes = list(EnvioNotificacao.objects.filter(
+        chave_idempotencia__in=[envio.chave_idempotencia for envio in novos],
+        status='PENDENTE',
+        tentativas=0,
+    ).values_list('pk', 'canal'))
+
+    logger.info(f"📬 {len(pendentes)} envios enfileirados - {tipo_ocorrencia} #{ocorrencia.pk}")
+    transaction.on_commit(lambda: despachar(pendentes))
+    return len(novos)
+
+
+def despachar(envios):
+    """
+    Entrega os envios [(id, canal), ...] ao executor do modo configurado
+
+    Os envios de um mesmo canal seguem juntos como um lote, para que os
+    emails de uma ocorrência compartilhem a mesma conexão SMTP.
+    """
+    por_canal = defaultdict(list)
+    for envio_id, canal in envios:
+        por_canal[canal].append(envio_id)
+
+    modo = _modo()
+    for canal, ids in por_canal.items():
+        if modo == MODO_CELERY:
+            from .tasks import processar_lote_notificacoes
+            processar_lote_notificacoes.delay(ids)
+        elif modo == MODO_THREAD:
+            _executor(canal).submit(_processar_em_thread, ids, canal)
+        else:
+            processar_lote(ids)
+
+
+# ====================
+# PROCESSAMENTO
+# ====================
+
+def _executor(canal):
+    """Um pool por canal, do tamanho do limite de concorrência"""
+    with _executores_lock:
+        if canal not in _executores:
+            _executores[canal] = ThreadPoolExecutor(
+                max_workers=_limite(canal),
+                thread_name_prefix=f'notificacoes-{canal.lower()}'
+            )
+        return _executores[canal]
+
+
+def _processar_em_thread(envio_ids, canal):
+    try:
+        envios = processar_lote(envio_ids, espera_vaga=ESPERA_VAGA_THREAD)
+        reagendar = [envio for envio in envios if envio.status == 'PENDENTE']
+        if reagendar:
+            proxima = min(envio.proxima_tentativa for envio in reagendar)
+            atraso = (proxima - timezone.now()).total_seconds()
+            timer = threading.Timer(
+                max(atraso, 0), despachar, args=([(envio.pk, canal) for envio in reagendar],)
+            )
+            timer.daemon = True
+            timer.start()
+    except VagaIndisponivel:
+        logger.warning(f"Sem vaga para envios {canal} {envio_ids}; ficam para processar_fila_notificacoes")
+    except Exception as e:
+        logger.error(f"Erro nos envios {envio_ids}: {str(e)}")
+    finally:
+        close_old_connections()
+
+
+def _adquirir_vaga(canal, espera=0):
+    """
+    Semáforo de arquivos: limita envios simultâneos entre threads e processos
+
+    Cada vaga é um arquivo em NOTIFICACOES_VAGAS_DIR com lock exclusivo
+    (flock). O lock é atômico, ao contrário de cache.add no FileBasedCache,
+    e o sistema o solta sozinho se o processo morrer no meio do envio. O
+    limite vale por máquina: workers em servidores diferentes precisam
+    compartilhar o diretório (ou cada um tem as suas vagas).
+
+    Returns:
+        arquivo aberto com o lock; devolver com _liberar_vaga
+    """
+    diretorio = getattr(settings, 'NOTIFICACOES_VAGAS_DIR', '/tmp/notificacoes_vagas')
+    os.makedirs(diretorio, exist_ok=True)
+    prazo = time.monotonic() + espera
+    while True:
+        for indice in range(_limite(canal)):
+            arquivo = open(os.path.join(diretorio, ARQUIVO_VAGA.format(canal=canal, indice=indice)), 'a+b')
+            if _trancar(arquivo):
+                return arquivo
+            arquivo.close()
+        if time.monotonic() >= prazo:
+            raise VagaIndisponivel(canal)
+        time.sleep(0.2)
+
+
+def _liberar_vaga(arquivo):
+    try:
+        _destrancar(arquivo)
+    finally:
+        arquivo.close()
+
+
+def processar_envio(envio_id, espera_vaga=0):
+    """
+    Executa um único envio da fila
+
+    Returns:
+        EnvioNotificacao atualizado ou None se outro worker já o pegou
+    """
+    envios = processar_lote([envio_id], espera_vaga)
+    return envios[0] if envios else None
+
+
+def processar_lote(envio_ids, espera_vaga=0):
+    """
+    Executa envios da fila, cada um no máximo uma vez
+
+    Só são processados envios PENDENTES e vencidos; a troca para ENVIANDO é
+    um UPDATE condicional, então dois workers nunca enviam o mesmo. Os emails
+    do lote saem por uma única conexão SMTP (core.entrega_notificacoes).
+
+    Returns:
+        lista de EnvioNotificacao processados (sem os que outro worker pegou)
+    """
+    por_canal = defaultdict(list)
+    for envio_id, canal in EnvioNotificacao.objects.filter(
+        pk__in=envio_ids
+    ).values_list('pk', 'canal'):
+        por_canal[canal].append(envio_id)
+
+    processados = []
+    for canal, ids in por_canal.items():
+        vaga = _adquirir_vaga(canal, espera_vaga)
+        try:
+            agora = timezone.now()
+            reivindicados = [
+                envio_id for envio_id in ids
+                if EnvioNotificacao.objects.filter(
+                    pk=envio_id,
+                    status='PENDENTE',
+                    proxima_tentativa__lte=agora,
+                ).update(status='ENVIANDO', atualizado_em=agora)
+            ]
+            if not reivindicados:
+                continue
+
+            envios = list(EnvioNotificacao.objects.filter(pk__in=reivindicados))
+            erros = {}
+            try:
+                _executar_lote(canal, envios, erros)
+            except Exception as e:
+                # Só quem ainda não tem resultado volta para a fila: o que já
+                # foi entregue antes da exceção fica ENVIADO
+                logger.error(f"Erro no lote {canal} {reivindicados}: {str(e)}")
+                for envio in envios:
+                    erros.setdefault(envio.pk, str(e) or e.__class__.__name__)
+
+            agora = timezone.now()
+            for envio in envios:
+                _registrar_resultado(envio, erros.get(envio.pk, 'Envio não executado'), agora)
+            EnvioNotificacao.objects.bulk_update(envios, [
+                'status', 'tentativas', 'ultimo_erro', 'enviado_em', 'proxima_tentativa', 'atualizado_em'
+            ])
+            processados.extend(envios)
+        finally:
+            _liberar_vaga(vaga)
+    return processados
+
+
+def _registrar_resultado(envio, erro, agora):
+    envio.tentativas += 1
+    envio.ultimo_erro = erro
+    envio.atualizado_em = agora
+    if not erro:
+        envio.status = 'ENVIADO'
+        envio.enviado_em = agora
+    elif envio.tentativas >= _max_tentativas():
+        envio.status = 'FALHOU'
+        logger.error(f"❌ Envio {envio.canal} #{envio.pk} falhou após {envio.tentativas} tentativas: {erro}")
+    else:
+        envio.status = 'PENDENTE'
+        envio.proxima_tentativa = agora + _atraso(envio.tentativas)
+
+
+def _carregar_ocorrencias(envios):
+    from .models import Ocorrencia, OcorrenciaRapida
+
+    ids_por_tipo = defaultdict(set)
+    for envio in envios:
+        ids_por_tipo[envio.tipo_ocorrencia].add(envio.ocorrencia_id)
+
+    ocorrencias = {}
+    for tipo, ids in ids_por_tipo.items():
+        modelo = OcorrenciaRapida if tipo == 'ocorrencia_rapida' else Ocorrencia
+        for pk, ocorrencia in modelo.objects.in_bulk(ids).items():
+            ocorrencias[(tipo, pk)] = ocorrencia
+    return ocorrencias
+
+
+def _executar_lote(canal, envios, erros):
+    """
+    Envia de fato
+
+    Preenche `erros` ({envio_id: '' se entregue, ou a mensagem de erro}) à
+    medida que cada envio termina, para o resultado sobreviver a uma exceção
+    no meio do lote.
+    """
+    from .services import ServicoNotificacao
+    from .entrega_notificacoes import enviar_emails
+
+    ocorrencias = _carregar_ocorrencias(envios)
+    estudantes = Estudante.objects.in_bulk({pk for envio in envios for pk in envio.estudantes})
+    responsaveis = Responsavel.objects.in_bulk({pk for envio in envios for pk in envio.responsaveis})
+
+    mensagens = {}
+    for envio in envios:
+        ocorrencia = ocorrencias.get((envio.tipo_ocorrencia, envio.ocorrencia_id))
+        if ocorrencia is None:
+            erros[envio.pk] = 'Ocorrência removida'
+            continue
+        estudantes_envio = [estudantes[pk] for pk in envio.estudantes if pk in estudantes]
+
+        if canal == 'EMAIL':
+            responsavel = responsaveis.get(envio.responsaveis[0])
+            if responsavel is None:
+                erros[envio.pk] = 'Responsável removido'
+                continue
+            try:
+                email = ServicoNotificacao._montar_email_responsavel(
+                    responsavel, estudantes_envio, ocorrencia, envio.tipo_ocorrencia
+                )
+            except Exception as e:
+                erros[envio.pk] = str(e)
+                continue
+            if email is None:
+                erros[envio.pk] = ''  # preferência mudou: nada a enviar
+            else:
+                mensagens[envio.pk] = email
+            continue
+
+        # SMS: para no primeiro responsável que receber (MÃE → PAI → outros)
+        entregue = False
+        for responsavel_id in envio.responsaveis:
+            responsavel = responsaveis.get(responsavel_id)
+            if responsavel and ServicoNotificacao._enviar_sms_responsavel(
+                responsavel, estudantes_envio, ocorrencia, envio.tipo_ocorrencia
+            ):
+                entregue = True
+                break
+        erros[envio.pk] = '' if entregue else 'Nenhum responsável recebeu a mensagem'
+
+    erros.update(enviar_emails(mensagens))
+
+
+def processar_pendentes(limite=None):
+    """
+    Processa os envios pendentes já vencidos (retentativas e sobras)
+
+    Returns:
+        dict com contagem por status final
+    """
+    # Envios presos em ENVIANDO (worker morto) voltam para a fila
+    EnvioNotificacao.objects.filter(
+        status='ENVIANDO',
+        atualizado_em__lt=timezone.now() - timedelta(seconds=TEMPO_ENVIANDO),
+    ).update(status='PENDENTE')
+
+    vencidos = EnvioNotificacao.objects.filter(
+        status='PENDENTE',
+        proxima_tentativa__lte=timezone.now(),
+    ).order_by('proxima_tentativa').values_list('pk', 'canal')
+    if limite:
+        vencidos = vencidos[:limite]
+
+    por_canal = defaultdict(list)
+    for envio_id, canal in vencidos:
+        por_canal[canal].append(envio_id)
+
+    resultado = {'ENVIADO': 0, 'PENDENTE': 0, 'FALHOU': 0, 'ignorados': 0}
+    for canal, ids in por_canal.items():
+        for inicio in range(0, len(ids), TAMANHO_LOTE):
+            lote = ids[inicio:inicio + TAMANHO_LOTE]
+            try:
+                envios = processar_lote(lote, espera_vaga=ESPERA_VAGA_THREAD)
+            except VagaIndisponivel:
+                envios = []
+            for envio in envios:
+                resultado[envio.status] += 1
+            resultado['ignorados'] += len(lote) - len(envios)
+    return resultado
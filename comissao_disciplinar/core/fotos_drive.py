@@ -0,0 +1,347 @@
+# core/fotos_drive.py - Cache em disco das fotos do Google Drive (original + miniaturas)
+from contextlib import contextmanager
+from io import BytesIO
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+import requests
+from PIL import Image, ImageOps
+from django.conf import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Variantes servidas: nome -> lado maior em pixels
+TAMANHOS = {
+    'avatar': 48,   # listas
+    'card': 300,    # cards, ficha, quiosque do refeitório
+}
+TAMANHO_PADRAO = 'card'
+# Avatares são exibidos em círculo (object-fit: cover): recorta quadrado
+RECORTE_QUADRADO = {'avatar'}
+# Tamanho pedido ao Drive; as variantes são geradas localmente a partir dele
+TAMANHO_ORIGINAL = 600
+
+ID_VALIDO = re.compile(r'^[A-Za-z0-9_-]{10,200}$')
+ID_NA_URL = re.compile(r'id=([a-zA-Z0-9_-]+)')
+
+TEMPO_LOCK = 30
+
+# file_id -> [lock, threads usando]; a entrada sai quando a última thread termina
+_locks_locais = {}
+_locks_locais_lock = threading.Lock()
+
+
+class FotoIndisponivel(Exception):
+    """Drive não devolveu a foto e não existe cópia local"""
+
+    def __init__(self, mensagem, status=404):
+        super().__init__(mensagem)
+        self.status = status
+
+
+# ====================
+# CONFIGURAÇÃO
+# ====================
+
+def diretorio_cache():
+    return getattr(settings, 'FOTOS_CACHE_DIR', os.path.join(settings.BASE_DIR, 'cache_fotos'))
+
+
+def _url_drive():
+    return getattr(settings, 'FOTOS_DRIVE_URL', 'https://drive.google.com/thumbnail')
+
+
+def _revalidar_apos():
+    """Segundos até perguntar de novo ao Drive se a foto mudou"""
+    return getattr(settings, 'FOTOS_REVALIDAR_APOS', 60 * 60 * 24 * 7)
+
+
+def _timeout():
+    return getattr(settings, 'REQUESTS_TIMEOUT', 10)
+
+
+def id_valido(file_id):
+    """O id vira nome de diretório: só aceita o alfabeto usado pelo Drive"""
+    return bool(file_id and ID_VALIDO.match(file_id))
+
+
+def extrair_drive_id(foto_url):
+    """Id do arquivo num link do Google Drive (ou '' se não for do Drive)"""
+    if not foto_url or 'drive.google.com' not in foto_url:
+        return ''
+    match = ID_NA_URL.search(foto_url)
+    return match.group(1) if match else ''
+
+
+def checksum(pedacos):
+    """SHA-256 de um iterável de bytes (ex.: FieldFile.chunks())"""
+    resumo = hashlib.sha256()
+    for pedaco in pedacos:
+        resumo.update(pedaco)
+    return resumo.hexdigest()
+
+
+def _diretorio_foto(file_id):
+    # Dois níveis para não juntar milhares de entradas num só diretório
+    return os.path.join(diretorio_cache(), file_id[:2], file_id)
+
+
+def caminho_variante(file_id, tamanho=TAMANHO_PADRAO):
+    return os.path.join(_diretorio_foto(file_id), f'{tamanho}.jpg')
+
+
+def _caminho_original(file_id):
+    return os.path.join(_diretorio_foto(file_id), 'original')
+
+
+def _caminho_meta(file_id):
+    return os.path.join(_diretorio_foto(file_id), 'meta.json')
+
+
+# ====================
+# ARQUIVOS
+# ====================
+
+def gravar_atomico(caminho, conteudo):
+    """Escreve em arquivo temporário e renomeia: leitores nunca veem arquivo pela metade"""
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    fd, temporario = tempfile.mkstemp(dir=os.path.dirname(caminho), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as arquivo:
+            arquivo.write(conteudo)
+        os.replace(temporario, caminho)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+
+def _ler_meta(file_id):
+    try:
+        with open(_caminho_meta(file_id), encoding='utf-8') as arquivo:
+            return json.load(arquivo)
+    except (OSError, ValueError):
+        return None
+
+
+def _gravar_meta(file_id, meta):
+    gravar_atomico(_caminho_meta(file_id), json.dumps(meta).encode('utf-8'))
+
+
+def _precisa_revalidar(meta):
+    return time.time() - meta.get('validado_em', 0) > _revalidar_apos()
+
+
+def gerar_variantes(file_id, conteudo=None):
+    """Gera as miniaturas JPEG (TAMANHOS) a partir do original em cache"""
+    if conteudo is None:
+        with open(_caminho_original(file_id), 'rb') as arquivo:
+            conteudo = arquivo.read()
+
+    with Image.open(BytesIO(conteudo)) as imagem:
+        imagem = ImageOps.exif_transpose(imagem).convert('RGB')
+        for nome, lado in TAMANHOS.items():
+            if nome in RECORTE_QUADRADO:
+                variante = ImageOps.fit(imagem, (lado, lado), Image.LANCZOS)
+            else:
+                variante = imagem.copy()
+                variante.thumbnail((lado, lado), Image.LANCZOS)
+            saida = BytesIO()
+            variante.save(saida, 'JPEG', quality=85, optimize=True, progressive=lado > 100)
+            gravar_atomico(caminho_variante(file_id, nome), saida.getvalue())
+
+
+# ====================
+# DOWNLOAD (SINGLE-FLIGHT)
+# ====================
+
+@contextmanager
+def _lock_local(file_id):
+    """Lock por id entre as threads do processo"""
+    with _locks_locais_lock:
+        entrada = _locks_locais.setdefault(file_id, [threading.Lock(), 0])
+        entrada[1] += 1
+    try:
+        with entrada[0]:
+            yield
+    finally:
+        with _locks_locais_lock:
+            entrada[1] -= 1
+            if not entrada[1]:
+                del _locks_locais[file_id]
+
+
+def _trancar(arquivo):
+    """Lock exclusivo sem espera; o sistema solta sozinho se o processo morrer"""
+    try:
+        if fcntl:
+            fcntl.flock(arquivo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            arquivo.seek(0)
+            msvcrt.locking(arquivo.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+def _destrancar(arquivo):
+    if fcntl:
+        fcntl.flock(arquivo.fileno(), fcntl.LOCK_UN)
+    else:
+        arquivo.seek(0)
+        msvcrt.locking(arquivo.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def _lock_entre_processos(file_id):
+    """
+    Lock do arquivo .lock no diretório da foto, entre processos
+
+    O arquivo nunca é apagado (apagar abriria corrida com quem já o abriu);
+    só o lock é solto, e apenas pelo processo que o obteve.
+
+    Yields:
+        bool: True se foi preciso esperar outro processo
+    """
+    caminho = os.path.join(_diretorio_foto(file_id), '.lock')
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    with open(caminho, 'a+b') as arquivo:
+        obtido = _trancar(arquivo)
+        esperou = not obtido
+        limite = time.monotonic() + TEMPO_LOCK
+        while not obtido and time.monotonic() < limite:
+            time.sleep(0.05)
+            obtido = _trancar(arquivo)
+        # Sem o lock após TEMPO_LOCK: dono travado, segue por conta própria
+        try:
+            yield esperou
+        finally:
+            if obtido:
+                _destrancar(arquivo)
+
+
+def _baixar(file_id, meta):
+    """
+    Busca a foto no Drive; com cópia local usa requisição condicional
+
+    Returns:
+        dict: metadados atualizados
+    """
+    cabecalhos = {}
+    if meta:
+        if meta.get('etag'):
+            cabecalhos['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            cabecalhos['If-Modified-Since'] = meta['last_modified']
+
+    resposta = requests.get(
+        _url_drive(),
+        params={'id': file_id, 'sz': f'w{TAMANHO_ORIGINAL}'},
+        headers=cabecalhos,
+        timeout=_timeout(),
+        allow_redirects=True,
+    )
+
+    agora = time.time()
+    if resposta.status_code == 304 and meta:
+        meta['validado_em'] = agora
+        _gravar_meta(file_id, meta)
+        return meta
+
+    if resposta.status_code != 200 or not resposta.headers.get('Content-Type', '').startswith('image/'):
+        raise FotoIndisponivel(f'Drive respondeu {resposta.status_code} para {file_id}')
+
+    gravar_atomico(_caminho_original(file_id), resposta.content)
+    gerar_variantes(file_id, resposta.content)
+
+    novo = {
+        'etag': resposta.headers.get('ETag', ''),
+        'last_modified': resposta.headers.get('Last-Modified', ''),
+        'baixado_em': agora,
+        'validado_em': agora,
+    }
+    _gravar_meta(file_id, novo)
+    logger.info(f"📷 Foto {file_id} baixada do Drive ({len(resposta.content)} bytes)")
+    return novo
+
+
+def atualizar_foto(file_id, forcar=False):
+    """
+    Garante cópia local atualizada da foto (uma única busca por id)
+
+    Requisições simultâneas para o mesmo id esperam a primeira: dentro do
+    processo por um lock por id, entre processos por um lock de arquivo.
+    Se o Drive falhar e já houver cópia, a cópia antiga continua valendo.
+
+    Returns:
+        dict: metadados da foto em cache
+
+    Raises:
+        FotoIndisponivel: sem cópia local e o Drive não entregou a foto
+    """
+    meta = _ler_meta(file_id)
+    if meta and not forcar and not _precisa_revalidar(meta):
+        return meta
+
+    with _lock_local(file_id):
+        # Outra thread pode ter baixado enquanto esperávamos
+        meta = _ler_meta(file_id)
+        if meta and not forcar and not _precisa_revalidar(meta):
+            return meta
+
+        with _lock_entre_processos(file_id) as esperou:
+            if esperou:
+                # Outro processo baixou enquanto esperávamos; se falhou, tenta por conta própria
+                meta = _ler_meta(file_id)
+                if meta:
+                    return meta
+
+            try:
+                return _baixar(file_id, meta)
+            except requests.exceptions.Timeout:
+                if meta:
+                    logger.warning(f"Timeout revalidando foto {file_id}; servindo cópia local")
+                    return meta
+                raise FotoIndisponivel('Timeout ao buscar foto no Drive', status=504)
+            except (requests.exceptions.RequestException, FotoIndisponivel, OSError) as e:
+                if meta:
+                    logger.warning(f"Falha revalidando foto {file_id} ({e}); servindo cópia local")
+                    return meta
+                if isinstance(e, FotoIndisponivel):
+                    raise
+                raise FotoIndisponivel(f'Erro ao buscar foto: {e}', status=502)
+
+
+def obter_foto(file_id, tamanho=TAMANHO_PADRAO):
+    """
+    Caminho local da variante pedida, baixando/revalidando se preciso
+
+    Raises:
+        FotoIndisponivel
+    """
+    if tamanho not in TAMANHOS:
+        tamanho = TAMANHO_PADRAO
+    if not id_valido(file_id):
+        raise FotoIndisponivel('ID inválido', status=400)
+
+    atualizar_foto(file_id)
+    caminho = caminho_variante(file_id, tamanho)
+    if not os.path.exists(caminho):
+        # Variante nova (TAMANHOS mudou) ou apagada: regenera do original
+        try:
+            gerar_variantes(file_id)
+        except OSError:
+            atualizar_foto(file_id, forcar=True)
+    return caminho
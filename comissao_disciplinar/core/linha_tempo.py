@@ -0,0 +1,232 @@
+# core/linha_tempo.py - Linha do tempo materializada do estudante
+from django.apps import apps
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Count, Prefetch
+from django.utils.text import Truncator
+import logging
+
+from .models import Estudante, EventoLinhaTempo
+
+logger = logging.getLogger(__name__)
+
+EVENTOS_POR_PAGINA = 20
+
+
+def _texto(texto, tamanho=300):
+    return Truncator(' '.join((texto or '').split())).chars(tamanho)
+
+
+def _so_ids():
+    return Prefetch('estudantes', queryset=Estudante.objects.only('id'))
+
+
+# ====================
+# FONTES (um gerador de eventos por tipo)
+# ====================
+
+def _eventos_ocorrencias(ids):
+    ocorrencias = apps.get_model('core', 'Ocorrencia').objects.filter(pk__in=ids).select_related(
+        'infracao', 'sancao', 'responsavel_registro'
+    ).prefetch_related(_so_ids())
+    for ocorrencia in ocorrencias:
+        detalhe = []
+        if ocorrencia.infracao:
+            detalhe.append(f"{ocorrencia.infracao.codigo} - {ocorrencia.infracao.descricao}")
+        if ocorrencia.sancao:
+            detalhe.append(f"Sanção: {ocorrencia.sancao.get_tipo_display()}")
+        for estudante in ocorrencia.estudantes.all():
+            yield EventoLinhaTempo(
+                estudante_id=estudante.id, tipo='OCORRENCIA', origem_id=ocorrencia.pk,
+                data=ocorrencia.data, hora=ocorrencia.horario,
+                titulo=f"Ocorrência #{ocorrencia.pk}",
+                resumo=_texto(ocorrencia.descricao),
+                detalhe=_texto(' · '.join(detalhe)),
+                situacao=ocorrencia.get_status_display(),
+                gravidade=ocorrencia.infracao.gravidade if ocorrencia.infracao else '',
+                responsavel=ocorrencia.responsavel_registro.nome,
+            )
+
+
+def _eventos_ocorrencias_rapidas(ids):
+    ocorrencias = apps.get_model('core', 'OcorrenciaRapida').objects.filter(pk__in=ids).select_related(
+        'turma', 'responsavel_registro'
+    ).prefetch_related(_so_ids())
+    for ocorrencia in ocorrencias:
+        for estudante in ocorrencia.estudantes.all():
+            yield EventoLinhaTempo(
+                estudante_id=estudante.id, tipo='OCORRENCIA_RAPIDA', origem_id=ocorrencia.pk,
+                data=ocorrencia.data, hora=ocorrencia.horario,
+                titulo=f"Ocorrência Rápida #{ocorrencia.pk}",
+                resumo=_texto(ocorrencia.descricao),
+                detalhe=f"Turma {ocorrencia.turma.nome}",
+                responsavel=ocorrencia.responsavel_registro.nome,
+            )
+
+
+def _eventos_atendimentos(ids):
+    atendimentos = apps.get_model('atendimentos', 'Atendimento').objects.filter(pk__in=ids).select_related(
+        'tipo_atendimento', 'situacao', 'servidor_responsavel'
+    ).prefetch_related(_so_ids())
+    for atendimento in atendimentos:
+        for estudante in atendimento.estudantes.all():
+            yield EventoLinhaTempo(
+                estudante_id=estudante.id, tipo='ATENDIMENTO', origem_id=atendimento.pk,
+                data=atendimento.data, hora=atendimento.hora,
+                titulo=atendimento.tipo_atendimento.nome,
+                resumo=_texto(atendimento.informacoes),
+                detalhe=atendimento.get_coordenacao_display(),
+                situacao=atendimento.situacao.nome,
+                responsavel=atendimento.servidor_responsavel.nome,
+                publico=atendimento.publicar_ficha_aluno,
+            )
+
+
+def _eventos_atendimentos_napne(ids):
+    atendimentos = apps.get_model('napne', 'AtendimentoNAPNE').objects.filter(pk__in=ids).select_related(
+        'tipo_atendimento', 'status', 'atendido_por'
+    )
+    for atendimento in atendimentos:
+        yield EventoLinhaTempo(
+            estudante_id=atendimento.estudante_id, tipo='ATENDIMENTO_NAPNE', origem_id=atendimento.pk,
+            data=atendimento.data,
+            titulo=f"NAPNE - {atendimento.tipo_atendimento.nome}",
+            resumo=_texto(atendimento.resumo_atendimento or atendimento.detalhamento),
+            situacao=atendimento.status.nome,
+            responsavel=atendimento.atendido_por.nome,
+            publico=atendimento.publicar_ficha_aluno,
+        )
+
+
+def _eventos_conselhos(ids):
+    """Um evento por estudante do conselho (a origem é o ConselhoClasse)"""
+    informacoes = apps.get_model('pedagogico', 'InformacaoEstudanteConselho').objects.filter(
+        conselho_id__in=ids
+    ).select_related('conselho__turma')
+    for info in informacoes:
+        encaminhamentos = [
+            sigla for sigla, marcado in (
+                ('CDPD', info.encaminhamento_cdpd),
+                ('CDAE', info.encaminhamento_cdae),
+                ('NAPNE', info.encaminhamento_napne),
+            ) if marcado
+        ]
+        yield EventoLinhaTempo(
+            estudante_id=info.estudante_id, tipo='CONSELHO', origem_id=info.conselho_id,
+            data=info.conselho.data_realizacao,
+            titulo=f"Conselho de Classe {info.conselho.periodo} - {info.conselho.turma.nome}",
+            resumo=_texto(info.observacoes_gerais),
+            detalhe=f"Encaminhamentos: {', '.join(encaminhamentos)}" if encaminhamentos else '',
+        )
+
+
+# tipo -> (modelo de origem, gerador de eventos a partir dos pks de origem)
+FONTES = {
+    'OCORRENCIA': ('core.Ocorrencia', _eventos_ocorrencias),
+    'OCORRENCIA_RAPIDA': ('core.OcorrenciaRapida', _eventos_ocorrencias_rapidas),
+    'ATENDIMENTO': ('atendimentos.Atendimento', _eventos_atendimentos),
+    'ATENDIMENTO_NAPNE': ('napne.AtendimentoNAPNE', _eventos_atendimentos_napne),
+    'CONSELHO': ('pedagogico.ConselhoClasse', _eventos_conselhos),
+}
+
+
+# ====================
+# MANUTENÇÃO
+# ====================
+
+def sincronizar(tipo, origem_ids):
+    """
+    Regrava os eventos dos registros de origem (post_save, m2m_changed e
+    gravações em lote)
+
+    Returns:
+        número de eventos gravados
+    """
+    origem_ids = list({pk for pk in origem_ids if pk})
+    if not origem_ids:
+        return 0
+    _, gerar = FONTES[tipo]
+    eventos = list(gerar(origem_ids))
+    with transaction.atomic():
+        EventoLinhaTempo.objects.filter(tipo=tipo, origem_id__in=origem_ids).delete()
+        EventoLinhaTempo.objects.bulk_create(eventos, batch_size=500)
+    return len(eventos)
+
+
+def remover(tipo, origem_ids):
+    """Apaga os eventos de registros de origem excluídos"""
+    return EventoLinhaTempo.objects.filter(tipo=tipo, origem_id__in=list(origem_ids)).delete()[0]
+
+
+def sincronizar_vinculos(tipo, instance, action, reverse, pk_set):
+    """
+    m2m_changed em .estudantes de ocorrências e atendimentos
+
+    instance é o registro de origem ou, quando reverse, o Estudante.
+    """
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        sincronizar(tipo, [instance.pk])
+    elif pk_set:
+        sincronizar(tipo, pk_set)
+    else:
+        EventoLinhaTempo.objects.filter(tipo=tipo, estudante=instance).delete()
+
+
+def reconstruir_linha_tempo(tipos=None, lote=500):
+    """
+    Recria a linha do tempo a partir das tabelas de origem (após importações
+    ou gravações em lote que não disparam signals)
+
+    Returns:
+        {tipo: eventos gravados}
+    """
+    totais = {}
+    with transaction.atomic():
+        for tipo in tipos or FONTES:
+            modelo, gerar = FONTES[tipo]
+            EventoLinhaTempo.objects.filter(tipo=tipo).delete()
+            origem_ids = apps.get_model(modelo).objects.order_by('pk').values_list('pk', flat=True)
+            pendentes = []
+            totais[tipo] = 0
+            for origem_id in origem_ids.iterator(chunk_size=lote):
+                pendentes.append(origem_id)
+                if len(pendentes) >= lote:
+                    totais[tipo] += _inserir(gerar(pendentes))
+                    pendentes = []
+            totais[tipo] += _inserir(gerar(pendentes))
+    logger.info(f"🕒 Linha do tempo reconstruída: {totais}")
+    return totais
+
+
+def _inserir(eventos):
+    eventos = list(eventos)
+    EventoLinhaTempo.objects.bulk_create(eventos, batch_size=500)
+    return len(eventos)
+
+
+# ====================
+# CONSULTA
+# ====================
+
+def pagina_linha_tempo(estudante, numero=1, tipos=None, por_pagina=EVENTOS_POR_PAGINA):
+    """
+    Página do histórico público do estudante e o total por tipo
+
+    São duas leituras no índice (estudante, publico, data): a contagem por
+    tipo, que também serve de total do Paginator, e a fatia da página.
+
+    Returns:
+        (page_obj, {tipo: total})
+    """
+    eventos = EventoLinhaTempo.objects.filter(estudante=estudante, publico=True)
+    contagem = dict(
+        eventos.order_by().values_list('tipo').annotate(total=Count('id'))
+    )
+    if tipos:
+        eventos = eventos.filter(tipo__in=tipos)
+    paginator = Paginator(eventos, por_pagina)
+    # Evita o COUNT(*) do Paginator: o total já saiu da contagem por tipo
+    paginator.count = sum(total for tipo, total in contagem.items() if not tipos or tipo in tipos)
+    return paginator.get_page(numero), contagem
@@ -0,0 +1,165 @@
+import os
+import sqlite3
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from core.analise_indices import (
+    analisar, atualizar_estatisticas, contexto_consultas, remover_indices, semear,
+)
+
+ALIAS_COPIA = 'analise_indices'
+
+
+class Command(BaseCommand):
+    help = (
+        'Roda as consultas das listas/dashboards com EXPLAIN, aponta varreduras completas '
+        'e compara o tempo com e sem os índices (numa transação desfeita no final, numa cópia '
+        'temporária quando o banco padrão é SQLite)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--quantidade',
+            type=int,
+            default=20000,
+            help='Ocorrências (e ocorrências rápidas) semeadas; as demais tabelas são proporcionais (padrão: 20000)',
+        )
+        parser.add_argument(
+            '--sem-semear',
+            action='store_true',
+            help='Usa só os dados já existentes no banco',
+        )
+        parser.add_argument('--repeticoes', type=int, default=5, help='Execuções por consulta (mediana)')
+        parser.add_argument('--planos', action='store_true', help='Mostra o EXPLAIN completo de cada consulta')
+        parser.add_argument(
+            '--banco',
+            default=DEFAULT_DB_ALIAS,
+            help='Alias (DATABASES) do banco analisado; com o padrão, SQLite é analisado numa cópia temporária',
+        )
+        parser.add_argument(
+            '--no-banco-atual',
+            action='store_true',
+            help='Semeia e remove índices no próprio banco em uso (trava as escritas durante a análise)',
+        )
+
+    def handle(self, *args, **options):
+        banco = options['banco']
+        if banco not in connections.settings:
+            raise CommandError(f"Banco '{banco}' não configurado em DATABASES")
+
+        self.stdout.write("\n" + "="*70)
+        self.stdout.write(self.style.SUCCESS("🔍 ANÁLISE DE ÍNDICES DAS CONSULTAS QUENTES"))
+        self.stdout.write("="*70 + "\n")
+
+        # A análise roda numa transação longa de escrita: no banco em uso ela
+        # travaria check-ins e demais gravações até terminar
+        copia = None
+        if banco == DEFAULT_DB_ALIAS and not options['no_banco_atual']:
+            if connections[banco].vendor == 'sqlite':
+                copia = self._copiar_sqlite(banco)
+                self.stdout.write(f"🗄️  Banco: sqlite (cópia temporária de '{banco}')")
+                banco = ALIAS_COPIA
+            elif not settings.DEBUG:
+                raise CommandError(
+                    "A análise semeia dados e remove índices numa transação longa, travando as escritas "
+                    "do banco em uso. Aponte --banco para um banco de análise ou confirme com --no-banco-atual."
+                )
+        if copia is None:
+            self.stdout.write(f"🗄️  Banco: {connections[banco].vendor} ('{banco}')")
+
+        try:
+            antes, depois = self._analisar(banco, options)
+        finally:
+            if copia:
+                connections[ALIAS_COPIA].close()
+                del connections[ALIAS_COPIA]
+                del connections.settings[ALIAS_COPIA]
+                os.remove(copia)
+
+        self._tabela(antes, depois)
+        if antes:
+            self.stdout.write(
+                f"🔎 Consultas com varredura completa: {sum(1 for *_, v in antes.values() if v)} sem os índices, "
+                f"{sum(1 for *_, v in depois.values() if v)} com os índices"
+            )
+        self._varreduras(depois, options['planos'])
+
+    def _copiar_sqlite(self, origem):
+        """Copia o banco SQLite para um arquivo temporário e registra o alias ALIAS_COPIA"""
+        conexao = connections[origem]
+        if conexao.in_atomic_block:
+            # O backup do SQLite espera indefinidamente por uma transação de escrita aberta
+            raise CommandError("Não é possível copiar o banco dentro de uma transação; use --banco ou --no-banco-atual")
+        conexao.ensure_connection()
+        descritor, caminho = tempfile.mkstemp(prefix='analise_indices_', suffix='.sqlite3')
+        os.close(descritor)
+        destino = sqlite3.connect(caminho)
+        try:
+            conexao.connection.backup(destino)
+        except Exception:
+            os.remove(caminho)
+            raise
+        finally:
+            destino.close()
+        connections.settings[ALIAS_COPIA] = {**connections.settings[origem], 'NAME': caminho}
+        return caminho
+
+    def _analisar(self, banco, options):
+        comparar = connections[banco].features.can_rollback_ddl
+        if not comparar:
+            self.stdout.write(self.style.WARNING(
+                "⚠️  Este banco não desfaz DDL em transação: só o cenário atual será medido"
+            ))
+
+        with transaction.atomic(using=banco):
+            if not options['sem_semear']:
+                criados = semear(options['quantidade'], banco=banco)
+                self.stdout.write("🌱 Massa semeada: " + ', '.join(f"{nome} {total}" for nome, total in criados.items()))
+            atualizar_estatisticas(banco)
+            contexto = contexto_consultas(banco)
+
+            depois = analisar(contexto, options['repeticoes'], banco)
+            antes = {}
+            if comparar:
+                removidos = remover_indices(banco)
+                atualizar_estatisticas(banco)
+                antes = analisar(contexto, options['repeticoes'], banco)
+                self.stdout.write(f"🧪 Sem os índices: {', '.join(removidos)}")
+
+            # Nada do que foi semeado ou removido fica no banco
+            transaction.set_rollback(True, using=banco)
+        return antes, depois
+
+    def _tabela(self, antes, depois):
+        self.stdout.write("\n" + f"{'Consulta':34} {'Antes (ms)':>11} {'Depois (ms)':>12} {'Ganho':>8}")
+        self.stdout.write("-"*70)
+        for nome, (ms, _, varreduras) in depois.items():
+            marca = ' ⚠️' if varreduras else ''
+            if nome in antes:
+                ms_antes = antes[nome][0]
+                ganho = f"{ms_antes / ms:.1f}x" if ms else '-'
+                self.stdout.write(f"{nome:34} {ms_antes:11.2f} {ms:12.2f} {ganho:>8}{marca}")
+            else:
+                self.stdout.write(f"{nome:34} {'-':>11} {ms:12.2f} {'-':>8}{marca}")
+        self.stdout.write("-"*70)
+
+    def _varreduras(self, depois, planos):
+        com_varredura = {nome: varreduras for nome, (_, _, varreduras) in depois.items() if varreduras}
+        if com_varredura:
+            self.stdout.write(self.style.WARNING(f"\n⚠️  Varreduras completas ({len(com_varredura)}):"))
+            for nome, varreduras in com_varredura.items():
+                self.stdout.write(f"   {nome}:")
+                for linha in varreduras:
+                    self.stdout.write(f"      {linha}")
+        else:
+            self.stdout.write(self.style.SUCCESS("\n✅ Nenhuma varredura completa com os índices atuais"))
+
+        if planos:
+            self.stdout.write("\n📋 Planos:")
+            for nome, (_, plano, _) in depois.items():
+                self.stdout.write(f"\n   {nome}:")
+                for linha in plano.splitlines():
+                    self.stdout.write(f"      {linha}")
+        self.stdout.write("="*70 + "\n")
@@ -0,0 +1,71 @@
+import time
+from itertools import cycle, islice
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Ocorrencia
+from core.utils import (
+    _criar_estilos, estilos_documento, gerar_documento_pdf, gerar_documentos_pdf,
+    gerar_documentos_pdf_unico,
+)
+
+
+class Command(BaseCommand):
+    help = 'Mede documentos/segundo de gerar_documento_pdf (individual x lote) com ocorrências do banco'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--documentos', type=int, default=50, help='Quantidade de documentos')
+        parser.add_argument(
+            '--tipo', default='NOTIFICACAO',
+            help='Tipo de documento (REGISTRO, ATA_ADVERTENCIA, NOTIFICACAO, RELATORIO_FINAL)',
+        )
+
+    def _medir(self, rotulo, quantidade, funcao):
+        inicio = time.perf_counter()
+        funcao()
+        decorrido = time.perf_counter() - inicio
+        self.stdout.write(
+            f"   {rotulo:32} {decorrido:6.2f}s  {quantidade / decorrido:7.1f} documentos/s"
+        )
+        return decorrido
+
+    def handle(self, *args, **options):
+        quantidade = options['documentos']
+        tipo = options['tipo']
+
+        ids = list(Ocorrencia.objects.order_by('-id').values_list('id', flat=True)[:quantidade])
+        if not ids:
+            raise CommandError('Nenhuma ocorrência cadastrada para gerar documentos.')
+        # Repete ocorrências se houver menos que o pedido
+        ids = list(islice(cycle(ids), quantidade))
+
+        self.stdout.write("\n" + "="*70)
+        self.stdout.write(self.style.SUCCESS("⏱️  BENCHMARK DE DOCUMENTOS PDF"))
+        self.stdout.write("="*70 + "\n")
+        self.stdout.write(f"📄 {quantidade} documentos {tipo} ({len(set(ids))} ocorrências distintas)\n")
+
+        estilos_documento()  # aquece o registro, como num processo já em uso
+
+        inicio = time.perf_counter()
+        for _ in range(quantidade):
+            _criar_estilos()
+        setup = time.perf_counter() - inicio
+        self.stdout.write(
+            f"   Montagem de estilos por documento (antigo): {setup / quantidade * 1000:.2f}ms/documento"
+        )
+
+        def individual():
+            for ocorrencia_id in ids:
+                gerar_documento_pdf(Ocorrencia.objects.get(pk=ocorrencia_id), tipo)
+
+        def lote():
+            por_id = Ocorrencia.objects.in_bulk(set(ids))
+            gerar_documentos_pdf([por_id[ocorrencia_id] for ocorrencia_id in ids], tipo)
+
+        def unico():
+            gerar_documentos_pdf_unico(Ocorrencia.objects.filter(pk__in=ids), tipo)
+
+        self._medir('Uma chamada por ocorrência:', quantidade, individual)
+        self._medir('Lote (gerar_documentos_pdf):', quantidade, lote)
+        self._medir('Lote num único PDF:', len(set(ids)), unico)
+        self.stdout.write("="*70 + "\n")
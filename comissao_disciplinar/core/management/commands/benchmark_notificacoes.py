@@ -0,0 +1,92 @@
+import time
+
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from core.entrega_falsa import ServidorSMTPFalso, TwilioHttpClientFalso
+from core.entrega_notificacoes import enviar_emails, descartar_clientes, enviar_sms
+
+
+class Command(BaseCommand):
+    help = 'Compara envio por mensagem x envio em lote usando SMTP/Twilio falsos (offline)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mensagens', type=int, default=100, help='Quantidade de emails/SMS')
+        parser.add_argument(
+            '--latencia-conexao', type=float, default=0.05,
+            help='Segundos simulados por handshake SMTP (TCP + TLS)',
+        )
+        parser.add_argument(
+            '--taxa-sms', type=float, default=None,
+            help='Limite de SMS/segundo (padrão: sem limite, para medir só o cliente)',
+        )
+
+    def _emails(self, quantidade):
+        return {
+            i: EmailMessage(f'Teste {i}', 'corpo', 'no-reply@ifb.edu.br', [f'resp{i}@teste.com'])
+            for i in range(quantidade)
+        }
+
+    def handle(self, *args, **options):
+        quantidade = options['mensagens']
+
+        self.stdout.write("\n" + "="*70)
+        self.stdout.write(self.style.SUCCESS("⏱️  BENCHMARK DE ENTREGA DE NOTIFICAÇÕES"))
+        self.stdout.write("="*70 + "\n")
+
+        with ServidorSMTPFalso(latencia_conexao=options['latencia_conexao']) as smtp:
+            def conexao():
+                return get_connection(
+                    'django.core.mail.backends.smtp.EmailBackend',
+                    host='127.0.0.1', port=smtp.porta, use_tls=False, use_ssl=False,
+                )
+
+            with override_settings(NOTIFICACOES_TAXA={}):
+                descartar_clientes()
+
+                inicio = time.perf_counter()
+                for mensagem in self._emails(quantidade).values():
+                    mensagem.connection = conexao()
+                    mensagem.send()
+                individual = time.perf_counter() - inicio
+                conexoes_individual = smtp.conexoes
+
+                inicio = time.perf_counter()
+                enviar_emails(self._emails(quantidade), connection=conexao())
+                lote = time.perf_counter() - inicio
+                conexoes_lote = smtp.conexoes - conexoes_individual
+
+        self.stdout.write(f"📧 {quantidade} emails")
+        self.stdout.write(f"   Uma conexão por email: {individual:.2f}s ({conexoes_individual} conexões)")
+        self.stdout.write(f"   Conexão compartilhada: {lote:.2f}s ({conexoes_lote} conexão)")
+
+        from twilio.rest import Client
+
+        taxa = {'SMS': options['taxa_sms']} if options['taxa_sms'] else {}
+        with override_settings(
+            NOTIFICACOES_TAXA=taxa,
+            NOTIFICACOES_TWILIO_HTTP_CLIENT='core.entrega_falsa.TwilioHttpClientFalso',
+            TWILIO_ACCOUNT_SID='AC' + '0' * 32,
+            TWILIO_AUTH_TOKEN='token',
+            TWILIO_PHONE_NUMBER='+15005550006',
+        ):
+            descartar_clientes()
+
+            inicio = time.perf_counter()
+            for i in range(quantidade):
+                Client('AC' + '0' * 32, 'token', http_client=TwilioHttpClientFalso()).messages.create(
+                    body='teste', from_='+15005550006', to=f'+556199999{i:04d}'
+                )
+            individual = time.perf_counter() - inicio
+
+            inicio = time.perf_counter()
+            for i in range(quantidade):
+                enviar_sms(f'+556199999{i:04d}', 'teste')
+            compartilhado = time.perf_counter() - inicio
+            descartar_clientes()
+
+        self.stdout.write(f"\n📱 {quantidade} SMS (transporte falso)")
+        self.stdout.write(f"   Cliente novo por SMS: {individual:.2f}s")
+        self.stdout.write(f"   Cliente compartilhado{' + limite de taxa' if taxa else ''}: {compartilhado:.2f}s")
+        self.stdout.write(self.style.SUCCESS("\n✅ Benchmark concluído!"))
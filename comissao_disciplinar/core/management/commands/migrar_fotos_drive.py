@@ -7,7 +7,7 @@ import os
 import time
 
 class Command(BaseCommand):
-    help = 'Baixa fotos do Google Drive para armazenamento local'
+    help = 'Baixa fotos do Google Drive para armazenamento local (serial; prefira sincronizar_fotos)'
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from core.fila_notificacoes import processar_pendentes
+
+
+class Command(BaseCommand):
+    help = 'Processa os envios pendentes da fila de notificações (retentativas e sobras)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limite',
+            type=int,
+            default=None,
+            help='Máximo de envios processados nesta execução',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("\n" + "="*70)
+        self.stdout.write(self.style.SUCCESS("📬 FILA DE NOTIFICAÇÕES"))
+        self.stdout.write("="*70 + "\n")
+
+        resultado = processar_pendentes(limite=options['limite'])
+
+        self.stdout.write(f"✅ Enviados: {resultado['ENVIADO']}")
+        self.stdout.write(f"🔁 Reagendados: {resultado['PENDENTE']}")
+        self.stdout.write(f"❌ Falharam (sem novas tentativas): {resultado['FALHOU']}")
+        self.stdout.write(f"⏭️  Ignorados (em uso por outro worker): {resultado['ignorados']}")
+        self.stdout.write(self.style.SUCCESS("\n✅ Processamento concluído!"))
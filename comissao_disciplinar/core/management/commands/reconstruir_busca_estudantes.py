@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+from core.busca_estudantes import reconstruir_indice
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói o índice de busca de estudantes (rode após importações em lote)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=1000,
+            help='Estudantes lidos por vez (padrão: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("\n" + "="*70)
+        self.stdout.write(self.style.SUCCESS("🔎 RECONSTRUÇÃO DO ÍNDICE DE BUSCA DE ESTUDANTES"))
+        self.stdout.write("="*70 + "\n")
+
+        inicio = time.perf_counter()
+        estudantes, termos = reconstruir_indice(lote=options['lote'])
+        decorrido = time.perf_counter() - inicio
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Estudantes indexados: {estudantes}"))
+        self.stdout.write(f"📚 Termos gravados: {termos}")
+        self.stdout.write(f"⏱️  Tempo: {decorrido:.2f}s")
+        self.stdout.write("="*70 + "\n")
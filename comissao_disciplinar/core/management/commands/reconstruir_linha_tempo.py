@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+from core.linha_tempo import FONTES, reconstruir_linha_tempo
+from core.models import EventoLinhaTempo
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói a linha do tempo dos estudantes (rode após o migrate e após importações em lote)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tipo',
+            action='append',
+            choices=list(FONTES),
+            help='Reconstrói só este tipo de evento (pode repetir)',
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=500,
+            help='Registros de origem lidos por vez (padrão: 500)',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("\n" + "="*70)
+        self.stdout.write(self.style.SUCCESS("🕒 RECONSTRUÇÃO DA LINHA DO TEMPO DOS ESTUDANTES"))
+        self.stdout.write("="*70 + "\n")
+
+        inicio = time.perf_counter()
+        totais = reconstruir_linha_tempo(tipos=options['tipo'], lote=options['lote'])
+        decorrido = time.perf_counter() - inicio
+
+        nomes = dict(EventoLinhaTempo.TIPO_CHOICES)
+        for tipo, total in totais.items():
+            self.stdout.write(f"   {nomes[tipo]}: {total}")
+        self.stdout.write(self.style.SUCCESS(f"✅ Eventos gravados: {sum(totais.values())}"))
+        self.stdout.write(f"⏱️  Tempo: {decorrido:.2f}s")
+        self.stdout.write("="*70 + "\n")
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from core.documentos_render import retomar_se_parado
+from core.models import DocumentoGerado
+
+
+class Command(BaseCommand):
+    help = 'Reagenda os documentos parados em geração (rode periodicamente, ex.: cron a cada 10 minutos)'
+
+    def handle(self, *args, **options):
+        self.stdout.write("\n" + "="*70)
+        self.stdout.write(self.style.SUCCESS("📄 DOCUMENTOS PARADOS EM GERAÇÃO"))
+        self.stdout.write("="*70 + "\n")
+
+        reagendados = 0
+        for documento in DocumentoGerado.objects.filter(status='PENDENTE').only('pk', 'status', 'data_geracao'):
+            if retomar_se_parado(documento):
+                reagendados += 1
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Reagendados: {reagendados}"))
+        self.stdout.write("="*70 + "\n")
@@ -0,0 +1,101 @@
+from django.core.management.base import BaseCommand
+from core.sincronizacao_fotos import SincronizadorFotos
+
+
+class Command(BaseCommand):
+    help = 'Sincroniza as fotos do Google Drive para o armazenamento local (paralelo e retomável)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=8,
+            help='Downloads simultâneos (padrão: 8)',
+        )
+        parser.add_argument(
+            '--processos',
+            type=int,
+            default=None,
+            help='Processos para redimensionar/recomprimir (padrão: nº de CPUs; 0 = sem processos extras)',
+        )
+        parser.add_argument(
+            '--limite',
+            type=int,
+            default=None,
+            help='Número máximo de fotos nesta execução',
+        )
+        parser.add_argument(
+            '--manifesto',
+            default=None,
+            help='Arquivo com os ids já concluídos (padrão: media/estudantes/.manifesto_sincronizacao.jsonl)',
+        )
+        parser.add_argument(
+            '--forcar',
+            action='store_true',
+            help='Ignora manifesto e fotos locais existentes e baixa tudo de novo',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Apenas lista o que seria baixado',
+        )
+
+    def handle(self, *args, **options):
+        sincronizador = SincronizadorFotos(
+            manifesto=options['manifesto'],
+            threads=options['threads'],
+            processos=options['processos'],
+            forcar=options['forcar'],
+            limite=options['limite'],
+            progresso=self._progresso,
+        )
+
+        self.stdout.write("\n" + "="*70)
+        self.stdout.write(self.style.SUCCESS("📥 SINCRONIZAÇÃO DE FOTOS: Google Drive → Local"))
+        self.stdout.write("="*70 + "\n")
+
+        if options['dry_run']:
+            pendentes = sincronizador.listar_pendentes()
+            self._resumo_inicial(sincronizador.resultado)
+            for _, matricula, file_id in pendentes:
+                self.stdout.write(f"🔍 {matricula:12} - {file_id}")
+            self.stdout.write(self.style.WARNING("\nExecute sem --dry-run para baixar as fotos."))
+            return
+
+        self.stdout.write(
+            f"⚙️  {sincronizador.threads} threads de download, "
+            f"{sincronizador.processos or 'sem'} processos de otimização"
+        )
+        resultado = sincronizador.executar()
+        self._resumo_inicial(resultado)
+
+        self.stdout.write("\n" + "="*70)
+        self.stdout.write(self.style.SUCCESS("📊 RESUMO:"))
+        self.stdout.write("="*70)
+        self.stdout.write(self.style.SUCCESS(f"✅ Baixados com sucesso: {resultado['baixados']}"))
+        self.stdout.write(self.style.ERROR(f"❌ Erros: {resultado['erros']}"))
+        for matricula, erro in resultado['falhas'][:20]:
+            self.stdout.write(f"   {matricula:12} - {erro}")
+        if resultado['bytes_baixados']:
+            self.stdout.write(
+                f"💾 {resultado['bytes_baixados'] / 1024 / 1024:.1f}MB baixados → "
+                f"{resultado['bytes_gravados'] / 1024 / 1024:.1f}MB gravados"
+            )
+        if resultado['erros']:
+            self.stdout.write(self.style.WARNING("\n💡 Rode o comando de novo para tentar só as que faltaram."))
+        self.stdout.write("="*70 + "\n")
+
+    def _resumo_inicial(self, resultado):
+        self.stdout.write(f"📋 Para processar: {resultado['pendentes']}")
+        self.stdout.write(f"⏭️  Já com foto local: {resultado['ja_locais']}")
+        self.stdout.write(f"🔁 Já concluídos (manifesto): {resultado['retomados']}")
+        if resultado['urls_invalidas']:
+            self.stdout.write(self.style.WARNING(f"⚠️  URLs inválidas: {resultado['urls_invalidas']}"))
+
+    def _progresso(self, status):
+        eta = f"{status['eta_segundos']:.0f}s" if status['eta_segundos'] is not None else '?'
+        self.stdout.write(
+            f"[{status['feitos']:4}/{status['total']}] "
+            f"{status['fotos_por_segundo']:.1f} fotos/s, {status['mb_por_segundo']:.2f}MB/s, "
+            f"erros: {status['erros']}, restante: {eta}"
+        )
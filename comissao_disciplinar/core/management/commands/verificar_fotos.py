@@ -1,9 +1,9 @@
 from django.core.management.base import BaseCommand
-from core.models import Estudante
-import os
+from core.estado_fotos import reconciliar_estado_fotos
+
 
 class Command(BaseCommand):
-    help = 'Verifica o status das fotos dos estudantes'
+    help = 'Verifica o status das fotos dos estudantes (agende com --corrigir para manter o estado em dia)'
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -11,79 +11,46 @@ class Command(BaseCommand):
             action='store_true',
             help='Mostra listagem detalhada de cada estudante',
         )
+        parser.add_argument(
+            '--corrigir',
+            action='store_true',
+            help='Grava o estado real do disco nos campos foto_* dos estudantes',
+        )
+        parser.add_argument(
+            '--checksum',
+            action='store_true',
+            help='Relê os arquivos locais e confere/atualiza o SHA-256',
+        )
 
     def handle(self, *args, **options):
-        estudantes = Estudante.objects.all().order_by('matricula_sga')
-        detalhado = options['detalhado']
-        
-        total = estudantes.count()
-        com_foto_local = 0
-        com_foto_drive = 0
-        com_ambas = 0
-        sem_foto = 0
-        foto_local_invalida = 0
-        
         self.stdout.write("\n" + "="*70)
         self.stdout.write(self.style.SUCCESS("📸 VERIFICAÇÃO DE FOTOS DOS ESTUDANTES"))
         self.stdout.write("="*70 + "\n")
-        
-        for estudante in estudantes:
-            tem_local = False
-            tem_drive = False
-            local_valido = False
-            
-            # Verificar foto local
-            if estudante.foto:
-                try:
-                    if os.path.exists(estudante.foto.path):
-                        tem_local = True
-                        local_valido = True
-                except:
-                    tem_local = True  # Cadastrada mas inválida
-                    local_valido = False
-            
-            # Verificar foto Drive
-            if estudante.foto_url:
-                tem_drive = True
-            
-            # Contabilizar
-            if tem_local and local_valido and tem_drive:
-                com_ambas += 1
-            elif tem_local and local_valido:
-                com_foto_local += 1
-            elif tem_drive:
-                com_foto_drive += 1
-            elif not tem_local and not tem_drive:
-                sem_foto += 1
-            
-            # Verificar fotos locais inválidas
-            if tem_local and not local_valido:
-                foto_local_invalida += 1
-                if detalhado:
-                    self.stdout.write(
-                        self.style.WARNING(
-                            f"⚠️  [{estudante.matricula_sga}] {estudante.nome[:40]:40} - "
-                            f"Foto local cadastrada mas arquivo não existe"
-                        )
-                    )
-            
-            # Mostrar detalhes se solicitado
-            if detalhado:
+
+        resultado = reconciliar_estado_fotos(
+            corrigir=options['corrigir'],
+            calcular_checksum=options['checksum'],
+        )
+        total = resultado['total']
+        com_foto_local = resultado['locais']
+        com_foto_drive = resultado['apenas_drive']
+        com_ambas = resultado['ambas']
+        sem_foto = resultado['sem_foto']
+        foto_local_invalida = len(resultado['locais_invalidas'])
+
+        if options['detalhado']:
+            for matricula, nome, local, tem_foto, tem_drive in resultado['detalhes']:
                 status = []
-                if tem_local and local_valido:
+                if local:
                     status.append("✅ Local")
-                elif tem_local:
+                elif tem_foto:
                     status.append("⚠️ Local (inválida)")
                 if tem_drive:
                     status.append("☁️ Drive")
                 if not status:
                     status.append("❌ Sem foto")
-                
-                status_str = " | ".join(status)
-                self.stdout.write(
-                    f"  [{estudante.matricula_sga}] {estudante.nome[:40]:40} - {status_str}"
-                )
-        
+                self.stdout.write(f"  [{matricula}] {nome[:40]:40} - {' | '.join(status)}")
+
         # Relatório
         self.stdout.write("\n" + "="*70)
         self.stdout.write(self.style.SUCCESS("📊 RESUMO:"))
@@ -94,17 +61,25 @@ class Command(BaseCommand):
         self.stdout.write(f"✅☁️  Com ambas (local + Drive): {com_ambas}")
         self.stdout.write(self.style.ERROR(f"❌ Sem foto: {sem_foto}"))
         self.stdout.write(self.style.WARNING(f"⚠️  Foto local inválida: {foto_local_invalida}"))
+        if options['checksum']:
+            self.stdout.write(f"🔄 Arquivos alterados no disco: {resultado['checksums_alterados']}")
+        if options['corrigir']:
+            self.stdout.write(self.style.SUCCESS(f"🛠️  Estados corrigidos: {resultado['corrigidos']}"))
+        elif resultado['corrigidos']:
+            self.stdout.write(self.style.WARNING(
+                f"🛠️  Estados divergentes: {resultado['corrigidos']} (use --corrigir)"
+            ))
         self.stdout.write("="*70)
-        
+
         # Percentuais
         if total > 0:
             self.stdout.write("\n" + self.style.SUCCESS("📈 PERCENTUAIS:"))
             self.stdout.write("-"*70)
-            
+
             total_com_foto = total - sem_foto
             total_local = com_foto_local + com_ambas
             total_drive = com_foto_drive + com_ambas
-            
+
             self.stdout.write(
                 f"Cobertura total de fotos: "
                 f"{(total_com_foto / total * 100):.1f}% ({total_com_foto}/{total})"
@@ -119,7 +94,7 @@ class Command(BaseCommand):
                 f"Fotos Drive disponíveis: "
                 f"{(total_drive / total * 100):.1f}% ({total_drive}/{total})"
             )
-            
+
             if total_local > 0:
                 self.stdout.write(
                     self.style.SUCCESS(
@@ -127,9 +102,9 @@ class Command(BaseCommand):
                         f"{(total_local / total_com_foto * 100):.1f}% dos que têm foto"
                     )
                 )
-            
+
             self.stdout.write("="*70 + "\n")
-        
+
         # Recomendações
         if foto_local_invalida > 0:
             self.stdout.write(self.style.WARNING("\n⚠️  ATENÇÃO:"))
@@ -137,11 +112,12 @@ class Command(BaseCommand):
                 f"Existem {foto_local_invalida} registros com referência a foto local "
                 "mas o arquivo não existe."
             )
-            self.stdout.write(
-                "Execute: python manage.py limpar_fotos_invalidas "
-                "para corrigir.\n"
-            )
-        
+            if not options['corrigir']:
+                self.stdout.write("Execute com --corrigir para que as páginas passem a usar o Drive.")
+            if options['detalhado']:
+                for matricula, nome in resultado['locais_invalidas']:
+                    self.stdout.write(f"   [{matricula}] {nome[:40]}")
+
         if com_foto_drive > 0 and com_foto_local < total:
             self.stdout.write(self.style.WARNING("💡 SUGESTÃO:"))
             self.stdout.write(
@@ -149,6 +125,6 @@ class Command(BaseCommand):
                 "Para melhor performance:"
             )
             self.stdout.write(
-                "Execute: python manage.py migrar_fotos_drive "
+                "Execute: python manage.py sincronizar_fotos "
                 "para baixá-las localmente.\n"
-            )
\ No newline at end of file
+            )
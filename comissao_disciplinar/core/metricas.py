@@ -0,0 +1,144 @@
+# core/metricas.py - Contadores dos dashboards, em cache com chaves versionadas
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models import Count
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+import logging
+
+from .models import Ocorrencia, OcorrenciaRapida
+from .utils_cache import obter_versao, incrementar_versao
+
+logger = logging.getLogger(__name__)
+
+CHAVE_VERSAO_OCORRENCIAS = 'core:metricas:ocorrencias:versao'
+CHAVE_VERSAO_OCORRENCIAS_RAPIDAS = 'core:metricas:ocorrencias_rapidas:versao'
+CHAVE_METRICAS = 'core:metricas:{nome}:{data}:v{versao}'
+# A data entra na chave (janelas "últimos N dias"); o TTL só limpa versões antigas
+TEMPO_CACHE_METRICAS = 60 * 60 * 24
+
+STATUS_ENCERRADOS = ['FINALIZADA', 'ARQUIVADA']
+
+
+def _em_cache(nome, chave_versao, calcular):
+    hoje = timezone.localdate()
+    chave = CHAVE_METRICAS.format(nome=nome, data=hoje.isoformat(), versao=obter_versao(chave_versao))
+    metricas = cache.get(chave)
+    if metricas is None:
+        metricas = calcular(hoje)
+        cache.set(chave, metricas, TEMPO_CACHE_METRICAS)
+    return metricas
+
+
+def invalidar_metricas_ocorrencias():
+    incrementar_versao(CHAVE_VERSAO_OCORRENCIAS)
+
+
+def invalidar_metricas_ocorrencias_rapidas():
+    incrementar_versao(CHAVE_VERSAO_OCORRENCIAS_RAPIDAS)
+
+
+# ====================
+# OCORRÊNCIAS
+# ====================
+
+def _calcular_metricas_ocorrencias(hoje):
+    por_status = dict(
+        Ocorrencia.objects.order_by().values_list('status').annotate(total=Count('id'))
+    )
+    total = sum(por_status.values())
+
+    # Últimos 30 dias
+    ocorrencias_mes = Ocorrencia.objects.filter(data__gte=hoje - timedelta(days=30))
+    por_gravidade = list(ocorrencias_mes.order_by().values(
+        'infracao__gravidade'
+    ).annotate(total=Count('id')))
+    top_infracoes = list(ocorrencias_mes.values(
+        'infracao__descricao'
+    ).annotate(total=Count('id')).order_by('-total')[:5])
+
+    # Últimos 6 meses, mês a mês
+    por_mes = list(Ocorrencia.objects.filter(
+        data__gte=hoje - timedelta(days=180)
+    ).annotate(mes=TruncMonth('data')).order_by().values('mes').annotate(
+        total=Count('id')
+    ).order_by('mes'))
+
+    prazos_vencendo = Ocorrencia.objects.filter(
+        prazo_defesa__lte=hoje + timedelta(days=3),
+        prazo_defesa__gte=hoje,
+        status='AGUARDANDO_DEFESA'
+    ).count()
+
+    return {
+        'total': total,
+        'abertas': total - sum(por_status.get(status, 0) for status in STATUS_ENCERRADOS),
+        'por_status': por_status,
+        'por_gravidade': por_gravidade,
+        'top_infracoes': top_infracoes,
+        'por_mes': por_mes,
+        'ultimos_seis_meses': sum(item['total'] for item in por_mes),
+        'prazos_vencendo': prazos_vencendo,
+    }
+
+
+def metricas_ocorrencias():
+    """
+    Contadores de Ocorrencia (status, gravidade, infrações, meses, prazos)
+
+    Recalculados só quando uma ocorrência muda (signals) ou o dia vira.
+    """
+    return _em_cache('ocorrencias', CHAVE_VERSAO_OCORRENCIAS, _calcular_metricas_ocorrencias)
+
+
+# ====================
+# OCORRÊNCIAS RÁPIDAS
+# ====================
+
+def _contagem_por_tipo(queryset):
+    """Ocorrências por tipo rápido; mantém as chaves usadas pelos templates"""
+    return [
+        {
+            'tipo_rapido': item['tipos_rapidos__codigo'],
+            'tipo_rapido__display': item['tipos_rapidos__descricao'],
+            'total': item['total'],
+        }
+        for item in queryset.filter(tipos_rapidos__isnull=False).order_by().values(
+            'tipos_rapidos__codigo', 'tipos_rapidos__descricao'
+        ).annotate(total=Count('id')).order_by('-total')
+    ]
+
+
+def _calcular_metricas_ocorrencias_rapidas(hoje):
+    por_dia = list(OcorrenciaRapida.objects.filter(
+        data__gte=hoje - timedelta(days=14)
+    ).order_by().values('data').annotate(total=Count('id')).order_by('data'))
+    contagem_dia = {item['data']: item['total'] for item in por_dia}
+
+    turmas_top = list(OcorrenciaRapida.objects.filter(
+        data__gte=hoje.replace(day=1)
+    ).order_by().values('turma__nome', 'turma__curso__nome').annotate(
+        total=Count('id')
+    ).order_by('-total')[:5])
+
+    return {
+        'total': OcorrenciaRapida.objects.count(),
+        'hoje': contagem_dia.get(hoje, 0),
+        'semana': OcorrenciaRapida.objects.filter(data__gte=hoje - timedelta(days=7)).count(),
+        'por_tipo': _contagem_por_tipo(OcorrenciaRapida.objects.all()),
+        'por_tipo_30_dias': _contagem_por_tipo(
+            OcorrenciaRapida.objects.filter(data__gte=hoje - timedelta(days=30))
+        ),
+        'por_dia': por_dia,
+        'turmas_top': turmas_top,
+    }
+
+
+def metricas_ocorrencias_rapidas():
+    """Contadores de OcorrenciaRapida (hoje, semana, tipos, dias, turmas do mês)"""
+    return _em_cache(
+        'ocorrencias_rapidas',
+        CHAVE_VERSAO_OCORRENCIAS_RAPIDAS,
+        _calcular_metricas_ocorrencias_rapidas
+    )
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncMonth
+
+
+def popular_contadores(apps, schema_editor):
+    """Conta as ocorrências rápidas já registradas"""
+    OcorrenciaRapida = apps.get_model('core', 'OcorrenciaRapida')
+    ContadorOcorrenciaRapida = apps.get_model('core', 'ContadorOcorrenciaRapida')
+    EstudantesOcorrencia = OcorrenciaRapida.estudantes.through
+
+    contagem = EstudantesOcorrencia.objects.filter(
+        ocorrenciarapida__tipos_rapidos__isnull=False
+    ).annotate(
+        mes=TruncMonth('ocorrenciarapida__data')
+    ).values(
+        'estudante_id', 'ocorrenciarapida__tipos_rapidos', 'mes'
+    ).annotate(
+        quantidade=Count('ocorrenciarapida_id', distinct=True)
+    ).order_by()
+
+    ContadorOcorrenciaRapida.objects.bulk_create([
+        ContadorOcorrenciaRapida(
+            estudante_id=item['estudante_id'],
+            tipo_ocorrencia_id=item['ocorrenciarapida__tipos_rapidos'],
+            mes_referencia=item['mes'],
+            quantidade=item['quantidade'],
+        )
+        for item in contagem
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_parecermembro'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorOcorrenciaRapida',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes_referencia', models.DateField(help_text='Primeiro dia do mês de referência')),
+                ('quantidade', models.PositiveIntegerField(default=0)),
+                ('estudante', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contadores_ocorrencias_rapidas', to='core.estudante')),
+                ('tipo_ocorrencia', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contadores', to='core.tipoocorrenciarapida')),
+            ],
+            options={
+                'verbose_name': 'Contador de Ocorrências Rápidas',
+                'verbose_name_plural': 'Contadores de Ocorrências Rápidas',
+                'indexes': [models.Index(fields=['mes_referencia', 'tipo_ocorrencia', 'quantidade'], name='core_contad_mes_ref_38143c_idx')],
+                'unique_together': {('estudante', 'tipo_ocorrencia', 'mes_referencia')},
+            },
+        ),
+        migrations.RunPython(popular_contadores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:26
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_contadorocorrenciarapida'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EnvioNotificacao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chave_idempotencia', models.CharField(max_length=64, unique=True)),
+                ('canal', models.CharField(choices=[('EMAIL', 'E-mail'), ('SMS', 'SMS')], max_length=10)),
+                ('status', models.CharField(choices=[('PENDENTE', 'Pendente'), ('ENVIANDO', 'Enviando'), ('ENVIADO', 'Enviado'), ('FALHOU', 'Falhou')], default='PENDENTE', max_length=10)),
+                ('tipo_ocorrencia', models.CharField(default='ocorrencia', max_length=20)),
+                ('ocorrencia_id', models.PositiveIntegerField()),
+                ('responsaveis', models.JSONField(default=list, help_text='IDs dos responsáveis, na ordem de tentativa')),
+                ('estudantes', models.JSONField(default=list, help_text='IDs dos estudantes citados')),
+                ('tentativas', models.PositiveSmallIntegerField(default=0)),
+                ('proxima_tentativa', models.DateTimeField(default=django.utils.timezone.now)),
+                ('ultimo_erro', models.TextField(blank=True)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+                ('enviado_em', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Envio de Notificação',
+                'verbose_name_plural': 'Envios de Notificação',
+                'ordering': ['criado_em'],
+                'indexes': [models.Index(fields=['status', 'proxima_tentativa'], name='core_envion_status_afc245_idx')],
+            },
+        ),
+    ]
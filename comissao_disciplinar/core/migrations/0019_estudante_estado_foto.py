@@ -0,0 +1,63 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:44
+
+import os
+import re
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def popular_estado_foto(apps, schema_editor):
+    """Preenche id do Drive e disponibilidade local (checksum fica para verificar_fotos)"""
+    Estudante = apps.get_model('core', 'Estudante')
+    agora = timezone.now()
+
+    alterados = []
+    for estudante in Estudante.objects.only('id', 'foto', 'foto_url').iterator():
+        match = re.search(r'id=([a-zA-Z0-9_-]+)', estudante.foto_url or '')
+        if match and 'drive.google.com' in estudante.foto_url:
+            estudante.foto_drive_id = match.group(1)
+        if estudante.foto:
+            estudante.foto_local_disponivel = os.path.exists(
+                os.path.join(settings.MEDIA_ROOT, estudante.foto.name)
+            )
+        estudante.foto_verificada_em = agora
+        alterados.append(estudante)
+
+    Estudante.objects.bulk_update(
+        alterados,
+        ['foto_drive_id', 'foto_local_disponivel', 'foto_verificada_em'],
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_envionotificacao'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='estudante',
+            name='foto_checksum',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='estudante',
+            name='foto_drive_id',
+            field=models.CharField(blank=True, editable=False, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='estudante',
+            name='foto_local_disponivel',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='estudante',
+            name='foto_verificada_em',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(popular_estado_foto, migrations.RunPython.noop),
+    ]
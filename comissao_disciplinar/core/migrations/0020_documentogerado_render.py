@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_estudante_estado_foto'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documentogerado',
+            name='erro',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='documentogerado',
+            name='hash_conteudo',
+            field=models.CharField(blank=True, help_text='SHA-256 dos dados usados no documento + versão do template', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='documentogerado',
+            name='status',
+            field=models.CharField(choices=[('PENDENTE', 'Em geração'), ('PRONTO', 'Pronto'), ('ERRO', 'Erro na geração')], default='PRONTO', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='documentogerado',
+            name='arquivo',
+            field=models.FileField(blank=True, upload_to='documentos_gerados/'),
+        ),
+        migrations.AddConstraint(
+            model_name='documentogerado',
+            constraint=models.UniqueConstraint(condition=models.Q(('hash_conteudo', ''), _negated=True), fields=('hash_conteudo',), name='documento_hash_conteudo_unico'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:57
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def popular_termos_busca(apps, schema_editor):
+    """Indexa os estudantes existentes (mesma regra de core.busca_estudantes.termos_de)"""
+    Estudante = apps.get_model('core', 'Estudante')
+    TermoBuscaEstudante = apps.get_model('core', 'TermoBuscaEstudante')
+
+    termos = []
+    for estudante in Estudante.objects.only('id', 'nome', 'matricula_sga').iterator():
+        prefixos = set()
+        for texto in (estudante.nome, estudante.matricula_sga):
+            decomposto = unicodedata.normalize('NFKD', texto or '')
+            normalizado = ''.join(c for c in decomposto if not unicodedata.combining(c)).lower()
+            for token in re.split(r'[^0-9a-z]+', normalizado):
+                token = token[:20]
+                prefixos.update(token[:tamanho] for tamanho in range(1, len(token) + 1))
+        termos.extend(
+            TermoBuscaEstudante(estudante_id=estudante.id, termo=termo) for termo in prefixos
+        )
+    TermoBuscaEstudante.objects.bulk_create(termos, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_documentogerado_render'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TermoBuscaEstudante',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('termo', models.CharField(max_length=20)),
+                ('estudante', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='termos_busca', to='core.estudante')),
+            ],
+            options={
+                'verbose_name': 'Termo de Busca de Estudante',
+                'verbose_name_plural': 'Termos de Busca de Estudantes',
+                'indexes': [models.Index(fields=['termo', 'estudante'], name='busca_estudante_termo_idx')],
+            },
+        ),
+        migrations.RunPython(popular_termos_busca, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,162 @@
+# Generated by Django 5.2.7 on 2026-10-17 23:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils.text import Truncator
+
+LOTE = 500
+
+
+def _texto(texto, tamanho=300):
+    return Truncator(' '.join((texto or '').split())).chars(tamanho)
+
+
+def _em_lotes(queryset):
+    """Mesmo fatiamento de core.linha_tempo.reconstruir_linha_tempo"""
+    ids = list(queryset.order_by('pk').values_list('pk', flat=True))
+    for inicio in range(0, len(ids), LOTE):
+        yield queryset.filter(pk__in=ids[inicio:inicio + LOTE])
+
+
+def popular_linha_tempo(apps, schema_editor):
+    """Gera os eventos dos registros existentes (mesmas regras de core.linha_tempo.FONTES)"""
+    EventoLinhaTempo = apps.get_model('core', 'EventoLinhaTempo')
+    Ocorrencia = apps.get_model('core', 'Ocorrencia')
+    OcorrenciaRapida = apps.get_model('core', 'OcorrenciaRapida')
+    Atendimento = apps.get_model('atendimentos', 'Atendimento')
+    AtendimentoNAPNE = apps.get_model('napne', 'AtendimentoNAPNE')
+    InformacaoEstudanteConselho = apps.get_model('pedagogico', 'InformacaoEstudanteConselho')
+
+    def gravar(eventos):
+        EventoLinhaTempo.objects.bulk_create(eventos, batch_size=LOTE, ignore_conflicts=True)
+
+    for lote in _em_lotes(Ocorrencia.objects.select_related(
+        'infracao', 'sancao', 'responsavel_registro'
+    ).prefetch_related('estudantes')):
+        eventos = []
+        for ocorrencia in lote:
+            detalhe = []
+            if ocorrencia.infracao:
+                detalhe.append(f"{ocorrencia.infracao.codigo} - {ocorrencia.infracao.descricao}")
+            if ocorrencia.sancao:
+                detalhe.append(f"Sanção: {ocorrencia.sancao.get_tipo_display()}")
+            eventos.extend(
+                EventoLinhaTempo(
+                    estudante_id=estudante.id, tipo='OCORRENCIA', origem_id=ocorrencia.pk,
+                    data=ocorrencia.data, hora=ocorrencia.horario,
+                    titulo=f"Ocorrência #{ocorrencia.pk}",
+                    resumo=_texto(ocorrencia.descricao),
+                    detalhe=_texto(' · '.join(detalhe)),
+                    situacao=ocorrencia.get_status_display(),
+                    gravidade=ocorrencia.infracao.gravidade if ocorrencia.infracao else '',
+                    responsavel=ocorrencia.responsavel_registro.nome,
+                )
+                for estudante in ocorrencia.estudantes.all()
+            )
+        gravar(eventos)
+
+    for lote in _em_lotes(OcorrenciaRapida.objects.select_related(
+        'turma', 'responsavel_registro'
+    ).prefetch_related('estudantes')):
+        gravar([
+            EventoLinhaTempo(
+                estudante_id=estudante.id, tipo='OCORRENCIA_RAPIDA', origem_id=ocorrencia.pk,
+                data=ocorrencia.data, hora=ocorrencia.horario,
+                titulo=f"Ocorrência Rápida #{ocorrencia.pk}",
+                resumo=_texto(ocorrencia.descricao),
+                detalhe=f"Turma {ocorrencia.turma.nome}",
+                responsavel=ocorrencia.responsavel_registro.nome,
+            )
+            for ocorrencia in lote for estudante in ocorrencia.estudantes.all()
+        ])
+
+    for lote in _em_lotes(Atendimento.objects.select_related(
+        'tipo_atendimento', 'situacao', 'servidor_responsavel'
+    ).prefetch_related('estudantes')):
+        gravar([
+            EventoLinhaTempo(
+                estudante_id=estudante.id, tipo='ATENDIMENTO', origem_id=atendimento.pk,
+                data=atendimento.data, hora=atendimento.hora,
+                titulo=atendimento.tipo_atendimento.nome,
+                resumo=_texto(atendimento.informacoes),
+                detalhe=atendimento.get_coordenacao_display(),
+                situacao=atendimento.situacao.nome,
+                responsavel=atendimento.servidor_responsavel.nome,
+                publico=atendimento.publicar_ficha_aluno,
+            )
+            for atendimento in lote for estudante in atendimento.estudantes.all()
+        ])
+
+    for lote in _em_lotes(AtendimentoNAPNE.objects.select_related(
+        'tipo_atendimento', 'status', 'atendido_por'
+    )):
+        gravar([
+            EventoLinhaTempo(
+                estudante_id=atendimento.estudante_id, tipo='ATENDIMENTO_NAPNE', origem_id=atendimento.pk,
+                data=atendimento.data,
+                titulo=f"NAPNE - {atendimento.tipo_atendimento.nome}",
+                resumo=_texto(atendimento.resumo_atendimento or atendimento.detalhamento),
+                situacao=atendimento.status.nome,
+                responsavel=atendimento.atendido_por.nome,
+                publico=atendimento.publicar_ficha_aluno,
+            )
+            for atendimento in lote
+        ])
+
+    for lote in _em_lotes(InformacaoEstudanteConselho.objects.select_related('conselho__turma')):
+        eventos = []
+        for info in lote:
+            encaminhamentos = [
+                sigla for sigla, marcado in (
+                    ('CDPD', info.encaminhamento_cdpd),
+                    ('CDAE', info.encaminhamento_cdae),
+                    ('NAPNE', info.encaminhamento_napne),
+                ) if marcado
+            ]
+            eventos.append(EventoLinhaTempo(
+                estudante_id=info.estudante_id, tipo='CONSELHO', origem_id=info.conselho_id,
+                data=info.conselho.data_realizacao,
+                titulo=f"Conselho de Classe {info.conselho.periodo} - {info.conselho.turma.nome}",
+                resumo=_texto(info.observacoes_gerais),
+                detalhe=f"Encaminhamentos: {', '.join(encaminhamentos)}" if encaminhamentos else '',
+            ))
+        gravar(eventos)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_termobuscaestudante'),
+        ('atendimentos', '0003_alter_atendimento_origem'),
+        ('napne', '0001_initial'),
+        ('pedagogico', '0004_progressoconselho'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoLinhaTempo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('OCORRENCIA', 'Ocorrência'), ('OCORRENCIA_RAPIDA', 'Ocorrência Rápida'), ('ATENDIMENTO', 'Atendimento'), ('ATENDIMENTO_NAPNE', 'Atendimento NAPNE'), ('CONSELHO', 'Conselho de Classe')], max_length=20)),
+                ('origem_id', models.PositiveBigIntegerField()),
+                ('data', models.DateField()),
+                ('hora', models.TimeField(blank=True, null=True)),
+                ('titulo', models.CharField(max_length=200)),
+                ('resumo', models.CharField(blank=True, max_length=300)),
+                ('detalhe', models.CharField(blank=True, max_length=300)),
+                ('situacao', models.CharField(blank=True, max_length=100)),
+                ('gravidade', models.CharField(blank=True, choices=[('LEVE', 'Leve'), ('MEDIA', 'Média'), ('GRAVE', 'Grave'), ('GRAVISSIMA', 'Gravíssima')], max_length=15)),
+                ('responsavel', models.CharField(blank=True, max_length=200)),
+                ('publico', models.BooleanField(default=True)),
+                ('estudante', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='linha_tempo', to='core.estudante')),
+            ],
+            options={
+                'verbose_name': 'Evento da Linha do Tempo',
+                'verbose_name_plural': 'Eventos da Linha do Tempo',
+                'ordering': ['-data', '-hora', '-id'],
+                'indexes': [models.Index(fields=['estudante', 'publico', '-data', '-hora', '-id'], name='linha_tempo_estudante_idx')],
+                'constraints': [models.UniqueConstraint(fields=('tipo', 'origem_id', 'estudante'), name='linha_tempo_origem_unica')],
+            },
+        ),
+        migrations.RunPython(popular_linha_tempo, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.7 on 2026-10-17 23:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_eventolinhatempo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='alertalimiteocorrenciarapida',
+            index=models.Index(fields=['mes_referencia', '-criado_em'], name='alerta_limite_mes_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='estudante',
+            index=models.Index(fields=['turma', 'situacao'], name='estudante_turma_situacao_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='estudante',
+            index=models.Index(fields=['situacao', 'nome'], name='estudante_situacao_nome_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificacao',
+            index=models.Index(fields=['usuario', 'lida', '-criado_em'], name='notificacao_usuario_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ocorrencia',
+            index=models.Index(fields=['-data', '-horario'], name='ocorrencia_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ocorrencia',
+            index=models.Index(fields=['-criado_em'], name='ocorrencia_criado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ocorrencia',
+            index=models.Index(fields=['status', 'prazo_defesa'], name='ocorrencia_status_prazo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ocorrenciarapida',
+            index=models.Index(fields=['-data', '-horario'], name='ocorr_rapida_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ocorrenciarapida',
+            index=models.Index(fields=['-criado_em'], name='ocorr_rapida_criado_idx'),
+        ),
+    ]
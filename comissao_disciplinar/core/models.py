@@ -5,7 +5,6 @@ from auditlog.models import AuditlogHistoryField
 from django.core.validators import RegexValidator
 from django.utils import timezone
 from django.urls import reverse
-import re
 
 
 
@@ -179,6 +178,13 @@ class Estudante(models.Model):
         help_text="Link direto da imagem no Google Drive. Usado apenas se não houver foto local."
     )
 
+    # Estado da foto (desnormalizado): mantido por save(), sincronizar_fotos e
+    # verificar_fotos, para os templates não consultarem o disco a cada linha
+    foto_local_disponivel = models.BooleanField(default=False, editable=False)
+    foto_drive_id = models.CharField(max_length=200, blank=True, editable=False)
+    foto_checksum = models.CharField(max_length=64, blank=True, editable=False)
+    foto_verificada_em = models.DateTimeField(null=True, blank=True, editable=False)
+
     # Responsável
     responsaveis = models.ManyToManyField(
         Responsavel,
@@ -188,38 +194,82 @@ class Estudante(models.Model):
 
     class Meta:
         ordering = ['nome']
+        indexes = [
+            # Estudantes ativos da turma (conselhos, cards, progresso)
+            models.Index(fields=['turma', 'situacao'], name='estudante_turma_situacao_idx'),
+            # Listas de ativos em ordem alfabética
+            models.Index(fields=['situacao', 'nome'], name='estudante_situacao_nome_idx'),
+        ]
 
     def __str__(self):
         return f"{self.nome} ({self.matricula_sga})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Nome da foto como veio do banco: save() só revisa o estado se mudar
+        instancia._foto_carregada = instancia.__dict__.get('foto', models.DEFERRED)
+        # Idem para o índice de busca (TermoBuscaEstudante)
+        instancia._busca_carregada = (
+            instancia.__dict__.get('nome', models.DEFERRED),
+            instancia.__dict__.get('matricula_sga', models.DEFERRED),
+        )
+        return instancia
+
+    def save(self, *args, **kwargs):
+        self.atualizar_estado_foto()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'foto', 'foto_url'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {
+                'foto_local_disponivel', 'foto_drive_id', 'foto_checksum', 'foto_verificada_em'
+            }
+        super().save(*args, **kwargs)
+        self._foto_carregada = self.foto.name
+
+    def atualizar_estado_foto(self):
+        """Recalcula os campos foto_* quando foto/foto_url mudaram"""
+        from .fotos_drive import checksum, extrair_drive_id
+
+        self.foto_drive_id = extrair_drive_id(self.foto_url)
+
+        if not self.foto:
+            self.foto_local_disponivel = False
+            self.foto_checksum = ''
+        elif not self.foto._committed:
+            # Upload novo: o arquivo será gravado pelo próprio save()
+            self.foto_local_disponivel = True
+            self.foto_checksum = checksum(self.foto.chunks())
+            self.foto_verificada_em = timezone.now()
+        elif getattr(self, '_foto_carregada', None) not in (models.DEFERRED, self.foto.name):
+            # Nome atribuído diretamente: confere uma vez no storage
+            self.foto_local_disponivel = self.foto.storage.exists(self.foto.name)
+            self.foto_checksum = checksum(self.foto.chunks()) if self.foto_local_disponivel else ''
+            self.foto_verificada_em = timezone.now()
+
+    def _foto_drive_proxy(self, tamanho=None):
+        if not self.foto_drive_id:
+            return None
+        url = reverse('core:proxy_google_drive_image') + f'?id={self.foto_drive_id}'
+        return f'{url}&tamanho={tamanho}' if tamanho else url
+
     def get_foto_url_safe(self):
         """
         Versão segura que retorna None em caso de erro
         PRIORIZA: Arquivo local → Google Drive via proxy
         """
         try:
-            # 1. PRIORIDADE: Verificar foto local
-            if self.foto:
-                import os
-                # Verificar se o arquivo existe fisicamente
+            # 1. PRIORIDADE: Foto local (estado mantido por verificar_fotos)
+            if self.foto_local_disponivel and self.foto:
                 try:
-                    if os.path.exists(self.foto.path):
-                        return self.foto.path
-                except (ValueError, AttributeError):
+                    return self.foto.path
+                except (ValueError, AttributeError, NotImplementedError):
                     # Se foto está definida mas não tem path válido, continua
                     pass
 
             # 2. FALLBACK: Foto do Google Drive via proxy
-            if self.foto_url and 'drive.google.com' in self.foto_url:
-                import re
-                from django.urls import reverse
-                match = re.search(r'id=([a-zA-Z0-9_-]+)', self.foto_url)
-                if match:
-                    file_id = match.group(1)
-                    return reverse('core:proxy_google_drive_image') + f'?id={file_id}'
+            return self._foto_drive_proxy()
         except Exception:
-            pass
-        return None
+            return None
 
     def get_foto_url(self):
         """
@@ -227,18 +277,12 @@ class Estudante(models.Model):
         PRIORIZA: Foto local → Foto do Google Drive
         """
         # 1. PRIORIDADE: Foto local
-        if self.foto:
+        if self.foto_local_disponivel and self.foto:
             try:
-                import os
-                # Verificar se arquivo existe fisicamente
-                if os.path.exists(self.foto.path):
-                    return self.foto.path
-            except (ValueError, AttributeError):
-                # Se houver erro ao acessar path, tenta retornar URL mesmo assim
-                try:
-                    return self.foto.url
-                except:
-                    pass
+                return self.foto.path
+            except (ValueError, AttributeError, NotImplementedError):
+                # Storage sem path local: usa a URL
+                return self.foto.url
 
         # 2. FALLBACK: Foto do Google Drive
         if self.foto_url:
@@ -246,36 +290,23 @@ class Estudante(models.Model):
 
         return None
 
-    def get_foto_url_proxy(self):
+    def get_foto_url_proxy(self, tamanho=None):
         """
         Retorna a URL da foto
         PRIORIZA: Local → Google Drive via proxy
-        """
-        from django.urls import reverse
-        import os
 
+        tamanho: variante do proxy ('avatar' ou 'card', ver core.fotos_drive)
+        """
         # 1. PRIORIDADE: Foto local
-        if self.foto:
-            try:
-                # Verificar se arquivo existe
-                if os.path.exists(self.foto.path):
-                    return self.foto.url
-            except (ValueError, AttributeError):
-                # Tenta retornar URL mesmo sem verificar existência
-                try:
-                    return self.foto.url
-                except:
-                    pass
+        if self.foto_local_disponivel and self.foto:
+            return self.foto.url
 
         # 2. FALLBACK: Google Drive via proxy
-        if self.foto_url and 'drive.google.com' in self.foto_url:
-            import re
-            match = re.search(r'id=([^&]+)', self.foto_url)
-            if match:
-                file_id = match.group(1)
-                return reverse('core:proxy_google_drive_image') + f'?id={file_id}'
+        return self._foto_drive_proxy(tamanho)
 
-        return None
+    def get_foto_url_avatar(self):
+        """URL da miniatura de 48px (listas)"""
+        return self.get_foto_url_proxy(tamanho='avatar')
 
     def get_iniciais(self):
         """Retorna as iniciais do nome para avatar"""
@@ -285,6 +316,28 @@ class Estudante(models.Model):
         return self.nome[0].upper() if self.nome else "?"
 
 
+class TermoBuscaEstudante(models.Model):
+    """
+    Prefixos normalizados (sem acento, minúsculos) do nome e da matrícula
+
+    Mantido pelo post_save de Estudante (e pelo comando
+    reconstruir_busca_estudantes) para que a busca por prefixo seja uma
+    leitura indexada em vez de icontains na tabela inteira.
+    """
+    termo = models.CharField(max_length=20)
+    estudante = models.ForeignKey(Estudante, on_delete=models.CASCADE, related_name='termos_busca')
+
+    class Meta:
+        verbose_name = 'Termo de Busca de Estudante'
+        verbose_name_plural = 'Termos de Busca de Estudantes'
+        indexes = [
+            models.Index(fields=['termo', 'estudante'], name='busca_estudante_termo_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.termo} → {self.estudante_id}"
+
+
 class Servidor(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     siape = models.CharField(max_length=10, unique=True)
@@ -339,6 +392,71 @@ class Infracao(models.Model):
         return f"{self.codigo} - {self.descricao[:50]}"
 
 
+class EventoLinhaTempo(models.Model):
+    """
+    Linha do tempo desnormalizada do estudante (um registro por evento)
+
+    Ocorrências, ocorrências rápidas, atendimentos, atendimentos NAPNE e
+    conselhos de classe são copiados para cá pelos signals de cada app (e
+    pelo comando reconstruir_linha_tempo), para que o histórico do estudante
+    seja uma única leitura indexada e paginada.
+    """
+    TIPO_CHOICES = [
+        ('OCORRENCIA', 'Ocorrência'),
+        ('OCORRENCIA_RAPIDA', 'Ocorrência Rápida'),
+        ('ATENDIMENTO', 'Atendimento'),
+        ('ATENDIMENTO_NAPNE', 'Atendimento NAPNE'),
+        ('CONSELHO', 'Conselho de Classe'),
+    ]
+
+    # Página do registro de origem (args=[origem_id])
+    URLS = {
+        'OCORRENCIA': 'core:ocorrencia_detail',
+        'OCORRENCIA_RAPIDA': 'core:ocorrencia_rapida_detail',
+        'ATENDIMENTO': 'atendimentos:atendimento_detail',
+        'ATENDIMENTO_NAPNE': 'napne:atendimento_detail',
+        'CONSELHO': 'pedagogico:conselho_detail',
+    }
+
+    estudante = models.ForeignKey(Estudante, on_delete=models.CASCADE, related_name='linha_tempo')
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES)
+    origem_id = models.PositiveBigIntegerField()
+
+    data = models.DateField()
+    hora = models.TimeField(null=True, blank=True)
+    titulo = models.CharField(max_length=200)
+    resumo = models.CharField(max_length=300, blank=True)
+    detalhe = models.CharField(max_length=300, blank=True)
+    situacao = models.CharField(max_length=100, blank=True)
+    gravidade = models.CharField(max_length=15, choices=Infracao.GRAVIDADE_CHOICES, blank=True)  # só ocorrências
+    responsavel = models.CharField(max_length=200, blank=True)
+
+    # Atendimentos só aparecem no histórico se publicados na ficha do aluno
+    publico = models.BooleanField(default=True)
+
+    class Meta:
+        verbose_name = 'Evento da Linha do Tempo'
+        verbose_name_plural = 'Eventos da Linha do Tempo'
+        ordering = ['-data', '-hora', '-id']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['tipo', 'origem_id', 'estudante'], name='linha_tempo_origem_unica'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['estudante', 'publico', '-data', '-hora', '-id'], name='linha_tempo_estudante_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} #{self.origem_id} - {self.data}"
+
+    def get_absolute_url(self):
+        """Página do registro de origem"""
+        return reverse(self.URLS[self.tipo], args=[self.origem_id])
+
+
 class Sancao(models.Model):
     TIPO_CHOICES = [
         ('ADVERTENCIA_VERBAL', 'Advertência Verbal'),
@@ -439,6 +557,14 @@ class Ocorrencia(models.Model):
         verbose_name = "Ocorrência"
         verbose_name_plural = "Ocorrências"
         ordering = ['-data', '-horario']
+        indexes = [
+            # Ordenação padrão e filtros por período (métricas, listas)
+            models.Index(fields=['-data', '-horario'], name='ocorrencia_data_idx'),
+            # Últimas registradas (dashboard, ocorrencia_list)
+            models.Index(fields=['-criado_em'], name='ocorrencia_criado_idx'),
+            # Contagem por status, processos em andamento e prazos de defesa
+            models.Index(fields=['status', 'prazo_defesa'], name='ocorrencia_status_prazo_idx'),
+        ]
 
     def __str__(self):
         return f"Ocorrência #{self.id} - {self.data} - {self.get_status_display()}"
@@ -624,9 +750,24 @@ class DocumentoGerado(models.Model):
         blank=True
     )
 
+    STATUS_CHOICES = [
+        ('PENDENTE', 'Em geração'),
+        ('PRONTO', 'Pronto'),
+        ('ERRO', 'Erro na geração'),
+    ]
+
     tipo_documento = models.CharField(max_length=25, choices=TIPO_CHOICES)
-    arquivo = models.FileField(upload_to='documentos_gerados/')
+    arquivo = models.FileField(upload_to='documentos_gerados/', blank=True)
     data_geracao = models.DateTimeField(auto_now_add=True)
+
+    # Renderização em segundo plano (core/documentos_render.py)
+    hash_conteudo = models.CharField(
+        max_length=64,
+        blank=True,
+        help_text='SHA-256 dos dados usados no documento + versão do template'
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PRONTO')
+    erro = models.TextField(blank=True)
     assinado = models.BooleanField(default=False)
     assinaturas = models.ManyToManyField(
         Servidor,
@@ -637,6 +778,13 @@ class DocumentoGerado(models.Model):
 
     class Meta:
         ordering = ['-data_geracao']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['hash_conteudo'],
+                condition=~models.Q(hash_conteudo=''),
+                name='documento_hash_conteudo_unico'
+            ),
+        ]
 
     def __str__(self):
         if self.ocorrencia:
@@ -691,6 +839,10 @@ class Notificacao(models.Model):
 
     class Meta:
         ordering = ['-criado_em']
+        indexes = [
+            # Não lidas do usuário (navbar) e recentes do dashboard
+            models.Index(fields=['usuario', 'lida', '-criado_em'], name='notificacao_usuario_idx'),
+        ]
 
     def __str__(self):
         return f"{self.titulo} - {self.usuario.username}"
@@ -712,6 +864,48 @@ class PreferenciaNotificacao(models.Model):
         return f"Preferências de {self.usuario.username}"
 
 
+class EnvioNotificacao(models.Model):
+    """Envio pendente/realizado da fila de notificações aos responsáveis"""
+    CANAL_CHOICES = [
+        ('EMAIL', 'E-mail'),
+        ('SMS', 'SMS'),
+    ]
+    STATUS_CHOICES = [
+        ('PENDENTE', 'Pendente'),
+        ('ENVIANDO', 'Enviando'),
+        ('ENVIADO', 'Enviado'),
+        ('FALHOU', 'Falhou'),
+    ]
+
+    chave_idempotencia = models.CharField(max_length=64, unique=True)
+    canal = models.CharField(max_length=10, choices=CANAL_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDENTE')
+    tipo_ocorrencia = models.CharField(max_length=20, default='ocorrencia')
+    ocorrencia_id = models.PositiveIntegerField()
+    responsaveis = models.JSONField(
+        default=list,
+        help_text='IDs dos responsáveis, na ordem de tentativa'
+    )
+    estudantes = models.JSONField(default=list, help_text='IDs dos estudantes citados')
+    tentativas = models.PositiveSmallIntegerField(default=0)
+    proxima_tentativa = models.DateTimeField(default=timezone.now)
+    ultimo_erro = models.TextField(blank=True)
+    criado_em = models.DateTimeField(auto_now_add=True)
+    atualizado_em = models.DateTimeField(auto_now=True)
+    enviado_em = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['criado_em']
+        verbose_name = "Envio de Notificação"
+        verbose_name_plural = "Envios de Notificação"
+        indexes = [
+            models.Index(fields=['status', 'proxima_tentativa']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_canal_display()} #{self.ocorrencia_id} - {self.get_status_display()}"
+
+
 # ====================
 # OCORRÊNCIAS RÁPIDAS
 # ====================
@@ -761,6 +955,10 @@ class OcorrenciaRapida(models.Model):
         verbose_name = "Ocorrência Rápida"
         verbose_name_plural = "Ocorrências Rápidas"
         ordering = ['-data', '-horario']
+        indexes = [
+            models.Index(fields=['-data', '-horario'], name='ocorr_rapida_data_idx'),
+            models.Index(fields=['-criado_em'], name='ocorr_rapida_criado_idx'),
+        ]
 
     def __str__(self):
         return f"Ocorrência Rápida #{self.id} - {self.data}"
@@ -903,11 +1101,47 @@ class AlertaLimiteOcorrenciaRapida(models.Model):
         verbose_name_plural = 'Alertas de Limites'
         ordering = ['-criado_em']
         unique_together = ['estudante', 'tipo_ocorrencia', 'mes_referencia']
+        indexes = [
+            # unique_together começa por estudante: o dashboard filtra só pelo mês
+            models.Index(fields=['mes_referencia', '-criado_em'], name='alerta_limite_mes_idx'),
+        ]
 
     def __str__(self):
         return f"Alerta: {self.estudante.nome} - {self.tipo_ocorrencia.codigo} ({self.quantidade_ocorrencias}x)"
 
 
+class ContadorOcorrenciaRapida(models.Model):
+    """
+    Quantidade de ocorrências rápidas por estudante, tipo e mês
+
+    Mantido pelos signals de OcorrenciaRapida (m2m_changed/delete) para que
+    a verificação de limites seja uma leitura indexada.
+    """
+    estudante = models.ForeignKey(
+        Estudante,
+        on_delete=models.CASCADE,
+        related_name='contadores_ocorrencias_rapidas'
+    )
+    tipo_ocorrencia = models.ForeignKey(
+        TipoOcorrenciaRapida,
+        on_delete=models.CASCADE,
+        related_name='contadores'
+    )
+    mes_referencia = models.DateField(help_text='Primeiro dia do mês de referência')
+    quantidade = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Contador de Ocorrências Rápidas'
+        verbose_name_plural = 'Contadores de Ocorrências Rápidas'
+        unique_together = ['estudante', 'tipo_ocorrencia', 'mes_referencia']
+        indexes = [
+            models.Index(fields=['mes_referencia', 'tipo_ocorrencia', 'quantidade']),
+        ]
+
+    def __str__(self):
+        return f"{self.estudante.nome} - {self.tipo_ocorrencia.codigo} ({self.mes_referencia:%m/%Y}): {self.quantidade}"
+
+
 class ParecerMembro(models.Model):
     TIPO_CHOICES = [
         ('SEMIFINAL', 'Parecer Semifinal'),
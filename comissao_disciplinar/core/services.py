@@ -1,5 +1,5 @@
 # core/services.py - Versão com prioridade MÃE/PAI para SMS
-from django.core.mail import EmailMultiAlternatives
+from django.core.mail import EmailMultiAlternatives, get_connection
 from django.conf import settings
 from django.template.loader import render_to_string
 from .models import Notificacao, PreferenciaNotificacao
@@ -13,6 +13,9 @@ logger = logging.getLogger(__name__)
 class ServicoNotificacao:
     """Serviço centralizado para envio de notificações"""
 
+    PREFERENCIAS_EMAIL = ['E-mail', 'CELULAR', 'EMAIL', 'Email']
+    PREFERENCIAS_SMS = ['CELULAR', 'WHATSAPP', 'E-mail', 'EMAIL', 'Email']
+
     @staticmethod
     def _get_debug_destinatarios():
         """Retorna destinatários para modo DEBUG"""
@@ -27,150 +30,76 @@ class ServicoNotificacao:
     def notificar_responsaveis_ocorrencia(ocorrencia, tipo_ocorrencia='ocorrencia'):
         """
         Notifica responsáveis via email e SMS sobre ocorrências
-        """
-        print(f"\n{'=' * 60}")
-        print(f" INICIANDO NOTIFICAÇÃO DOS RESPONSÁVEIS")
-        print(f"{'=' * 60}")
-        print(f" Ocorrência ID: {ocorrencia.id}")
-        print(f" Tipo: {tipo_ocorrencia}")
-        print(f" DEBUG: {getattr(settings, 'DEBUG', False)}")
-
-        # Coletar responsáveis únicos
-        responsaveis_unicos = {}
-        estudantes = ocorrencia.estudantes.all()
-        print(f" Total de estudantes: {estudantes.count()}")
-
-        for estudante in estudantes:
-            print(f"\n Estudante: {estudante.nome}")
-            print(f"   Matrícula: {estudante.matricula_sga}")
-
-            responsaveis = estudante.responsaveis.all()
-            print(f"   Responsáveis cadastrados: {responsaveis.count()}")
-
-            for responsavel in responsaveis:
-                print(f"\n   📋 Responsável: {responsavel.nome}")
-                print(f"      Email: {responsavel.email}")
-                print(f"      Celular: {responsavel.celular}")
-                print(f"      Preferência: {responsavel.get_preferencia_contato_display()}")
-
-                if responsavel.id not in responsaveis_unicos:
-                    responsaveis_unicos[responsavel.id] = {
-                        'responsavel': responsavel,
-                        'estudantes': []
-                    }
-                responsaveis_unicos[responsavel.id]['estudantes'].append(estudante)
-
-        print(f"\n Total de responsáveis únicos: {len(responsaveis_unicos)}")
-
-        # Enviar notificações
-        for resp_id, resp_data in responsaveis_unicos.items():
-            responsavel = resp_data['responsavel']
-            estudantes_lista = resp_data['estudantes']
-
-            print(f"\n{'=' * 60}")
-            print(f" Processando responsável: {responsavel.nome}")
-            print(f"{'=' * 60}")
-
-            # Email
-            try:
-                print(f"\n Tentando enviar EMAIL...")
-                ServicoNotificacao._enviar_email_responsavel(
-                    responsavel, estudantes_lista, ocorrencia, tipo_ocorrencia
-                )
-            except Exception as e:
-                print(f" ERRO ao enviar email: {str(e)}")
-                import traceback
-                traceback.print_exc()
-
-        # SMS: Enviar apenas uma vez por estudante, priorizando MÃE
-        print(f"\n{'=' * 60}")
-        print(f" INICIANDO ENVIO DE SMS COM PRIORIDADE")
-        print(f"{'=' * 60}")
 
-        for estudante in estudantes:
-            print(f"\n Processando SMS para estudante: {estudante.nome}")
-            ServicoNotificacao._enviar_sms_priorizado(estudante, ocorrencia, tipo_ocorrencia)
+        Os envios vão para a fila (core.fila_notificacoes): a requisição só
+        grava os registros e o SMTP/Twilio roda fora dela, com retentativas.
+        """
+        from .fila_notificacoes import enfileirar_notificacoes_responsaveis
 
-        print(f"\n{'=' * 60}")
-        print(f" PROCESSO DE NOTIFICAÇÃO CONCLUÍDO")
-        print(f"{'=' * 60}\n")
+        novos = enfileirar_notificacoes_responsaveis(ocorrencia, tipo_ocorrencia)
+        print(f" {novos} notificações enfileiradas para ocorrência #{ocorrencia.id} ({tipo_ocorrencia})")
+        return novos
 
     @staticmethod
-    def _enviar_sms_priorizado(estudante, ocorrencia, tipo_ocorrencia):
+    def _ordenar_responsaveis_sms(responsaveis):
         """
-        Envia SMS priorizando MÃE, depois PAI
+        Ordem de tentativa de SMS: MÃE, depois PAI, depois os demais
         """
-        print(f"\n Buscando responsáveis para SMS...")
-
-        responsaveis = estudante.responsaveis.all()
-
-        # Separar por tipo de parentesco
         mae = None
         pai = None
         outros = []
 
         for resp in responsaveis:
-            if resp.preferencia_contato not in ['CELULAR', 'WHATSAPP', 'E-mail', 'EMAIL', 'Email']:
+            if resp.preferencia_contato not in ServicoNotificacao.PREFERENCIAS_SMS:
                 continue
 
             parentesco_upper = resp.tipo_vinculo.upper() if resp.tipo_vinculo else ''
 
             if 'MÃE' in parentesco_upper or 'MAE' in parentesco_upper:
                 mae = resp
-                print(f"   Encontrada MÃE: {resp.nome}")
             elif 'PAI' in parentesco_upper:
                 pai = resp
-                print(f"   Encontrado PAI: {resp.nome}")
             else:
                 outros.append(resp)
-                print(f"   Encontrado OUTRO: {resp.nome} ({resp.tipo_vinculo})")
 
-        # Tentar enviar na ordem: MÃE -> PAI -> OUTROS
         ordem_envio = []
         if mae:
             ordem_envio.append(mae)
         if pai:
             ordem_envio.append(pai)
         ordem_envio.extend(outros)
+        return ordem_envio
 
-        if not ordem_envio:
-            print(f"   Nenhum responsável com preferência SMS/WhatsApp")
+    @staticmethod
+    def _enviar_email_responsavel(responsavel, estudantes, ocorrencia, tipo_ocorrencia='ocorrencia',
+                                  connection=None):
+        """Envia email para responsável (a fila usa _montar_email_responsavel + envio em lote)"""
+        email = ServicoNotificacao._montar_email_responsavel(
+            responsavel, estudantes, ocorrencia, tipo_ocorrencia
+        )
+        if email is None:
             return
-
-        print(f"\n Ordem de tentativa: {[r.nome for r in ordem_envio]}")
-
-        # Tentar enviar até conseguir
-        for responsavel in ordem_envio:
-            try:
-                print(f"\n Tentando enviar SMS para {responsavel.nome} ({responsavel.tipo_vinculo})...")
-                sucesso = ServicoNotificacao._enviar_sms_responsavel(
-                    responsavel, [estudante], ocorrencia, tipo_ocorrencia
-                )
-
-                if sucesso:
-                    print(f"    SMS enviado com SUCESSO para {responsavel.nome}")
-                    return  # Parar após primeiro envio bem-sucedido
-                else:
-                    print(f"    Falha ao enviar para {responsavel.nome}, tentando próximo...")
-
-            except Exception as e:
-                print(f"    ERRO ao enviar para {responsavel.nome}: {str(e)}")
-                continue
-
-        print(f"\n ⚠️  Não foi possível enviar SMS para nenhum responsável")
+        email.connection = connection
+        email.send()
+        logger.info(f" Email enviado para {responsavel.nome} ({email.to[0]})")
 
     @staticmethod
-    def _enviar_email_responsavel(responsavel, estudantes, ocorrencia, tipo_ocorrencia='ocorrencia'):
-        """Envia email para responsável - ATUALIZADO para múltiplos tipos"""
+    def _montar_email_responsavel(responsavel, estudantes, ocorrencia, tipo_ocorrencia='ocorrencia'):
+        """
+        Monta o email para responsável - ATUALIZADO para múltiplos tipos
+
+        Returns:
+            EmailMultiAlternatives pronto para envio, ou None se a preferência não for email
+        """
         print(f"\n{'=' * 60}")
-        print(f" _enviar_email_responsavel")
+        print(f" _montar_email_responsavel")
         print(f"{'=' * 60}")
         print(f" Responsável: {responsavel.nome}")
         print(f" Email: {responsavel.email}")
         print(f" Preferência: {responsavel.get_preferencia_contato_display()}")
 
         try:
-            if responsavel.preferencia_contato not in ['E-mail', 'CELULAR', 'EMAIL', 'Email']:
+            if responsavel.preferencia_contato not in ServicoNotificacao.PREFERENCIAS_EMAIL:
                 print(f"  Preferência não é EMAIL/WHATSAPP - Pulando")
                 return
 
@@ -260,17 +189,12 @@ class ServicoNotificacao:
             )
             email.attach_alternative(mensagem_html, "text/html")
             print(f"    Email criado")
-
-            print(f"\n Enviando email...")
-            email.send()
-            print(f"    Email enviado com SUCESSO!")
-
-            logger.info(f" Email enviado para {responsavel.nome} ({destinatario_email})")
+            return email
 
         except Exception as e:
-            print(f"\n ERRO FATAL ao enviar email:")
+            print(f"\n ERRO FATAL ao montar email:")
             print(f"   {str(e)}")
-            logger.error(f" Erro ao enviar email para {responsavel.nome}: {str(e)}")
+            logger.error(f" Erro ao montar email para {responsavel.nome}: {str(e)}")
             import traceback
             traceback.print_exc()
             raise
@@ -291,7 +215,7 @@ class ServicoNotificacao:
         print(f" Preferência: {responsavel.get_preferencia_contato_display()}")
 
         try:
-            if responsavel.preferencia_contato not in ['CELULAR', 'WHATSAPP', 'E-mail', 'EMAIL', 'Email']:
+            if responsavel.preferencia_contato not in ServicoNotificacao.PREFERENCIAS_SMS:
                 print(f"  Preferência não é CELULAR/WHATSAPP - Pulando")
                 return False
 
@@ -391,16 +315,6 @@ class ServicoNotificacao:
                 print("  Twilio não configurado - settings.TWILIO_ACCOUNT_SID não existe")
                 return False
 
-            print(f"\n Importando Twilio Client...")
-            from twilio.rest import Client
-
-            print(f" Criando cliente Twilio...")
-            client = Client(
-                settings.TWILIO_ACCOUNT_SID,
-                settings.TWILIO_AUTH_TOKEN
-            )
-            print(f"    Cliente criado")
-
             # Padronizar número antes do envio
             numero_padronizado = ServicoNotificacao._padronizar_numero_telefone(numero)
             if not numero_padronizado:
@@ -409,21 +323,17 @@ class ServicoNotificacao:
 
             print(f" Número padronizado: {numero_padronizado}")
 
-            print(f"\n Enviando mensagem...")
+            print(f"\n Enviando mensagem (cliente Twilio compartilhado)...")
             print(f"   De: {settings.TWILIO_PHONE_NUMBER}")
             print(f"   Para: {numero_padronizado}")
 
-            message = client.messages.create(
-                body=mensagem,
-                from_=settings.TWILIO_PHONE_NUMBER,
-                to=numero_padronizado
-            )
+            from .entrega_notificacoes import enviar_sms
+            sid = enviar_sms(numero_padronizado, mensagem)
 
             print(f"    SMS enviado com SUCESSO!")
-            print(f"   SID: {message.sid}")
-            print(f"   Status: {message.status}")
+            print(f"   SID: {sid}")
 
-            logger.info(f" SMS Twilio enviado para {numero_padronizado}: {message.sid}")
+            logger.info(f" SMS Twilio enviado para {numero_padronizado}: {sid}")
             return True
 
         except Exception as e:
@@ -511,34 +421,51 @@ class ServicoNotificacao:
 
         from .models import Servidor
 
-        membros_comissao = Servidor.objects.filter(membro_comissao_disciplinar=True)
+        membros_comissao = Servidor.objects.filter(
+            membro_comissao_disciplinar=True
+        ).select_related('user')
         print(f" Membros da comissão: {membros_comissao.count()}")
 
-        for servidor in membros_comissao:
-            print(f"\n Notificando: {servidor.nome}")
-
-            prioridade = 'ALTA' if (
-                    ocorrencia.infracao and
-                    ocorrencia.infracao.gravidade in ['GRAVE', 'GRAVISSIMA']
-            ) else 'MEDIA'
-
-            print(f"   Prioridade: {prioridade}")
+        prioridade = 'ALTA' if (
+                ocorrencia.infracao and
+                ocorrencia.infracao.gravidade in ['GRAVE', 'GRAVISSIMA']
+        ) else 'MEDIA'
+        print(f"   Prioridade: {prioridade}")
 
+        # Prioridade alta gera email para cada membro: uma conexão SMTP para todos
+        conexao = None
+        if prioridade in ['ALTA', 'URGENTE']:
+            conexao = get_connection()
             try:
-                ServicoNotificacao.criar_notificacao(
-                    usuario=servidor.user,
-                    tipo='NOVA_OCORRENCIA',
-                    titulo=f'Nova Ocorrência #{ocorrencia.id}',
-                    mensagem=f'Registrada por {ocorrencia.responsavel_registro.nome}',
-                    ocorrencia=ocorrencia,
-                    prioridade=prioridade
-                )
-                print(f"    Notificação criada")
+                conexao.open()
             except Exception as e:
-                print(f"    ERRO: {str(e)}")
+                print(f"    ERRO ao abrir conexão SMTP: {str(e)}")
+                conexao = None
+
+        try:
+            for servidor in membros_comissao:
+                print(f"\n Notificando: {servidor.nome}")
+
+                try:
+                    ServicoNotificacao.criar_notificacao(
+                        usuario=servidor.user,
+                        tipo='NOVA_OCORRENCIA',
+                        titulo=f'Nova Ocorrência #{ocorrencia.id}',
+                        mensagem=f'Registrada por {ocorrencia.responsavel_registro.nome}',
+                        ocorrencia=ocorrencia,
+                        prioridade=prioridade,
+                        connection=conexao
+                    )
+                    print(f"    Notificação criada")
+                except Exception as e:
+                    print(f"    ERRO: {str(e)}")
+        finally:
+            if conexao is not None:
+                conexao.close()
 
     @staticmethod
-    def criar_notificacao(usuario, tipo, titulo, mensagem, ocorrencia=None, prioridade='MEDIA'):
+    def criar_notificacao(usuario, tipo, titulo, mensagem, ocorrencia=None, prioridade='MEDIA',
+                          connection=None):
         """Cria notificação in-app"""
         print(f"\n Criando notificação in-app...")
         print(f"   Usuário: {usuario.username}")
@@ -557,13 +484,15 @@ class ServicoNotificacao:
 
         if prioridade in ['ALTA', 'URGENTE']:
             print(f"    Enviando email (prioridade {prioridade})...")
-            ServicoNotificacao.enviar_notificacao_email(usuario, titulo, mensagem, ocorrencia)
+            ServicoNotificacao.enviar_notificacao_email(
+                usuario, titulo, mensagem, ocorrencia, connection=connection
+            )
 
         return notificacao
 
     @staticmethod
-    def enviar_notificacao_email(usuario, titulo, mensagem, ocorrencia=None):
-        """Envia notificação por email"""
+    def enviar_notificacao_email(usuario, titulo, mensagem, ocorrencia=None, connection=None):
+        """Envia notificação por email (connection: conexão SMTP já aberta, opcional)"""
         print(f"\n Enviando notificação email...")
         print(f"   Para: {usuario.email}")
 
@@ -601,7 +530,8 @@ class ServicoNotificacao:
                 assunto,
                 mensagem_texto,
                 settings.DEFAULT_FROM_EMAIL,
-                [destinatario_email]
+                [destinatario_email],
+                connection=connection
             )
             email.attach_alternative(mensagem_html, "text/html")
             email.send()
@@ -1,8 +1,12 @@
 from .models import Ocorrencia, NotificacaoOficial
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, pre_save, pre_delete, post_delete, m2m_changed
 from django.dispatch import receiver
-from .models import OcorrenciaRapida
-from .utils_alertas import verificar_limites_ocorrencia
+from .models import OcorrenciaRapida, Estudante, AlertaLimiteOcorrenciaRapida
+from .utils_alertas import pares_por_mes, ajustar_contadores, ajustar_contador_alertas
+from .cards_turma import invalidar_cards_relacionados, invalidar_cards_turmas
+from .metricas import invalidar_metricas_ocorrencias, invalidar_metricas_ocorrencias_rapidas
+from .busca_estudantes import indexar_estudantes
+from .linha_tempo import sincronizar, remover, sincronizar_vinculos
 
 
 @receiver(post_save, sender=Ocorrencia)
@@ -21,10 +25,207 @@ def notificacao_enviada(sender, instance, created, **kwargs):
         # como enviar push notification, SMS, etc.
         pass
 
-@receiver(post_save, sender=OcorrenciaRapida)
-def verificar_alertas_ocorrencia_rapida(sender, instance, created, **kwargs):
+# ====================
+# CONTADORES DE OCORRÊNCIAS RÁPIDAS
+# ====================
+
+def _ajustar_por_mes(ocorrencia_ids, delta, **filtros):
+    for mes_referencia, pares in pares_por_mes(ocorrencia_ids, **filtros).items():
+        ajustar_contadores(mes_referencia, pares, delta)
+
+
+def _tratar_m2m(instance, action, reverse, pk_set, campo_filtro, campo_through):
     """
-    Signal para verificar limites sempre que uma ocorrência rápida é criada/atualizada
+    Traduz um m2m_changed em ajustes de contador
+
+    campo_filtro: 'estudante_ids' ou 'tipo_ids' (filtro de pares_por_mes)
+    campo_through: coluna do lado oposto à ocorrência na tabela intermediária
     """
+    if action == 'post_add':
+        delta = 1
+    elif action in ('pre_remove', 'pre_clear'):
+        delta = -1
+    else:
+        return
+
+    if not reverse:
+        # instance é a OcorrenciaRapida; pk_set são estudantes/tipos
+        filtros = {campo_filtro: pk_set} if pk_set is not None else {}
+        _ajustar_por_mes([instance.pk], delta, **filtros)
+        return
+
+    # instance é o Estudante/Tipo; pk_set são ocorrências
+    if pk_set is None:
+        through = (OcorrenciaRapida.estudantes.through if campo_filtro == 'estudante_ids'
+                   else OcorrenciaRapida.tipos_rapidos.through)
+        pk_set = list(through.objects.filter(
+            **{campo_through: instance.pk}
+        ).values_list('ocorrenciarapida_id', flat=True))
+    if pk_set:
+        _ajustar_por_mes(pk_set, delta, **{campo_filtro: [instance.pk]})
+
+
+@receiver(m2m_changed, sender=OcorrenciaRapida.estudantes.through)
+def contadores_estudantes_alterados(sender, instance, action, reverse, pk_set, **kwargs):
+    """Atualiza contadores/alertas quando estudantes entram ou saem da ocorrência"""
+    _tratar_m2m(instance, action, reverse, pk_set, 'estudante_ids', 'estudante_id')
+
+
+@receiver(m2m_changed, sender=OcorrenciaRapida.tipos_rapidos.through)
+def contadores_tipos_alterados(sender, instance, action, reverse, pk_set, **kwargs):
+    """Atualiza contadores/alertas quando tipos entram ou saem da ocorrência"""
+    _tratar_m2m(instance, action, reverse, pk_set, 'tipo_ids', 'tipoocorrenciarapida_id')
+
+
+@receiver(pre_delete, sender=OcorrenciaRapida)
+def contadores_ocorrencia_excluida(sender, instance, **kwargs):
+    """Desconta a ocorrência antes que o M2M seja apagado em cascata"""
+    _ajustar_por_mes([instance.pk], -1)
+
+
+@receiver(pre_save, sender=OcorrenciaRapida)
+def guardar_mes_anterior(sender, instance, update_fields=None, **kwargs):
+    """Guarda o mês anterior para mover os contadores se a data mudar"""
+    instance._mes_anterior = None
+    if instance.pk is None or (update_fields is not None and 'data' not in update_fields):
+        return
+    data_anterior = (OcorrenciaRapida.objects.filter(pk=instance.pk)
+                     .values_list('data', flat=True).first())
+    if data_anterior:
+        instance._mes_anterior = data_anterior.replace(day=1)
+
+
+@receiver(post_save, sender=OcorrenciaRapida)
+def mover_contadores_mes(sender, instance, created, **kwargs):
+    """Transfere os contadores entre meses quando a data da ocorrência é alterada"""
+    mes_anterior = getattr(instance, '_mes_anterior', None)
+    instance._mes_anterior = None
+    if created or mes_anterior is None:
+        return
+    if (mes_anterior.year, mes_anterior.month) == (instance.data.year, instance.data.month):
+        return
+    for mes_referencia, pares in pares_por_mes([instance.pk]).items():
+        ajustar_contadores(mes_anterior, pares, -1)
+        ajustar_contadores(mes_referencia, pares, 1)
+
+
+# ====================
+# CACHE DOS CARDS DE ESTUDANTES (estudantes_dashboard)
+# ====================
+
+@receiver(post_save, sender=Ocorrencia)
+@receiver(pre_delete, sender=Ocorrencia)
+@receiver(post_save, sender=OcorrenciaRapida)
+@receiver(pre_delete, sender=OcorrenciaRapida)
+def invalidar_cards_ocorrencia(sender, instance, **kwargs):
+    invalidar_cards_relacionados(instance)
+
+
+@receiver(m2m_changed, sender=Ocorrencia.estudantes.through)
+@receiver(m2m_changed, sender=OcorrenciaRapida.estudantes.through)
+def invalidar_cards_vinculos(sender, instance, action, reverse, pk_set, **kwargs):
+    invalidar_cards_relacionados(instance, action, reverse, pk_set)
+
+
+@receiver(pre_save, sender=Estudante)
+def guardar_turma_anterior(sender, instance, update_fields=None, **kwargs):
+    """Guarda a turma anterior: ao trocar de turma, as duas precisam ser atualizadas"""
+    instance._turma_anterior_id = None
+    if instance.pk is None or (update_fields is not None and 'turma' not in update_fields):
+        return
+    instance._turma_anterior_id = (Estudante.objects.filter(pk=instance.pk)
+                                   .values_list('turma_id', flat=True).first())
+
+
+@receiver(post_save, sender=Estudante)
+@receiver(post_delete, sender=Estudante)
+def invalidar_cards_estudante(sender, instance, **kwargs):
+    invalidar_cards_turmas([instance.turma_id, getattr(instance, '_turma_anterior_id', None)])
+
+
+# ====================
+# ÍNDICE DE BUSCA DE ESTUDANTES
+# ====================
+
+@receiver(post_save, sender=Estudante)
+def indexar_estudante(sender, instance, update_fields=None, **kwargs):
+    """Regrava os termos de busca quando nome ou matrícula mudam"""
+    if update_fields is not None and not {'nome', 'matricula_sga'} & set(update_fields):
+        return
+    atual = (instance.nome, instance.matricula_sga)
+    if getattr(instance, '_busca_carregada', None) == atual:
+        return
+    indexar_estudantes([instance])
+    instance._busca_carregada = atual
+
+
+# ====================
+# LINHA DO TEMPO DOS ESTUDANTES
+# ====================
+
+@receiver(post_save, sender=Ocorrencia)
+def linha_tempo_ocorrencia(sender, instance, **kwargs):
+    sincronizar('OCORRENCIA', [instance.pk])
+
+
+@receiver(post_save, sender=OcorrenciaRapida)
+def linha_tempo_ocorrencia_rapida(sender, instance, **kwargs):
+    sincronizar('OCORRENCIA_RAPIDA', [instance.pk])
+
+
+@receiver(post_delete, sender=Ocorrencia)
+def linha_tempo_ocorrencia_excluida(sender, instance, **kwargs):
+    remover('OCORRENCIA', [instance.pk])
+
+
+@receiver(post_delete, sender=OcorrenciaRapida)
+def linha_tempo_ocorrencia_rapida_excluida(sender, instance, **kwargs):
+    remover('OCORRENCIA_RAPIDA', [instance.pk])
+
+
+@receiver(m2m_changed, sender=Ocorrencia.estudantes.through)
+def linha_tempo_vinculos_ocorrencia(sender, instance, action, reverse, pk_set, **kwargs):
+    sincronizar_vinculos('OCORRENCIA', instance, action, reverse, pk_set)
+
+
+@receiver(m2m_changed, sender=OcorrenciaRapida.estudantes.through)
+def linha_tempo_vinculos_ocorrencia_rapida(sender, instance, action, reverse, pk_set, **kwargs):
+    sincronizar_vinculos('OCORRENCIA_RAPIDA', instance, action, reverse, pk_set)
+
+
+# ====================
+# CACHE DAS MÉTRICAS DOS DASHBOARDS
+# ====================
+
+@receiver(post_save, sender=Ocorrencia)
+@receiver(post_delete, sender=Ocorrencia)
+def invalidar_metricas_ocorrencia(sender, **kwargs):
+    invalidar_metricas_ocorrencias()
+
+
+@receiver(post_save, sender=OcorrenciaRapida)
+@receiver(post_delete, sender=OcorrenciaRapida)
+def invalidar_metricas_ocorrencia_rapida(sender, **kwargs):
+    invalidar_metricas_ocorrencias_rapidas()
+
+
+@receiver(m2m_changed, sender=OcorrenciaRapida.tipos_rapidos.through)
+def invalidar_metricas_tipos_rapidos(sender, action, **kwargs):
+    """Contagem por tipo depende do M2M, gravado depois do post_save"""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidar_metricas_ocorrencias_rapidas()
+
+
+# ====================
+# CONTADOR DE ALERTAS DO MÊS
+# ====================
+
+@receiver(post_save, sender=AlertaLimiteOcorrenciaRapida)
+def contar_alerta_criado(sender, instance, created, **kwargs):
     if created:
-        verificar_limites_ocorrencia(instance)
\ No newline at end of file
+        ajustar_contador_alertas(instance.mes_referencia, 1)
+
+
+@receiver(post_delete, sender=AlertaLimiteOcorrenciaRapida)
+def descontar_alerta_removido(sender, instance, **kwargs):
+    ajustar_contador_alertas(instance.mes_referencia, -1)
@@ -0,0 +1,283 @@
+# core/sincronizacao_fotos.py - Download em lote das fotos do Drive (threads) + otimização (processos)
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from io import BytesIO
+import hashlib
+import json
+import os
+import threading
+import time
+
+import requests
+from PIL import Image, ImageOps
+from django.conf import settings
+from django.utils import timezone
+import logging
+
+from .cards_turma import invalidar_cards_estudantes
+from .fotos_drive import gravar_atomico, id_valido
+from .models import Estudante
+
+logger = logging.getLogger(__name__)
+
+PASTA_FOTOS = 'estudantes'
+LADO_MAXIMO = 800
+TAMANHO_MAXIMO_KB = 200
+LOTE_BANCO = 100
+
+_sessoes = threading.local()
+
+
+# ====================
+# ETAPAS (THREAD / PROCESSO)
+# ====================
+
+def baixar_foto(file_id, lado=LADO_MAXIMO):
+    """Baixa a miniatura do Drive reaproveitando a sessão HTTP da thread"""
+    if not hasattr(_sessoes, 'sessao'):
+        _sessoes.sessao = requests.Session()
+    resposta = _sessoes.sessao.get(
+        getattr(settings, 'FOTOS_DRIVE_URL', 'https://drive.google.com/thumbnail'),
+        params={'id': file_id, 'sz': f'w{lado}'},
+        timeout=getattr(settings, 'REQUESTS_TIMEOUT', 10) * 3,
+        allow_redirects=True,
+    )
+    if resposta.status_code != 200 or not resposta.headers.get('Content-Type', '').startswith('image/'):
+        raise ValueError(f'Status {resposta.status_code}')
+    return resposta.content
+
+
+def otimizar_foto(conteudo, destino, lado=LADO_MAXIMO, tamanho_max_kb=TAMANHO_MAXIMO_KB):
+    """
+    Redimensiona e recomprime em JPEG até caber em tamanho_max_kb
+
+    Roda num processo separado (CPU), por isso só recebe/devolve tipos simples.
+
+    Returns:
+        tuple: (tamanho final em bytes, SHA-256 do arquivo gravado)
+    """
+    with Image.open(BytesIO(conteudo)) as imagem:
+        imagem = ImageOps.exif_transpose(imagem).convert('RGB')
+        imagem.thumbnail((lado, lado), Image.LANCZOS)
+
+        qualidade = 90
+        while True:
+            saida = BytesIO()
+            imagem.save(saida, 'JPEG', quality=qualidade, optimize=True, progressive=True)
+            if saida.tell() <= tamanho_max_kb * 1024 or qualidade <= 40:
+                break
+            qualidade -= 10
+
+    gravar_atomico(destino, saida.getvalue())
+    return saida.tell(), hashlib.sha256(saida.getvalue()).hexdigest()
+
+
+# ====================
+# MANIFESTO (RETOMADA)
+# ====================
+
+def ler_manifesto(caminho):
+    """Ids do Drive já concluídos em execuções anteriores"""
+    concluidos = set()
+    if not os.path.exists(caminho):
+        return concluidos
+    with open(caminho, encoding='utf-8') as arquivo:
+        for linha in arquivo:
+            try:
+                concluidos.add(json.loads(linha)['id'])
+            except (ValueError, KeyError):
+                # Última linha truncada por uma interrupção
+                continue
+    return concluidos
+
+
+# ====================
+# SINCRONIZAÇÃO
+# ====================
+
+class SincronizadorFotos:
+    """
+    Baixa as fotos do Drive dos estudantes sem foto local e grava em MEDIA_ROOT
+
+    - downloads num ThreadPoolExecutor (I/O), com no máximo 2x threads em voo
+    - redimensionamento/recompressão num ProcessPoolExecutor (CPU);
+      processos=0 otimiza na própria thread principal
+    - Estudante.foto atualizado com bulk_update a cada LOTE_BANCO fotos, e só
+      depois o id entra no manifesto: interrompido, basta rodar de novo
+    """
+
+    def __init__(self, manifesto=None, threads=8, processos=None, forcar=False,
+                 limite=None, progresso=None, intervalo_progresso=5.0):
+        pasta = os.path.join(settings.MEDIA_ROOT, PASTA_FOTOS)
+        self.pasta = pasta
+        self.manifesto = manifesto or os.path.join(pasta, '.manifesto_sincronizacao.jsonl')
+        self.threads = threads
+        self.processos = os.cpu_count() if processos is None else processos
+        self.forcar = forcar
+        self.limite = limite
+        self.progresso = progresso
+        self.intervalo_progresso = intervalo_progresso
+
+        self.resultado = {
+            'pendentes': 0, 'ja_locais': 0, 'retomados': 0, 'urls_invalidas': 0,
+            'baixados': 0, 'erros': 0, 'bytes_baixados': 0, 'bytes_gravados': 0,
+            'falhas': [],
+        }
+        self._lote = []
+        self._inicio = None
+        self._ultimo_relatorio = 0.0
+
+    def listar_pendentes(self):
+        """
+        Estudantes com foto no Drive e sem arquivo local
+
+        Lista a pasta de fotos uma vez em vez de um os.path.exists por estudante.
+        O manifesto só dispensa o download se o arquivo gravado ainda existe:
+        foto apagada do disco volta a ser baixada.
+        """
+        os.makedirs(self.pasta, exist_ok=True)
+        existentes = {
+            f'{PASTA_FOTOS}/{entrada.name}' for entrada in os.scandir(self.pasta) if entrada.is_file()
+        }
+        concluidos = set() if self.forcar else ler_manifesto(self.manifesto)
+
+        pendentes = []
+        self.resultado['urls_invalidas'] = Estudante.objects.exclude(foto_url__isnull=True).exclude(
+            foto_url=''
+        ).filter(foto_drive_id='').count()
+        estudantes = Estudante.objects.exclude(foto_drive_id='').values_list(
+            'id', 'matricula_sga', 'foto_drive_id', 'foto'
+        ).order_by('id')
+        for estudante_id, matricula, file_id, foto in estudantes:
+            if not self.forcar and foto and foto in existentes:
+                self.resultado['ja_locais'] += 1
+                continue
+            if not id_valido(file_id):
+                self.resultado['urls_invalidas'] += 1
+                continue
+            if file_id in concluidos and f'{PASTA_FOTOS}/{matricula}.jpg' in existentes:
+                self.resultado['retomados'] += 1
+                continue
+            pendentes.append((estudante_id, matricula, file_id))
+            if self.limite and len(pendentes) >= self.limite:
+                break
+
+        self.resultado['pendentes'] = len(pendentes)
+        return pendentes
+
+    def executar(self):
+        pendentes = self.listar_pendentes()
+        self._inicio = time.monotonic()
+        if not pendentes:
+            return self.resultado
+
+        processador = ProcessPoolExecutor(self.processos) if self.processos else None
+        try:
+            with ThreadPoolExecutor(self.threads) as downloads:
+                self._pipeline(pendentes, downloads, processador)
+        finally:
+            if processador:
+                processador.shutdown()
+            self._gravar_lote()
+
+        self._relatar(forcar=True)
+        return self.resultado
+
+    def _pipeline(self, pendentes, downloads, processador):
+        fila = iter(pendentes)
+        em_download = {}
+        em_processamento = {}
+
+        def alimentar():
+            # Limita os downloads em voo: não acumula centenas de fotos na memória
+            while len(em_download) + len(em_processamento) < self.threads * 2:
+                item = next(fila, None)
+                if item is None:
+                    return
+                em_download[downloads.submit(baixar_foto, item[2])] = item
+
+        alimentar()
+        while em_download or em_processamento:
+            prontos, _ = wait(list(em_download) + list(em_processamento), return_when=FIRST_COMPLETED)
+            for futuro in prontos:
+                if futuro in em_download:
+                    item = em_download.pop(futuro)
+                    try:
+                        conteudo = futuro.result()
+                    except Exception as e:
+                        self._falhou(item, e)
+                        continue
+                    self.resultado['bytes_baixados'] += len(conteudo)
+                    destino = os.path.join(self.pasta, f'{item[1]}.jpg')
+                    if processador:
+                        em_processamento[processador.submit(otimizar_foto, conteudo, destino)] = item
+                    else:
+                        self._concluir_otimizacao(item, otimizar_foto, conteudo, destino)
+                else:
+                    item = em_processamento.pop(futuro)
+                    self._concluir_otimizacao(item, futuro.result)
+            alimentar()
+            self._relatar()
+
+    def _concluir_otimizacao(self, item, funcao, *args):
+        try:
+            tamanho, soma = funcao(*args)
+        except Exception as e:
+            self._falhou(item, e)
+            return
+        self.resultado['baixados'] += 1
+        self.resultado['bytes_gravados'] += tamanho
+        self._lote.append((*item, soma))
+        if len(self._lote) >= LOTE_BANCO:
+            self._gravar_lote()
+
+    def _falhou(self, item, erro):
+        self.resultado['erros'] += 1
+        self.resultado['falhas'].append((item[1], str(erro)[:80]))
+        logger.warning(f"Foto de {item[1]} ({item[2]}) não sincronizada: {erro}")
+
+    def _gravar_lote(self):
+        """bulk_update do lote e, em seguida, registro no manifesto"""
+        if not self._lote:
+            return
+        agora = timezone.now()
+        Estudante.objects.bulk_update(
+            [
+                Estudante(
+                    id=estudante_id,
+                    foto=f'{PASTA_FOTOS}/{matricula}.jpg',
+                    foto_local_disponivel=True,
+                    foto_checksum=soma,
+                    foto_verificada_em=agora,
+                )
+                for estudante_id, matricula, _, soma in self._lote
+            ],
+            ['foto', 'foto_local_disponivel', 'foto_checksum', 'foto_verificada_em'],
+        )
+        # bulk_update não dispara signals: invalida os cards das turmas aqui
+        invalidar_cards_estudantes([estudante_id for estudante_id, *_ in self._lote])
+        with open(self.manifesto, 'a', encoding='utf-8') as arquivo:
+            for _, matricula, file_id, _ in self._lote:
+                arquivo.write(json.dumps({'id': file_id, 'matricula': matricula}) + '\n')
+        self._lote = []
+
+    def _relatar(self, forcar=False):
+        if not self.progresso:
+            return
+        agora = time.monotonic()
+        if not forcar and agora - self._ultimo_relatorio < self.intervalo_progresso:
+            return
+        self._ultimo_relatorio = agora
+
+        feitos = self.resultado['baixados'] + self.resultado['erros']
+        decorrido = max(agora - self._inicio, 1e-6)
+        taxa = feitos / decorrido
+        restantes = self.resultado['pendentes'] - feitos
+        self.progresso({
+            'feitos': feitos,
+            'total': self.resultado['pendentes'],
+            'erros': self.resultado['erros'],
+            'fotos_por_segundo': taxa,
+            'mb_por_segundo': self.resultado['bytes_baixados'] / decorrido / 1024 / 1024,
+            'eta_segundos': restantes / taxa if taxa else None,
+            'decorrido': decorrido,
+        })
@@ -3,6 +3,7 @@ from celery import shared_task
 from django.core.mail import send_mail
 from django.conf import settings
 from django.template.loader import render_to_string
+from django.utils import timezone
 from django.utils.html import strip_tags
 from .models import NotificacaoOficial
 
@@ -41,4 +42,33 @@ def enviar_notificacao_email(notificacao_id):
     except Exception as e:
         # Log do erro
         print(f"Erro ao enviar e-mail: {str(e)}")
-        raise e
\ No newline at end of file
+        raise e
+
+
+@shared_task(bind=True, max_retries=None)
+def processar_lote_notificacoes(self, envio_ids):
+    """Processa um lote da fila de notificações (modo 'celery')"""
+    from .fila_notificacoes import processar_lote, VagaIndisponivel
+
+    try:
+        envios = processar_lote(envio_ids)
+    except VagaIndisponivel:
+        # Canal no limite de envios simultâneos: tenta de novo em instantes
+        raise self.retry(countdown=5)
+
+    reagendar = [envio for envio in envios if envio.status == 'PENDENTE']
+    if reagendar:
+        processar_lote_notificacoes.apply_async(
+            ([envio.pk for envio in reagendar],),
+            eta=min(envio.proxima_tentativa for envio in reagendar)
+        )
+    return {envio.pk: envio.status for envio in envios}
+
+
+@shared_task
+def renderizar_documento_task(documento_id):
+    """Gera o PDF de um DocumentoGerado pendente (modo 'celery')"""
+    from .documentos_render import renderizar_documento
+
+    documento = renderizar_documento(documento_id)
+    return documento.status if documento else None
@@ -1,3 +1,1251 @@
-from django.test import TestCase
+import base64
+import hashlib
+import io
+import os
+import re
+import shutil
+import tempfile
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+import time as relogio
+from datetime import date, datetime, time, timedelta
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, connections
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import load_workbook
+from PIL import Image
+from .models import (
+    Campus, Curso, Turma, Estudante, Servidor, Responsavel, Infracao, Ocorrencia,
+    OcorrenciaRapida, TipoOcorrenciaRapida, EnvioNotificacao, DocumentoGerado, TermoBuscaEstudante,
+    EventoLinhaTempo,
+    ConfiguracaoLimiteOcorrenciaRapida, AlertaLimiteOcorrenciaRapida, ContadorOcorrenciaRapida,
+)
+from . import documentos_render, fotos_drive, utils_alertas
+from .drive_falso import ServidorDriveFalso, gerar_jpeg
+from .cards_turma import cards_da_turma, consultar_cards_turma
+from .entrega_falsa import ServidorSMTPFalso, TwilioHttpClientFalso
+from .entrega_notificacoes import LimitadorTaxa, cliente_twilio, descartar_clientes, enviar_sms
+from .estado_fotos import reconciliar_estado_fotos
+from .analise_indices import varreduras_completas
+from .busca_estudantes import filtrar_por_busca, termos_de
+from .sincronizacao_fotos import SincronizadorFotos, ler_manifesto
+from .metricas import metricas_ocorrencias, metricas_ocorrencias_rapidas
+from .fila_notificacoes import (
+    enfileirar_notificacoes_responsaveis, processar_envio, processar_pendentes, VagaIndisponivel,
+    _adquirir_vaga, _liberar_vaga,
+)
+from .context_processors import alertas_ativos
+from .utils_alertas import recalcular_alertas_periodo, contar_alertas_mes
+from .utils import (
+    estilos_documento, gerar_documento_pdf, gerar_documentos_pdf, gerar_documentos_pdf_unico,
+    gerar_recibos_termicos, RECIBO_ENTRE_RECIBOS, RECIBO_MARGEM,
+)
+from .utils_exportacao import exportar_queryset
 
-# Create your tests here.
+
+class CoreBaseTestCase(TestCase):
+    def setUp(self):
+        self.campus = Campus.objects.create(nome='Campus Teste', sigla='CT')
+        self.curso = Curso.objects.create(nome='Informática', campus=self.campus, codigo='INF')
+        self.turma = Turma.objects.create(
+            nome='1A', curso=self.curso, ano=2025, periodo='2025.1', semestre=0
+        )
+
+    def criar_estudante(self, matricula, nome, **kwargs):
+        return Estudante.objects.create(
+            matricula_sga=matricula,
+            nome=nome,
+            email=f'{matricula}@test.com',
+            turma=self.turma,
+            campus=self.campus,
+            curso=self.curso,
+            data_ingresso=kwargs.pop('data_ingresso', timezone.localdate()),
+            **kwargs
+        )
+
+    def criar_servidor(self, siape='1234567', **kwargs):
+        user = User.objects.create_user(f'servidor{siape}', f'{siape}@test.com', 'pass')
+        return Servidor.objects.create(
+            user=user,
+            siape=siape,
+            nome=kwargs.pop('nome', 'Servidor Teste'),
+            email=f'{siape}@test.com',
+            campus=self.campus,
+            **kwargs
+        )
+
+    def criar_ocorrencia(self, estudantes, dia, responsavel, infracao=None):
+        ocorrencia = Ocorrencia.objects.create(
+            data=date(2025, 3, dia), horario=time(8, 0), curso=self.curso, turma=self.turma,
+            descricao=f'Ocorrência {dia}', infracao=infracao, responsavel_registro=responsavel,
+        )
+        ocorrencia.estudantes.set(estudantes)
+        return ocorrencia
+
+    def criar_atendimento(self, estudantes, dia, responsavel, publicar=False):
+        from atendimentos.models import Atendimento, TipoAtendimento, SituacaoAtendimento
+
+        atendimento = Atendimento.objects.create(
+            coordenacao='CDPD', servidor_responsavel=responsavel, data=date(2025, 3, dia), hora=time(9, 0),
+            tipo_atendimento=TipoAtendimento.objects.get_or_create(nome='Orientação')[0],
+            situacao=SituacaoAtendimento.objects.get_or_create(nome='Aberto')[0],
+            origem='PRESENCIAL', informacoes='Conversa', publicar_ficha_aluno=publicar,
+        )
+        atendimento.estudantes.set(estudantes)
+        return atendimento
+
+    def criar_ocorrencia_rapida(self, estudantes, tipos, data, responsavel):
+        ocorrencia = OcorrenciaRapida.objects.create(
+            data=data, horario=time(8, 0), turma=self.turma, responsavel_registro=responsavel
+        )
+        ocorrencia.tipos_rapidos.set(tipos)
+        ocorrencia.estudantes.set(estudantes)
+        return ocorrencia
+
+
+class ExportacaoTestCase(CoreBaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.criar_estudante('2025001', 'Ana Souza')
+        self.criar_estudante('2025002', 'Bruno Lima', situacao='TRANCADO')
+        self.colunas = [
+            ('matricula_sga', 'Matrícula'),
+            ('nome', 'Nome'),
+            ('turma__nome', 'Turma'),
+            ('situacao', 'Situação'),
+            ('data_ingresso', 'Ingresso'),
+        ]
+
+    def test_csv_em_streaming(self):
+        response = exportar_queryset(
+            Estudante.objects.order_by('matricula_sga'), self.colunas, 'estudantes',
+            transformacoes={'situacao': str.lower}, chunk_size=1,
+        )
+        self.assertTrue(response.streaming)
+        conteudo = b''.join(response.streaming_content).decode('utf-8')
+        linhas = conteudo.lstrip('\ufeff').splitlines()
+        self.assertEqual(linhas[0], 'Matrícula,Nome,Turma,Situação,Ingresso')
+        self.assertEqual(
+            linhas[2], f"2025002,Bruno Lima,1A,trancado,{timezone.localdate():%d/%m/%Y}"
+        )
+
+    def test_xlsx_write_only(self):
+        response = exportar_queryset(
+            Estudante.objects.order_by('matricula_sga'), self.colunas, 'estudantes', formato='xlsx'
+        )
+        planilha = load_workbook(io.BytesIO(b''.join(response.streaming_content))).active
+        linhas = list(planilha.values)
+        self.assertEqual(len(linhas), 3)
+        self.assertEqual(linhas[1][:2], ('2025001', 'Ana Souza'))
+
+    def test_texto_com_formula_escapado(self):
+        Estudante.objects.filter(matricula_sga='2025001').update(nome='=HYPERLINK("http://x")')
+        Estudante.objects.filter(matricula_sga='2025002').update(nome='-1+1')
+        response = exportar_queryset(Estudante.objects.order_by('matricula_sga'), self.colunas, 'estudantes')
+        linhas = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        self.assertIn(',"\'=HYPERLINK(""http://x"")",', linhas[1])
+        self.assertIn(",'-1+1,", linhas[2])
+
+        response = exportar_queryset(
+            Estudante.objects.order_by('matricula_sga'), self.colunas, 'estudantes', formato='xlsx'
+        )
+        planilha = load_workbook(io.BytesIO(b''.join(response.streaming_content))).active
+        self.assertEqual([linha[1] for linha in planilha.values][1:], ["'=HYPERLINK(\"http://x\")", "'-1+1"])
+
+    def test_formato_invalido(self):
+        response = exportar_queryset(Estudante.objects.all(), self.colunas, 'x', formato='pdf')
+        self.assertEqual(response.status_code, 400)
+
+
+class RecalcularAlertasTestCase(CoreBaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.servidor = self.criar_servidor()
+        self.ana = self.criar_estudante('2025001', 'Ana Souza')
+        self.bruno = self.criar_estudante('2025002', 'Bruno Lima')
+        self.atraso = TipoOcorrenciaRapida.objects.create(codigo='ATRASO', descricao='Atraso')
+        self.celular = TipoOcorrenciaRapida.objects.create(codigo='CELULAR', descricao='Celular')
+        self.config = ConfiguracaoLimiteOcorrenciaRapida.objects.create(
+            tipo_ocorrencia=self.atraso, limite_mensal=2
+        )
+        self.mes = date(2025, 3, 1)
+
+    def test_recalculo_em_lote(self):
+        for dia in (3, 10):
+            self.criar_ocorrencia_rapida(
+                [self.ana, self.bruno], [self.atraso, self.celular], date(2025, 3, dia), self.servidor
+            )
+        self.criar_ocorrencia_rapida([self.ana], [self.atraso], date(2025, 3, 20), self.servidor)
+        # Fora do mês: não conta
+        self.criar_ocorrencia_rapida([self.bruno], [self.atraso], date(2025, 4, 1), self.servidor)
+        AlertaLimiteOcorrenciaRapida.objects.all().delete()
+
+        with self.assertNumQueries(6):
+            resultado = recalcular_alertas_periodo(self.mes)
+
+        self.assertEqual(resultado, {
+            'configuracoes_processadas': 1,
+            'alertas_gerados': 2,
+            'estudantes_afetados': 2,
+            'mes_referencia': '03/2025',
+        })
+        alerta = AlertaLimiteOcorrenciaRapida.objects.get(estudante=self.ana, mes_referencia=self.mes)
+        self.assertEqual(alerta.quantidade_ocorrencias, 3)
+
+    def test_diff_mantem_atualiza_e_remove(self):
+        self.criar_ocorrencia_rapida([self.ana], [self.atraso], date(2025, 3, 3), self.servidor)
+        self.criar_ocorrencia_rapida([self.ana], [self.atraso], date(2025, 3, 4), self.servidor)
+        recalcular_alertas_periodo(self.mes)
+        alerta = AlertaLimiteOcorrenciaRapida.objects.get(estudante=self.ana)
+        alerta.notificacao_sistema_criada = True
+        alerta.save()
+        obsoleto = AlertaLimiteOcorrenciaRapida.objects.create(
+            estudante=self.bruno, tipo_ocorrencia=self.atraso, configuracao=self.config,
+            mes_referencia=self.mes, quantidade_ocorrencias=5,
+        )
+
+        self.criar_ocorrencia_rapida([self.ana], [self.atraso], date(2025, 3, 5), self.servidor)
+        recalcular_alertas_periodo(self.mes)
+
+        alerta.refresh_from_db()
+        self.assertEqual(alerta.quantidade_ocorrencias, 3)
+        self.assertTrue(alerta.notificacao_sistema_criada)
+        self.assertFalse(AlertaLimiteOcorrenciaRapida.objects.filter(pk=obsoleto.pk).exists())
+
+
+class ContadorOcorrenciaRapidaTestCase(CoreBaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.servidor = self.criar_servidor()
+        self.atraso = TipoOcorrenciaRapida.objects.create(codigo='ATRASO', descricao='Atraso')
+        self.config = ConfiguracaoLimiteOcorrenciaRapida.objects.create(
+            tipo_ocorrencia=self.atraso, limite_mensal=2
+        )
+        self.mes = date(2025, 3, 1)
+
+    def quantidade(self, estudante, mes=None):
+        contador = ContadorOcorrenciaRapida.objects.filter(
+            estudante=estudante, tipo_ocorrencia=self.atraso, mes_referencia=mes or self.mes
+        ).first()
+        return contador.quantidade if contador else 0
+
+    def test_contador_e_alerta_ao_atingir_limite(self):
+        ana = self.criar_estudante('2025001', 'Ana Souza')
+        self.criar_ocorrencia_rapida([ana], [self.atraso], date(2025, 3, 3), self.servidor)
+        self.assertEqual(self.quantidade(ana), 1)
+        self.assertFalse(AlertaLimiteOcorrenciaRapida.objects.exists())
+
+        self.criar_ocorrencia_rapida([ana], [self.atraso], date(2025, 3, 4), self.servidor)
+        self.assertEqual(self.quantidade(ana), 2)
+        alerta = AlertaLimiteOcorrenciaRapida.objects.get(estudante=ana, mes_referencia=self.mes)
+        self.assertEqual(alerta.quantidade_ocorrencias, 2)
+
+    def test_turma_inteira_custo_constante(self):
+        def registrar(quantidade):
+            estudantes = [
+                self.criar_estudante(f'3{quantidade:02d}{i:03d}', f'Estudante {i}')
+                for i in range(quantidade)
+            ]
+            ocorrencia = OcorrenciaRapida.objects.create(
+                data=date(2025, 3, 3), horario=time(8, 0), turma=self.turma,
+                responsavel_registro=self.servidor,
+            )
+            ocorrencia.tipos_rapidos.set([self.atraso])
+            with CaptureQueriesContext(connection) as consultas:
+                ocorrencia.estudantes.set(estudantes)
+            return len(consultas)
+
+        self.assertEqual(registrar(3), registrar(30))
+        self.assertEqual(ContadorOcorrenciaRapida.objects.filter(mes_referencia=self.mes).count(), 33)
+
+    def test_remocao_e_exclusao_descontam(self):
+        ana = self.criar_estudante('2025001', 'Ana Souza')
+        bruno = self.criar_estudante('2025002', 'Bruno Lima')
+        primeira = self.criar_ocorrencia_rapida([ana, bruno], [self.atraso], date(2025, 3, 3), self.servidor)
+        segunda = self.criar_ocorrencia_rapida([ana], [self.atraso], date(2025, 3, 4), self.servidor)
+        self.assertTrue(AlertaLimiteOcorrenciaRapida.objects.filter(estudante=ana).exists())
+
+        primeira.estudantes.remove(bruno)
+        self.assertEqual(self.quantidade(bruno), 0)
+
+        segunda.delete()
+        self.assertEqual(self.quantidade(ana), 1)
+        self.assertFalse(AlertaLimiteOcorrenciaRapida.objects.filter(estudante=ana).exists())
+
+        primeira.tipos_rapidos.clear()
+        self.assertEqual(self.quantidade(ana), 0)
+
+    def test_conflitos_de_insercao_nao_perdem_nem_duplicam(self):
+        ana = self.criar_estudante('2025001', 'Ana Souza')
+        bruno = self.criar_estudante('2025002', 'Bruno Lima')
+        # Alerta e contador da Ana já gravados por "outro worker"
+        existente = AlertaLimiteOcorrenciaRapida.objects.create(
+            estudante=ana, tipo_ocorrencia=self.atraso, configuracao=self.config,
+            mes_referencia=self.mes, quantidade_ocorrencias=1,
+        )
+        criados = utils_alertas._inserir_alertas([
+            AlertaLimiteOcorrenciaRapida(
+                estudante=estudante, tipo_ocorrencia=self.atraso, configuracao=self.config,
+                mes_referencia=self.mes, quantidade_ocorrencias=1,
+            )
+            for estudante in (ana, bruno)
+        ])
+        self.assertEqual([alerta.estudante_id for alerta in criados], [bruno.pk])
+        self.assertIsNotNone(criados[0].pk)
+        self.assertEqual(AlertaLimiteOcorrenciaRapida.objects.get(estudante=ana), existente)
+
+        utils_alertas._somar_contador(ana.pk, self.atraso.pk, self.mes, 1)
+        utils_alertas._somar_contador(ana.pk, self.atraso.pk, self.mes, 2)
+        self.assertEqual(self.quantidade(ana), 3)
+
+    def test_mudanca_de_data_move_contador(self):
+        ana = self.criar_estudante('2025001', 'Ana Souza')
+        ocorrencia = self.criar_ocorrencia_rapida([ana], [self.atraso], date(2025, 3, 3), self.servidor)
+        ocorrencia.data = date(2025, 4, 2)
+        ocorrencia.save()
+        self.assertEqual(self.quantidade(ana), 0)
+        self.assertEqual(self.quantidade(ana, date(2025, 4, 1)), 1)
+
+
+@override_settings(
+    NOTIFICACOES_FILA_MODO='eager',
+    NOTIFICACOES_CONCORRENCIA={'EMAIL': 1, 'SMS': 1},
+    NOTIFICACOES_MAX_TENTATIVAS=2,
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+)
+class NotificacoesBaseTestCase(CoreBaseTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.servidor = self.criar_servidor()
+        self.atraso = TipoOcorrenciaRapida.objects.create(codigo='ATRASO', descricao='Atraso')
+        self.mae = Responsavel.objects.create(
+            nome='Maria Souza', email='maria@test.com', celular='61999990000',
+            tipo_vinculo='MAE', preferencia_contato='CELULAR',
+        )
+        self.ana = self.criar_estudante('2025001', 'Ana Souza')
+        self.bia = self.criar_estudante('2025002', 'Bia Souza')
+        self.ana.responsaveis.add(self.mae)
+        self.bia.responsaveis.add(self.mae)
+        self.ocorrencia = self.criar_ocorrencia_rapida(
+            [self.ana, self.bia], [self.atraso], date(2025, 3, 3), self.servidor
+        )
+
+    def enfileirar(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return enfileirar_notificacoes_responsaveis(self.ocorrencia, 'ocorrencia_rapida')
+
+
+class FilaNotificacoesTestCase(NotificacoesBaseTestCase):
+    def test_um_email_por_responsavel_e_idempotencia(self):
+        self.assertEqual(self.enfileirar(), 3)  # 1 email (mãe das duas) + 1 SMS por estudante
+        self.assertEqual(len(mail.outbox), 1)
+        email = EnvioNotificacao.objects.get(canal='EMAIL')
+        self.assertEqual(email.status, 'ENVIADO')
+        self.assertEqual(sorted(email.estudantes), sorted([self.ana.pk, self.bia.pk]))
+
+        # Reenvio do formulário não duplica nada
+        self.assertEqual(self.enfileirar(), 0)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(EnvioNotificacao.objects.count(), 3)
+
+    def test_falha_reagenda_ate_o_limite(self):
+        self.enfileirar()
+        sms = EnvioNotificacao.objects.filter(canal='SMS').first()
+        # SMS não chega ao responsável: volta para a fila com atraso
+        self.assertEqual(sms.status, 'PENDENTE')
+        self.assertEqual(sms.tentativas, 1)
+        self.assertGreater(sms.proxima_tentativa, timezone.now())
+        self.assertEqual(processar_pendentes()['ignorados'], 0)
+
+        EnvioNotificacao.objects.filter(canal='SMS').update(proxima_tentativa=timezone.now())
+        resultado = processar_pendentes()
+        self.assertEqual(resultado['FALHOU'], 2)
+        self.assertFalse(EnvioNotificacao.objects.filter(status='PENDENTE').exists())
+
+    def test_limite_de_concorrencia_por_canal(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            enfileirar_notificacoes_responsaveis(self.ocorrencia, 'ocorrencia_rapida')
+        email = EnvioNotificacao.objects.get(canal='EMAIL')
+
+        vaga = _adquirir_vaga('EMAIL')
+        with self.assertRaises(VagaIndisponivel):
+            processar_envio(email.pk)
+        _liberar_vaga(vaga)
+
+        self.assertEqual(processar_envio(email.pk).status, 'ENVIADO')
+        self.assertIsNone(processar_envio(email.pk))
+        self.assertEqual(len(mail.outbox), 1)
+
+
+class EntregaNotificacoesTestCase(NotificacoesBaseTestCase):
+    def tearDown(self):
+        descartar_clientes()
+        super().tearDown()
+
+    def test_emails_da_ocorrencia_compartilham_conexao(self):
+        for i in range(3):
+            responsavel = Responsavel.objects.create(
+                nome=f'Responsável {i}', email=f'resp{i}@test.com', celular='61999990000',
+                tipo_vinculo='PAI', preferencia_contato='EMAIL',
+            )
+            self.ana.responsaveis.add(responsavel)
+
+        with ServidorSMTPFalso() as smtp, override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+            EMAIL_HOST='127.0.0.1', EMAIL_PORT=smtp.porta, EMAIL_USE_TLS=False,
+            NOTIFICACOES_TAXA={},
+        ):
+            descartar_clientes()
+            self.enfileirar()
+
+        self.assertEqual(EnvioNotificacao.objects.filter(canal='EMAIL', status='ENVIADO').count(), 4)
+        self.assertEqual(smtp.mensagens, 4)
+        self.assertEqual(smtp.conexoes, 1)
+
+    def test_queda_do_smtp_preserva_emails_ja_enviados(self):
+        for i in range(3):
+            responsavel = Responsavel.objects.create(
+                nome=f'Responsável {i}', email=f'resp{i}@test.com', celular='61999990000',
+                tipo_vinculo='PAI', preferencia_contato='EMAIL',
+            )
+            self.ana.responsaveis.add(responsavel)
+
+        # O servidor cai depois da primeira mensagem e recusa a reconexão
+        with ServidorSMTPFalso(limite_mensagens=1) as smtp, override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+            EMAIL_HOST='127.0.0.1', EMAIL_PORT=smtp.porta, EMAIL_USE_TLS=False,
+            NOTIFICACOES_TAXA={},
+        ):
+            descartar_clientes()
+            self.enfileirar()
+
+        emails = EnvioNotificacao.objects.filter(canal='EMAIL')
+        self.assertEqual(emails.filter(status='ENVIADO').count(), 1)
+        self.assertEqual(emails.filter(status='PENDENTE').count(), 3)
+        self.assertEqual(smtp.mensagens, 1)
+
+    def test_limitador_respeita_taxa(self):
+        limitador = LimitadorTaxa(50)
+        inicio = relogio.monotonic()
+        for _ in range(5):
+            limitador.aguardar()
+        self.assertGreaterEqual(relogio.monotonic() - inicio, 0.07)
+
+    @override_settings(
+        NOTIFICACOES_TAXA={},
+        NOTIFICACOES_TWILIO_HTTP_CLIENT='core.entrega_falsa.TwilioHttpClientFalso',
+        TWILIO_ACCOUNT_SID='AC' + '0' * 32, TWILIO_AUTH_TOKEN='token', TWILIO_PHONE_NUMBER='+15005550006',
+    )
+    def test_cliente_twilio_reaproveitado(self):
+        descartar_clientes()
+        TwilioHttpClientFalso.enviados.clear()
+        cliente = cliente_twilio()
+        self.assertTrue(enviar_sms('+5561999990000', 'um').startswith('SM'))
+        enviar_sms('+5561999990001', 'dois')
+        self.assertIs(cliente_twilio(), cliente)
+        self.assertEqual([sms['body'] for sms in TwilioHttpClientFalso.enviados], ['um', 'dois'])
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class CardsTurmaTestCase(CoreBaseTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.servidor = self.criar_servidor()
+        self.grave = Infracao.objects.create(
+            codigo='G1', descricao='Agressão', gravidade='GRAVE', referencia_artigo='Art. 1'
+        )
+        self.atraso = TipoOcorrenciaRapida.objects.create(codigo='ATRASO', descricao='Atraso')
+
+    def test_contagens_e_ultimos_itens(self):
+        ana = self.criar_estudante('2025001', 'Ana Souza')
+        bruno = self.criar_estudante('2025002', 'Bruno Lima')
+        for dia in range(1, 6):
+            self.criar_ocorrencia([ana], dia, self.servidor)
+        self.criar_ocorrencia([ana, bruno], 10, self.servidor, infracao=self.grave)
+        self.criar_ocorrencia_rapida([bruno], [self.atraso], date(2025, 3, 2), self.servidor)
+        self.criar_atendimento([ana, bruno], 4, self.servidor)
+
+        cards = {e.matricula_sga: e for e in consultar_cards_turma(self.turma)}
+        self.assertEqual(cards['2025001'].total_ocorrencias, 6)
+        self.assertEqual(cards['2025002'].total_ocorrencias, 1)
+        self.assertEqual(cards['2025002'].total_ocorrencias_rapidas, 1)
+        self.assertEqual(cards['2025001'].total_atendimentos, 1)
+        self.assertEqual(cards['2025001'].status_alerta, 'alto')
+        self.assertEqual(
+            [o.data.day for o in cards['2025001'].ultimas_ocorrencias], [10, 5, 4]
+        )
+        self.assertEqual(len(cards['2025002'].ultimos_atendimentos), 1)
+
+    def test_consultas_constantes(self):
+        def consultas(quantidade):
+            cache.clear()
+            for i in range(quantidade):
+                estudante = self.criar_estudante(f'9{quantidade:02d}{i:03d}', f'Estudante {i}')
+                self.criar_ocorrencia([estudante], 3, self.servidor)
+            with CaptureQueriesContext(connection) as capturadas:
+                consultar_cards_turma(self.turma)
+            return len(capturadas)
+
+        self.assertEqual(consultas(2), consultas(20))
+
+    def test_cache_invalidado_por_nova_ocorrencia(self):
+        ana = self.criar_estudante('2025001', 'Ana Souza')
+        self.assertEqual(cards_da_turma(self.turma)[0].total_ocorrencias_rapidas, 0)
+        with self.assertNumQueries(0):
+            cards_da_turma(self.turma)
+
+        self.criar_ocorrencia_rapida([ana], [self.atraso], date(2025, 3, 2), self.servidor)
+        self.assertEqual(cards_da_turma(self.turma)[0].total_ocorrencias_rapidas, 1)
+
+    def test_troca_de_turma_invalida_as_duas(self):
+        ana = self.criar_estudante('2025001', 'Ana Souza')
+        outra = Turma.objects.create(nome='1B', curso=self.curso, ano=2025, periodo='2025.1', semestre=0)
+        self.assertEqual(len(cards_da_turma(self.turma)), 1)
+        self.assertEqual(len(cards_da_turma(outra)), 0)
+
+        ana.turma = outra
+        ana.save()
+        self.assertEqual(len(cards_da_turma(self.turma)), 0)
+        self.assertEqual(len(cards_da_turma(outra)), 1)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class MetricasDashboardTestCase(CoreBaseTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.servidor = self.criar_servidor()
+        self.ana = self.criar_estudante('2025001', 'Ana Souza')
+        self.atraso = TipoOcorrenciaRapida.objects.create(codigo='ATRASO', descricao='Atraso')
+        self.celular = TipoOcorrenciaRapida.objects.create(codigo='CELULAR', descricao='Celular')
+
+    def test_metricas_em_cache_ate_mudanca(self):
+        hoje = timezone.localdate()
+        self.criar_ocorrencia_rapida([self.ana], [self.atraso, self.celular], hoje, self.servidor)
+        self.criar_ocorrencia_rapida([self.ana], [self.atraso], hoje, self.servidor)
+
+        metricas = metricas_ocorrencias_rapidas()
+        self.assertEqual(metricas['total'], 2)
+        self.assertEqual(metricas['hoje'], 2)
+        self.assertEqual(metricas['por_tipo'][0], {
+            'tipo_rapido': 'ATRASO', 'tipo_rapido__display': 'Atraso', 'total': 2
+        })
+        with self.assertNumQueries(0):
+            metricas_ocorrencias_rapidas()
+
+        self.criar_ocorrencia_rapida([self.ana], [self.celular], hoje, self.servidor)
+        self.assertEqual(metricas_ocorrencias_rapidas()['total'], 3)
+
+    def test_metricas_ocorrencias_por_status(self):
+        Ocorrencia.objects.create(
+            data=timezone.localdate(), horario=time(8, 0), curso=self.curso, turma=self.turma,
+            descricao='Teste', responsavel_registro=self.servidor,
+        )
+        metricas = metricas_ocorrencias()
+        self.assertEqual(metricas['total'], 1)
+        self.assertEqual(metricas['abertas'], 1)
+        self.assertEqual(metricas['por_status'], {'REGISTRADA': 1})
+
+        Ocorrencia.objects.update(status='ARQUIVADA')  # update() não dispara signals
+        self.assertEqual(metricas_ocorrencias()['abertas'], 1)
+        Ocorrencia.objects.get().save()
+        self.assertEqual(metricas_ocorrencias()['abertas'], 0)
+
+    def test_dashboard_ocorrencias_rapidas(self):
+        self.client.force_login(self.servidor.user)
+        self.criar_ocorrencia_rapida([self.ana], [self.atraso], timezone.localdate(), self.servidor)
+        resposta = self.client.get(reverse('core:ocorrencia_rapida_dashboard'), secure=True)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.context['tipo_mais_comum'], 'ATRASO')
+
+        resposta = self.client.get(reverse('core:relatorios_estatisticas'), secure=True)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.context['tipos_rapidos_mais_comuns'][0]['total'], 1)
+
+        resposta = self.client.get(reverse('core:dashboard'), secure=True)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta.context['total_ocorrencias'], 0)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ContadorAlertasTestCase(CoreBaseTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.servidor = self.criar_servidor()
+        self.ana = self.criar_estudante('2025001', 'Ana Souza')
+        self.atraso = TipoOcorrenciaRapida.objects.create(codigo='ATRASO', descricao='Atraso')
+        self.config = ConfiguracaoLimiteOcorrenciaRapida.objects.create(
+            tipo_ocorrencia=self.atraso, limite_mensal=1
+        )
+        self.mes = timezone.localdate().replace(day=1)
+
+    def test_contador_acompanha_criacao_e_remocao(self):
+        self.assertEqual(contar_alertas_mes(), 0)
+        self.criar_ocorrencia_rapida([self.ana], [self.atraso], timezone.localdate(), self.servidor)
+        with self.assertNumQueries(0):
+            self.assertEqual(contar_alertas_mes(), 1)
+
+        AlertaLimiteOcorrenciaRapida.objects.get().delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(contar_alertas_mes(), 0)
+
+    def test_ajuste_nao_adia_recontagem(self):
+        mes = timezone.localdate().replace(day=1)
+        chave = utils_alertas._chave_contador_alertas(mes)
+        contar_alertas_mes()
+        _, prazo = cache.get(chave)
+        utils_alertas.ajustar_contador_alertas(mes, 3)
+        self.assertEqual(cache.get(chave), (3, prazo))
+
+        # Vencido o prazo, a leitura reconta no banco mesmo com ajustes no meio
+        cache.set(chave, (3, relogio.time() - 1))
+        utils_alertas.ajustar_contador_alertas(mes, 1)
+        self.assertEqual(contar_alertas_mes(), 0)
+
+    def test_context_processor_preguicoso(self):
+        request = RequestFactory().get('/')
+        request.user = self.servidor.user
+        with self.assertNumQueries(0):
+            contexto = alertas_ativos(request)
+        self.assertEqual(str(contexto['alertas_ativos_count']), '0')
+        self.assertFalse(contexto['alertas_ativos_count'] > 0)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class FotosDriveTestCase(CoreBaseTestCase):
+    FILE_ID = '1AbCdEfGhIjKlMnOp_qr-st'
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.diretorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.diretorio, ignore_errors=True)
+        self.drive = ServidorDriveFalso(fotos={self.FILE_ID: gerar_jpeg()}, latencia=0.05)
+        self.drive.__enter__()
+        self.addCleanup(self.drive.__exit__)
+        configuracao = override_settings(FOTOS_CACHE_DIR=self.diretorio, FOTOS_DRIVE_URL=self.drive.url)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+
+    def test_variantes_e_cache_em_disco(self):
+        caminho = fotos_drive.obter_foto(self.FILE_ID, 'avatar')
+        with Image.open(caminho) as imagem:
+            self.assertEqual(imagem.size, (48, 48))
+        with Image.open(fotos_drive.obter_foto(self.FILE_ID, 'card')) as imagem:
+            self.assertEqual(max(imagem.size), 300)
+        self.assertEqual(len(self.drive.requisicoes), 1)
+
+    def test_busca_unica_com_requisicoes_simultaneas(self):
+        threads = [
+            threading.Thread(target=fotos_drive.obter_foto, args=(self.FILE_ID,))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.drive.requisicoes, [self.FILE_ID])
+
+    def test_lock_entre_processos(self):
+        # Outro processo (outro descritor) segura o lock do arquivo
+        caminho = os.path.join(self.diretorio, self.FILE_ID[:2], self.FILE_ID, '.lock')
+        os.makedirs(os.path.dirname(caminho))
+        with open(caminho, 'a+b') as outro:
+            self.assertTrue(fotos_drive._trancar(outro))
+            thread = threading.Thread(target=fotos_drive.obter_foto, args=(self.FILE_ID,))
+            thread.start()
+            relogio.sleep(0.3)
+            self.assertEqual(self.drive.requisicoes, [])
+            fotos_drive._destrancar(outro)
+        thread.join()
+        self.assertEqual(self.drive.requisicoes, [self.FILE_ID])
+        self.assertTrue(os.path.exists(caminho))  # o lock de outro dono não é apagado
+        self.assertEqual(fotos_drive._locks_locais, {})
+
+    def test_revalidacao_condicional(self):
+        fotos_drive.obter_foto(self.FILE_ID)
+        with override_settings(FOTOS_REVALIDAR_APOS=0):
+            fotos_drive.obter_foto(self.FILE_ID)
+            self.assertEqual(self.drive.nao_modificadas, 1)
+
+            self.drive.trocar_foto(self.FILE_ID, gerar_jpeg(cor=(200, 30, 30)))
+            with Image.open(fotos_drive.obter_foto(self.FILE_ID)) as imagem:
+                self.assertGreater(imagem.getpixel((10, 10))[0], 150)
+        self.assertEqual(len(self.drive.requisicoes), 3)
+
+    def test_drive_fora_do_ar_serve_copia_local(self):
+        caminho = fotos_drive.obter_foto(self.FILE_ID)
+        self.drive.__exit__()
+        self.addCleanup(self.drive.__enter__)
+        with override_settings(FOTOS_REVALIDAR_APOS=0, REQUESTS_TIMEOUT=1):
+            self.assertEqual(fotos_drive.obter_foto(self.FILE_ID), caminho)
+
+    def test_view_proxy(self):
+        servidor = self.criar_servidor()
+        self.client.force_login(servidor.user)
+        url = reverse('core:proxy_google_drive_image')
+
+        resposta = self.client.get(url, {'id': self.FILE_ID, 'tamanho': 'avatar'}, secure=True)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta['Content-Type'], 'image/jpeg')
+        with Image.open(io.BytesIO(b''.join(resposta.streaming_content))) as imagem:
+            self.assertEqual(imagem.size, (48, 48))
+
+        self.assertEqual(self.client.get(url, {'id': '../../etc'}, secure=True).status_code, 400)
+        self.assertEqual(self.client.get(url, {'id': 'Inexistente_123'}, secure=True).status_code, 404)
+
+        with override_settings(FOTOS_SENDFILE_HEADER='X-Accel-Redirect', FOTOS_SENDFILE_PREFIX='/_fotos/'):
+            resposta = self.client.get(url, {'id': self.FILE_ID}, secure=True)
+        self.assertEqual(
+            resposta['X-Accel-Redirect'],
+            f'/_fotos/{self.FILE_ID[:2]}/{self.FILE_ID}/card.jpg'
+        )
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class SincronizacaoFotosTestCase(CoreBaseTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+
+        self.ids = [f'FotoDrive_{i:04d}_abc' for i in range(6)]
+        fotos = {file_id: gerar_jpeg(largura=1200, altura=1600) for file_id in self.ids[:5]}
+        self.drive = ServidorDriveFalso(fotos=fotos, latencia=0.02)
+        self.drive.__enter__()
+        self.addCleanup(self.drive.__exit__)
+        configuracao = override_settings(MEDIA_ROOT=self.media, FOTOS_DRIVE_URL=self.drive.url)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+
+        for i, file_id in enumerate(self.ids):
+            self.criar_estudante(
+                f'2025{i:03d}', f'Estudante {i}',
+                foto_url=f'https://drive.google.com/uc?export=view&id={file_id}'
+            )
+        self.criar_estudante('2025999', 'Sem Foto')
+
+    def test_sincroniza_e_retoma(self):
+        resultado = SincronizadorFotos(threads=4, processos=0).executar()
+        self.assertEqual(resultado['baixados'], 5)
+        self.assertEqual(resultado['erros'], 1)
+
+        estudante = Estudante.objects.get(matricula_sga='2025000')
+        self.assertEqual(estudante.foto.name, 'estudantes/2025000.jpg')
+        self.assertTrue(estudante.foto_local_disponivel)
+        with open(estudante.foto.path, 'rb') as arquivo:
+            self.assertEqual(estudante.foto_checksum, hashlib.sha256(arquivo.read()).hexdigest())
+        with Image.open(estudante.foto.path) as imagem:
+            self.assertEqual(max(imagem.size), 800)
+        self.assertEqual(
+            ler_manifesto(f'{self.media}/estudantes/.manifesto_sincronizacao.jsonl'),
+            set(self.ids[:5])
+        )
+
+        # Segunda execução: só a que falhou volta a ser tentada
+        self.drive.trocar_foto(self.ids[5], gerar_jpeg())
+        self.drive.requisicoes.clear()
+        resultado = SincronizadorFotos(threads=4, processos=0).executar()
+        self.assertEqual(self.drive.requisicoes, [self.ids[5]])
+        self.assertEqual((resultado['baixados'], resultado['ja_locais']), (1, 5))
+
+        # Foto apagada do disco: o manifesto não impede o novo download
+        os.remove(estudante.foto.path)
+        self.drive.requisicoes.clear()
+        resultado = SincronizadorFotos(threads=4, processos=0).executar()
+        self.assertEqual(self.drive.requisicoes, [self.ids[0]])
+        self.assertEqual((resultado['baixados'], resultado['retomados']), (1, 0))
+        self.assertTrue(os.path.exists(estudante.foto.path))
+
+    def test_comando_com_pool_de_processos(self):
+        saida = io.StringIO()
+        call_command('sincronizar_fotos', threads=2, processos=2, stdout=saida)
+        self.assertIn('Baixados com sucesso: 5', saida.getvalue())
+        self.assertEqual(Estudante.objects.exclude(foto='').exclude(foto__isnull=True).count(), 5)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class EstadoFotoTestCase(CoreBaseTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        configuracao = override_settings(MEDIA_ROOT=self.media)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+
+    def test_estado_mantido_no_save(self):
+        estudante = self.criar_estudante(
+            '2025001', 'Ana Souza',
+            foto_url='https://drive.google.com/uc?export=view&id=1AbCdEfGhIjKl_mn'
+        )
+        self.assertEqual(estudante.foto_drive_id, '1AbCdEfGhIjKl_mn')
+        self.assertFalse(estudante.foto_local_disponivel)
+        self.assertTrue(estudante.get_foto_url_proxy().endswith('?id=1AbCdEfGhIjKl_mn'))
+
+        conteudo = gerar_jpeg()
+        estudante.foto = SimpleUploadedFile('ana.jpg', conteudo, content_type='image/jpeg')
+        estudante.save()
+        estudante = Estudante.objects.get(pk=estudante.pk)
+        self.assertTrue(estudante.foto_local_disponivel)
+        self.assertEqual(estudante.foto_checksum, hashlib.sha256(conteudo).hexdigest())
+        self.assertEqual(estudante.get_foto_url_proxy(), estudante.foto.url)
+
+    def test_verificador_reconcilia_disco(self):
+        estudante = self.criar_estudante(
+            '2025001', 'Ana Souza',
+            foto_url='https://drive.google.com/uc?export=view&id=1AbCdEfGhIjKl_mn'
+        )
+        estudante.foto = SimpleUploadedFile('ana.jpg', gerar_jpeg(), content_type='image/jpeg')
+        estudante.save()
+
+        # Arquivo sumiu do disco: a URL não consulta o disco, só o estado gravado
+        os.remove(estudante.foto.path)
+        estudante = Estudante.objects.get(pk=estudante.pk)
+        self.assertEqual(estudante.get_foto_url_proxy(), estudante.foto.url)
+
+        resultado = reconciliar_estado_fotos(corrigir=False)
+        self.assertEqual((resultado['corrigidos'], len(resultado['locais_invalidas'])), (1, 1))
+
+        saida = io.StringIO()
+        call_command('verificar_fotos', corrigir=True, stdout=saida)
+        self.assertIn('Estados corrigidos: 1', saida.getvalue())
+        estudante = Estudante.objects.get(pk=estudante.pk)
+        self.assertFalse(estudante.foto_local_disponivel)
+        self.assertIsNotNone(estudante.foto_verificada_em)
+        self.assertTrue(estudante.get_foto_url_proxy().endswith('?id=1AbCdEfGhIjKl_mn'))
+
+
+class DocumentosPdfTestCase(CoreBaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.servidor = self.criar_servidor()
+        infracao = Infracao.objects.create(
+            codigo='L1', descricao='Uso de celular', gravidade='LEVE', referencia_artigo='Art. 2'
+        )
+        self.ocorrencias = []
+        for dia in range(1, 6):
+            ocorrencia = Ocorrencia.objects.create(
+                data=date(2025, 3, dia), horario=time(8, 0), curso=self.curso, turma=self.turma,
+                descricao=f'Ocorrência {dia}', infracao=infracao, responsavel_registro=self.servidor,
+            )
+            ocorrencia.estudantes.set([
+                self.criar_estudante(f'2025{dia}{i}', f'Estudante {dia}{i}') for i in range(3)
+            ])
+            self.ocorrencias.append(ocorrencia)
+
+    def test_registro_de_estilos_compartilhado(self):
+        self.assertIs(estilos_documento(), estilos_documento())
+        self.assertIn('TituloPrincipal', estilos_documento())
+
+    def test_lote_em_queries_constantes(self):
+        ids = [ocorrencia.id for ocorrencia in self.ocorrencias]
+        # ocorrências + estudantes + turmas + cursos (infração/responsável no select_related)
+        with self.assertNumQueries(4):
+            documentos = gerar_documentos_pdf(Ocorrencia.objects.filter(pk__in=ids), 'REGISTRO')
+        self.assertEqual(set(documentos), set(ids))
+        for buffer in documentos.values():
+            self.assertTrue(buffer.getvalue().startswith(b'%PDF'))
+
+        unico = gerar_documentos_pdf_unico(Ocorrencia.objects.filter(pk__in=ids), 'NOTIFICACAO')
+        self.assertTrue(unico.getvalue().startswith(b'%PDF'))
+
+    def test_geracao_concorrente(self):
+        # Relacionamentos carregados antes: as threads só montam o PDF
+        ocorrencia = Ocorrencia.objects.select_related(
+            'infracao', 'responsavel_registro'
+        ).prefetch_related('estudantes').get(pk=self.ocorrencias[0].pk)
+        tamanhos = set()
+        with ThreadPoolExecutor(4) as executor:
+            for buffer in executor.map(
+                lambda _: gerar_documento_pdf(ocorrencia, 'ATA_ADVERTENCIA'), range(8)
+            ):
+                tamanhos.add(len(re.findall(rb'/Type /Page\b', buffer.getvalue())))
+        self.assertEqual(len(tamanhos), 1)
+        self.assertGreater(tamanhos.pop(), 1)
+
+
+@override_settings(DOCUMENTOS_RENDER_MODO='eager')
+class DocumentosRenderTestCase(CoreBaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        configuracao = override_settings(MEDIA_ROOT=self.media)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+
+        self.servidor = self.criar_servidor()
+        self.tipo = TipoOcorrenciaRapida.objects.create(codigo='ATRASO', descricao='Atraso')
+        self.rapida = self.criar_ocorrencia_rapida(
+            [self.criar_estudante('20251', 'Ana')], [self.tipo], date(2025, 3, 10), self.servidor
+        )
+        self.ocorrencia = Ocorrencia.objects.create(
+            data=date(2025, 3, 10), horario=time(8, 0), curso=self.curso, turma=self.turma,
+            descricao='Uso de celular', responsavel_registro=self.servidor,
+        )
+        self.ocorrencia.estudantes.set([self.criar_estudante('20252', 'Bruno')])
+
+    def test_mesmo_conteudo_reaproveita_documento(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            documento = documentos_render.solicitar_documento(self.ocorrencia, 'REGISTRO', self.servidor)
+        documento.refresh_from_db()
+        self.assertEqual(documento.status, 'PRONTO')
+        self.assertTrue(documento.arquivo.read().startswith(b'%PDF'))
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            repetido = documentos_render.solicitar_documento(self.ocorrencia, 'REGISTRO', self.servidor)
+        self.assertEqual(repetido.pk, documento.pk)
+        self.assertEqual(callbacks, [])  # nada a renderizar
+
+        self.ocorrencia.descricao = 'Descrição corrigida'
+        self.ocorrencia.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            novo = documentos_render.solicitar_documento(self.ocorrencia, 'REGISTRO', self.servidor)
+        self.assertNotEqual(novo.pk, documento.pk)
+        self.assertNotEqual(novo.hash_conteudo, documento.hash_conteudo)
+
+    def test_download_do_recibo(self):
+        # Recibo agendado ao registrar a ocorrência (renderizado após o commit)
+        with self.captureOnCommitCallbacks(execute=True):
+            documento = documentos_render.solicitar_documento(
+                self.rapida, 'RECIBO_TERMICO', self.servidor, assinado=True
+            )
+
+        self.client.force_login(self.servidor.user)
+        url = reverse('core:baixar_recibo_termico', args=[self.rapida.pk])
+        with self.captureOnCommitCallbacks() as callbacks:
+            resposta = self.client.get(url, secure=True)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertTrue(b''.join(resposta.streaming_content).startswith(b'%PDF'))
+        self.assertEqual(callbacks, [])  # servido do arquivo já gerado
+        self.assertEqual(
+            list(DocumentoGerado.objects.filter(ocorrencia_rapida=self.rapida).values_list('pk', flat=True)),
+            [documento.pk]
+        )
+
+    def test_documento_impresso_com_a_data_do_registro(self):
+        self.client.force_login(self.servidor.user)
+        url = reverse('core:gerar_documento', args=[self.ocorrencia.pk, 'ATA_ADVERTENCIA'])
+        with self.captureOnCommitCallbacks() as callbacks:
+            resposta = self.client.get(url, secure=True)
+        documento = DocumentoGerado.objects.get(ocorrencia=self.ocorrencia)
+        self.assertEqual(documento.status, 'PENDENTE')
+        mensagem = str(list(resposta.wsgi_request._messages)[0])
+        self.assertIn('em geração', mensagem)
+        self.assertIn(reverse('core:baixar_documento', args=[documento.pk]), mensagem)
+
+        # PDF renderizado (ou reaproveitado) depois mostra a data do registro, não a do dia
+        DocumentoGerado.objects.filter(pk=documento.pk).update(
+            data_geracao=timezone.make_aware(datetime(2024, 1, 2, 9, 30))
+        )
+        for callback in callbacks:
+            callback()
+        documento.refresh_from_db()
+        texto = b''.join(
+            zlib.decompress(base64.a85decode(fluxo.strip(), adobe=True))
+            for fluxo in re.findall(rb'stream\r?\n(.*?)endstream', documento.arquivo.read(), re.S)
+        )
+        self.assertIn(b'02/01/2024 \\340s 09:30', texto)
+        self.assertNotIn(timezone.localdate().strftime('%d/%m/%Y').encode(), texto)
+
+    def test_documento_pendente_responde_202(self):
+        documento = DocumentoGerado.objects.create(
+            ocorrencia=self.ocorrencia, tipo_documento='REGISTRO', hash_conteudo='x' * 64, status='PENDENTE'
+        )
+        self.client.force_login(self.servidor.user)
+        with self.captureOnCommitCallbacks() as callbacks:
+            resposta = self.client.get(reverse('core:baixar_documento', args=[documento.pk]), secure=True)
+        self.assertEqual(resposta.status_code, 202)
+        self.assertIn('Retry-After', resposta)
+        self.assertEqual(callbacks, [])  # recém-criado: ainda em geração
+
+    def test_documento_parado_em_geracao_e_reagendado(self):
+        documento = DocumentoGerado.objects.create(
+            ocorrencia=self.ocorrencia, tipo_documento='REGISTRO', status='PENDENTE',
+            hash_conteudo=documentos_render.hash_documento(self.ocorrencia, 'REGISTRO'),
+        )
+        DocumentoGerado.objects.filter(pk=documento.pk).update(
+            data_geracao=timezone.now() - timedelta(minutes=10)
+        )
+
+        # Pedido do mesmo conteúdo: reaproveita a linha e agenda a renderização uma única vez
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.assertEqual(documentos_render.solicitar_documento(self.ocorrencia, 'REGISTRO').pk, documento.pk)
+            documentos_render.solicitar_documento(self.ocorrencia, 'REGISTRO')
+        self.assertEqual(len(callbacks), 1)
+        documento.refresh_from_db()
+        self.assertEqual(documento.status, 'PRONTO')
+
+        # Varredura periódica pelo comando
+        DocumentoGerado.objects.filter(pk=documento.pk).update(
+            status='PENDENTE', data_geracao=timezone.now() - timedelta(minutes=10)
+        )
+        saida = io.StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('retomar_documentos', stdout=saida)
+        self.assertIn('Reagendados: 1', saida.getvalue())
+        documento.refresh_from_db()
+        self.assertEqual(documento.status, 'PRONTO')
+
+
+class RecibosTermicosTestCase(CoreBaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.servidor = self.criar_servidor()
+        tipos = [
+            TipoOcorrenciaRapida.objects.create(codigo='ATRASO', descricao='Atraso'),
+            TipoOcorrenciaRapida.objects.create(codigo='CELULAR', descricao='Celular'),
+        ]
+        for i in range(6):
+            self.criar_ocorrencia_rapida(
+                [self.criar_estudante(f'2025{i}{j}', f'Estudante {i}{j}') for j in range(2)],
+                tipos, date(2025, 3, 10), self.servidor
+            )
+
+    def test_lote_num_unico_rolo(self):
+        # ocorrências (+turma/curso/responsável) + estudantes + tipos
+        with self.assertNumQueries(3):
+            pdf = gerar_recibos_termicos(OcorrenciaRapida.objects.all()).getvalue()
+        self.assertEqual(len(re.findall(rb'/Type /Page\b', pdf)), 1)
+
+        # Rolo = 6 recibos individuais (sem as margens) + espaço de corte entre eles
+        def altura(conteudo):
+            return float(re.search(rb'/MediaBox \[ 0 0 [\d.]+ ([\d.]+) \]', conteudo).group(1))
+
+        individual = altura(gerar_recibos_termicos([OcorrenciaRapida.objects.first()]).getvalue())
+        margens = RECIBO_MARGEM * 4
+        self.assertAlmostEqual(
+            altura(pdf), 6 * (individual - margens) + margens + 5 * RECIBO_ENTRE_RECIBOS, places=2
+        )
+
+    def test_impressao_pela_listagem(self):
+        self.client.force_login(self.servidor.user)
+        resposta = self.client.get(
+            reverse('core:ocorrencia_rapida_list'), {'data_inicio': '2025-03-10', 'recibos': '1'}, secure=True
+        )
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta['Content-Type'], 'application/pdf')
+        self.assertTrue(b''.join(resposta.streaming_content).startswith(b'%PDF'))
+
+    def test_impressao_limitada(self):
+        self.client.force_login(self.servidor.user)
+        url = reverse('core:ocorrencia_rapida_list')
+
+        # Sem período: só as de hoje (nenhuma aqui), não o histórico inteiro
+        resposta = self.client.get(url, {'recibos': '1'}, secure=True)
+        self.assertRedirects(resposta, url, fetch_redirect_response=False)
+
+        with override_settings(RECIBOS_TERMICOS_LIMITE=5):
+            resposta = self.client.get(url, {'data_inicio': '2025-03-10', 'recibos': '1'}, secure=True)
+        self.assertRedirects(resposta, f'{url}?data_inicio=2025-03-10', fetch_redirect_response=False)
+        self.assertIn('até 5', str(list(resposta.wsgi_request._messages)[-1]))
+
+    def test_acao_do_admin(self):
+        admin = User.objects.create_superuser('admin', 'admin@test.com', 'pass')
+        self.client.force_login(admin)
+        url = reverse('admin:core_ocorrenciarapida_changelist')
+        dados = {
+            'action': 'gerar_recibos_termicos',
+            '_selected_action': list(OcorrenciaRapida.objects.values_list('pk', flat=True)),
+        }
+
+        resposta = self.client.post(url, dados, secure=True)
+        self.assertEqual(resposta['Content-Type'], 'application/pdf')
+        self.assertEqual(len(re.findall(rb'/Type /Page\b', b''.join(resposta.streaming_content))), 1)
+        self.assertFalse(DocumentoGerado.objects.exists())
+
+        with override_settings(RECIBOS_TERMICOS_LIMITE=5):
+            resposta = self.client.post(url, dados, secure=True)
+        self.assertRedirects(resposta, url, fetch_redirect_response=False)
+        self.assertIn('até 5', str(list(resposta.wsgi_request._messages)[-1]))
+
+
+class BuscaEstudantesTestCase(CoreBaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.joao = self.criar_estudante('20251001', 'João da Silva')
+        self.maria = self.criar_estudante('20252002', 'Maria Conceição Souza')
+
+    def buscar(self, busca):
+        return set(filtrar_por_busca(Estudante.objects.all(), busca).values_list('nome', flat=True))
+
+    def test_prefixos_sem_acento(self):
+        self.assertIn('joao', termos_de('João'))
+        self.assertEqual(self.buscar('Joao'), {'João da Silva'})
+        self.assertEqual(self.buscar('conceiçao sou'), {'Maria Conceição Souza'})
+        self.assertEqual(self.buscar('2025'), {'João da Silva', 'Maria Conceição Souza'})
+        self.assertEqual(self.buscar('joao souza'), set())
+
+    def test_indice_acompanha_alteracoes(self):
+        self.joao.nome = 'João Pereira'
+        self.joao.save()
+        self.assertEqual(self.buscar('pereira'), {'João Pereira'})
+        self.assertEqual(self.buscar('silva'), set())
+
+        # Salvar sem mudar nome/matrícula não regrava o índice
+        ids = set(TermoBuscaEstudante.objects.values_list('id', flat=True))
+        self.joao.email = 'joao@test.com'
+        self.joao.save()
+        Estudante.objects.get(pk=self.maria.pk).save()
+        self.assertEqual(set(TermoBuscaEstudante.objects.values_list('id', flat=True)), ids)
+
+        TermoBuscaEstudante.objects.all().delete()
+        call_command('reconstruir_busca_estudantes', stdout=io.StringIO())
+        self.assertEqual(self.buscar('mar'), {'Maria Conceição Souza'})
+
+    def test_autocomplete(self):
+        self.client.force_login(self.criar_servidor().user)
+        resposta = self.client.get(reverse('core:api_filtrar_estudantes'), {'busca': 'joao'}, secure=True)
+        self.assertEqual([e['nome'] for e in resposta.json()['estudantes']], ['João da Silva'])
+
+
+class LinhaTempoTestCase(CoreBaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.servidor = self.criar_servidor(pode_visualizar_ficha_aluno=True)
+        self.ana = self.criar_estudante('2025001', 'Ana Souza')
+        self.bruno = self.criar_estudante('2025002', 'Bruno Lima')
+        self.grave = Infracao.objects.create(
+            codigo='G1', descricao='Agressão', gravidade='GRAVE', referencia_artigo='Art. 1'
+        )
+
+    def eventos(self, estudante):
+        return list(estudante.linha_tempo.values_list('tipo', 'origem_id'))
+
+    def test_signals_mantem_eventos(self):
+        from pedagogico.models import ConselhoClasse, InformacaoEstudanteConselho
+
+        ocorrencia = self.criar_ocorrencia([self.ana, self.bruno], 10, self.servidor, infracao=self.grave)
+        atraso = TipoOcorrenciaRapida.objects.create(codigo='ATRASO', descricao='Atraso')
+        rapida = self.criar_ocorrencia_rapida([self.ana], [atraso], date(2025, 3, 2), self.servidor)
+        atendimento = self.criar_atendimento([self.ana], 4, self.servidor)
+        conselho = ConselhoClasse.objects.create(turma=self.turma, periodo='2025.1', data_realizacao=date(2025, 3, 20))
+        InformacaoEstudanteConselho.objects.create(conselho=conselho, estudante=self.ana)
+
+        self.assertEqual(self.eventos(self.ana), [
+            ('CONSELHO', conselho.pk), ('OCORRENCIA', ocorrencia.pk),
+            ('ATENDIMENTO', atendimento.pk), ('OCORRENCIA_RAPIDA', rapida.pk),
+        ])
+        evento = self.ana.linha_tempo.get(tipo='OCORRENCIA')
+        self.assertEqual(evento.gravidade, 'GRAVE')
+        self.assertEqual(evento.situacao, 'Registrada')
+        self.assertFalse(self.ana.linha_tempo.get(tipo='ATENDIMENTO').publico)
+
+        ocorrencia.status = 'EM_ANALISE'
+        ocorrencia.save()
+        self.assertEqual(self.ana.linha_tempo.get(tipo='OCORRENCIA').situacao, 'Em Análise Prévia')
+        ocorrencia.estudantes.remove(self.bruno)
+        self.assertEqual(self.eventos(self.bruno), [])
+        conselho.data_realizacao = date(2025, 3, 1)
+        conselho.save()
+        self.assertEqual(self.ana.linha_tempo.get(tipo='CONSELHO').data, date(2025, 3, 1))
+        rapida.delete()
+        self.assertFalse(self.ana.linha_tempo.filter(tipo='OCORRENCIA_RAPIDA').exists())
+
+        EventoLinhaTempo.objects.all().delete()
+        call_command('reconstruir_linha_tempo', stdout=io.StringIO())
+        self.assertEqual(EventoLinhaTempo.objects.count(), 3)
+
+    def test_conselhos_so_com_permissao_de_ver_a_ficha(self):
+        from pedagogico.models import ConselhoClasse, InformacaoEstudanteConselho
+
+        self.criar_ocorrencia([self.ana], 1, self.servidor)
+        conselho = ConselhoClasse.objects.create(turma=self.turma, periodo='2025.1', data_realizacao=date(2025, 3, 20))
+        InformacaoEstudanteConselho.objects.create(conselho=conselho, estudante=self.ana)
+        url = reverse('core:estudante_detail', args=[self.ana.matricula_sga])
+
+        self.client.force_login(self.servidor.user)
+        resposta = self.client.get(url, secure=True)
+        self.assertEqual([e.tipo for e in resposta.context['eventos']], ['CONSELHO', 'OCORRENCIA'])
+
+        self.client.force_login(self.criar_servidor('7654321').user)
+        for parametros in ({}, {'tipo': 'CONSELHO'}):
+            resposta = self.client.get(url, parametros, secure=True)
+            self.assertEqual([e.tipo for e in resposta.context['eventos']], ['OCORRENCIA'])
+        self.assertEqual(resposta.context['total_conselhos'], 0)
+        self.assertNotIn('CONSELHO', dict(resposta.context['tipos_evento']))
+
+    def test_paginas_em_consultas_constantes(self):
+        self.client.force_login(self.servidor.user)
+        urls = [
+            reverse('core:estudante_detail', args=[self.ana.matricula_sga]),
+            reverse('pedagogico:ficha_aluno', args=[self.ana.matricula_sga]),
+            reverse('core:relatorio_estudante', args=[self.ana.matricula_sga]),
+        ]
+
+        def consultas():
+            contagens = []
+            for url in urls:
+                self.client.get(url, secure=True)  # aquece caches da sessão/contexto
+                with CaptureQueriesContext(connection) as capturadas:
+                    self.assertEqual(self.client.get(url, secure=True).status_code, 200)
+                contagens.append(len(capturadas))
+            return contagens
+
+        self.criar_ocorrencia([self.ana], 1, self.servidor, infracao=self.grave)
+        poucas = consultas()
+        for dia in range(2, 30):
+            self.criar_ocorrencia([self.ana], dia, self.servidor, infracao=self.grave)
+        self.criar_atendimento([self.ana], 4, self.servidor, publicar=True)
+        self.assertEqual(consultas(), poucas)
+
+        resposta = self.client.get(urls[0], {'tipo': 'ATENDIMENTO'}, secure=True)
+        self.assertEqual(resposta.context['total_ocorrencias'], 29)
+        self.assertEqual([e.tipo for e in resposta.context['eventos']], ['ATENDIMENTO'])
+        # Relatório impresso lista todas as ocorrências, sem paginação
+        resposta = self.client.get(urls[2], secure=True)
+        self.assertEqual(len(resposta.context['ocorrencias']), 29)
+        self.assertEqual(resposta.context['total_ocorrencias'], 29)
+
+
+class AnaliseIndicesTestCase(CoreBaseTestCase):
+    def test_varreduras_completas(self):
+        self.assertEqual(varreduras_completas('2 0 0 SCAN core_ocorrencia'), ['2 0 0 SCAN core_ocorrencia'])
+        self.assertEqual(varreduras_completas(
+            '3 0 0 SEARCH core_ocorrencia USING INDEX ocorrencia_status_prazo_idx (status=?)\n'
+            '4 0 0 SCAN core_ocorrencia USING INDEX ocorrencia_criado_idx'
+        ), [])
+        self.assertEqual(len(varreduras_completas('Seq Scan on core_ocorrencia  (cost=0.00..1.00)')), 1)
+
+    def test_comando_recusa_copia_dentro_de_transacao(self):
+        with self.assertRaises(CommandError):
+            call_command('analisar_indices', '--quantidade', '10', stdout=io.StringIO())
+
+    def test_comando_no_banco_atual_desfaz_massa_e_indices(self):
+        saida = io.StringIO()
+        call_command(
+            'analisar_indices', '--quantidade', '300', '--repeticoes', '1', '--no-banco-atual', stdout=saida
+        )
+        self.assertIn('0 com os índices', saida.getvalue())
+        self.assertFalse(Ocorrencia.objects.exists())
+        with connection.cursor() as cursor:
+            indices = connection.introspection.get_constraints(cursor, Ocorrencia._meta.db_table)
+        self.assertIn('ocorrencia_status_prazo_idx', indices)
+
+
+class AnaliseIndicesCopiaTestCase(TransactionTestCase):
+    def test_comando_roda_numa_copia_do_sqlite(self):
+        # O alias da cópia só existe durante o comando: liberado aqui, não na classe
+        AnaliseIndicesCopiaTestCase.databases = {'default', 'analise_indices'}
+        self.addCleanup(setattr, AnaliseIndicesCopiaTestCase, 'databases', {'default'})
+        saida = io.StringIO()
+        call_command('analisar_indices', '--quantidade', '300', '--repeticoes', '1', stdout=saida)
+        self.assertIn('cópia temporária', saida.getvalue())
+        self.assertIn('0 com os índices', saida.getvalue())
+        self.assertNotIn('analise_indices', connections.settings)
+        self.assertFalse(Campus.objects.exists())
@@ -30,6 +30,7 @@ urlpatterns = [
     path('ocorrencias/<int:pk>/sancao/', views.ocorrencia_aplicar_sancao, name='ocorrencia_aplicar_sancao'),
     path('ocorrencias/<int:pk>/comissao/', views.comissao_create, name='comissao_create'),
     path('ocorrencias/<int:pk>/documento/<str:tipo>/', views.gerar_documento, name='gerar_documento'),
+    path('documentos/<int:pk>/', views.baixar_documento, name='baixar_documento'),
 
     path('ocorrencias-rapidas/', views.ocorrencia_rapida_list, name='ocorrencia_rapida_list'),
     path('ocorrencias-rapidas/dashboard/', views.ocorrencia_rapida_dashboard, name='ocorrencia_rapida_dashboard'),
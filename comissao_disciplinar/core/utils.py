@@ -11,6 +11,9 @@ from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_RIGHT, TA_JUSTIFY
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from datetime import datetime
+import copy
+import tempfile
+import threading
 import qrcode
 from django.conf import settings
 import os
@@ -20,25 +23,64 @@ from reportlab.pdfgen import canvas
 from io import BytesIO
 from datetime import datetime
 
-def gerar_documento_pdf(ocorrencia, tipo_documento):
-    """Gera documento PDF profissional baseado no tipo"""
-    buffer = BytesIO()
-
-    # Configurar documento com margens adequadas
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=A4,
-        topMargin=2*cm,
-        bottomMargin=2*cm,
-        leftMargin=2*cm,
-        rightMargin=2*cm,
-        title=f"Documento - {tipo_documento} - Ocorrência #{ocorrencia.id}"
-    )
-
-    # Configurar estilos
+# ====================
+# ESTILOS E FLOWABLES COMPARTILHADOS (PDF)
+# ====================
+
+MARGEM_DOCUMENTO = 2*cm
+
+_estilos = None
+_fixos = {}
+_estilos_lock = threading.Lock()
+
+ESTILO_LINHA_DIVISORIA = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#006633')),
+    ('BOX', (0, 0), (-1, -1), 0, colors.HexColor('#006633'))
+])
+
+ESTILO_TABELA_INFO_REGISTRO = TableStyle([
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+    ('LEFTPADDING', (0, 0), (-1, -1), 0),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 0),
+])
+
+ESTILO_TABELA_ESTUDANTES = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#006633')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 9),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#f8f9fa')),
+    ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('FONTSIZE', (0, 1), (-1, -1), 8),
+])
+
+ESTILO_TABELA_INFRACAO = TableStyle([
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+    ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#f0f8ff')),
+    ('LEFTPADDING', (0, 0), (-1, -1), 8),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 8),
+])
+
+ESTILO_TABELA_INFO_ATA = TableStyle([
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+])
+
+ESTILO_TABELA_ASSINATURAS = TableStyle([
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+])
+
+
+def _criar_estilos():
+    """Estilos personalizados baseados no design do IFB"""
     styles = getSampleStyleSheet()
 
-    # Estilos personalizados baseados no design do IFB
     styles.add(ParagraphStyle(
         name='TituloPrincipal',
         parent=styles['Heading1'],
@@ -107,91 +149,201 @@ def gerar_documento_pdf(ocorrencia, tipo_documento):
         fontName='Helvetica'
     ))
 
+    return styles
+
+
+def estilos_documento():
+    """
+    Folha de estilos dos documentos, criada uma vez por processo
+
+    Compartilhada entre threads: quem usa não deve alterá-la (styles.add etc.).
+    """
+    global _estilos
+    if _estilos is None:
+        with _estilos_lock:
+            if _estilos is None:
+                _estilos = _criar_estilos()
+    return _estilos
+
+
+def _paragrafo_fixo(texto, estilo):
+    """
+    Parágrafo de texto fixo com o markup já interpretado
+
+    O parse fica em cache; cada uso recebe uma cópia rasa, porque wrap()/split()
+    guardam estado de layout no próprio flowable.
+    """
+    chave = (texto, estilo)
+    paragrafo = _fixos.get(chave)
+    if paragrafo is None:
+        paragrafo = Paragraph(texto, estilos_documento()[estilo])
+        with _estilos_lock:
+            paragrafo = _fixos.setdefault(chave, paragrafo)
+    return copy.copy(paragrafo)
+
+
+# ====================
+# DOCUMENTOS DE OCORRÊNCIA (PDF)
+# ====================
+
+def _montar_documento(ocorrencia, tipo_documento, styles, width, emitido_em):
+    """Lista de flowables de um documento (cabeçalho, conteúdo e rodapé)"""
     # Elementos do documento
     elements = []
 
     # Cabeçalho institucional
-    elements.extend(_gerar_cabecalho(styles, doc.width))
+    elements.extend(_gerar_cabecalho(styles, width))
 
     # Linha divisória
     elements.append(Spacer(1, 10))
-    elements.append(_gerar_linha_divisoria(doc.width))
+    elements.append(_gerar_linha_divisoria(width))
     elements.append(Spacer(1, 20))
 
     # Conteúdo baseado no tipo de documento
     if tipo_documento == 'REGISTRO':
-        elements.extend(_gerar_conteudo_registro(ocorrencia, styles, doc.width))
+        elements.extend(_gerar_conteudo_registro(ocorrencia, styles, width))
     elif tipo_documento == 'ATA_ADVERTENCIA':
-        elements.extend(_gerar_conteudo_advertencia(ocorrencia, styles, doc.width))
+        elements.extend(_gerar_conteudo_advertencia(ocorrencia, styles, width, emitido_em))
     elif tipo_documento == 'NOTIFICACAO':
-        elements.extend(_gerar_conteudo_notificacao(ocorrencia, styles, doc.width))
+        elements.extend(_gerar_conteudo_notificacao(ocorrencia, styles, width))
     elif tipo_documento == 'RELATORIO_FINAL':
-        elements.extend(_gerar_conteudo_relatorio_final(ocorrencia, styles, doc.width))
+        elements.extend(_gerar_conteudo_relatorio_final(ocorrencia, styles, width, emitido_em))
     else:
-        elements.extend(_gerar_conteudo_generico(ocorrencia, tipo_documento, styles, doc.width))
+        elements.extend(_gerar_conteudo_generico(ocorrencia, tipo_documento, styles, width))
 
     # Rodapé
     elements.append(PageBreak())
-    elements.extend(_gerar_rodape(ocorrencia, tipo_documento, styles, doc.width))
+    elements.extend(_gerar_rodape(ocorrencia, tipo_documento, styles, width, emitido_em))
+
+    return elements
+
+
+def _novo_documento(buffer, titulo):
+    # Configurar documento com margens adequadas
+    return SimpleDocTemplate(
+        buffer,
+        pagesize=A4,
+        topMargin=MARGEM_DOCUMENTO,
+        bottomMargin=MARGEM_DOCUMENTO,
+        leftMargin=MARGEM_DOCUMENTO,
+        rightMargin=MARGEM_DOCUMENTO,
+        title=titulo
+    )
+
+
+def gerar_documento_pdf(ocorrencia, tipo_documento, emitido_em=None):
+    """
+    Gera documento PDF profissional baseado no tipo
+
+    emitido_em é a data impressa no documento (padrão: agora); documentos
+    guardados passam a data_geracao do registro, para que o PDF reaproveitado
+    mostre sempre a mesma data.
+    """
+    buffer = BytesIO()
+    doc = _novo_documento(buffer, f"Documento - {tipo_documento} - Ocorrência #{ocorrencia.id}")
 
     # Construir PDF
+    doc.build(_montar_documento(
+        ocorrencia, tipo_documento, estilos_documento(), doc.width, emitido_em or datetime.now()
+    ))
+    buffer.seek(0)
+    return buffer
+
+
+def _preparar_ocorrencias(ocorrencias):
+    """Carrega de uma vez o que os templates de documento leem de cada ocorrência"""
+    from django.db.models import QuerySet, prefetch_related_objects
+
+    relacionados = ('estudantes__turma', 'estudantes__curso')
+    if isinstance(ocorrencias, QuerySet):
+        return list(ocorrencias.select_related(
+            'infracao', 'responsavel_registro'
+        ).prefetch_related(*relacionados))
+
+    ocorrencias = list(ocorrencias)
+    prefetch_related_objects(ocorrencias, 'infracao', 'responsavel_registro', *relacionados)
+    return ocorrencias
+
+
+def gerar_documentos_pdf(ocorrencias, tipo_documento):
+    """
+    Gera o mesmo tipo de documento para várias ocorrências
+
+    Estilos e flowables fixos são compartilhados e os relacionamentos são
+    carregados em poucas queries, então o custo por documento fica no conteúdo.
+
+    Returns:
+        dict {ocorrencia.id: BytesIO}
+    """
+    return {
+        ocorrencia.id: gerar_documento_pdf(ocorrencia, tipo_documento)
+        for ocorrencia in _preparar_ocorrencias(ocorrencias)
+    }
+
+
+def gerar_documentos_pdf_unico(ocorrencias, tipo_documento):
+    """Como gerar_documentos_pdf, mas num único PDF (um documento após o outro, para impressão)"""
+    buffer = BytesIO()
+    doc = _novo_documento(buffer, f"Documentos - {tipo_documento}")
+    styles = estilos_documento()
+    emitido_em = datetime.now()
+
+    elements = []
+    for ocorrencia in _preparar_ocorrencias(ocorrencias):
+        if elements:
+            elements.append(PageBreak())
+        elements.extend(_montar_documento(ocorrencia, tipo_documento, styles, doc.width, emitido_em))
+
     doc.build(elements)
     buffer.seek(0)
     return buffer
 
+
 def _gerar_cabecalho(styles, width):
     """Gera o cabeçalho institucional do IFB"""
     elements = []
 
     # Título principal
-    elements.append(Paragraph("INSTITUTO FEDERAL DE EDUCAÇÃO, CIÊNCIA E TECNOLOGIA DE BRASÍLIA", styles['TituloPrincipal']))
-    elements.append(Paragraph("COMISSÃO DISCIPLINAR ESTUDANTIL", styles['TituloSecundario']))
+    elements.append(_paragrafo_fixo("INSTITUTO FEDERAL DE EDUCAÇÃO, CIÊNCIA E TECNOLOGIA DE BRASÍLIA", 'TituloPrincipal'))
+    elements.append(_paragrafo_fixo("COMISSÃO DISCIPLINAR ESTUDANTIL", 'TituloSecundario'))
 
     return elements
 
 def _gerar_linha_divisoria(width):
     """Gera uma linha divisória estilizada"""
     linha = Table([['']], colWidths=[width], rowHeights=[2])
-    linha.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#006633')),
-        ('BOX', (0, 0), (-1, -1), 0, colors.HexColor('#006633'))
-    ]))
+    linha.setStyle(ESTILO_LINHA_DIVISORIA)
     return linha
 
 def _gerar_conteudo_registro(ocorrencia, styles, width):
     """Gera conteúdo para documento de registro de ocorrência"""
     elements = []
 
-    elements.append(Paragraph("REGISTRO DE OCORRÊNCIA DISCIPLINAR", styles['TituloSecundario']))
+    elements.append(_paragrafo_fixo("REGISTRO DE OCORRÊNCIA DISCIPLINAR", 'TituloSecundario'))
     elements.append(Spacer(1, 20))
 
     # Informações básicas da ocorrência
     info_data = [
-        [Paragraph("<b>Número do Registro:</b>", styles['Corpo']),
+        [_paragrafo_fixo("<b>Número do Registro:</b>", 'Corpo'),
          Paragraph(f"#{ocorrencia.id}", styles['Corpo'])],
-        [Paragraph("<b>Data do Fato:</b>", styles['Corpo']),
+        [_paragrafo_fixo("<b>Data do Fato:</b>", 'Corpo'),
          Paragraph(ocorrencia.data.strftime("%d/%m/%Y"), styles['Corpo'])],
-        [Paragraph("<b>Horário:</b>", styles['Corpo']),
+        [_paragrafo_fixo("<b>Horário:</b>", 'Corpo'),
          Paragraph(ocorrencia.horario.strftime("%H:%M"), styles['Corpo'])],
-        [Paragraph("<b>Status do Processo:</b>", styles['Corpo']),
+        [_paragrafo_fixo("<b>Status do Processo:</b>", 'Corpo'),
          Paragraph(ocorrencia.get_status_display(), styles['Corpo'])],
-        [Paragraph("<b>Registrado por:</b>", styles['Corpo']),
+        [_paragrafo_fixo("<b>Registrado por:</b>", 'Corpo'),
          Paragraph(ocorrencia.responsavel_registro.nome, styles['Corpo'])],
     ]
 
     info_table = Table(info_data, colWidths=[width*0.4, width*0.6])
-    info_table.setStyle(TableStyle([
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-        ('LEFTPADDING', (0, 0), (-1, -1), 0),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 0),
-    ]))
+    info_table.setStyle(ESTILO_TABELA_INFO_REGISTRO)
 
     elements.append(info_table)
     elements.append(Spacer(1, 20))
 
     # Estudantes envolvidos
-    elements.append(Paragraph("<b>ESTUDANTES ENVOLVIDOS:</b>", styles['Subtitulo']))
+    elements.append(_paragrafo_fixo("<b>ESTUDANTES ENVOLVIDOS:</b>", 'Subtitulo'))
 
     estudantes_data = [['Nome', 'Matrícula', 'Turma', 'Curso']]
     for estudante in ocorrencia.estudantes.all():
@@ -203,85 +355,65 @@ def _gerar_conteudo_registro(ocorrencia, styles, width):
         ])
 
     estudantes_table = Table(estudantes_data, colWidths=[width*0.35, width*0.2, width*0.2, width*0.25])
-    estudantes_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#006633')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 9),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#f8f9fa')),
-        ('GRID', (0, 0), (-1, -1), 1, colors.grey),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('FONTSIZE', (0, 1), (-1, -1), 8),
-    ]))
+    estudantes_table.setStyle(ESTILO_TABELA_ESTUDANTES)
 
     elements.append(estudantes_table)
     elements.append(Spacer(1, 20))
 
     # Descrição detalhada
-    elements.append(Paragraph("<b>DESCRIÇÃO DETALHADA DO FATO:</b>", styles['Subtitulo']))
+    elements.append(_paragrafo_fixo("<b>DESCRIÇÃO DETALHADA DO FATO:</b>", 'Subtitulo'))
     elements.append(Spacer(1, 8))
     elements.append(Paragraph(ocorrencia.descricao, styles['Corpo']))
     elements.append(Spacer(1, 20))
 
     # Infração identificada
     if ocorrencia.infracao:
-        elements.append(Paragraph("<b>INFRAÇÃO IDENTIFICADA:</b>", styles['Subtitulo']))
+        elements.append(_paragrafo_fixo("<b>INFRAÇÃO IDENTIFICADA:</b>", 'Subtitulo'))
         infracao_data = [
-            [Paragraph("<b>Código:</b>", styles['Corpo']), Paragraph(ocorrencia.infracao.codigo, styles['Corpo'])],
-            [Paragraph("<b>Descrição:</b>", styles['Corpo']), Paragraph(ocorrencia.infracao.descricao, styles['Corpo'])],
-            [Paragraph("<b>Gravidade:</b>", styles['Corpo']), Paragraph(ocorrencia.infracao.get_gravidade_display(), styles['Corpo'])],
-            [Paragraph("<b>Referência Legal:</b>", styles['Corpo']), Paragraph(ocorrencia.infracao.referencia_artigo, styles['Corpo'])],
+            [_paragrafo_fixo("<b>Código:</b>", 'Corpo'), Paragraph(ocorrencia.infracao.codigo, styles['Corpo'])],
+            [_paragrafo_fixo("<b>Descrição:</b>", 'Corpo'), Paragraph(ocorrencia.infracao.descricao, styles['Corpo'])],
+            [_paragrafo_fixo("<b>Gravidade:</b>", 'Corpo'), Paragraph(ocorrencia.infracao.get_gravidade_display(), styles['Corpo'])],
+            [_paragrafo_fixo("<b>Referência Legal:</b>", 'Corpo'), Paragraph(ocorrencia.infracao.referencia_artigo, styles['Corpo'])],
         ]
 
         infracao_table = Table(infracao_data, colWidths=[width*0.3, width*0.7])
-        infracao_table.setStyle(TableStyle([
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-            ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#f0f8ff')),
-            ('LEFTPADDING', (0, 0), (-1, -1), 8),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 8),
-        ]))
+        infracao_table.setStyle(ESTILO_TABELA_INFRACAO)
 
         elements.append(infracao_table)
         elements.append(Spacer(1, 20))
 
     # Testemunhas (se houver)
     if ocorrencia.testemunhas:
-        elements.append(Paragraph("<b>TESTEMUNHAS:</b>", styles['Subtitulo']))
+        elements.append(_paragrafo_fixo("<b>TESTEMUNHAS:</b>", 'Subtitulo'))
         elements.append(Spacer(1, 8))
         elements.append(Paragraph(ocorrencia.testemunhas, styles['Corpo']))
         elements.append(Spacer(1, 20))
 
     # Medida preventiva (se houver)
     if ocorrencia.medida_preventiva:
-        elements.append(Paragraph("<b>MEDIDA PREVENTIVA ADOTADA:</b>", styles['Subtitulo']))
+        elements.append(_paragrafo_fixo("<b>MEDIDA PREVENTIVA ADOTADA:</b>", 'Subtitulo'))
         elements.append(Spacer(1, 8))
         elements.append(Paragraph(ocorrencia.medida_preventiva, styles['Corpo']))
         elements.append(Spacer(1, 20))
 
     return elements
 
-def _gerar_conteudo_advertencia(ocorrencia, styles, width):
+def _gerar_conteudo_advertencia(ocorrencia, styles, width, emitido_em):
     """Gera conteúdo para ata de advertência"""
     elements = []
 
-    elements.append(Paragraph("ATA DE ADVERTÊNCIA VERBAL", styles['TituloSecundario']))
+    elements.append(_paragrafo_fixo("ATA DE ADVERTÊNCIA VERBAL", 'TituloSecundario'))
     elements.append(Spacer(1, 20))
 
     # Informações do processo
     info_data = [
-        [Paragraph("<b>Processo Nº:</b>", styles['Corpo']), Paragraph(f"#{ocorrencia.id}", styles['Corpo'])],
-        [Paragraph("<b>Data:</b>", styles['Corpo']), Paragraph(datetime.now().strftime('%d/%m/%Y'), styles['Corpo'])],
-        [Paragraph("<b>Local:</b>", styles['Corpo']), Paragraph("Instituto Federal de Brasília", styles['Corpo'])],
+        [_paragrafo_fixo("<b>Processo Nº:</b>", 'Corpo'), Paragraph(f"#{ocorrencia.id}", styles['Corpo'])],
+        [_paragrafo_fixo("<b>Data:</b>", 'Corpo'), Paragraph(emitido_em.strftime('%d/%m/%Y'), styles['Corpo'])],
+        [_paragrafo_fixo("<b>Local:</b>", 'Corpo'), _paragrafo_fixo("Instituto Federal de Brasília", 'Corpo')],
     ]
 
     info_table = Table(info_data, colWidths=[width*0.3, width*0.7])
-    info_table.setStyle(TableStyle([
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-    ]))
+    info_table.setStyle(ESTILO_TABELA_INFO_ATA)
 
     elements.append(info_table)
     elements.append(Spacer(1, 20))
@@ -309,7 +441,7 @@ def _gerar_conteudo_advertencia(ocorrencia, styles, width):
     elements.append(Spacer(1, 30))
 
     # Assinaturas
-    elements.append(Paragraph("<b>ASSINATURAS:</b>", styles['Subtitulo']))
+    elements.append(_paragrafo_fixo("<b>ASSINATURAS:</b>", 'Subtitulo'))
     elements.append(Spacer(1, 40))
 
     assinaturas_data = [
@@ -320,10 +452,7 @@ def _gerar_conteudo_advertencia(ocorrencia, styles, width):
     ]
 
     assinaturas_table = Table(assinaturas_data, colWidths=[width*0.5, width*0.5])
-    assinaturas_table.setStyle(TableStyle([
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-    ]))
+    assinaturas_table.setStyle(ESTILO_TABELA_ASSINATURAS)
 
     elements.append(assinaturas_table)
 
@@ -333,7 +462,7 @@ def _gerar_conteudo_notificacao(ocorrencia, styles, width):
     """Gera conteúdo para notificação oficial"""
     elements = []
 
-    elements.append(Paragraph("NOTIFICAÇÃO OFICIAL", styles['TituloSecundario']))
+    elements.append(_paragrafo_fixo("NOTIFICAÇÃO OFICIAL", 'TituloSecundario'))
     elements.append(Spacer(1, 20))
 
     # Conteúdo básico para notificação
@@ -358,17 +487,17 @@ def _gerar_conteudo_notificacao(ocorrencia, styles, width):
 
     return elements
 
-def _gerar_conteudo_relatorio_final(ocorrencia, styles, width):
+def _gerar_conteudo_relatorio_final(ocorrencia, styles, width, emitido_em):
     """Gera conteúdo para relatório final"""
     elements = []
 
-    elements.append(Paragraph("RELATÓRIO FINAL DO PROCESSO DISCIPLINAR", styles['TituloSecundario']))
+    elements.append(_paragrafo_fixo("RELATÓRIO FINAL DO PROCESSO DISCIPLINAR", 'TituloSecundario'))
     elements.append(Spacer(1, 20))
 
     # Conteúdo básico para relatório final
     texto_relatorio = f"""
     <b>Processo Nº:</b> #{ocorrencia.id}
-    <br/><b>Data de Conclusão:</b> {datetime.now().strftime('%d/%m/%Y')}
+    <br/><b>Data de Conclusão:</b> {emitido_em.strftime('%d/%m/%Y')}
     <br/><b>Status Final:</b> {ocorrencia.get_status_display()}
     <br/><br/>
     Este relatório apresenta a conclusão do processo disciplinar instaurado para apuração dos fatos.
@@ -400,7 +529,7 @@ def _gerar_conteudo_generico(ocorrencia, tipo_documento, styles, width):
 
     return elements
 
-def _gerar_rodape(ocorrencia, tipo_documento, styles, width):
+def _gerar_rodape(ocorrencia, tipo_documento, styles, width, emitido_em):
     """Gera rodapé com informações de autenticação"""
     elements = []
 
@@ -410,7 +539,7 @@ def _gerar_rodape(ocorrencia, tipo_documento, styles, width):
 
     # Informações do rodapé
     rodape_texto = f"""
-    Documento gerado automaticamente pelo Sistema de Ocorrências IFB em {datetime.now().strftime('%d/%m/%Y às %H:%M')} |
+    Documento gerado automaticamente pelo Sistema de Ocorrências IFB em {emitido_em.strftime('%d/%m/%Y às %H:%M')} |
     Processo #{ocorrencia.id} | Tipo: {tipo_documento} |
     Comissão Disciplinar Estudantil - Instituto Federal de Brasília
     """
@@ -441,181 +570,234 @@ def enviar_notificacao_email(notificacao_id):
         return f"Erro ao enviar e-mail: {str(e)}"
 
 
-def gerar_recibo_termico_ocorrencia_rapida(ocorrencia):
-    """
-    Gera um recibo térmico (58mm de largura) para ocorrência rápida
-    Similar a cupom fiscal de mercado
+# ====================
+# RECIBO TÉRMICO (58mm)
+# ====================
+
+RECIBO_LARGURA = 58 * mm
+RECIBO_MARGEM = 3 * mm
+RECIBO_LINHA = 12
+RECIBO_TRACEJADO = 8
+RECIBO_MAX_CARACTERES = 35
+RECIBO_ENTRE_RECIBOS = 10 * mm  # espaço para o corte entre recibos do mesmo rolo
+# Viewers/drivers costumam recusar páginas acima de 200 polegadas
+RECIBO_ALTURA_MAXIMA_PAGINA = 14400
+
+
+def _quebrar_linhas(texto, max_chars=RECIBO_MAX_CARACTERES):
+    """Quebra o texto em linhas de até max_chars caracteres (por palavra)"""
+    linhas = []
+    linha_atual = ""
+    for palavra in texto.split():
+        if len(linha_atual + " " + palavra) <= max_chars:
+            linha_atual += (" " if linha_atual else "") + palavra
+        else:
+            if linha_atual:
+                linhas.append(linha_atual)
+            linha_atual = palavra
+    if linha_atual:
+        linhas.append(linha_atual)
+    return linhas
+
+
+def _operacoes_recibo(ocorrencia, emitido_em):
     """
-    # Configurações para impressora térmica 58mm
-    LARGURA_MM = 58
-    MARGEM_MM = 3
+    Conteúdo do recibo como lista de operações de desenho
 
-    # Converter mm para pontos (1mm = 2.83465 pontos)
-    largura = LARGURA_MM * mm
-    margem = MARGEM_MM * mm
+    A altura do recibo é a soma exata dos avanços, sem estimativa à parte.
+    Usa os relacionamentos já carregados (estudantes, tipos_rapidos, turma).
 
-    # PASSO 1: Calcular altura necessária
-    linha_altura = 12
-    linhas_necessarias = 0
-
-    # Cabeçalho: 5 linhas
-    linhas_necessarias += 5
-
-    # Dados da ocorrência: 4 linhas
-    linhas_necessarias += 4
+    Returns:
+        [(operacao, avanco, argumentos)]
+    """
+    ops = []
 
-    # Tipo: 3 linhas
-    linhas_necessarias += 3
+    def centro(texto, tamanho=8, negrito=False):
+        ops.append(('centro', RECIBO_LINHA, (texto, tamanho, negrito)))
 
-    # Turma: 4 linhas
-    linhas_necessarias += 4
+    def esquerda(texto, tamanho=7):
+        ops.append(('esquerda', RECIBO_LINHA, (texto, tamanho)))
 
-    # Estudantes
-    linhas_necessarias += 2  # Título
-    estudantes = ocorrencia.estudantes.all()
-    linhas_necessarias += len(estudantes) * 3  # 3 linhas por estudante
+    def espaco(pontos):
+        ops.append(('espaco', pontos, ()))
 
-    # Descrição (se houver)
-    if ocorrencia.descricao:
-        linhas_necessarias += 2  # Título
-        # Estimar linhas da descrição
-        palavras = ocorrencia.descricao[:150].split()
-        linha_atual = ""
-        max_chars = 35
-        for palavra in palavras:
-            if len(linha_atual + " " + palavra) <= max_chars:
-                linha_atual += (" " if linha_atual else "") + palavra
-            else:
-                linhas_necessarias += 1
-                linha_atual = palavra
-        if linha_atual:
-            linhas_necessarias += 1
-
-    # Responsável: 4 linhas
-    linhas_necessarias += 4
-
-    # Rodapé: 5 linhas
-    linhas_necessarias += 5
-
-    # Calcular altura total
-    altura_conteudo = linhas_necessarias * linha_altura
-    altura_total = altura_conteudo + (margem * 4)  # Margem extra
-
-    # PASSO 2: Criar canvas com altura correta
-    buffer = BytesIO()
-    c = canvas.Canvas(buffer, pagesize=(largura, altura_total))
-
-    # Posição Y inicial (de cima para baixo)
-    y = altura_total - (margem * 2)
-
-    def texto_centralizado(texto, y_pos, tamanho=8, negrito=False):
-        """Desenha texto centralizado"""
-        font = "Helvetica-Bold" if negrito else "Helvetica"
-        c.setFont(font, tamanho)
-        texto_largura = c.stringWidth(texto, font, tamanho)
-        x = (largura - texto_largura) / 2
-        c.drawString(x, y_pos, texto)
-        return y_pos - linha_altura
-
-    def texto_esquerda(texto, y_pos, tamanho=7):
-        """Desenha texto alinhado à esquerda"""
-        c.setFont("Helvetica", tamanho)
-        c.drawString(margem, y_pos, texto)
-        return y_pos - linha_altura
-
-    def linha_tracejada(y_pos):
-        """Desenha linha tracejada"""
-        c.setDash(1, 2)
-        c.line(margem, y_pos, largura - margem, y_pos)
-        c.setDash()
-        return y_pos - 8
+    def tracejado():
+        ops.append(('tracejado', RECIBO_TRACEJADO, ()))
 
     # === CABEÇALHO ===
-    y = texto_centralizado("INSTITUTO FEDERAL", y, 9, True)
-    y = texto_centralizado("DE BRASILIA", y, 9, True)
-    y = texto_centralizado("Campus Recanto das Emas", y, 7)
-    y -= 4
-    y = linha_tracejada(y)
+    centro("INSTITUTO FEDERAL", 9, True)
+    centro("DE BRASILIA", 9, True)
+    centro("Campus Recanto das Emas", 7)
+    espaco(4)
+    tracejado()
 
     # === TÍTULO ===
-    y = texto_centralizado("REGISTRO DE OCORRENCIA", y, 8, True)
-    y = texto_centralizado("(Ocorrencia Rapida)", y, 7)
-    y -= 4
-    y = linha_tracejada(y)
+    centro("REGISTRO DE OCORRENCIA", 8, True)
+    centro("(Ocorrencia Rapida)", 7)
+    espaco(4)
+    tracejado()
 
     # === DADOS DA OCORRÊNCIA ===
-    y = texto_esquerda(f"No: {ocorrencia.id:06d}", y, 8)
-    y = texto_esquerda(f"Data: {ocorrencia.data.strftime('%d/%m/%Y')}", y)
-    y = texto_esquerda(f"Hora: {ocorrencia.horario.strftime('%H:%M')}", y)
-    y -= 4
-    y = linha_tracejada(y)
+    esquerda(f"No: {ocorrencia.id:06d}", 8)
+    esquerda(f"Data: {ocorrencia.data.strftime('%d/%m/%Y')}")
+    esquerda(f"Hora: {ocorrencia.horario.strftime('%H:%M')}")
+    espaco(4)
+    tracejado()
 
     # === TIPO ===
-    y = texto_esquerda("TIPO DE OCORRENCIA:", y, 7)
-    tipo_display = ocorrencia.get_tipo_rapido_display()
-    y = texto_centralizado(tipo_display, y, 8, True)
-    y -= 4
-    y = linha_tracejada(y)
+    esquerda("TIPO DE OCORRENCIA:", 7)
+    centro(", ".join(tipo.codigo for tipo in ocorrencia.tipos_rapidos.all()), 8, True)
+    espaco(4)
+    tracejado()
 
     # === TURMA ===
-    y = texto_esquerda("TURMA:", y, 7)
-    y = texto_esquerda(f"{ocorrencia.turma.nome}", y, 8)
-    y = texto_esquerda(f"{ocorrencia.turma.curso.nome[:40]}", y, 6)
-    y -= 4
-    y = linha_tracejada(y)
+    esquerda("TURMA:", 7)
+    esquerda(f"{ocorrencia.turma.nome}", 8)
+    esquerda(f"{ocorrencia.turma.curso.nome[:40]}", 6)
+    espaco(4)
+    tracejado()
 
     # === ESTUDANTES ===
-    y = texto_esquerda("ESTUDANTE(S):", y, 7)
-    y -= 2
-
-    for estudante in estudantes:
-        nome = estudante.nome[:50]
-        y = texto_esquerda(f"* {nome}", y, 7)
-        y = texto_esquerda(f"  Mat: {estudante.matricula_sga}", y, 6)
-        y -= 2
-
-    y -= 2
-    y = linha_tracejada(y)
+    esquerda("ESTUDANTE(S):", 7)
+    espaco(2)
+    for estudante in ocorrencia.estudantes.all():
+        esquerda(f"* {estudante.nome[:50]}", 7)
+        esquerda(f"  Mat: {estudante.matricula_sga}", 6)
+        espaco(2)
+    espaco(2)
+    tracejado()
 
     # === DESCRIÇÃO ===
     if ocorrencia.descricao:
-        y = texto_esquerda("DESCRICAO:", y, 7)
-        descricao = ocorrencia.descricao[:150]
-        palavras = descricao.split()
-        linha_atual = ""
-        max_chars = 35
-
-        for palavra in palavras:
-            if len(linha_atual + " " + palavra) <= max_chars:
-                linha_atual += (" " if linha_atual else "") + palavra
-            else:
-                if linha_atual:
-                    y = texto_esquerda(linha_atual, y, 6)
-                linha_atual = palavra
-
-        if linha_atual:
-            y = texto_esquerda(linha_atual, y, 6)
-
-        y -= 4
-        y = linha_tracejada(y)
+        esquerda("DESCRICAO:", 7)
+        for linha in _quebrar_linhas(ocorrencia.descricao[:150]):
+            esquerda(linha, 6)
+        espaco(4)
+        tracejado()
 
     # === RESPONSÁVEL ===
-    y = texto_esquerda("REGISTRADO POR:", y, 7)
-    nome_servidor = ocorrencia.responsavel_registro.nome[:30]
-    y = texto_esquerda(nome_servidor, y, 7)
-    y = texto_esquerda(f"SIAPE/CPF: {ocorrencia.responsavel_registro.siape}", y, 6)
-    y -= 4
-    y = linha_tracejada(y)
+    esquerda("REGISTRADO POR:", 7)
+    esquerda(ocorrencia.responsavel_registro.nome[:30], 7)
+    esquerda(f"SIAPE/CPF: {ocorrencia.responsavel_registro.siape}", 6)
+    espaco(4)
+    tracejado()
 
     # === RODAPÉ ===
-    y -= 4
-    y = texto_centralizado("Sistema de Ocorrencias IFB", y, 6)
-    data_hora = datetime.now().strftime("%d/%m/%Y %H:%M")
-    y = texto_centralizado(data_hora, y, 6)
-    y -= 4
-    y = linha_tracejada(y)
-    y = texto_centralizado("*** FIM DO DOCUMENTO ***", y, 6)
+    espaco(4)
+    centro("Sistema de Ocorrencias IFB", 6)
+    centro(emitido_em.strftime("%d/%m/%Y %H:%M"), 6)
+    espaco(4)
+    tracejado()
+    centro("*** FIM DO DOCUMENTO ***", 6)
+    return ops
+
+
+def _altura_recibo(ops):
+    return sum(avanco for _, avanco, _ in ops)
+
+
+def _desenhar_recibo(c, ops, y):
+    """Desenha as operações a partir de y (de cima para baixo) e devolve o novo y"""
+    for operacao, avanco, argumentos in ops:
+        if operacao == 'centro':
+            texto, tamanho, negrito = argumentos
+            fonte = "Helvetica-Bold" if negrito else "Helvetica"
+            c.setFont(fonte, tamanho)
+            c.drawString((RECIBO_LARGURA - c.stringWidth(texto, fonte, tamanho)) / 2, y, texto)
+        elif operacao == 'esquerda':
+            texto, tamanho = argumentos
+            c.setFont("Helvetica", tamanho)
+            c.drawString(RECIBO_MARGEM, y, texto)
+        elif operacao == 'tracejado':
+            c.setDash(1, 2)
+            c.line(RECIBO_MARGEM, y, RECIBO_LARGURA - RECIBO_MARGEM, y)
+            c.setDash()
+        y -= avanco
+    return y
+
+
+def _paginar_recibos(recibos):
+    """Agrupa recibos consecutivos em páginas de até RECIBO_ALTURA_MAXIMA_PAGINA"""
+    pagina, altura_pagina = [], 0
+    for ops in recibos:
+        altura = _altura_recibo(ops) + (RECIBO_ENTRE_RECIBOS if pagina else 0)
+        if pagina and altura_pagina + altura + RECIBO_MARGEM * 4 > RECIBO_ALTURA_MAXIMA_PAGINA:
+            yield pagina, altura_pagina
+            pagina, altura_pagina = [], 0
+            altura = _altura_recibo(ops)
+        pagina.append(ops)
+        altura_pagina += altura
+    if pagina:
+        yield pagina, altura_pagina
+
+
+def _preparar_ocorrencias_rapidas(ocorrencias):
+    """Carrega turma/curso/responsável e estudantes/tipos em queries constantes"""
+    from django.db.models import QuerySet, prefetch_related_objects
+
+    if isinstance(ocorrencias, QuerySet):
+        return list(ocorrencias.select_related(
+            'turma__curso', 'responsavel_registro'
+        ).prefetch_related('estudantes', 'tipos_rapidos'))
+    ocorrencias = list(ocorrencias)
+    prefetch_related_objects(ocorrencias, 'turma__curso', 'responsavel_registro', 'estudantes', 'tipos_rapidos')
+    return ocorrencias
+
+
+def gerar_recibos_termicos(ocorrencias, destino=None, emitido_em=None):
+    """
+    Gera os recibos térmicos (58mm) de várias ocorrências rápidas num só PDF
+
+    Os recibos seguem em sequência no mesmo rolo contínuo, separados por
+    espaço de corte; a página só é quebrada ao atingir
+    RECIBO_ALTURA_MAXIMA_PAGINA.
+
+    Args:
+        ocorrencias: queryset ou lista de OcorrenciaRapida
+        destino: arquivo (binário) onde gravar; padrão BytesIO
+        emitido_em: data de emissão impressa nos recibos; padrão agora
 
+    Returns:
+        destino posicionado no início
+    """
+    destino = BytesIO() if destino is None else destino
+    emitido_em = emitido_em or datetime.now()
+    recibos = [_operacoes_recibo(ocorrencia, emitido_em) for ocorrencia in _preparar_ocorrencias_rapidas(ocorrencias)]
+
+    c = canvas.Canvas(destino, pagesize=(RECIBO_LARGURA, RECIBO_MARGEM * 4))
+    for pagina, altura_conteudo in _paginar_recibos(recibos):
+        altura_total = altura_conteudo + RECIBO_MARGEM * 4
+        c.setPageSize((RECIBO_LARGURA, altura_total))
+        y = altura_total - RECIBO_MARGEM * 2
+        for indice, ops in enumerate(pagina):
+            if indice:
+                y -= RECIBO_ENTRE_RECIBOS
+            y = _desenhar_recibo(c, ops, y)
+        c.showPage()
     c.save()
-    buffer.seek(0)
-    return buffer
\ No newline at end of file
+    destino.seek(0)
+    return destino
+
+
+def gerar_recibo_termico_ocorrencia_rapida(ocorrencia, emitido_em=None):
+    """
+    Gera um recibo térmico (58mm de largura) para ocorrência rápida
+    Similar a cupom fiscal de mercado
+    """
+    return gerar_recibos_termicos([ocorrencia], emitido_em=emitido_em)
+
+
+def resposta_recibos_termicos(ocorrencias, nome_arquivo):
+    """
+    FileResponse com os recibos de várias ocorrências rápidas num só PDF
+
+    O PDF é gravado num arquivo temporário (em memória até 4MB) e enviado em
+    blocos, sem montar a resposta inteira em memória.
+    """
+    from django.http import FileResponse
+
+    arquivo = tempfile.SpooledTemporaryFile(max_size=4 * 1024 * 1024)
+    gerar_recibos_termicos(ocorrencias, destino=arquivo)
+    return FileResponse(
+        arquivo, as_attachment=True, filename=f'{nome_arquivo}.pdf', content_type='application/pdf'
+    )
@@ -1,11 +1,16 @@
 # core/utils_alertas.py - ATUALIZE ESTA FUNÇÃO COMPLETAMENTE
 from django.utils import timezone
-from django.db.models import Count, Q
+from django.core.cache import cache
+from django.db import transaction, IntegrityError
+from django.db.models import Count, Q, F
+from collections import defaultdict
 from datetime import date, timedelta
+import time
 from .models import (
     OcorrenciaRapida,
     ConfiguracaoLimiteOcorrenciaRapida,
     AlertaLimiteOcorrenciaRapida,
+    ContadorOcorrenciaRapida,
     Estudante,
     TipoOcorrenciaRapida
 )
@@ -13,101 +18,308 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+CHAVE_CONTADOR_ALERTAS = 'core:alertas:contador:{mes}'
+TEMPO_CONTADOR_ALERTAS = 60 * 60  # recontagem periódica corrige eventuais corridas
 
-def verificar_limites_ocorrencia(ocorrencia):
+
+# ====================
+# CONTADOR DE ALERTAS DO MÊS (menu lateral)
+# ====================
+
+def _chave_contador_alertas(mes_referencia):
+    return CHAVE_CONTADOR_ALERTAS.format(mes=mes_referencia.strftime('%Y-%m'))
+
+
+def contar_alertas_mes(mes_referencia=None):
+    """Quantidade de alertas do mês, lida do cache (conta no banco só na falta ou vencido o prazo)"""
+    mes_referencia = (mes_referencia or timezone.localdate()).replace(day=1)
+    chave = _chave_contador_alertas(mes_referencia)
+    valor = cache.get(chave)
+    if valor is not None and valor[1] > time.time():
+        return valor[0]
+    total = AlertaLimiteOcorrenciaRapida.objects.filter(mes_referencia=mes_referencia).count()
+    cache.set(chave, (total, time.time() + TEMPO_CONTADOR_ALERTAS), TEMPO_CONTADOR_ALERTAS)
+    return total
+
+
+def ajustar_contador_alertas(mes_referencia, delta):
     """
-    Verifica se uma ocorrência específica dispara algum alerta.
-    Usado em signals ou no save_model.
+    Soma delta ao contador em cache; se não houver contador, a próxima leitura reconta
+
+    O prazo da recontagem fica guardado junto do valor e não é renovado aqui
+    (cache.incr regrava com o TIMEOUT padrão e adiaria a recontagem).
     """
-    try:
-        estudantes = ocorrencia.estudantes.all()
-        tipos = ocorrencia.tipos_rapidos.all()
+    chave = _chave_contador_alertas(mes_referencia)
+    valor = cache.get(chave)
+    if valor is None:
+        return
+    total, expira_em = valor
+    restante = expira_em - time.time()
+    if restante > 0:
+        cache.set(chave, (max(total + delta, 0), expira_em), restante)
+    else:
+        cache.delete(chave)
 
-        if not estudantes or not tipos:
-            return
 
-        # Data da ocorrência define o mês de referência
-        mes_referencia = ocorrencia.data.replace(day=1)
+def invalidar_contador_alertas(mes_referencia):
+    cache.delete(_chave_contador_alertas(mes_referencia))
 
-        logger.info(f"Verificando limites para {estudantes.count()} estudantes e {tipos.count()} tipos")
 
-        # Filtra configurações ativas para os tipos desta ocorrência
-        configs = ConfiguracaoLimiteOcorrenciaRapida.objects.filter(
-            tipo_ocorrencia__in=tipos,
-            ativo=True
-        ).select_related('tipo_ocorrencia')
+def pares_por_mes(ocorrencia_ids, estudante_ids=None, tipo_ids=None):
+    """
+    Pares (estudante, tipo) das ocorrências informadas, agrupados por mês
 
-        logger.info(f"Encontradas {configs.count()} configurações ativas")
+    Uma única consulta sobre as tabelas intermediárias do M2M; estudante_ids
+    e tipo_ids restringem o resultado (ex.: apenas os vínculos alterados).
 
-        for config in configs:
-            for estudante in estudantes:
-                processar_alerta_individual(estudante, config, mes_referencia)
+    Returns:
+        dict {mes_referencia: [(estudante_id, tipo_id), ...]}
+    """
+    EstudantesOcorrencia = OcorrenciaRapida.estudantes.through
+    vinculos = EstudantesOcorrencia.objects.filter(
+        ocorrenciarapida_id__in=ocorrencia_ids,
+        ocorrenciarapida__tipos_rapidos__isnull=False,
+    )
+    if estudante_ids is not None:
+        vinculos = vinculos.filter(estudante_id__in=estudante_ids)
+    if tipo_ids is not None:
+        vinculos = vinculos.filter(ocorrenciarapida__tipos_rapidos__in=tipo_ids)
+
+    resultado = defaultdict(list)
+    for estudante_id, tipo_id, data in vinculos.values_list(
+        'estudante_id', 'ocorrenciarapida__tipos_rapidos', 'ocorrenciarapida__data'
+    ):
+        resultado[data.replace(day=1)].append((estudante_id, tipo_id))
+    return resultado
+
+
+def ajustar_contadores(mes_referencia, pares, delta):
+    """
+    Soma delta aos contadores (estudante, tipo, mês) e reavalia os limites
 
-    except Exception as e:
-        logger.error(f"Erro ao verificar limites: {str(e)}")
+    Custo constante por tipo (um UPDATE, uma leitura e um INSERT em lote),
+    independente de quantos estudantes a ocorrência envolve.
+    """
+    por_tipo = defaultdict(set)
+    for estudante_id, tipo_id in pares:
+        por_tipo[tipo_id].add(estudante_id)
+
+    for tipo_id, estudante_ids in por_tipo.items():
+        contadores = ContadorOcorrenciaRapida.objects.filter(
+            mes_referencia=mes_referencia,
+            tipo_ocorrencia_id=tipo_id,
+            estudante_id__in=estudante_ids,
+        )
+        if delta < 0:
+            contadores.filter(quantidade__gte=-delta).update(quantidade=F('quantidade') + delta)
+            continue
+
+        existentes = set(contadores.values_list('estudante_id', flat=True))
+        if existentes:
+            contadores.filter(estudante_id__in=existentes).update(quantidade=F('quantidade') + delta)
+        faltantes = estudante_ids - existentes
+        if not faltantes:
+            continue
+        try:
+            with transaction.atomic():
+                ContadorOcorrenciaRapida.objects.bulk_create([
+                    ContadorOcorrenciaRapida(
+                        estudante_id=estudante_id,
+                        tipo_ocorrencia_id=tipo_id,
+                        mes_referencia=mes_referencia,
+                        quantidade=delta,
+                    )
+                    for estudante_id in faltantes
+                ])
+        except IntegrityError:
+            # Outro worker criou algum desses contadores no meio tempo: soma um a um
+            for estudante_id in faltantes:
+                _somar_contador(estudante_id, tipo_id, mes_referencia, delta)
+
+    verificar_limites_contadores(mes_referencia, por_tipo)
+
+
+def _somar_contador(estudante_id, tipo_id, mes_referencia, delta):
+    """UPDATE com F(); cria o contador se não existir e, se perder a corrida, repete o UPDATE"""
+    contador = ContadorOcorrenciaRapida.objects.filter(
+        estudante_id=estudante_id, tipo_ocorrencia_id=tipo_id, mes_referencia=mes_referencia,
+    )
+    if contador.update(quantidade=F('quantidade') + delta):
+        return
+    try:
+        with transaction.atomic():
+            ContadorOcorrenciaRapida.objects.create(
+                estudante_id=estudante_id, tipo_ocorrencia_id=tipo_id,
+                mes_referencia=mes_referencia, quantidade=delta,
+            )
+    except IntegrityError:
+        contador.update(quantidade=F('quantidade') + delta)
 
 
-def processar_alerta_individual(estudante, config, mes_referencia):
+def _inserir_alertas(alertas):
     """
-    Lógica isolada para verificar e criar/atualizar alerta para um estudante/config específico.
+    Insere os alertas e devolve só os que foram de fato gravados
+
+    Tenta um INSERT em lote; se outro worker criou algum deles no meio tempo,
+    grava um a um e descarta os que já existiam.
     """
     try:
-        ano = mes_referencia.year
-        mes = mes_referencia.month
-
-        # Contar ocorrências do tipo específico para este estudante no mês
-        total_ocorrencias = OcorrenciaRapida.objects.filter(
-            estudantes=estudante,
-            tipos_rapidos=config.tipo_ocorrencia,
-            data__year=ano,
-            data__month=mes
-        ).count()
-
-        logger.info(
-            f"Estudante {estudante.nome} - Tipo {config.tipo_ocorrencia.codigo}: {total_ocorrencias}/{config.limite_mensal}")
-
-        if total_ocorrencias >= config.limite_mensal:  # Alterado para >= para incluir quando igual ao limite
-            alerta, created = AlertaLimiteOcorrenciaRapida.objects.update_or_create(
-                estudante=estudante,
-                tipo_ocorrencia=config.tipo_ocorrencia,
+        with transaction.atomic():
+            return AlertaLimiteOcorrenciaRapida.objects.bulk_create(alertas)
+    except IntegrityError:
+        pass
+    criados = []
+    for alerta in alertas:
+        try:
+            with transaction.atomic():
+                criados.extend(AlertaLimiteOcorrenciaRapida.objects.bulk_create([alerta]))
+        except IntegrityError:
+            continue
+    return criados
+
+
+def verificar_limites_contadores(mes_referencia, por_tipo):
+    """
+    Cria, atualiza ou remove alertas a partir dos contadores
+
+    Args:
+        mes_referencia: primeiro dia do mês
+        por_tipo: dict {tipo_id: {estudante_id, ...}}
+    """
+    configs = ConfiguracaoLimiteOcorrenciaRapida.objects.filter(
+        tipo_ocorrencia_id__in=list(por_tipo),
+        ativo=True
+    ).select_related('tipo_ocorrencia')
+
+    for config in configs:
+        estudante_ids = por_tipo[config.tipo_ocorrencia_id]
+        quantidades = dict(ContadorOcorrenciaRapida.objects.filter(
+            mes_referencia=mes_referencia,
+            tipo_ocorrencia_id=config.tipo_ocorrencia_id,
+            estudante_id__in=estudante_ids,
+        ).values_list('estudante_id', 'quantidade'))
+        alertas = {
+            alerta.estudante_id: alerta
+            for alerta in AlertaLimiteOcorrenciaRapida.objects.filter(
                 mes_referencia=mes_referencia,
-                defaults={
-                    'configuracao': config,
-                    'quantidade_ocorrencias': total_ocorrencias,
-                }
+                tipo_ocorrencia_id=config.tipo_ocorrencia_id,
+                estudante_id__in=estudante_ids,
             )
+        }
+
+        criar, atualizar, remover = [], [], []
+        for estudante_id in estudante_ids:
+            quantidade = quantidades.get(estudante_id, 0)
+            alerta = alertas.get(estudante_id)
+            if quantidade >= config.limite_mensal:
+                if alerta is None:
+                    criar.append(AlertaLimiteOcorrenciaRapida(
+                        estudante_id=estudante_id,
+                        tipo_ocorrencia_id=config.tipo_ocorrencia_id,
+                        configuracao=config,
+                        mes_referencia=mes_referencia,
+                        quantidade_ocorrencias=quantidade,
+                    ))
+                elif alerta.quantidade_ocorrencias != quantidade:
+                    alerta.quantidade_ocorrencias = quantidade
+                    atualizar.append(alerta)
+            elif alerta is not None:
+                remover.append(alerta.pk)
+
+        if remover:
+            AlertaLimiteOcorrenciaRapida.objects.filter(pk__in=remover).delete()
+        if atualizar:
+            AlertaLimiteOcorrenciaRapida.objects.bulk_update(atualizar, ['quantidade_ocorrencias'])
+        criados = _inserir_alertas(criar) if criar else []
+        if criados:
+            # bulk_create não dispara post_save; remoções já passam pelo post_delete
+            ajustar_contador_alertas(mes_referencia, len(criados))
+            logger.info(f"✅ {len(criados)} alertas criados - {config.tipo_ocorrencia.codigo}")
 
             # Enviar notificações se configurado
-            if created and config.gerar_notificacao_sistema:
+            if config.gerar_notificacao_sistema:
                 from .services import ServicoNotificacao
-                try:
-                    ServicoNotificacao.notificar_alerta_limite_atingido(alerta)
-                except Exception as e:
-                    logger.error(f"Erro ao enviar notificação: {str(e)}")
-
-            if created:
-                logger.info(
-                    f"✅ Alerta criado: {estudante.nome} - {config.tipo_ocorrencia.codigo} ({total_ocorrencias}x)")
-
-        else:
-            # Remover alerta se o estudante não excede mais o limite
-            deleted, _ = AlertaLimiteOcorrenciaRapida.objects.filter(
-                estudante=estudante,
-                tipo_ocorrencia=config.tipo_ocorrencia,
-                mes_referencia=mes_referencia
-            ).delete()
-
-            if deleted:
-                logger.info(f"❌ Alerta removido: {estudante.nome} - {config.tipo_ocorrencia.codigo}")
+                for alerta in criados:
+                    try:
+                        ServicoNotificacao.notificar_alerta_limite_atingido(alerta)
+                    except Exception as e:
+                        logger.error(f"Erro ao enviar notificação: {str(e)}")
 
+
+def verificar_limites_ocorrencia(ocorrencia):
+    """
+    Verifica se uma ocorrência específica dispara algum alerta.
+    Os contadores já são mantidos pelos signals; aqui só relê os limites.
+    """
+    try:
+        for mes_referencia, pares in pares_por_mes([ocorrencia.pk]).items():
+            por_tipo = defaultdict(set)
+            for estudante_id, tipo_id in pares:
+                por_tipo[tipo_id].add(estudante_id)
+            verificar_limites_contadores(mes_referencia, por_tipo)
+    except Exception as e:
+        logger.error(f"Erro ao verificar limites: {str(e)}")
+
+
+def processar_alerta_individual(estudante, config, mes_referencia):
+    """
+    Verifica e cria/atualiza/remove o alerta de um estudante/config específico.
+    """
+    try:
+        verificar_limites_contadores(
+            mes_referencia.replace(day=1),
+            {config.tipo_ocorrencia_id: {estudante.pk}}
+        )
     except Exception as e:
         logger.error(f"Erro ao processar alerta para {estudante.nome}: {str(e)}")
 
 
+def _intervalo_mes(mes_referencia):
+    """Retorna (primeiro dia do mês, primeiro dia do mês seguinte)"""
+    inicio = mes_referencia.replace(day=1)
+    if inicio.month == 12:
+        return inicio, inicio.replace(year=inicio.year + 1, month=1)
+    return inicio, inicio.replace(month=inicio.month + 1)
+
+
+def contar_ocorrencias_por_estudante_tipo(mes_referencia, tipos=None):
+    """
+    Conta ocorrências rápidas por (estudante, tipo) no mês com uma única
+    consulta agrupada sobre as tabelas intermediárias do M2M.
+
+    Returns:
+        dict {(estudante_id, tipo_id): quantidade}
+    """
+    inicio, fim = _intervalo_mes(mes_referencia)
+    EstudantesOcorrencia = OcorrenciaRapida.estudantes.through
+
+    vinculos = EstudantesOcorrencia.objects.filter(
+        ocorrenciarapida__data__gte=inicio,
+        ocorrenciarapida__data__lt=fim,
+    )
+    if tipos is not None:
+        vinculos = vinculos.filter(ocorrenciarapida__tipos_rapidos__in=tipos)
+
+    contagem = vinculos.values(
+        'estudante_id', 'ocorrenciarapida__tipos_rapidos'
+    ).annotate(
+        quantidade=Count('ocorrenciarapida_id', distinct=True)
+    ).order_by()
+
+    return {
+        (item['estudante_id'], item['ocorrenciarapida__tipos_rapidos']): item['quantidade']
+        for item in contagem
+        if item['ocorrenciarapida__tipos_rapidos'] is not None
+    }
+
+
 def recalcular_alertas_periodo(mes_referencia=None):
     """
-    Força a verificação de TODOS os estudantes e TODAS as configurações ativas.
-    Retorna estatísticas detalhadas.
+    Recalcula os alertas do mês para TODAS as configurações ativas.
+
+    Conta tudo em uma consulta agrupada, compara com os alertas existentes
+    e aplica criação/atualização/remoção em lote numa única transação
+    (alertas que continuam válidos mantêm data e flags de notificação).
 
     Args:
         mes_referencia: Data do primeiro dia do mês (datetime.date)
@@ -117,108 +329,69 @@ def recalcular_alertas_periodo(mes_referencia=None):
     """
     if not mes_referencia:
         mes_referencia = timezone.now().date().replace(day=1)
+    mes_referencia = mes_referencia.replace(day=1)
 
     logger.info(f"🔍 RECALCULANDO ALERTAS para {mes_referencia.strftime('%m/%Y')}")
-    print(f"\n{'=' * 60}")
-    print(f"🔍 RECALCULANDO ALERTAS para {mes_referencia.strftime('%m/%Y')}")
-    print(f"{'=' * 60}\n")
-
-    ano = mes_referencia.year
-    mes = mes_referencia.month
-
-    # Limpar alertas existentes para este mês
-    deleted_count = AlertaLimiteOcorrenciaRapida.objects.filter(
-        mes_referencia=mes_referencia
-    ).delete()[0]
-
-    logger.info(f"Limpos {deleted_count} alertas antigos")
-    print(f"🗑️  Limpos {deleted_count} alertas antigos")
-
-    # Obter TODAS as configurações ativas
-    configs_ativas = ConfiguracaoLimiteOcorrenciaRapida.objects.filter(
-        ativo=True
-    ).select_related('tipo_ocorrencia')
 
-    if not configs_ativas.exists():
+    configs = {
+        config.tipo_ocorrencia_id: config
+        for config in ConfiguracaoLimiteOcorrenciaRapida.objects.filter(ativo=True)
+    }
+
+    # Alertas que deveriam existir: {(estudante_id, tipo_id): (config, quantidade)}
+    esperados = {}
+    if configs:
+        contagem = contar_ocorrencias_por_estudante_tipo(mes_referencia, tipos=list(configs))
+        for (estudante_id, tipo_id), quantidade in contagem.items():
+            config = configs.get(tipo_id)
+            if config and quantidade >= config.limite_mensal:
+                esperados[(estudante_id, tipo_id)] = (config, quantidade)
+    else:
         logger.warning("⚠️ Nenhuma configuração ativa encontrada!")
-        print("⚠️ Nenhuma configuração ativa encontrada!")
-        return {
-            'configuracoes_processadas': 0,
-            'alertas_gerados': 0,
-            'estudantes_afetados': 0,
-            'mes_referencia': mes_referencia.strftime('%m/%Y')
-        }
-
-    logger.info(f"📊 Configurações ativas: {configs_ativas.count()}")
-    print(f"📊 Configurações ativas: {configs_ativas.count()}")
-
-    alertas_gerados = 0
-    estudantes_afetados = set()
-
-    for config in configs_ativas:
-        logger.info(f"\nProcessando {config.tipo_ocorrencia.codigo} (limite: {config.limite_mensal})")
-        print(f"\n📋 Processando {config.tipo_ocorrencia.codigo} (limite: {config.limite_mensal})")
-
-        # Buscar estudantes com ocorrências deste tipo no mês
-        estudantes_com_ocorrencias = Estudante.objects.filter(
-            ocorrencias_rapidas__tipos_rapidos=config.tipo_ocorrencia,
-            ocorrencias_rapidas__data__year=ano,
-            ocorrencias_rapidas__data__month=mes
-        ).annotate(
-            qtd=Count('ocorrencias_rapidas', distinct=True)
-        ).filter(
-            qtd__gte=config.limite_mensal
-        ).distinct()
-
-        logger.info(f"  → {estudantes_com_ocorrencias.count()} estudantes excedem o limite")
-        print(f"  → {estudantes_com_ocorrencias.count()} estudantes excedem o limite")
-
-        for estudante in estudantes_com_ocorrencias:
-            try:
-                # Contar novamente para garantir precisão
-                total_ocorrencias = OcorrenciaRapida.objects.filter(
-                    estudantes=estudante,
-                    tipos_rapidos=config.tipo_ocorrencia,
-                    data__year=ano,
-                    data__month=mes
-                ).count()
-
-                print(f"    📌 {estudante.nome}: {total_ocorrencias} ocorrências")
-
-                if total_ocorrencias >= config.limite_mensal:
-                    alerta, created = AlertaLimiteOcorrenciaRapida.objects.get_or_create(
-                        estudante=estudante,
-                        tipo_ocorrencia=config.tipo_ocorrencia,
-                        mes_referencia=mes_referencia,
-                        defaults={
-                            'configuracao': config,
-                            'quantidade_ocorrencias': total_ocorrencias
-                        }
-                    )
-
-                    if not created:
-                        # Atualizar quantidade se já existir
-                        alerta.quantidade_ocorrencias = total_ocorrencias
-                        alerta.save(update_fields=['quantidade_ocorrencias'])
 
-                    alertas_gerados += 1
-                    estudantes_afetados.add(estudante.id)
-
-                    logger.info(f"    ✅ {estudante.nome}: {total_ocorrencias} ocorrências")
-
-            except Exception as e:
-                logger.error(f"Erro ao criar alerta para {estudante.nome}: {str(e)}")
-                print(f"    ❌ Erro: {str(e)}")
+    existentes = {
+        (alerta.estudante_id, alerta.tipo_ocorrencia_id): alerta
+        for alerta in AlertaLimiteOcorrenciaRapida.objects.filter(mes_referencia=mes_referencia)
+    }
+
+    criar = []
+    atualizar = []
+    for chave, (config, quantidade) in esperados.items():
+        alerta = existentes.get(chave)
+        if alerta is None:
+            criar.append(AlertaLimiteOcorrenciaRapida(
+                estudante_id=chave[0],
+                tipo_ocorrencia_id=chave[1],
+                configuracao=config,
+                mes_referencia=mes_referencia,
+                quantidade_ocorrencias=quantidade,
+            ))
+        elif alerta.quantidade_ocorrencias != quantidade or alerta.configuracao_id != config.pk:
+            alerta.quantidade_ocorrencias = quantidade
+            alerta.configuracao = config
+            atualizar.append(alerta)
+    remover = [alerta.pk for chave, alerta in existentes.items() if chave not in esperados]
+
+    with transaction.atomic():
+        if remover:
+            AlertaLimiteOcorrenciaRapida.objects.filter(pk__in=remover).delete()
+        if atualizar:
+            AlertaLimiteOcorrenciaRapida.objects.bulk_update(
+                atualizar, ['quantidade_ocorrencias', 'configuracao']
+            )
+        if criar:
+            AlertaLimiteOcorrenciaRapida.objects.bulk_create(criar)
+    invalidar_contador_alertas(mes_referencia)
 
-    logger.info(f"\n🎯 CONCLUSÃO: {alertas_gerados} alertas gerados para {len(estudantes_afetados)} estudantes")
-    print(f"\n{'=' * 60}")
-    print(f"🎯 CONCLUSÃO: {alertas_gerados} alertas gerados")
-    print(f"👥 Estudantes afetados: {len(estudantes_afetados)}")
-    print(f"{'=' * 60}\n")
+    estudantes_afetados = {estudante_id for estudante_id, _ in esperados}
+    logger.info(
+        f"🎯 CONCLUSÃO: {len(esperados)} alertas ({len(criar)} novos, {len(atualizar)} atualizados, "
+        f"{len(remover)} removidos) para {len(estudantes_afetados)} estudantes"
+    )
 
     return {
-        'configuracoes_processadas': configs_ativas.count(),
-        'alertas_gerados': alertas_gerados,
+        'configuracoes_processadas': len(configs),
+        'alertas_gerados': len(esperados),
         'estudantes_afetados': len(estudantes_afetados),
         'mes_referencia': mes_referencia.strftime('%m/%Y')
-    }
\ No newline at end of file
+    }
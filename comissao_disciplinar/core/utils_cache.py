@@ -0,0 +1,19 @@
+# core/utils_cache.py - Chaves de cache versionadas (invalidação entre workers)
+from django.core.cache import cache
+
+
+def obter_versao(chave):
+    """Lê a versão compartilhada entre os workers (cria se não existir)"""
+    versao = cache.get(chave)
+    if versao is None:
+        versao = 1
+        cache.add(chave, versao, None)
+    return versao
+
+
+def incrementar_versao(chave):
+    """Invalida, em todos os processos, os valores guardados sob a versão atual"""
+    try:
+        cache.incr(chave)
+    except ValueError:
+        cache.set(chave, 1, None)
@@ -0,0 +1,126 @@
+# core/utils_exportacao.py - Exportação em streaming (CSV/XLSX)
+import csv
+import tempfile
+from datetime import date, datetime
+
+from django.http import StreamingHttpResponse, FileResponse, HttpResponse
+from django.utils import timezone
+import logging
+
+logger = logging.getLogger(__name__)
+
+FORMATOS_EXPORTACAO = ('csv', 'xlsx')
+TAMANHO_LOTE_EXPORTACAO = 2000
+INICIO_FORMULA = ('=', '+', '-', '@', '\t', '\r')  # o Excel interpreta como fórmula
+
+
+class _Eco:
+    """Pseudo-buffer: o csv.writer devolve a linha em vez de gravá-la"""
+
+    def write(self, valor):
+        return valor
+
+
+def _formatar_valor(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, datetime):
+        if timezone.is_aware(valor):
+            valor = timezone.localtime(valor)
+        return valor.strftime('%d/%m/%Y %H:%M')
+    if isinstance(valor, date):
+        return valor.strftime('%d/%m/%Y')
+    if isinstance(valor, bool):
+        return 'Sim' if valor else 'Não'
+    if isinstance(valor, str) and valor.startswith(INICIO_FORMULA):
+        # Texto digitado pelo usuário não vira fórmula na planilha (CSV injection)
+        return "'" + valor
+    return valor
+
+
+def _linhas(queryset, campos, transformacoes, chunk_size):
+    """Percorre o queryset em lotes, sem carregar tudo na memória"""
+    transformacoes = transformacoes or {}
+    funcoes = [transformacoes.get(campo) for campo in campos]
+    linhas = queryset.prefetch_related(None).values_list(*campos).iterator(chunk_size=chunk_size)
+    for linha in linhas:
+        yield [
+            _formatar_valor(funcao(valor) if funcao else valor)
+            for funcao, valor in zip(funcoes, linha)
+        ]
+
+
+def _stream_csv(cabecalho, linhas, chunk_size):
+    writer = csv.writer(_Eco())
+    yield '\ufeff'  # BOM para o Excel reconhecer UTF-8
+    yield writer.writerow(cabecalho)
+    bloco = []
+    for linha in linhas:
+        bloco.append(writer.writerow(linha))
+        if len(bloco) >= chunk_size:
+            yield ''.join(bloco)
+            bloco = []
+    if bloco:
+        yield ''.join(bloco)
+
+
+def exportar_queryset(queryset, colunas, nome_arquivo, formato='csv',
+                      transformacoes=None, chunk_size=TAMANHO_LOTE_EXPORTACAO):
+    """
+    Exporta um queryset em CSV ou XLSX com memória constante
+
+    Só o CSV é transmitido em streaming. O XLSX é gravado inteiro num arquivo
+    temporário (write_only, memória constante) e só então servido: a resposta
+    começa depois que a última linha foi lida do banco.
+
+    Textos que começam com =, +, -, @ são prefixados com ' para o Excel
+    não os executar como fórmula.
+
+    Args:
+        queryset: queryset já filtrado e ordenado
+        colunas: lista de (campo para values_list, título da coluna)
+        nome_arquivo: nome do arquivo sem extensão
+        formato: 'csv' ou 'xlsx'
+        transformacoes: dict campo → função aplicada ao valor (ex.: choices)
+        chunk_size: linhas buscadas por vez no banco
+
+    Returns:
+        StreamingHttpResponse (CSV) ou FileResponse (XLSX)
+    """
+    if formato not in FORMATOS_EXPORTACAO:
+        return HttpResponse('Formato inválido', status=400)
+
+    campos = [campo for campo, _ in colunas]
+    cabecalho = [titulo for _, titulo in colunas]
+    linhas = _linhas(queryset, campos, transformacoes, chunk_size)
+
+    if formato == 'csv':
+        response = StreamingHttpResponse(
+            _stream_csv(cabecalho, linhas, chunk_size),
+            content_type='text/csv; charset=utf-8'
+        )
+        response['Content-Disposition'] = f'attachment; filename="{nome_arquivo}.csv"'
+        return response
+
+    # XLSX: modo write_only grava as linhas em disco à medida que chegam
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    planilha = workbook.create_sheet(title=nome_arquivo[:31])
+    planilha.append(cabecalho)
+    total = 0
+    for linha in linhas:
+        planilha.append(linha)
+        total += 1
+
+    arquivo = tempfile.TemporaryFile()
+    workbook.save(arquivo)
+    arquivo.seek(0)
+    logger.info(f"Exportação XLSX {nome_arquivo}: {total} linhas")
+
+    return FileResponse(
+        arquivo,
+        as_attachment=True,
+        filename=f'{nome_arquivo}.xlsx',
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
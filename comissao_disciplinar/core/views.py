@@ -2,12 +2,12 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.db.models import Q, Count
-from django.http import HttpResponse, JsonResponse
+from django.http import FileResponse, HttpResponse, JsonResponse
 from django.core.paginator import Paginator
 from datetime import datetime, timedelta
 from .models import *
 from .forms import *
-from .utils import gerar_documento_pdf, enviar_notificacao_email
+from .utils import enviar_notificacao_email, resposta_recibos_termicos
 from .services import ServicoNotificacao
 from django.core.mail import get_connection
 from django.core.mail import EmailMultiAlternatives
@@ -17,9 +17,17 @@ from django.conf import settings
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_encode
 from django.utils.encoding import force_bytes
+from django.utils.html import format_html
+from django.urls import reverse
 from django.contrib.auth import get_user_model
-import requests
 from .utils_alertas import recalcular_alertas_periodo
+from .utils_exportacao import exportar_queryset
+from .busca_estudantes import filtrar_por_busca
+from .linha_tempo import pagina_linha_tempo
+from .cards_turma import cards_da_turma
+from .metricas import metricas_ocorrencias, metricas_ocorrencias_rapidas
+from . import documentos_render, fotos_drive
+import os
 
 
 def home(request):
@@ -50,32 +58,12 @@ def is_comissao(user):
 def dashboard(request):
     servidor = request.user.servidor
 
-    # Estatísticas gerais
-    total_ocorrencias = Ocorrencia.objects.count()
-    ocorrencias_abertas = Ocorrencia.objects.exclude(
-        status__in=['FINALIZADA', 'ARQUIVADA']
-    ).count()
+    # Estatísticas gerais (cache, invalidado pelos signals de Ocorrencia)
+    metricas = metricas_ocorrencias()
     minhas_ocorrencias = Ocorrencia.objects.filter(
         responsavel_registro=servidor
     ).count()
 
-    # Ocorrências pendentes de ação
-    pendentes_analise = Ocorrencia.objects.filter(status='REGISTRADA').count()
-    aguardando_defesa = Ocorrencia.objects.filter(status='AGUARDANDO_DEFESA').count()
-
-    # Ocorrências por gravidade (últimos 30 dias)
-    data_limite = timezone.now().date() - timedelta(days=30)
-    ocorrencias_mes = Ocorrencia.objects.filter(data__gte=data_limite)
-
-    por_gravidade = list(ocorrencias_mes.values(
-        'infracao__gravidade'
-    ).annotate(total=Count('id')))
-
-    # Tipos de infração mais comuns
-    top_infracoes = list(ocorrencias_mes.values(
-        'infracao__descricao'
-    ).annotate(total=Count('id')).order_by('-total')[:5])
-
     # Últimas ocorrências
     ultimas_ocorrencias = list(Ocorrencia.objects.select_related(
         'responsavel_registro', 'curso', 'turma'
@@ -92,13 +80,13 @@ def dashboard(request):
     ]
 
     context = {
-        'total_ocorrencias': total_ocorrencias,
-        'ocorrencias_abertas': ocorrencias_abertas,
+        'total_ocorrencias': metricas['total'],
+        'ocorrencias_abertas': metricas['abertas'],
         'minhas_ocorrencias': minhas_ocorrencias,
-        'pendentes_analise': pendentes_analise,
-        'aguardando_defesa': aguardando_defesa,
-        'por_gravidade': por_gravidade,
-        'top_infracoes': top_infracoes,
+        'pendentes_analise': metricas['por_status'].get('REGISTRADA', 0),
+        'aguardando_defesa': metricas['por_status'].get('AGUARDANDO_DEFESA', 0),
+        'por_gravidade': metricas['por_gravidade'],
+        'top_infracoes': metricas['top_infracoes'],
         'ultimas_ocorrencias': ultimas_ocorrencias,
         'notificacoes_recentes': notificacoes_recentes,
         'notificacoes_nao_lidas_count': Notificacao.objects.filter(
@@ -122,10 +110,7 @@ def estudante_list(request):
     situacao = request.GET.get('situacao')
 
     if busca:
-        estudantes = estudantes.filter(
-            Q(nome__icontains=busca) |
-            Q(matricula_sga__icontains=busca)
-        )
+        estudantes = filtrar_por_busca(estudantes, busca)
 
     if turma_id:
         estudantes = estudantes.filter(turma_id=turma_id)
@@ -168,29 +153,28 @@ def estudante_detail(request, matricula):
              request.user.servidor.pode_visualizar_ficha_aluno)
     )
 
-    # Buscar dados adicionais
-    from atendimentos.models import Atendimento
-    from pedagogico.models import InformacaoEstudanteConselho
-
-    atendimentos = Atendimento.objects.filter(
-        estudantes=estudante,
-        publicar_ficha_aluno=True
-    )[:5]
-
-    total_atendimentos = Atendimento.objects.filter(
-        estudantes=estudante
-    ).count()
-
-    total_conselhos = InformacaoEstudanteConselho.objects.filter(
-        estudante=estudante
-    ).count()
+    # Histórico de todos os módulos numa leitura paginada da linha do tempo;
+    # conselhos (observações e encaminhamentos) só com permissão de ver a ficha
+    tipos_evento = [
+        (tipo, nome) for tipo, nome in EventoLinhaTempo.TIPO_CHOICES if pode_ver_ficha or tipo != 'CONSELHO'
+    ]
+    permitidos = [tipo for tipo, _ in tipos_evento]
+    tipos = [tipo for tipo in request.GET.getlist('tipo') if tipo in permitidos]
+    eventos, contagem = pagina_linha_tempo(
+        estudante, request.GET.get('page'), tipos=tipos or (None if pode_ver_ficha else permitidos)
+    )
 
     context = {
         'estudante': estudante,
         'pode_ver_ficha': pode_ver_ficha,
-        'atendimentos': atendimentos,
-        'total_atendimentos': total_atendimentos,
-        'total_conselhos': total_conselhos,
+        'eventos': eventos,
+        'page_obj': eventos,
+        'tipos_evento': tipos_evento,
+        'tipos_selecionados': tipos,
+        'total_ocorrencias': contagem.get('OCORRENCIA', 0),
+        'total_ocorrencias_rapidas': contagem.get('OCORRENCIA_RAPIDA', 0),
+        'total_atendimentos': contagem.get('ATENDIMENTO', 0) + contagem.get('ATENDIMENTO_NAPNE', 0),
+        'total_conselhos': contagem.get('CONSELHO', 0) if pode_ver_ficha else 0,
     }
     return render(request, 'core/estudante_detail.html', context)
 
@@ -230,6 +214,32 @@ def ocorrencia_list(request):
     # Ordenação padrão
     ocorrencias = ocorrencias.order_by('-criado_em')
 
+    # Exportação (mesmos filtros, uma linha por estudante)
+    formato = request.GET.get('exportar')
+    if formato:
+        status_map = dict(Ocorrencia.STATUS_CHOICES)
+        return exportar_queryset(
+            ocorrencias,
+            colunas=[
+                ('id', 'Nº'),
+                ('data', 'Data'),
+                ('horario', 'Horário'),
+                ('curso__nome', 'Curso'),
+                ('turma__nome', 'Turma'),
+                ('estudantes__matricula_sga', 'Matrícula'),
+                ('estudantes__nome', 'Estudante'),
+                ('infracao__codigo', 'Infração'),
+                ('infracao__gravidade', 'Gravidade'),
+                ('status', 'Status'),
+                ('descricao', 'Descrição'),
+                ('responsavel_registro__nome', 'Registrado por'),
+                ('criado_em', 'Criado em'),
+            ],
+            nome_arquivo=f'ocorrencias_{timezone.localdate():%Y%m%d}',
+            formato=formato,
+            transformacoes={'status': lambda valor: status_map.get(valor, valor)},
+        )
+
     # Paginação
     paginator = Paginator(ocorrencias, 20)
     page = request.GET.get('page')
@@ -333,24 +343,11 @@ def ocorrencia_rapida_create(request):
                 print(f"{'=' * 60}")
 
                 try:
-                    from .utils import gerar_recibo_termico_ocorrencia_rapida
-
-                    # Gerar recibo
-                    recibo_pdf = gerar_recibo_termico_ocorrencia_rapida(ocorrencia)
-
-                    # Salvar como documento gerado
-                    from django.core.files.base import ContentFile
-                    documento = DocumentoGerado.objects.create(
-                        ocorrencia_rapida=ocorrencia,
-                        tipo_documento='RECIBO_TERMICO',
-                        assinado=True
+                    # Renderizado fora da requisição; reaproveitado se o conteúdo já foi gerado
+                    documento = documentos_render.solicitar_documento(
+                        ocorrencia, 'RECIBO_TERMICO', servidor=servidor, assinado=True
                     )
-
-                    nome_arquivo = f"recibo_termico_{ocorrencia.id}_{timezone.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-                    documento.arquivo.save(nome_arquivo, ContentFile(recibo_pdf.getvalue()))
-                    documento.assinaturas.add(servidor)
-
-                    print(f"✅ Recibo térmico gerado: {nome_arquivo}")
+                    print(f"✅ Recibo térmico agendado: documento #{documento.id}")
 
                     # Armazenar ID do documento na sessão para baixar depois
                     request.session['ultimo_recibo_id'] = documento.id
@@ -423,16 +420,21 @@ def baixar_recibo_termico(request, ocorrencia_id):
         return redirect('core:dashboard')
 
     try:
-        from .utils import gerar_recibo_termico_ocorrencia_rapida
-
-        # Gerar recibo
-        recibo_pdf = gerar_recibo_termico_ocorrencia_rapida(ocorrencia)
-
-        # Retornar como resposta HTTP
-        response = HttpResponse(recibo_pdf.getvalue(), content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="recibo_termico_{ocorrencia.id}.pdf"'
-
-        return response
+        # Mesmo conteúdo = mesmo arquivo: só renderiza se ainda não existir
+        documento = documentos_render.solicitar_documento(
+            ocorrencia, 'RECIBO_TERMICO', servidor=request.user.servidor, assinado=True
+        )
+        if documento.status == 'ERRO':
+            raise RuntimeError(documento.erro)
+        if documento.status != 'PRONTO':
+            return _documento_em_geracao(documento)
+
+        return FileResponse(
+            documento.arquivo.open('rb'),
+            as_attachment=True,
+            filename=f'recibo_termico_{ocorrencia.id}.pdf',
+            content_type='application/pdf',
+        )
 
     except Exception as e:
         print(f"❌ ERRO ao gerar recibo térmico: {str(e)}")
@@ -624,41 +626,64 @@ def gerar_documento(request, pk, tipo):
     ocorrencia = get_object_or_404(Ocorrencia, pk=pk)
     servidor = request.user.servidor
 
-    # Gerar documento PDF
-    arquivo_pdf = gerar_documento_pdf(ocorrencia, tipo)
+    # PDF gerado em segundo plano; mesmo conteúdo reaproveita o documento existente
+    documento = documentos_render.solicitar_documento(ocorrencia, tipo, servidor=servidor)
 
-    # Criar um nome de arquivo válido
-    nome_arquivo = f"documento_{ocorrencia.id}_{tipo}_{timezone.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+    # Ainda PENDENTE aqui: o link responde 202 e se atualiza até o PDF ficar pronto
+    messages.info(request, format_html(
+        '{} em geração. <a href="{}">Baixar o documento</a>',
+        documento.get_tipo_documento_display(), reverse('core:baixar_documento', args=[documento.pk])
+    ))
+    return redirect('core:ocorrencia_detail', pk=pk)
 
-    # Salvar no banco usando ContentFile
-    from django.core.files.base import ContentFile
-    documento = DocumentoGerado.objects.create(
-        ocorrencia=ocorrencia,
-        tipo_documento=tipo,
+
+def _documento_em_geracao(documento):
+    """202 enquanto o PDF não fica pronto; o navegador tenta de novo sozinho"""
+    response = HttpResponse(
+        'Documento em geração. Esta página será atualizada automaticamente.',
+        status=202, content_type='text/plain; charset=utf-8'
     )
+    response['Retry-After'] = '2'
+    response['Refresh'] = '2'
+    return response
 
-    # Salvar o conteúdo do PDF no campo arquivo
-    documento.arquivo.save(nome_arquivo, ContentFile(arquivo_pdf.getvalue()))
-    documento.assinaturas.add(servidor)
 
-    messages.success(request, f'{documento.get_tipo_documento_display()} gerado com sucesso!')
-    return redirect('ocorrencia_detail', pk=pk)
+@login_required
+@user_passes_test(is_servidor)
+def baixar_documento(request, pk):
+    """Entrega o PDF de um DocumentoGerado (202 enquanto estiver em geração)"""
+    documento = get_object_or_404(DocumentoGerado, pk=pk)
+
+    # Em geração: responde 202 na hora (sem prender o worker) e retoma se a renderização se perdeu
+    documentos_render.retomar_se_parado(documento)
+    if documento.status == 'ERRO':
+        messages.error(request, f'Erro ao gerar documento: {documento.erro}')
+        if documento.ocorrencia_id:
+            return redirect('core:ocorrencia_detail', pk=documento.ocorrencia_id)
+        return redirect('core:ocorrencia_rapida_detail', pk=documento.ocorrencia_rapida_id)
+    if documento.status != 'PRONTO':
+        return _documento_em_geracao(documento)
+
+    return FileResponse(
+        documento.arquivo.open('rb'),
+        filename=os.path.basename(documento.arquivo.name),
+        content_type='application/pdf',
+    )
 
 @login_required
 def relatorio_estudante(request, matricula):
     estudante = get_object_or_404(Estudante, matricula_sga=matricula)
-    ocorrencias = estudante.ocorrencias.all().select_related(
-        'curso', 'turma', 'infracao'
-    ).order_by('-data')
+    # Relatório impresso: todas as ocorrências, sem paginação
+    eventos = estudante.linha_tempo.filter(tipo='OCORRENCIA')
+    ocorrencias = list(eventos)
 
     # Estatísticas
-    total_ocorrencias = ocorrencias.count()
-    por_gravidade = ocorrencias.values('infracao__gravidade').annotate(total=Count('id'))
+    por_gravidade = eventos.values('gravidade').annotate(total=Count('id')).order_by('gravidade')
 
     context = {
         'estudante': estudante,
         'ocorrencias': ocorrencias,
-        'total_ocorrencias': total_ocorrencias,
+        'total_ocorrencias': len(ocorrencias),
         'por_gravidade': por_gravidade,
     }
 
@@ -776,20 +801,13 @@ def comissao_dashboard(request):
     ]
 
     # Estatísticas para a comissão
-    ocorrencias_pendentes = Ocorrencia.objects.filter(status='REGISTRADA').count()
-    ocorrencias_analise = Ocorrencia.objects.filter(status='EM_ANALISE').count()
-    ocorrencias_julgamento = Ocorrencia.objects.filter(status='EM_JULGAMENTO').count()
-    prazos_vencendo = Ocorrencia.objects.filter(
-        prazo_defesa__lte=timezone.now().date() + timedelta(days=3),
-        prazo_defesa__gte=timezone.now().date(),
-        status='AGUARDANDO_DEFESA'
-    ).count()
+    metricas = metricas_ocorrencias()
 
     context = {
-        'ocorrencias_pendentes': ocorrencias_pendentes,
-        'ocorrencias_analise': ocorrencias_analise,
-        'ocorrencias_julgamento': ocorrencias_julgamento,
-        'prazos_vencendo': prazos_vencendo,
+        'ocorrencias_pendentes': metricas['por_status'].get('REGISTRADA', 0),
+        'ocorrencias_analise': metricas['por_status'].get('EM_ANALISE', 0),
+        'ocorrencias_julgamento': metricas['por_status'].get('EM_JULGAMENTO', 0),
+        'prazos_vencendo': metricas['prazos_vencendo'],
         'breadcrumbs_list': breadcrumbs_list,
     }
     return render(request, 'core/comissao_dashboard.html', context)
@@ -825,8 +843,10 @@ def relatorios_estatisticas(request):
     ]
 
     # Estatísticas gerais
-    total_ocorrencias = Ocorrencia.objects.count()
-    total_ocorrencias_rapidas = OcorrenciaRapida.objects.count()
+    metricas = metricas_ocorrencias()
+    metricas_rapidas = metricas_ocorrencias_rapidas()
+    total_ocorrencias = metricas['total']
+    total_ocorrencias_rapidas = metricas_rapidas['total']
 
     # Calcular percentuais
     total_geral = total_ocorrencias + total_ocorrencias_rapidas
@@ -834,25 +854,10 @@ def relatorios_estatisticas(request):
     percentual_rapidas = round((total_ocorrencias_rapidas / total_geral * 100), 1) if total_geral > 0 else 0
 
     # Tipos de ocorrências rápidas mais comuns
-    from django.db.models import Count
-    tipos_rapidos_mais_comuns = OcorrenciaRapida.objects.values(
-        'tipo_rapido'
-    ).annotate(
-        total=Count('id')
-    ).order_by('-total')[:5]
-
-    # Adicionar display names para os tipos
-    tipo_map = dict(OcorrenciaRapida.TIPOS_RAPIDOS)
-    for tipo in tipos_rapidos_mais_comuns:
-        tipo['tipo_rapido__display'] = tipo_map.get(tipo['tipo_rapido'], tipo['tipo_rapido'])
+    tipos_rapidos_mais_comuns = metricas_rapidas['por_tipo'][:5]
 
     # Média mensal (últimos 6 meses)
-    from datetime import datetime, timedelta
-    seis_meses_atras = datetime.now().date() - timedelta(days=180)
-    ocorrencias_ultimos_meses = Ocorrencia.objects.filter(
-        data__gte=seis_meses_atras
-    ).count()
-    media_mensal = round(ocorrencias_ultimos_meses / 6, 1)
+    media_mensal = round(metricas['ultimos_seis_meses'] / 6, 1)
 
     context = {
         'total_ocorrencias': total_ocorrencias,
@@ -973,10 +978,8 @@ def api_filtrar_estudantes(request):
             pass
 
     if busca:
-        estudantes = estudantes.filter(
-            Q(nome__icontains=busca) |
-            Q(matricula_sga__icontains=busca)
-        )
+        # Prefixo sem acento: "joao sil" encontra "João da Silva"
+        estudantes = filtrar_por_busca(estudantes, busca)
 
     estudantes = estudantes.select_related('turma', 'curso').order_by('nome')[:50]
 
@@ -1040,7 +1043,7 @@ def ocorrencia_rapida_list(request):
     if data_fim:
         ocorrencias = ocorrencias.filter(data__lte=data_fim)
     if tipo_rapido:
-        ocorrencias = ocorrencias.filter(tipo_rapido=tipo_rapido)
+        ocorrencias = ocorrencias.filter(tipos_rapidos__codigo=tipo_rapido).distinct()
     if turma_id:
         ocorrencias = ocorrencias.filter(turma_id=turma_id)
     if busca:
@@ -1050,6 +1053,50 @@ def ocorrencia_rapida_list(request):
             Q(descricao__icontains=busca)
         ).distinct()
 
+    # Exportação (mesmos filtros, uma linha por estudante)
+    formato = request.GET.get('exportar')
+    if formato:
+        return exportar_queryset(
+            ocorrencias,
+            colunas=[
+                ('id', 'Nº'),
+                ('data', 'Data'),
+                ('horario', 'Horário'),
+                ('turma__nome', 'Turma'),
+                ('turma__curso__nome', 'Curso'),
+                ('estudantes__matricula_sga', 'Matrícula'),
+                ('estudantes__nome', 'Estudante'),
+                ('descricao', 'Ocorrência'),
+                ('responsavel_registro__nome', 'Registrado por'),
+                ('criado_em', 'Criado em'),
+            ],
+            nome_arquivo=f'ocorrencias_rapidas_{timezone.localdate():%Y%m%d}',
+            formato=formato,
+        )
+
+    # Recibos térmicos de todas as ocorrências filtradas num único PDF (rolo contínuo)
+    if request.GET.get('recibos'):
+        if not data_inicio and not data_fim:
+            # Sem período informado: só as de hoje, nunca o histórico inteiro
+            ocorrencias = ocorrencias.filter(data=timezone.localdate())
+        total = ocorrencias.count()
+        if not total:
+            messages.warning(request, 'Nenhuma ocorrência encontrada para imprimir recibos.')
+            return redirect('core:ocorrencia_rapida_list')
+        limite = getattr(settings, 'RECIBOS_TERMICOS_LIMITE', 500)
+        if total > limite:
+            messages.warning(
+                request,
+                f'{total} ocorrências no filtro; a impressão de recibos aceita até {limite}. Reduza o período.'
+            )
+            filtros = request.GET.copy()
+            filtros.pop('recibos')
+            return redirect(f"{reverse('core:ocorrencia_rapida_list')}?{filtros.urlencode()}")
+        return resposta_recibos_termicos(
+            ocorrencias.order_by('data', 'horario', 'id'),
+            f'recibos_termicos_{timezone.localdate():%Y%m%d}'
+        )
+
     # Paginação
     paginator = Paginator(ocorrencias, 20)
     page = request.GET.get('page')
@@ -1109,68 +1156,33 @@ def ocorrencia_rapida_detail(request, pk):
 @user_passes_test(is_servidor)
 def ocorrencia_rapida_dashboard(request):
     """Dashboard específico para ocorrências rápidas"""
-    # Estatísticas gerais
-    total_ocorrencias_rapidas = OcorrenciaRapida.objects.count()
-
-    # Ocorrências de hoje
-    hoje = timezone.now().date()
-    hoje_count = OcorrenciaRapida.objects.filter(data=hoje).count()
-
-    # Ocorrências da semana (últimos 7 dias)
-    semana_passada = hoje - timedelta(days=7)
-    semana_count = OcorrenciaRapida.objects.filter(data__gte=semana_passada).count()
-
-    # Tipo mais comum
-    from django.db.models import Count
-    tipo_mais_comum = OcorrenciaRapida.objects.values('tipo_rapido').annotate(
-        total=Count('id')
-    ).order_by('-total').first()
+    # Estatísticas gerais (cache, invalidado pelos signals de OcorrenciaRapida)
+    metricas = metricas_ocorrencias_rapidas()
 
+    tipo_mais_comum = metricas['por_tipo'][0] if metricas['por_tipo'] else None
     tipo_mais_comum_nome = tipo_mais_comum['tipo_rapido'] if tipo_mais_comum else 'N/A'
     tipo_mais_comum_count = tipo_mais_comum['total'] if tipo_mais_comum else 0
 
-    # Dados para gráficos
-    # Tipos de ocorrência (últimos 30 dias)
-    data_limite = hoje - timedelta(days=30)
-    tipos_data = list(OcorrenciaRapida.objects.filter(
-        data__gte=data_limite
-    ).values('tipo_rapido').annotate(total=Count('id')).order_by('-total'))
-
-    # Ocorrências por dia (últimas 2 semanas)
-    duas_semanas = hoje - timedelta(days=14)
-    dados_diarios = list(OcorrenciaRapida.objects.filter(
-        data__gte=duas_semanas
-    ).values('data').annotate(total=Count('id')).order_by('data'))
-
     # Últimas ocorrências
     ultimas_ocorrencias = list(OcorrenciaRapida.objects.select_related(
         'responsavel_registro', 'turma', 'turma__curso'
     ).prefetch_related('estudantes').order_by('-criado_em')[:10])
 
-    # Turmas com mais ocorrências (mês atual)
-    from datetime import datetime
-    primeiro_dia_mes = datetime.now().replace(day=1).date()
-    turmas_top = list(OcorrenciaRapida.objects.filter(
-        data__gte=primeiro_dia_mes
-    ).values('turma__nome', 'turma__curso__nome').annotate(
-        total=Count('id')
-    ).order_by('-total')[:5])
-
     breadcrumbs_list = [
         {'label': 'Dashboard', 'url': '/dashboard/'},
         {'label': 'Ocorrências Rápidas - Dashboard', 'url': ''}
     ]
 
     context = {
-        'total_ocorrencias_rapidas': total_ocorrencias_rapidas,
-        'hoje_count': hoje_count,
-        'semana_count': semana_count,
+        'total_ocorrencias_rapidas': metricas['total'],
+        'hoje_count': metricas['hoje'],
+        'semana_count': metricas['semana'],
         'tipo_mais_comum': tipo_mais_comum_nome,
         'tipo_mais_comum_count': tipo_mais_comum_count,
-        'tipos_data': tipos_data,
-        'dados_diarios': dados_diarios,
+        'tipos_data': metricas['por_tipo_30_dias'],
+        'dados_diarios': metricas['por_dia'],
         'ultimas_ocorrencias': ultimas_ocorrencias,
-        'turmas_top': turmas_top,
+        'turmas_top': metricas['turmas_top'],
         'breadcrumbs_list': breadcrumbs_list,
     }
 
@@ -1375,52 +1387,8 @@ def estudantes_dashboard(request):
         try:
             turma_selecionada = Turma.objects.get(id=turma_id, ativa=True)
 
-            # Buscar estudantes da turma com dados relacionados
-            estudantes = Estudante.objects.filter(
-                turma=turma_selecionada,
-                situacao='ATIVO'
-            ).select_related(
-                'turma', 'curso', #'responsaveis'
-            ).prefetch_related(
-                'ocorrencias',
-                'ocorrencias_rapidas'
-            ).order_by('nome')
-
-            # Adicionar contagem de atendimentos e ocorrências para cada estudante
-            from atendimentos.models import Atendimento
-
-            for estudante in estudantes:
-                # Contar ocorrências
-                estudante.total_ocorrencias = estudante.ocorrencias.count()
-                estudante.total_ocorrencias_rapidas = estudante.ocorrencias_rapidas.count()
-
-                # Contar atendimentos
-                estudante.total_atendimentos = Atendimento.objects.filter(
-                    estudantes=estudante
-                ).count()
-
-                # Últimas ocorrências (3 mais recentes)
-                estudante.ultimas_ocorrencias = estudante.ocorrencias.all().order_by('-data')[:3]
-
-                # Últimas ocorrências rápidas (3 mais recentes)
-                estudante.ultimas_ocorrencias_rapidas = estudante.ocorrencias_rapidas.all().order_by('-data')[:3]
-
-                # Últimos atendimentos (3 mais recentes)
-                estudante.ultimos_atendimentos = Atendimento.objects.filter(
-                    estudantes=estudante
-                ).order_by('-data')[:3]
-
-                # Status geral (baseado em ocorrências graves)
-                ocorrencias_graves = estudante.ocorrencias.filter(
-                    infracao__gravidade__in=['GRAVE', 'GRAVISSIMA']
-                ).count()
-
-                if ocorrencias_graves > 0:
-                    estudante.status_alerta = 'alto'
-                elif estudante.total_ocorrencias > 3:
-                    estudante.status_alerta = 'medio'
-                else:
-                    estudante.status_alerta = 'baixo'
+            # Contagens e itens recentes em consultas constantes, com cache por turma
+            estudantes = cards_da_turma(turma_selecionada)
 
         except Turma.DoesNotExist:
             messages.error(request, 'Turma não encontrada.')
@@ -1442,39 +1410,38 @@ def estudantes_dashboard(request):
     return render(request, 'core/estudantes_dashboard.html', context)
 
 
-#@require_GET
-#@cache_page(60 * 60 * 24)  # Cache por 24 horas
 @login_required
 def proxy_imagem_google_drive(request):
-    """Proxy com timeout e melhor tratamento de erros"""
+    """
+    Foto do Google Drive servida do cache em disco (core.fotos_drive)
+
+    ?id=<file id do Drive>&tamanho=avatar|card (padrão card)
+    """
     file_id = request.GET.get('id')
 
     if not file_id:
         return HttpResponse('ID não fornecido', status=400)
 
-    url = f'https://drive.google.com/thumbnail?id={file_id}&sz=w300'
+    tamanho = request.GET.get('tamanho', fotos_drive.TAMANHO_PADRAO)
 
     try:
-        # TIMEOUT CRÍTICO - evita travamentos
-        response = requests.get(url, timeout=10, stream=True, allow_redirects=True)
-
-        if response.status_code == 200:
-            content_type = response.headers.get('Content-Type', 'image/jpeg')
-
-            http_response = HttpResponse(
-                response.content,
-                content_type=content_type
-            )
-            http_response['Cache-Control'] = 'public, max-age=86400'
-            return http_response
-        else:
-            # Retorna placeholder ao invés de erro
-            return HttpResponse(status=404)
+        caminho = fotos_drive.obter_foto(file_id, tamanho)
+    except fotos_drive.FotoIndisponivel as e:
+        # Retorna status ao invés de página de erro (o <img> cai no placeholder)
+        return HttpResponse(str(e) if e.status != 404 else '', status=e.status)
+
+    cabecalho_sendfile = getattr(settings, 'FOTOS_SENDFILE_HEADER', None)
+    if cabecalho_sendfile:
+        # Nginx (X-Accel-Redirect) / Apache (X-Sendfile) entregam o arquivo
+        relativo = os.path.relpath(caminho, fotos_drive.diretorio_cache()).replace(os.sep, '/')
+        prefixo = getattr(settings, 'FOTOS_SENDFILE_PREFIX', '')
+        response = HttpResponse(content_type='image/jpeg')
+        response[cabecalho_sendfile] = f"{prefixo.rstrip('/')}/{relativo}" if prefixo else caminho
+    else:
+        response = FileResponse(open(caminho, 'rb'), content_type='image/jpeg')
 
-    except requests.exceptions.Timeout:
-        return HttpResponse('Timeout', status=504)
-    except requests.exceptions.RequestException:
-        return HttpResponse('Erro ao carregar', status=500)
+    response['Cache-Control'] = 'private, max-age=86400'
+    return response
 
 
 @login_required
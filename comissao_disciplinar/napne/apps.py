@@ -3,4 +3,7 @@ from django.apps import AppConfig
 class NapneConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'napne'
-    verbose_name = 'NAPNE'
\ No newline at end of file
+    verbose_name = 'NAPNE'
+
+    def ready(self):
+        import napne.signals  # Importar signals
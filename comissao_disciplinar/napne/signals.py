@@ -0,0 +1,15 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from core.linha_tempo import sincronizar, remover
+from .models import AtendimentoNAPNE
+
+
+@receiver(post_save, sender=AtendimentoNAPNE)
+def linha_tempo_atendimento_napne(sender, instance, **kwargs):
+    sincronizar('ATENDIMENTO_NAPNE', [instance.pk])
+
+
+@receiver(post_delete, sender=AtendimentoNAPNE)
+def linha_tempo_atendimento_napne_excluido(sender, instance, **kwargs):
+    remover('ATENDIMENTO_NAPNE', [instance.pk])
@@ -126,6 +126,29 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'America/Sao_Paulo' # Defina seu timezone
 
+# Fila de notificações aos responsáveis (email/SMS)
+# 'celery': worker + broker acima | 'thread': pool no próprio processo | 'eager': síncrono (testes)
+NOTIFICACOES_FILA_MODO = os.getenv('NOTIFICACOES_FILA_MODO', 'thread')
+NOTIFICACOES_CONCORRENCIA = {'EMAIL': 4, 'SMS': 2}  # envios simultâneos por canal
+NOTIFICACOES_VAGAS_DIR = os.getenv('NOTIFICACOES_VAGAS_DIR', '/tmp/notificacoes_vagas')  # locks das vagas de envio (por máquina)
+NOTIFICACOES_MAX_TENTATIVAS = 5
+NOTIFICACOES_ATRASO_BASE = 60  # segundos; dobra a cada nova tentativa
+NOTIFICACOES_TAXA = {'EMAIL': 10, 'SMS': 1}  # mensagens/segundo por processo (limite do provedor)
+NOTIFICACOES_TWILIO_HTTP_CLIENT = os.getenv('NOTIFICACOES_TWILIO_HTTP_CLIENT')  # ex.: core.entrega_falsa.TwilioHttpClientFalso
+
+# Geração de documentos PDF (DocumentoGerado) fora da requisição; mesmos modos da fila acima
+DOCUMENTOS_RENDER_MODO = os.getenv('DOCUMENTOS_RENDER_MODO', 'thread')
+DOCUMENTOS_RENDER_CONCORRENCIA = 2  # PDFs gerados ao mesmo tempo por processo
+DOCUMENTOS_PENDENTE_MAXIMO = 300  # segundos em geração até a renderização ser dada como perdida e reagendada
+RECIBOS_TERMICOS_LIMITE = 500  # recibos por impressão em lote (listagem de ocorrências rápidas)
+
+# Totem do refeitório: abrir /refeitorio/checkin/?token=<valor> libera o feed ao vivo sem login
+REFEITORIO_TOKEN_QUIOSQUE = os.getenv('REFEITORIO_TOKEN_QUIOSQUE')
+REFEITORIO_LOTE_IDADE_MAXIMA = 48  # horas; check-ins offline mais antigos são recusados
+
+# Conselhos de classe: segundos até o painel recalcular o progresso gravado (cobre .update() em lote)
+PROGRESSO_CONSELHO_VALIDADE = 60
+
 # Security
 if not DEBUG:
     SECURE_SSL_REDIRECT = True
@@ -192,6 +215,16 @@ REQUESTS_TIMEOUT = 10
 # Desabilitar proxy para fotos se necessário
 USE_PHOTO_PROXY = True  # Mude para False se quiser desabilitar
 
+# Cache em disco das fotos do Google Drive (core/fotos_drive.py)
+FOTOS_CACHE_DIR = os.path.join(BASE_DIR, 'cache_fotos')
+FOTOS_DRIVE_URL = 'https://drive.google.com/thumbnail'
+FOTOS_REVALIDAR_APOS = 60 * 60 * 24 * 7  # pergunta ao Drive (If-None-Match) 1x por semana
+# Em produção, deixe o Nginx/Apache entregar o arquivo:
+#   FOTOS_SENDFILE_HEADER = 'X-Accel-Redirect'; FOTOS_SENDFILE_PREFIX = '/_fotos/'
+#   (location /_fotos/ { internal; alias <FOTOS_CACHE_DIR>/; })
+FOTOS_SENDFILE_HEADER = None
+FOTOS_SENDFILE_PREFIX = ''
+
 
 # ===== OUTRAS OPÇÕES DE SMS BRASILEIRAS =====
 # - Total Voice: https://totalvoice.com.br/
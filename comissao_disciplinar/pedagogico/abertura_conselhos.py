@@ -0,0 +1,161 @@
+# pedagogico/abertura_conselhos.py - Abertura de conselhos de classe em lote
+from collections import defaultdict
+
+from django.db import transaction
+import logging
+
+from core.linha_tempo import sincronizar
+from core.models import Estudante
+from .models import ConselhoClasse, Disciplina, DisciplinaTurma, InformacaoEstudanteConselho
+from .progresso import recalcular_progresso
+
+logger = logging.getLogger(__name__)
+
+
+def bimestre_do_periodo(periodo):
+    """'2024.1' -> 1 (1 se o período não tiver o bimestre)"""
+    try:
+        return int(periodo.split('.')[-1])
+    except ValueError:
+        return 1
+
+
+def _disciplinas_por_curso(curso_ids):
+    """{curso_id: [Disciplina ativa]} numa única query"""
+    por_curso = defaultdict(list)
+    for disciplina in Disciplina.objects.filter(curso_id__in=curso_ids, ativa=True):
+        por_curso[disciplina.curso_id].append(disciplina)
+    return por_curso
+
+
+def _estudantes_por_turma(turma_ids):
+    """{turma_id: {estudante_id}} dos estudantes ativos numa única query"""
+    por_turma = defaultdict(set)
+    for turma_id, estudante_id in Estudante.objects.filter(
+        turma_id__in=turma_ids, situacao='ATIVO'
+    ).values_list('turma_id', 'id'):
+        por_turma[turma_id].add(estudante_id)
+    return por_turma
+
+
+def _criar_estrutura(conselhos, turma, disciplinas, estudante_ids):
+    """
+    Insere só o que falta (diferença de conjuntos) de InformacaoEstudanteConselho
+    e DisciplinaTurma dos conselhos de uma turma
+
+    Returns:
+        (informacoes_criadas, disciplinas_criadas, ids dos conselhos alterados)
+    """
+    periodos = {conselho.periodo for conselho in conselhos}
+    existentes_dt = set(DisciplinaTurma.objects.filter(
+        turma=turma, periodo__in=periodos
+    ).values_list('disciplina_id', 'periodo'))
+    existentes_info = defaultdict(set)
+    for conselho_id, estudante_id in InformacaoEstudanteConselho.objects.filter(
+        conselho__in=conselhos
+    ).values_list('conselho_id', 'estudante_id'):
+        existentes_info[conselho_id].add(estudante_id)
+
+    novas_dt = {}
+    novas_info = []
+    alterados = set()
+    for conselho in conselhos:
+        bimestre = bimestre_do_periodo(conselho.periodo)
+        esperadas = {
+            (disciplina.id, conselho.periodo)
+            for disciplina in disciplinas if disciplina.esta_ativa_no_bimestre(bimestre)
+        }
+        faltantes_dt = esperadas - existentes_dt
+        faltantes_info = set(estudante_ids) - existentes_info[conselho.id]
+        for disciplina_id, periodo in faltantes_dt:
+            novas_dt[(disciplina_id, periodo)] = DisciplinaTurma(
+                disciplina_id=disciplina_id, turma=turma, periodo=periodo
+            )
+        for estudante_id in faltantes_info:
+            novas_info.append(InformacaoEstudanteConselho(conselho=conselho, estudante_id=estudante_id))
+        if faltantes_dt or faltantes_info:
+            alterados.add(conselho.id)
+
+    DisciplinaTurma.objects.bulk_create(novas_dt.values(), ignore_conflicts=True)
+    InformacaoEstudanteConselho.objects.bulk_create(novas_info, batch_size=500, ignore_conflicts=True)
+    # bulk_create não dispara signals: eventos dos estudantes incluídos
+    sincronizar('CONSELHO', {info.conselho_id for info in novas_info})
+    return len(novas_info), len(novas_dt), alterados
+
+
+def criar_estrutura_conselho(conselho):
+    """Cria estrutura inicial do conselho (estudantes e disciplinas)"""
+    turma = conselho.turma
+    _criar_estrutura(
+        [conselho],
+        turma,
+        _disciplinas_por_curso([turma.curso_id])[turma.curso_id],
+        _estudantes_por_turma([turma.id])[turma.id],
+    )
+    # bulk_create não dispara signals
+    recalcular_progresso(conselho)
+
+
+def abrir_conselhos(turmas, periodos, data_realizacao, criado_por=None, dry_run=False):
+    """
+    Abre conselhos (e sua estrutura) para todas as combinações turma x período
+
+    Conselhos já existentes são mantidos e só recebem o que faltar. Cada
+    turma é gravada numa transação própria.
+
+    Returns:
+        dict com conselhos_criados, conselhos_existentes, informacoes_criadas,
+        disciplinas_criadas e turmas [(turma, criados)]
+    """
+    turmas = list(turmas)
+    periodos = sorted(set(periodos))
+    resultado = {
+        'conselhos_criados': 0, 'conselhos_existentes': 0,
+        'informacoes_criadas': 0, 'disciplinas_criadas': 0, 'turmas': [],
+    }
+
+    existentes = defaultdict(set)
+    for turma_id, periodo in ConselhoClasse.objects.filter(
+        turma__in=turmas, periodo__in=periodos
+    ).values_list('turma_id', 'periodo'):
+        existentes[turma_id].add(periodo)
+    disciplinas = _disciplinas_por_curso({turma.curso_id for turma in turmas})
+    estudantes = _estudantes_por_turma([turma.id for turma in turmas])
+
+    for turma in turmas:
+        faltantes = [periodo for periodo in periodos if periodo not in existentes[turma.id]]
+        resultado['conselhos_criados'] += len(faltantes)
+        resultado['conselhos_existentes'] += len(periodos) - len(faltantes)
+        resultado['turmas'].append((turma, faltantes))
+        if dry_run:
+            continue
+
+        with transaction.atomic():
+            ConselhoClasse.objects.bulk_create(
+                [
+                    ConselhoClasse(
+                        turma=turma, periodo=periodo, data_realizacao=data_realizacao, criado_por=criado_por
+                    )
+                    for periodo in faltantes
+                ],
+                ignore_conflicts=True,
+            )
+            # ignore_conflicts não devolve ids: relê os conselhos da turma
+            conselhos = list(ConselhoClasse.objects.filter(turma=turma, periodo__in=periodos))
+            informacoes, disciplinas_criadas, alterados = _criar_estrutura(
+                conselhos, turma, disciplinas[turma.curso_id], estudantes[turma.id]
+            )
+            resultado['informacoes_criadas'] += informacoes
+            resultado['disciplinas_criadas'] += disciplinas_criadas
+
+            # bulk_create não dispara signals: contadores dos conselhos novos ou alterados
+            for conselho in conselhos:
+                if conselho.id in alterados or conselho.periodo in faltantes:
+                    recalcular_progresso(conselho)
+
+    if not dry_run:
+        logger.info(
+            f"📋 Conselhos abertos em lote: {resultado['conselhos_criados']} novos, "
+            f"{resultado['informacoes_criadas']} estudantes, {resultado['disciplinas_criadas']} disciplinas"
+        )
+    return resultado
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class PedagogicoConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'pedagogico'
+
+    def ready(self):
+        import pedagogico.signals  # Importar signals
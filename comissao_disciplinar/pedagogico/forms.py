@@ -160,4 +160,18 @@ class DisciplinaTurmaForm(forms.ModelForm):
         fields = ['docente']
         widgets = {
             'docente': forms.Select(attrs={'class': 'form-control'}),
-        }
\ No newline at end of file
+        }
+
+class AbrirConselhosForm(forms.Form):
+    """Abertura de conselhos para várias turmas de uma vez (coordenação)"""
+    turmas = forms.ModelMultipleChoiceField(
+        queryset=Turma.objects.filter(ativa=True).select_related('curso').order_by('curso__nome', 'nome'),
+        widget=forms.CheckboxSelectMultiple,
+    )
+    periodo = forms.CharField(
+        max_length=20,
+        widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': '2024.1'})
+    )
+    data_realizacao = forms.DateField(
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'})
+    )
@@ -0,0 +1,150 @@
+# pedagogico/grade_observacoes.py - Grade de observações do docente por estudante
+from django.db import transaction
+from django.utils import timezone
+import logging
+
+from core.linha_tempo import sincronizar
+from .models import InformacaoEstudanteConselho, ObservacaoDocenteEstudante
+from .progresso import recalcular_progresso
+
+logger = logging.getLogger(__name__)
+
+CAMPOS_ATUALIZADOS = ['observacao', 'observacao_napne', 'preenchido', 'atualizado_em']
+
+
+def _estudantes_da_grade(conselho):
+    """Estudantes ativos da turma com a ficha NAPNE (quando houver) já carregada"""
+    return list(
+        conselho.turma.estudantes.filter(situacao='ATIVO')
+        .select_related('ficha_napne').order_by('nome')
+    )
+
+
+def _observacoes_por_estudante(conselho, docente, disciplina):
+    """{estudante_id: ObservacaoDocenteEstudante} do docente/disciplina no conselho"""
+    return {
+        obs.informacao_estudante.estudante_id: obs
+        for obs in ObservacaoDocenteEstudante.objects.filter(
+            informacao_estudante__conselho=conselho, docente=docente, disciplina=disciplina
+        ).select_related('informacao_estudante')
+    }
+
+
+def carregar_grade(conselho, docente, disciplina):
+    """
+    Linhas da grade (2 queries, sem gravar nada)
+
+    Estudantes sem observação recebem uma ObservacaoDocenteEstudante não salva,
+    só para exibir os campos vazios.
+    """
+    observacoes = _observacoes_por_estudante(conselho, docente, disciplina)
+    dados = []
+    for estudante in _estudantes_da_grade(conselho):
+        eh_napne = hasattr(estudante, 'ficha_napne')
+        dados.append({
+            'estudante': estudante,
+            'obs_docente': observacoes.get(estudante.id) or ObservacaoDocenteEstudante(
+                docente=docente, disciplina=disciplina
+            ),
+            'eh_napne': eh_napne,
+            'necessidade': estudante.ficha_napne.necessidade_especifica if eh_napne else None,
+        })
+    return dados
+
+
+def salvar_grade(conselho, docente, disciplina, valores):
+    """
+    Grava a grade inteira de uma vez
+
+    Carrega estudantes, informações e observações existentes, compara com os
+    valores enviados e grava só as linhas que mudaram (bulk_create com upsert
+    e bulk_update).
+    Linhas sem a observação geral, ou sem a NAPNE para estudante NAPNE, são
+    ignoradas.
+
+    Args:
+        valores: {estudante_id: (observacao, observacao_napne)}
+
+    Returns:
+        dict com salvos (válidos), criados, atualizados e ignorados
+    """
+    resultado = {'salvos': 0, 'criados': 0, 'atualizados': 0, 'ignorados': 0}
+    estudantes = _estudantes_da_grade(conselho)
+    observacoes = _observacoes_por_estudante(conselho, docente, disciplina)
+
+    agora = timezone.now()
+    alteradas = []
+    pendentes = {}  # estudante_id -> (observacao, observacao_napne) sem linha ainda
+    for estudante in estudantes:
+        if estudante.id not in valores:
+            continue
+        observacao, observacao_napne = (texto.strip() for texto in valores[estudante.id])
+        if not observacao or (hasattr(estudante, 'ficha_napne') and not observacao_napne):
+            resultado['ignorados'] += 1
+            continue
+        resultado['salvos'] += 1
+
+        obs = observacoes.get(estudante.id)
+        if obs is None:
+            pendentes[estudante.id] = (observacao, observacao_napne)
+        elif (obs.observacao, obs.observacao_napne, obs.preenchido) != (observacao, observacao_napne, True):
+            obs.observacao = observacao
+            obs.observacao_napne = observacao_napne
+            obs.preenchido = True
+            obs.atualizado_em = agora  # bulk_update não aplica auto_now
+            alteradas.append(obs)
+
+    if not alteradas and not pendentes:
+        return resultado
+
+    with transaction.atomic():
+        if pendentes:
+            informacoes = dict(
+                InformacaoEstudanteConselho.objects.filter(conselho=conselho)
+                .values_list('estudante_id', 'id')
+            )
+            faltantes = [estudante_id for estudante_id in pendentes if estudante_id not in informacoes]
+            if faltantes:
+                InformacaoEstudanteConselho.objects.bulk_create(
+                    [
+                        InformacaoEstudanteConselho(conselho=conselho, estudante_id=estudante_id)
+                        for estudante_id in faltantes
+                    ],
+                    ignore_conflicts=True,
+                )
+                sincronizar('CONSELHO', [conselho.pk])
+                # ignore_conflicts não devolve ids: relê só as criadas
+                informacoes.update(
+                    InformacaoEstudanteConselho.objects.filter(
+                        conselho=conselho, estudante_id__in=faltantes
+                    ).values_list('estudante_id', 'id')
+                )
+            # Upsert: se outra aba/reenvio gravou a mesma linha no meio tempo,
+            # o INSERT vira UPDATE em vez de IntegrityError
+            ObservacaoDocenteEstudante.objects.bulk_create(
+                [
+                    ObservacaoDocenteEstudante(
+                        informacao_estudante_id=informacoes[estudante_id], docente=docente,
+                        disciplina=disciplina, observacao=observacao,
+                        observacao_napne=observacao_napne, preenchido=True,
+                    )
+                    for estudante_id, (observacao, observacao_napne) in pendentes.items()
+                ],
+                batch_size=500,
+                update_conflicts=True,
+                unique_fields=['informacao_estudante', 'docente', 'disciplina'],
+                update_fields=CAMPOS_ATUALIZADOS,
+            )
+        if alteradas:
+            ObservacaoDocenteEstudante.objects.bulk_update(alteradas, CAMPOS_ATUALIZADOS, batch_size=500)
+
+        # bulk_create/bulk_update não disparam signals
+        recalcular_progresso(conselho)
+
+    resultado['criados'] = len(pendentes)
+    resultado['atualizados'] = len(alteradas)
+    logger.info(
+        f"📝 Grade de observações salva (conselho {conselho.pk}, {disciplina}): "
+        f"{resultado['criados']} novas, {resultado['atualizados']} atualizadas"
+    )
+    return resultado
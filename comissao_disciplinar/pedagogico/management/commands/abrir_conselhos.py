@@ -0,0 +1,77 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from core.models import Turma
+from pedagogico.abertura_conselhos import abrir_conselhos
+
+
+class Command(BaseCommand):
+    help = 'Abre conselhos de classe em lote (turmas x períodos), criando só o que falta'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--periodo',
+            action='append',
+            required=True,
+            help='Período do conselho (ex.: 2025.1); pode repetir',
+        )
+        parser.add_argument(
+            '--data',
+            type=date.fromisoformat,
+            default=None,
+            help='Data de realização (AAAA-MM-DD; padrão: hoje)',
+        )
+        parser.add_argument(
+            '--turma',
+            type=int,
+            action='append',
+            help='Id da turma (padrão: todas as turmas ativas); pode repetir',
+        )
+        parser.add_argument(
+            '--curso',
+            type=int,
+            help='Restringe às turmas ativas do curso',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Apenas mostra os conselhos que seriam criados',
+        )
+
+    def handle(self, *args, **options):
+        turmas = Turma.objects.select_related('curso').order_by('curso__nome', 'nome')
+        if options['turma']:
+            turmas = turmas.filter(id__in=options['turma'])
+        else:
+            turmas = turmas.filter(ativa=True)
+        if options['curso']:
+            turmas = turmas.filter(curso_id=options['curso'])
+        if not turmas.exists():
+            raise CommandError('Nenhuma turma encontrada.')
+
+        self.stdout.write("\n" + "="*70)
+        self.stdout.write(self.style.SUCCESS("📋 ABERTURA DE CONSELHOS DE CLASSE EM LOTE"))
+        self.stdout.write("="*70 + "\n")
+
+        resultado = abrir_conselhos(
+            turmas,
+            options['periodo'],
+            options['data'] or date.today(),
+            dry_run=options['dry_run'],
+        )
+
+        for turma, criados in resultado['turmas']:
+            situacao = ', '.join(criados) if criados else 'já existentes'
+            self.stdout.write(f"  {turma.curso.nome[:30]:30} {turma.nome:10} - {situacao}")
+
+        self.stdout.write("\n" + "="*70)
+        self.stdout.write(self.style.SUCCESS("📊 RESUMO:"))
+        self.stdout.write("="*70)
+        self.stdout.write(self.style.SUCCESS(f"✅ Conselhos criados: {resultado['conselhos_criados']}"))
+        self.stdout.write(f"⏭️  Já existentes: {resultado['conselhos_existentes']}")
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING("\nExecute sem --dry-run para criar os conselhos."))
+        else:
+            self.stdout.write(f"👥 Estudantes vinculados: {resultado['informacoes_criadas']}")
+            self.stdout.write(f"📚 Disciplinas vinculadas: {resultado['disciplinas_criadas']}")
+        self.stdout.write("="*70 + "\n")
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-17 23:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pedagogico', '0003_conselhoclasse_aberto_conselhoclasse_criado_por_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProgressoConselho',
+            fields=[
+                ('conselho', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='progresso', serialize=False, to='pedagogico.conselhoclasse')),
+                ('total_disciplinas', models.PositiveIntegerField(default=0)),
+                ('total_estudantes', models.PositiveIntegerField(default=0)),
+                ('total_napne', models.PositiveIntegerField(default=0)),
+                ('perfis_preenchidos', models.PositiveIntegerField(default=0)),
+                ('observacoes_preenchidas', models.PositiveIntegerField(default=0)),
+                ('observacoes_napne_preenchidas', models.PositiveIntegerField(default=0)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Progresso do Conselho',
+                'verbose_name_plural': 'Progresso dos Conselhos',
+            },
+        ),
+    ]
@@ -241,6 +241,52 @@ class ObservacaoDocenteTurma(models.Model):
         return f"{self.docente.nome} - {self.disciplina.codigo} - {self.conselho}"
 
 
+class ProgressoConselho(models.Model):
+    """
+    Contadores de preenchimento do conselho
+
+    Recalculados (pedagogico.progresso) quando observações, disciplinas ou
+    estudantes da turma mudam, para que o painel e o endpoint JSON leiam
+    uma única linha durante a reunião.
+    """
+    conselho = models.OneToOneField(
+        ConselhoClasse,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='progresso'
+    )
+    total_disciplinas = models.PositiveIntegerField(default=0)
+    total_estudantes = models.PositiveIntegerField(default=0)
+    total_napne = models.PositiveIntegerField(default=0)
+    perfis_preenchidos = models.PositiveIntegerField(default=0)
+    observacoes_preenchidas = models.PositiveIntegerField(default=0)
+    observacoes_napne_preenchidas = models.PositiveIntegerField(default=0)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Progresso do Conselho'
+        verbose_name_plural = 'Progresso dos Conselhos'
+
+    def __str__(self):
+        return f"Progresso - {self.conselho_id}: {self.percentual}%"
+
+    @property
+    def observacoes_esperadas(self):
+        return self.total_disciplinas * self.total_estudantes
+
+    @property
+    def observacoes_napne_esperadas(self):
+        return self.total_disciplinas * self.total_napne
+
+    @property
+    def percentual(self):
+        """Perfis de turma + observações de estudantes preenchidos"""
+        esperados = self.total_disciplinas + self.observacoes_esperadas
+        if not esperados:
+            return 0
+        return round((self.perfis_preenchidos + self.observacoes_preenchidas) * 100 / esperados)
+
+
 class FichaAluno(models.Model):
     """
     Dashboard/Ficha do estudante - agregação de informações
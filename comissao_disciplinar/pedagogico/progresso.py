@@ -0,0 +1,106 @@
+# pedagogico/progresso.py - Progresso de preenchimento dos conselhos de classe
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, Q
+from django.utils import timezone
+import logging
+
+from core.models import Estudante
+from .models import (
+    ConselhoClasse, DisciplinaTurma, ObservacaoDocenteEstudante, ObservacaoDocenteTurma,
+    ProgressoConselho,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def recalcular_progresso(conselho):
+    """
+    Recalcula e grava os contadores do conselho (4 queries agregadas)
+
+    Args:
+        conselho: ConselhoClasse ou id
+
+    Returns:
+        ProgressoConselho
+    """
+    if not isinstance(conselho, ConselhoClasse):
+        conselho = ConselhoClasse.objects.only('id', 'turma_id', 'periodo').get(pk=conselho)
+
+    estudantes = Estudante.objects.filter(
+        turma_id=conselho.turma_id, situacao='ATIVO'
+    ).aggregate(
+        total=Count('id'),
+        napne=Count('id', filter=Q(ficha_napne__isnull=False)),
+    )
+    observacoes = ObservacaoDocenteEstudante.objects.filter(
+        informacao_estudante__conselho=conselho,
+        informacao_estudante__estudante__turma_id=conselho.turma_id,
+        informacao_estudante__estudante__situacao='ATIVO',
+        preenchido=True,
+    ).aggregate(
+        total=Count('id'),
+        napne=Count('id', filter=Q(informacao_estudante__estudante__ficha_napne__isnull=False)),
+    )
+
+    progresso, _ = ProgressoConselho.objects.update_or_create(
+        conselho=conselho,
+        defaults={
+            'total_disciplinas': DisciplinaTurma.objects.filter(
+                turma_id=conselho.turma_id, periodo=conselho.periodo
+            ).count(),
+            'total_estudantes': estudantes['total'],
+            'total_napne': estudantes['napne'],
+            'perfis_preenchidos': ObservacaoDocenteTurma.objects.filter(
+                conselho=conselho
+            ).exclude(observacao='').count(),
+            'observacoes_preenchidas': observacoes['total'],
+            'observacoes_napne_preenchidas': observacoes['napne'],
+        }
+    )
+    return progresso
+
+
+def recalcular_progresso_turmas(turma_ids, periodo=None):
+    """Recalcula os conselhos abertos das turmas (opcionalmente de um período)"""
+    conselhos = ConselhoClasse.objects.filter(
+        turma_id__in=[turma_id for turma_id in turma_ids if turma_id], aberto=True
+    ).only('id', 'turma_id', 'periodo')
+    if periodo is not None:
+        conselhos = conselhos.filter(periodo=periodo)
+    for conselho in conselhos:
+        recalcular_progresso(conselho)
+
+
+def obter_progresso(conselho):
+    """
+    Contadores gravados (calcula na primeira leitura de conselhos antigos)
+
+    Os signals cobrem save/delete, mas .update() em lote (ex.: ações de
+    situação do admin de estudantes) passa por fora deles: contadores mais
+    velhos que PROGRESSO_CONSELHO_VALIDADE segundos são recalculados.
+    """
+    conselho_id = conselho.pk if isinstance(conselho, ConselhoClasse) else conselho
+    progresso = ProgressoConselho.objects.filter(conselho_id=conselho_id).first()
+    validade = timedelta(seconds=getattr(settings, 'PROGRESSO_CONSELHO_VALIDADE', 60))
+    if progresso is None or progresso.atualizado_em < timezone.now() - validade:
+        return recalcular_progresso(conselho)
+    return progresso
+
+
+def progresso_json(progresso):
+    """Representação do progresso para o endpoint do painel"""
+    return {
+        'conselho': progresso.conselho_id,
+        'total_disciplinas': progresso.total_disciplinas,
+        'total_estudantes': progresso.total_estudantes,
+        'total_napne': progresso.total_napne,
+        'perfis_preenchidos': progresso.perfis_preenchidos,
+        'observacoes_preenchidas': progresso.observacoes_preenchidas,
+        'observacoes_esperadas': progresso.observacoes_esperadas,
+        'observacoes_napne_preenchidas': progresso.observacoes_napne_preenchidas,
+        'observacoes_napne_esperadas': progresso.observacoes_napne_esperadas,
+        'percentual': progresso.percentual,
+        'atualizado_em': progresso.atualizado_em.isoformat(),
+    }
@@ -0,0 +1,88 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from core.linha_tempo import sincronizar, remover
+from core.models import Estudante
+from napne.models import FichaEstudanteNAPNE
+from .models import (
+    ConselhoClasse, DisciplinaTurma, InformacaoEstudanteConselho, ObservacaoDocenteEstudante,
+    ObservacaoDocenteTurma,
+)
+from .progresso import recalcular_progresso, recalcular_progresso_turmas
+
+
+# ====================
+# PROGRESSO DOS CONSELHOS
+# ====================
+
+def _excluindo_conselho(kwargs):
+    """Exclusão em cascata do próprio conselho: não há o que recalcular"""
+    return isinstance(kwargs.get('origin'), ConselhoClasse)
+
+
+@receiver(post_save, sender=ConselhoClasse)
+def criar_progresso_conselho(sender, instance, created, **kwargs):
+    if created:
+        recalcular_progresso(instance)
+
+
+@receiver(post_save, sender=ObservacaoDocenteTurma)
+@receiver(post_delete, sender=ObservacaoDocenteTurma)
+def progresso_observacao_turma(sender, instance, **kwargs):
+    if _excluindo_conselho(kwargs):
+        return
+    recalcular_progresso(instance.conselho_id)
+
+
+@receiver(post_save, sender=ObservacaoDocenteEstudante)
+@receiver(post_delete, sender=ObservacaoDocenteEstudante)
+def progresso_observacao_estudante(sender, instance, **kwargs):
+    if _excluindo_conselho(kwargs):
+        return
+    recalcular_progresso(instance.informacao_estudante.conselho_id)
+
+
+@receiver(post_save, sender=DisciplinaTurma)
+@receiver(post_delete, sender=DisciplinaTurma)
+def progresso_disciplina_turma(sender, instance, **kwargs):
+    recalcular_progresso_turmas([instance.turma_id], periodo=instance.periodo)
+
+
+@receiver(post_save, sender=Estudante)
+@receiver(post_delete, sender=Estudante)
+def progresso_estudante(sender, instance, update_fields=None, **kwargs):
+    """Situação/turma do estudante mudam os totais dos conselhos abertos"""
+    if update_fields is not None and not {'turma', 'situacao'} & set(update_fields):
+        return
+    # Troca de turma: a anterior (guardada no pre_save de core.signals) perde o estudante
+    turma_ids = {instance.turma_id, getattr(instance, '_turma_anterior_id', None)}
+    recalcular_progresso_turmas(turma_ids)
+
+
+@receiver(post_save, sender=FichaEstudanteNAPNE)
+@receiver(post_delete, sender=FichaEstudanteNAPNE)
+def progresso_ficha_napne(sender, instance, **kwargs):
+    recalcular_progresso_turmas([instance.turma_id])
+
+
+# ====================
+# LINHA DO TEMPO DOS ESTUDANTES
+# ====================
+
+@receiver(post_save, sender=ConselhoClasse)
+def linha_tempo_conselho(sender, instance, created, **kwargs):
+    """Data/turma do conselho aparecem nos eventos de todos os estudantes"""
+    if not created:
+        sincronizar('CONSELHO', [instance.pk])
+
+
+@receiver(post_delete, sender=ConselhoClasse)
+def linha_tempo_conselho_excluido(sender, instance, **kwargs):
+    remover('CONSELHO', [instance.pk])
+
+
+@receiver(post_save, sender=InformacaoEstudanteConselho)
+@receiver(post_delete, sender=InformacaoEstudanteConselho)
+def linha_tempo_informacao_estudante(sender, instance, **kwargs):
+    if _excluindo_conselho(kwargs):
+        return
+    sincronizar('CONSELHO', [instance.conselho_id])
@@ -1,3 +1,254 @@
+import io
+from datetime import date, timedelta
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from core.models import Campus, Curso, Turma, Estudante, Servidor
+from napne.models import FichaEstudanteNAPNE
+from .abertura_conselhos import abrir_conselhos
+from .models import (
+    Disciplina, DisciplinaTurma, ConselhoClasse, InformacaoEstudanteConselho,
+    ObservacaoDocenteEstudante, ObservacaoDocenteTurma, ProgressoConselho,
+)
 
-# Create your tests here.
+
+class ConselhoBaseTestCase(TestCase):
+    def setUp(self):
+        self.campus = Campus.objects.create(nome='Campus Teste', sigla='CT')
+        self.curso = Curso.objects.create(nome='Informática', campus=self.campus, codigo='INF')
+        self.turma = Turma.objects.create(
+            nome='1A', curso=self.curso, ano=2025, periodo='2025.1', semestre=0
+        )
+        user = User.objects.create_user('coordenacao', 'coord@test.com', 'pass')
+        self.servidor = Servidor.objects.create(
+            user=user, siape='1234567', nome='Coordenação', email='coord@test.com',
+            campus=self.campus, coordenacao='CDPD'
+        )
+        self.disciplinas = []
+        for i in range(2):
+            disciplina = Disciplina.objects.create(
+                nome=f'Disciplina {i}', codigo=f'D{i}', curso=self.curso, carga_horaria=60
+            )
+            DisciplinaTurma.objects.create(
+                disciplina=disciplina, turma=self.turma, docente=self.servidor, periodo='2025.1'
+            )
+            self.disciplinas.append(disciplina)
+        self.conselho = ConselhoClasse.objects.create(
+            turma=self.turma, periodo='2025.1', data_realizacao=date(2025, 6, 1)
+        )
+
+    def criar_estudantes(self, quantidade, inicio=0):
+        estudantes = []
+        for i in range(inicio, inicio + quantidade):
+            estudantes.append(Estudante.objects.create(
+                matricula_sga=f'2025{i:04d}', nome=f'Estudante {i}', email=f'{i}@test.com',
+                turma=self.turma, campus=self.campus, curso=self.curso,
+                data_ingresso=timezone.localdate()
+            ))
+        return estudantes
+
+    def observar(self, estudante, disciplina):
+        informacao, _ = InformacaoEstudanteConselho.objects.get_or_create(
+            conselho=self.conselho, estudante=estudante
+        )
+        return ObservacaoDocenteEstudante.objects.create(
+            informacao_estudante=informacao, docente=self.servidor, disciplina=disciplina,
+            observacao='Participativo', preenchido=True
+        )
+
+
+class ProgressoConselhoTestCase(ConselhoBaseTestCase):
+    def test_contadores_acompanham_observacoes(self):
+        estudantes = self.criar_estudantes(3)
+        FichaEstudanteNAPNE.objects.create(
+            estudante=estudantes[0], turma=self.turma, atendido_por=self.servidor,
+            necessidade_especifica='TDAH', telefone='0'
+        )
+        self.observar(estudantes[0], self.disciplinas[0])
+        self.observar(estudantes[1], self.disciplinas[0])
+        ObservacaoDocenteTurma.objects.create(
+            conselho=self.conselho, docente=self.servidor, disciplina=self.disciplinas[0],
+            observacao='Turma participativa'
+        )
+
+        progresso = self.conselho.progresso
+        progresso.refresh_from_db()
+        self.assertEqual(progresso.total_disciplinas, 2)
+        self.assertEqual(progresso.total_estudantes, 3)
+        self.assertEqual(progresso.total_napne, 1)
+        self.assertEqual(progresso.perfis_preenchidos, 1)
+        self.assertEqual(progresso.observacoes_preenchidas, 2)
+        self.assertEqual(progresso.observacoes_napne_preenchidas, 1)
+        self.assertEqual(progresso.percentual, round(3 * 100 / 8))
+
+        self.client.force_login(self.servidor.user)
+        resposta = self.client.get(
+            reverse('pedagogico:conselho_progresso', args=[self.conselho.pk]), secure=True
+        )
+        self.assertEqual(resposta.json()['observacoes_preenchidas'], 2)
+        self.assertEqual(resposta.json()['observacoes_esperadas'], 6)
+
+    def test_troca_de_turma_recalcula_as_duas(self):
+        estudantes = self.criar_estudantes(3)
+        outra = Turma.objects.create(nome='1B', curso=self.curso, ano=2025, periodo='2025.1', semestre=0)
+        conselho_outra = ConselhoClasse.objects.create(
+            turma=outra, periodo='2025.1', data_realizacao=date(2025, 6, 1)
+        )
+
+        estudantes[0].turma = outra
+        estudantes[0].save()
+        self.conselho.progresso.refresh_from_db()
+        conselho_outra.progresso.refresh_from_db()
+        self.assertEqual(self.conselho.progresso.total_estudantes, 2)
+        self.assertEqual(conselho_outra.progresso.total_estudantes, 1)
+
+    def test_progresso_antigo_recalculado_apos_update_em_lote(self):
+        self.criar_estudantes(3)
+        Estudante.objects.filter(matricula_sga='20250000').update(situacao='TRANCADO')  # sem signals
+        self.client.force_login(self.servidor.user)
+        url = reverse('pedagogico:conselho_progresso', args=[self.conselho.pk])
+        self.assertEqual(self.client.get(url, secure=True).json()['total_estudantes'], 3)
+
+        ProgressoConselho.objects.filter(pk=self.conselho.pk).update(
+            atualizado_em=timezone.now() - timedelta(minutes=5)
+        )
+        self.assertEqual(self.client.get(url, secure=True).json()['total_estudantes'], 2)
+        self.assertGreater(
+            ProgressoConselho.objects.get(pk=self.conselho.pk).atualizado_em, timezone.now() - timedelta(minutes=1)
+        )
+
+    def test_painel_em_queries_constantes(self):
+        self.client.force_login(self.servidor.user)
+        url = reverse('pedagogico:conselho_painel', args=[self.conselho.pk])
+
+        self.criar_estudantes(2)
+        self.client.get(url, secure=True)  # aquece caches da sessão/contexto
+        with CaptureQueriesContext(connection) as poucos:
+            self.assertEqual(self.client.get(url, secure=True).status_code, 200)
+
+        for estudante in self.criar_estudantes(10, inicio=2):
+            self.observar(estudante, self.disciplinas[1])
+        with CaptureQueriesContext(connection) as muitos:
+            resposta = self.client.get(url, secure=True)
+        self.assertEqual(len(muitos), len(poucos))
+        self.assertContains(resposta, '1/2 observações')
+
+
+class AberturaConselhosTestCase(ConselhoBaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.criar_estudantes(3)
+        Disciplina.objects.create(
+            nome='Só no 2º', codigo='D9', curso=self.curso, carga_horaria=30, bimestres_ativos='2'
+        )
+        self.turmas = [self.turma] + [
+            Turma.objects.create(nome=f'{i}B', curso=self.curso, ano=2025, periodo='2025.1', semestre=0)
+            for i in range(1, 4)
+        ]
+
+    def test_abre_so_o_que_falta(self):
+        resultado = abrir_conselhos(self.turmas, ['2025.1', '2025.2'], date(2025, 6, 1))
+        # 2025.1 da turma 1A já existia (setUp)
+        self.assertEqual(resultado['conselhos_criados'], 7)
+        self.assertEqual(resultado['conselhos_existentes'], 1)
+        self.assertEqual(ConselhoClasse.objects.count(), 8)
+        # 3 estudantes x 2 conselhos da turma 1A
+        self.assertEqual(InformacaoEstudanteConselho.objects.count(), 6)
+        # D9 só entra no 2º bimestre
+        self.assertEqual(DisciplinaTurma.objects.filter(turma=self.turma, periodo='2025.2').count(), 3)
+        conselho = ConselhoClasse.objects.get(turma=self.turma, periodo='2025.2')
+        self.assertEqual(conselho.progresso.total_estudantes, 3)
+
+        # Segunda execução: nada a criar, sem uma query por linha
+        with CaptureQueriesContext(connection) as consultas:
+            resultado = abrir_conselhos(self.turmas, ['2025.1', '2025.2'], date(2025, 6, 1))
+        self.assertEqual(resultado['conselhos_criados'], 0)
+        self.assertEqual(resultado['informacoes_criadas'], 0)
+        self.assertLess(len(consultas), 25)
+
+    def test_comando(self):
+        saida = io.StringIO()
+        call_command('abrir_conselhos', '--periodo', '2025.3', '--data', '2025-09-01', stdout=saida)
+        self.assertIn('Conselhos criados: 4', saida.getvalue())
+        self.assertEqual(ConselhoClasse.objects.filter(periodo='2025.3').count(), 4)
+
+
+class GradeObservacoesTestCase(ConselhoBaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.estudantes = self.criar_estudantes(30)
+        FichaEstudanteNAPNE.objects.create(
+            estudante=self.estudantes[0], turma=self.turma, atendido_por=self.servidor,
+            necessidade_especifica='TDAH', telefone='0'
+        )
+        self.disciplina_turma = DisciplinaTurma.objects.get(disciplina=self.disciplinas[0], turma=self.turma)
+        self.url = reverse(
+            'pedagogico:conselho_docente_preencher_estudantes',
+            args=[self.conselho.pk, self.disciplina_turma.pk]
+        )
+        self.client.force_login(self.servidor.user)
+
+    def postar(self, texto):
+        dados = {f'observacao_{estudante.id}': texto for estudante in self.estudantes}
+        # Estudante NAPNE sem a observação NAPNE: ignorado
+        return self.client.post(self.url, dados, secure=True)
+
+    def test_grade_em_poucas_queries(self):
+        self.assertEqual(self.client.get(self.url, secure=True).status_code, 200)
+        self.assertFalse(ObservacaoDocenteEstudante.objects.exists())
+
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(self.postar('Participativo').status_code, 302)
+        self.assertLess(len(consultas), 35)
+        self.assertEqual(ObservacaoDocenteEstudante.objects.filter(preenchido=True).count(), 29)
+        self.conselho.progresso.refresh_from_db()
+        self.assertEqual(self.conselho.progresso.observacoes_preenchidas, 29)
+
+        # Reenvio idêntico não grava nada
+        with CaptureQueriesContext(connection) as consultas:
+            self.postar('Participativo')
+        self.assertFalse([q for q in consultas if q['sql'].startswith(('INSERT', 'UPDATE'))
+                          and 'observacaodocenteestudante' in q['sql']])
+
+        # Só a linha alterada é atualizada
+        dados = {f'observacao_{estudante.id}': 'Participativo' for estudante in self.estudantes}
+        dados[f'observacao_{self.estudantes[1].id}'] = 'Faltoso'
+        dados[f'observacao_napne_{self.estudantes[0].id}'] = 'Prova adaptada'
+        self.client.post(self.url, dados, secure=True)
+        self.assertEqual(
+            ObservacaoDocenteEstudante.objects.get(informacao_estudante__estudante=self.estudantes[1]).observacao,
+            'Faltoso'
+        )
+        self.conselho.progresso.refresh_from_db()
+        self.assertEqual(self.conselho.progresso.observacoes_preenchidas, 30)
+        self.assertEqual(self.conselho.progresso.observacoes_napne_preenchidas, 1)
+
+    def test_envio_concorrente_nao_perde_a_grade(self):
+        """Outra aba grava a mesma linha entre a leitura e o INSERT da grade"""
+        alvo = self.estudantes[1]
+
+        def outra_aba(execute, sql, params, many, context):
+            if sql.startswith('INSERT') and 'observacaodocenteestudante' in sql and not outra_aba.gravou:
+                outra_aba.gravou = True
+                informacao, _ = InformacaoEstudanteConselho.objects.get_or_create(
+                    conselho=self.conselho, estudante=alvo
+                )
+                ObservacaoDocenteEstudante.objects.create(
+                    informacao_estudante=informacao, docente=self.servidor,
+                    disciplina=self.disciplinas[0], observacao='Versão da outra aba', preenchido=True,
+                )
+            return execute(sql, params, many, context)
+        outra_aba.gravou = False
+
+        with connection.execute_wrapper(outra_aba):
+            self.assertEqual(self.postar('Participativo').status_code, 302)
+        self.assertTrue(outra_aba.gravou)
+        self.assertEqual(ObservacaoDocenteEstudante.objects.count(), 29)
+        self.assertEqual(
+            ObservacaoDocenteEstudante.objects.get(informacao_estudante__estudante=alvo).observacao,
+            'Participativo'
+        )
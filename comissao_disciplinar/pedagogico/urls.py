@@ -13,12 +13,14 @@ urlpatterns = [
     # Conselho de Classe - Gestão
     path('conselhos/', views.conselho_list, name='conselho_list'),
     path('conselhos/novo/', views.conselho_create, name='conselho_create'),
+    path('conselhos/abrir-lote/', views.conselho_abrir_lote, name='conselho_abrir_lote'),
     path('conselhos/<int:pk>/', views.conselho_detail, name='conselho_detail'),
     path('conselhos/<int:pk>/fechar/', views.conselho_fechar, name='conselho_fechar'),
     path('conselhos/<int:pk>/reabrir/', views.conselho_reabrir, name='conselho_reabrir'),
 
     # Conselho - Painel Unificado
     path('conselhos/<int:pk>/painel/', views.conselho_painel, name='conselho_painel'),
+    path('conselhos/<int:pk>/progresso/', views.conselho_progresso, name='conselho_progresso'),
 
     # Conselho - Docente
     path('conselhos/<int:pk>/assumir/<int:disciplina_turma_id>/',
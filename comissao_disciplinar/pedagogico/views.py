@@ -1,6 +1,8 @@
 # pedagogico/views.py
 
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import JsonResponse
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db.models import Q, Prefetch, Count
@@ -15,10 +17,15 @@ from .forms import (
     InformacaoEstudanteConselhoForm,
     ObservacaoDocenteEstudanteForm,
     ObservacaoDocenteTurmaForm,
-    DisciplinaTurmaForm
+    DisciplinaTurmaForm,
+    AbrirConselhosForm,
 )
-from core.models import Estudante, Turma, Servidor
+from core.models import Estudante, EventoLinhaTempo, Turma, Servidor
+from core.linha_tempo import pagina_linha_tempo
 from core.decorators import coordenacao_required
+from .abertura_conselhos import abrir_conselhos, criar_estrutura_conselho
+from .grade_observacoes import carregar_grade, salvar_grade
+from .progresso import obter_progresso, progresso_json
 
 
 # ========== DISCIPLINAS ==========
@@ -92,7 +99,7 @@ def conselho_create(request):
             conselho.save()
 
             # Criar estrutura inicial
-            _criar_estrutura_conselho(conselho)
+            criar_estrutura_conselho(conselho)
 
             messages.success(request, 'Conselho de Classe criado com sucesso!')
             return redirect('pedagogico:conselho_painel', pk=conselho.pk)
@@ -102,41 +109,29 @@ def conselho_create(request):
     return render(request, 'pedagogico/conselho_form.html', {'form': form})
 
 
-def _criar_estrutura_conselho(conselho):
-    """Cria estrutura inicial do conselho (estudantes e disciplinas)"""
-    # Pegar bimestre do período (ex: 2024.1 -> 1)
-    try:
-        bimestre = int(conselho.periodo.split('.')[-1])
-    except:
-        bimestre = 1
-
-    # Criar InformacaoEstudanteConselho para cada estudante
-    estudantes = conselho.turma.estudantes.filter(situacao='ATIVO')
-    for estudante in estudantes:
-        InformacaoEstudanteConselho.objects.get_or_create(
-            conselho=conselho,
-            estudante=estudante
-        )
-
-    # Pegar disciplinas ativas no bimestre
-    disciplinas = Disciplina.objects.filter(
-        curso=conselho.turma.curso,
-        ativa=True
-    )
+@login_required
+@coordenacao_required(['CDPD', 'CC', 'CGEN', 'DREP', 'DG'])
+def conselho_abrir_lote(request):
+    """Abre conselhos de classe para várias turmas de uma vez"""
+    if request.method == 'POST':
+        form = AbrirConselhosForm(request.POST)
+        if form.is_valid():
+            resultado = abrir_conselhos(
+                form.cleaned_data['turmas'],
+                [form.cleaned_data['periodo']],
+                form.cleaned_data['data_realizacao'],
+                criado_por=request.user.servidor,
+            )
+            messages.success(
+                request,
+                f"{resultado['conselhos_criados']} conselho(s) aberto(s); "
+                f"{resultado['conselhos_existentes']} já existia(m)."
+            )
+            return redirect(f"{reverse('pedagogico:conselho_list')}?periodo={form.cleaned_data['periodo']}")
+    else:
+        form = AbrirConselhosForm(initial={'turmas': Turma.objects.filter(ativa=True)})
 
-    # Filtrar por bimestre ativo
-    disciplinas_bimestre = [
-        d for d in disciplinas
-        if d.esta_ativa_no_bimestre(bimestre)
-    ]
-
-    # Criar ou pegar DisciplinaTurma
-    for disciplina in disciplinas_bimestre:
-        DisciplinaTurma.objects.get_or_create(
-            disciplina=disciplina,
-            turma=conselho.turma,
-            periodo=conselho.periodo
-        )
+    return render(request, 'pedagogico/conselho_abrir_lote.html', {'form': form})
 
 
 @login_required
@@ -146,29 +141,45 @@ def conselho_painel(request, pk):
         ConselhoClasse.objects.select_related('turma', 'turma__curso'),
         pk=pk
     )
-    servidor = request.user.servidor
 
     # Verificar permissão
-    eh_coordenacao = servidor.coordenacao in ['CDPD', 'CC', 'CGEN', 'DREP', 'DG']
-    eh_docente_turma = DisciplinaTurma.objects.filter(
-        turma=conselho.turma,
-        periodo=conselho.periodo,
-        docente=servidor
-    ).exists()
-
+    eh_coordenacao, eh_docente_turma = _perfil_no_conselho(request, conselho)
     if not (eh_coordenacao or eh_docente_turma or request.user.is_superuser):
         messages.error(request, 'Você não tem permissão para acessar este conselho.')
         return redirect('pedagogico:conselho_list')
 
-    # Pegar disciplinas do período
-    disciplinas_turma = DisciplinaTurma.objects.filter(
+    progresso = obter_progresso(conselho)
+
+    # Preenchimento por disciplina (perfil da turma + observações de estudantes)
+    perfis = set(
+        ObservacaoDocenteTurma.objects.filter(conselho=conselho).exclude(
+            observacao=''
+        ).values_list('disciplina_id', flat=True)
+    )
+    observacoes_por_disciplina = dict(
+        ObservacaoDocenteEstudante.objects.filter(
+            informacao_estudante__conselho=conselho, preenchido=True
+        ).values_list('disciplina_id').annotate(total=Count('id'))
+    )
+    disciplinas_turma = list(DisciplinaTurma.objects.filter(
         turma=conselho.turma,
         periodo=conselho.periodo
-    ).select_related('disciplina', 'docente')
+    ).select_related('disciplina', 'docente'))
+    for dt in disciplinas_turma:
+        dt.perfil_preenchido = dt.disciplina_id in perfis
+        dt.observacoes_preenchidas = observacoes_por_disciplina.get(dt.disciplina_id, 0)
 
-    # Pegar estudantes
+    # Estudantes com ficha NAPNE e observações preenchidas numa única query
     estudantes = conselho.turma.estudantes.filter(
         situacao='ATIVO'
+    ).select_related('ficha_napne').annotate(
+        observacoes_preenchidas=Count(
+            'informacaoestudanteconselho__observacoes_docentes',
+            filter=Q(
+                informacaoestudanteconselho__conselho=conselho,
+                informacaoestudanteconselho__observacoes_docentes__preenchido=True,
+            )
+        )
     ).order_by('nome')
 
     # Separar NAPNE e não-NAPNE
@@ -181,22 +192,6 @@ def conselho_painel(request, pk):
         else:
             estudantes_regulares.append(est)
 
-    # Estatísticas de preenchimento
-    total_disciplinas = disciplinas_turma.count()
-    total_estudantes = len(estudantes_napne) + len(estudantes_regulares)
-
-    # Observações de turma preenchidas
-    obs_turma_preenchidas = ObservacaoDocenteTurma.objects.filter(
-        conselho=conselho
-    ).count()
-
-    # Observações de estudantes NAPNE preenchidas
-    obs_napne_preenchidas = ObservacaoDocenteEstudante.objects.filter(
-        informacao_estudante__conselho=conselho,
-        informacao_estudante__estudante__in=estudantes_napne,
-        preenchido=True
-    ).count()
-
     context = {
         'conselho': conselho,
         'disciplinas_turma': disciplinas_turma,
@@ -204,15 +199,44 @@ def conselho_painel(request, pk):
         'estudantes_regulares': estudantes_regulares,
         'eh_coordenacao': eh_coordenacao,
         'eh_docente_turma': eh_docente_turma,
-        'total_disciplinas': total_disciplinas,
-        'total_estudantes': total_estudantes,
-        'obs_turma_preenchidas': obs_turma_preenchidas,
-        'obs_napne_preenchidas': obs_napne_preenchidas,
-        'total_obs_napne_esperadas': total_disciplinas * len(estudantes_napne),
+        'progresso': progresso,
+        'total_disciplinas': progresso.total_disciplinas,
+        'total_estudantes': progresso.total_estudantes,
+        'obs_turma_preenchidas': progresso.perfis_preenchidos,
+        'obs_napne_preenchidas': progresso.observacoes_napne_preenchidas,
+        'total_obs_napne_esperadas': progresso.observacoes_napne_esperadas,
     }
     return render(request, 'pedagogico/conselho_painel.html', context)
 
 
+@login_required
+def conselho_progresso(request, pk):
+    """Contadores de preenchimento em JSON (atualização do painel durante a reunião)"""
+    conselho = get_object_or_404(ConselhoClasse.objects.only('id', 'turma_id', 'periodo', 'aberto'), pk=pk)
+
+    eh_coordenacao, eh_docente_turma = _perfil_no_conselho(request, conselho)
+    if not (eh_coordenacao or eh_docente_turma or request.user.is_superuser):
+        return JsonResponse({'erro': 'Sem permissão'}, status=403)
+
+    dados = progresso_json(obter_progresso(conselho))
+    dados['aberto'] = conselho.aberto
+    return JsonResponse(dados)
+
+
+def _perfil_no_conselho(request, conselho):
+    """(eh_coordenacao, eh_docente_turma) do usuário logado"""
+    servidor = getattr(request.user, 'servidor', None)
+    if servidor is None:
+        return False, False
+    eh_coordenacao = servidor.coordenacao in ['CDPD', 'CC', 'CGEN', 'DREP', 'DG']
+    eh_docente_turma = DisciplinaTurma.objects.filter(
+        turma_id=conselho.turma_id,
+        periodo=conselho.periodo,
+        docente=servidor
+    ).exists()
+    return eh_coordenacao, eh_docente_turma
+
+
 @login_required
 def conselho_docente_assumir(request, pk, disciplina_turma_id):
     """Docente assume uma disciplina"""
@@ -295,7 +319,9 @@ def conselho_docente_preencher_turma(request, pk, disciplina_turma_id):
 def conselho_docente_preencher_estudantes(request, pk, disciplina_turma_id):
     """Docente preenche observações de todos os estudantes"""
     conselho = get_object_or_404(ConselhoClasse, pk=pk)
-    disciplina_turma = get_object_or_404(DisciplinaTurma, pk=disciplina_turma_id)
+    disciplina_turma = get_object_or_404(
+        DisciplinaTurma.objects.select_related('disciplina'), pk=disciplina_turma_id
+    )
     servidor = request.user.servidor
 
     # Verificar permissão
@@ -303,55 +329,16 @@ def conselho_docente_preencher_estudantes(request, pk, disciplina_turma_id):
         messages.error(request, 'Você não é o docente desta disciplina.')
         return redirect('pedagogico:conselho_painel', pk=pk)
 
-    # Pegar todos os estudantes ativos
-    estudantes = conselho.turma.estudantes.filter(situacao='ATIVO').order_by('nome')
-
-    # Preparar dados
-    dados_estudantes = []
-    for estudante in estudantes:
-        info_estudante, _ = InformacaoEstudanteConselho.objects.get_or_create(
-            conselho=conselho,
-            estudante=estudante
-        )
-
-        obs_docente, _ = ObservacaoDocenteEstudante.objects.get_or_create(
-            informacao_estudante=info_estudante,
-            docente=servidor,
-            disciplina=disciplina_turma.disciplina
-        )
-
-        eh_napne = hasattr(estudante, 'ficha_napne')
-
-        dados_estudantes.append({
-            'estudante': estudante,
-            'obs_docente': obs_docente,
-            'eh_napne': eh_napne,
-            'necessidade': estudante.ficha_napne.necessidade_especifica if eh_napne else None
-        })
+    disciplina = disciplina_turma.disciplina
 
     if request.method == 'POST':
-        # Processar todos os estudantes
-        salvos = 0
-        for dado in dados_estudantes:
-            obs = dado['obs_docente']
-            est_id = dado['estudante'].id
-
-            observacao = request.POST.get(f'observacao_{est_id}', '').strip()
-            observacao_napne = request.POST.get(f'observacao_napne_{est_id}', '').strip()
-
-            # Validação: observação geral é obrigatória
-            if not observacao:
-                continue
-
-            # Validação: observação NAPNE obrigatória se for NAPNE
-            if dado['eh_napne'] and not observacao_napne:
-                continue
-
-            obs.observacao = observacao
-            obs.observacao_napne = observacao_napne
-            obs.preenchido = True
-            obs.save()
-            salvos += 1
+        # Grava a grade inteira com bulk_create/bulk_update (só linhas alteradas)
+        valores = {}
+        for chave, observacao in request.POST.items():
+            est_id = chave.removeprefix('observacao_')
+            if est_id != chave and est_id.isdigit():
+                valores[int(est_id)] = (observacao, request.POST.get(f'observacao_napne_{est_id}', ''))
+        salvos = salvar_grade(conselho, servidor, disciplina, valores)['salvos']
 
         if salvos > 0:
             messages.success(request, f'{salvos} observação(ões) salva(s) com sucesso!')
@@ -360,6 +347,8 @@ def conselho_docente_preencher_estudantes(request, pk, disciplina_turma_id):
 
         return redirect('pedagogico:conselho_painel', pk=pk)
 
+    dados_estudantes = carregar_grade(conselho, servidor, disciplina)
+
     context = {
         'conselho': conselho,
         'disciplina_turma': disciplina_turma,
@@ -458,32 +447,18 @@ def ficha_aluno(request, matricula):
         messages.error(request, 'Você não tem permissão para visualizar esta ficha.')
         return redirect('core:estudante_list')
 
-    from atendimentos.models import Atendimento
-    from core.models import OcorrenciaRapida
-
-    ocorrencias = estudante.ocorrencias.all()
-    ocorrencias_rapidas = OcorrenciaRapida.objects.filter(estudantes=estudante)
-    atendimentos = Atendimento.objects.filter(
-        estudantes=estudante,
-        publicar_ficha_aluno=True
-    )
-
-    conselhos_info = InformacaoEstudanteConselho.objects.filter(
-        estudante=estudante
-    ).select_related('conselho').order_by('-conselho__data_realizacao')
-
-    total_ocorrencias = ocorrencias.count()
-    total_ocorrencias_rapidas = ocorrencias_rapidas.count()
-    total_atendimentos = atendimentos.count()
+    # Histórico de todos os módulos numa leitura paginada da linha do tempo
+    tipos = [tipo for tipo in request.GET.getlist('tipo') if tipo in dict(EventoLinhaTempo.TIPO_CHOICES)]
+    eventos, contagem = pagina_linha_tempo(estudante, request.GET.get('page'), tipos=tipos)
 
     context = {
         'estudante': estudante,
-        'ocorrencias': ocorrencias[:10],
-        'ocorrencias_rapidas': ocorrencias_rapidas[:10],
-        'atendimentos': atendimentos[:10],
-        'conselhos_info': conselhos_info,
-        'total_ocorrencias': total_ocorrencias,
-        'total_ocorrencias_rapidas': total_ocorrencias_rapidas,
-        'total_atendimentos': total_atendimentos,
+        'eventos': eventos,
+        'page_obj': eventos,
+        'tipos_evento': EventoLinhaTempo.TIPO_CHOICES,
+        'tipos_selecionados': tipos,
+        'total_ocorrencias': contagem.get('OCORRENCIA', 0),
+        'total_ocorrencias_rapidas': contagem.get('OCORRENCIA_RAPIDA', 0),
+        'total_atendimentos': contagem.get('ATENDIMENTO', 0) + contagem.get('ATENDIMENTO_NAPNE', 0),
     }
     return render(request, 'pedagogico/ficha_aluno.html', context)
\ No newline at end of file
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 23:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_indices_consultas'),
+        ('projetos', '0002_alter_projeto_tipo'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='projeto',
+            index=models.Index(fields=['situacao', 'proximo_relatorio'], name='projeto_situacao_relat_idx'),
+        ),
+    ]
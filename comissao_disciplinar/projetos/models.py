@@ -91,6 +91,10 @@ class Projeto(models.Model):
         verbose_name = 'Projeto de Extensão/Pesquisa'
         verbose_name_plural = 'Projetos de Extensão/Pesquisa'
         ordering = ['-data_inicio', 'titulo']
+        indexes = [
+            # Projetos ativos com relatório vencido/vencendo
+            models.Index(fields=['situacao', 'proximo_relatorio'], name='projeto_situacao_relat_idx'),
+        ]
         permissions = [
             ('coordenar_projetos', 'Pode coordenar projetos (Coord. Pesquisa/Extensão)'),
         ]
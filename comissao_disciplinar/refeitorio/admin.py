@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import ConfigRefeitorio, RegistroRefeicao, BloqueioAcesso
+from .models import ConfigRefeitorio, RegistroRefeicao, BloqueioAcesso, ResumoDiarioRefeicao
 
 @admin.register(ConfigRefeitorio)
 class ConfigRefeitorioAdmin(admin.ModelAdmin):
@@ -16,4 +16,9 @@ class RegistroRefeicaoAdmin(admin.ModelAdmin):
 @admin.register(BloqueioAcesso)
 class BloqueioAcessoAdmin(admin.ModelAdmin):
     list_display = ['__str__', 'data_inicio', 'data_fim', 'ativo']
-    list_filter = ['ativo', 'data_inicio']
\ No newline at end of file
+    list_filter = ['ativo', 'data_inicio']
+@admin.register(ResumoDiarioRefeicao)
+class ResumoDiarioRefeicaoAdmin(admin.ModelAdmin):
+    list_display = ['data', 'tipo_refeicao', 'turma', 'tipo_pessoa', 'quantidade']
+    list_filter = ['tipo_refeicao', 'tipo_pessoa']
+    date_hierarchy = 'data'
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class RefeitorioConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'refeitorio'
+
+    def ready(self):
+        import refeitorio.signals  # Importar signals
@@ -0,0 +1,35 @@
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from refeitorio.services import reconstruir_resumo
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói o resumo diário de refeições a partir dos registros'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--inicio',
+            type=str,
+            help='Data inicial (YYYY-MM-DD). Padrão: todo o histórico',
+        )
+        parser.add_argument(
+            '--fim',
+            type=str,
+            help='Data final (YYYY-MM-DD). Padrão: todo o histórico',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            inicio = datetime.strptime(options['inicio'], '%Y-%m-%d').date() if options['inicio'] else None
+            fim = datetime.strptime(options['fim'], '%Y-%m-%d').date() if options['fim'] else None
+        except ValueError:
+            raise CommandError('Datas devem estar no formato YYYY-MM-DD')
+
+        self.stdout.write("\n" + "=" * 70)
+        self.stdout.write(self.style.SUCCESS("🍽️  RECONSTRUÇÃO DO RESUMO DIÁRIO DO REFEITÓRIO"))
+        self.stdout.write("=" * 70 + "\n")
+        self.stdout.write(f"Período: {inicio or 'início'} → {fim or 'hoje'}")
+
+        linhas = reconstruir_resumo(inicio, fim)
+
+        self.stdout.write(self.style.SUCCESS(f"\n✅ {linhas} linhas de resumo gravadas\n"))
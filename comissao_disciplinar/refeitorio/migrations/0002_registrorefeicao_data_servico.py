@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_parecermembro'),
+        ('refeitorio', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registrorefeicao',
+            name='data_servico',
+            field=models.DateField(blank=True, help_text='Dia (horário local) da refeição. Garante um registro por pessoa, refeição e dia.', null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='registrorefeicao',
+            constraint=models.UniqueConstraint(fields=('estudante', 'tipo_refeicao', 'data_servico'), name='unique_refeicao_estudante_dia'),
+        ),
+        migrations.AddConstraint(
+            model_name='registrorefeicao',
+            constraint=models.UniqueConstraint(fields=('servidor', 'tipo_refeicao', 'data_servico'), name='unique_refeicao_servidor_dia'),
+        ),
+    ]
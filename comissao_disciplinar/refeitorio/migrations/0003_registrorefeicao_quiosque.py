@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:12
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('refeitorio', '0002_registrorefeicao_data_servico'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registrorefeicao',
+            name='quiosque',
+            field=models.CharField(blank=True, help_text='Identificador do totem (registros enviados em lote)', max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='registrorefeicao',
+            name='data_hora',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
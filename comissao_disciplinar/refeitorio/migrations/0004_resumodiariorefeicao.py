@@ -0,0 +1,62 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def popular_resumo(apps, schema_editor):
+    """Gera o resumo a partir dos registros já existentes"""
+    RegistroRefeicao = apps.get_model('refeitorio', 'RegistroRefeicao')
+    ResumoDiarioRefeicao = apps.get_model('refeitorio', 'ResumoDiarioRefeicao')
+
+    registros = RegistroRefeicao.objects.annotate(dia=TruncDate('data_hora'))
+    resumos = [
+        ResumoDiarioRefeicao(
+            data=item['dia'], tipo_refeicao=item['tipo_refeicao'],
+            turma_id=item['estudante__turma'], tipo_pessoa='ESTUDANTE', quantidade=item['total'],
+        )
+        for item in registros.filter(estudante__isnull=False).values(
+            'dia', 'tipo_refeicao', 'estudante__turma'
+        ).annotate(total=Count('id')).order_by()
+    ]
+    resumos += [
+        ResumoDiarioRefeicao(
+            data=item['dia'], tipo_refeicao=item['tipo_refeicao'],
+            tipo_pessoa='SERVIDOR', quantidade=item['total'],
+        )
+        for item in registros.filter(servidor__isnull=False).values(
+            'dia', 'tipo_refeicao'
+        ).annotate(total=Count('id')).order_by()
+    ]
+    ResumoDiarioRefeicao.objects.bulk_create(resumos, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_parecermembro'),
+        ('refeitorio', '0003_registrorefeicao_quiosque'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoDiarioRefeicao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField()),
+                ('tipo_refeicao', models.CharField(max_length=20)),
+                ('tipo_pessoa', models.CharField(choices=[('ESTUDANTE', 'Estudante'), ('SERVIDOR', 'Servidor')], max_length=10)),
+                ('quantidade', models.PositiveIntegerField(default=0)),
+                ('turma', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='resumos_refeitorio', to='core.turma')),
+            ],
+            options={
+                'verbose_name': 'Resumo Diário de Refeições',
+                'verbose_name_plural': 'Resumos Diários de Refeições',
+                'ordering': ['-data', 'tipo_refeicao'],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('turma__isnull', False)), fields=('data', 'tipo_refeicao', 'turma', 'tipo_pessoa'), name='unique_resumo_refeicao_turma'), models.UniqueConstraint(condition=models.Q(('turma__isnull', True)), fields=('data', 'tipo_refeicao', 'tipo_pessoa'), name='unique_resumo_refeicao_sem_turma')],
+            },
+        ),
+        migrations.RunPython(popular_resumo, migrations.RunPython.noop),
+    ]
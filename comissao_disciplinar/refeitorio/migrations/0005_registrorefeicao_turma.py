@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def popular_turma(apps, schema_editor):
+    """Preenche a turma dos registros existentes com a turma atual do estudante (a mesma usada pela 0004)"""
+    RegistroRefeicao = apps.get_model('refeitorio', 'RegistroRefeicao')
+    Estudante = apps.get_model('core', 'Estudante')
+
+    RegistroRefeicao.objects.filter(estudante__isnull=False).update(
+        turma_id=Subquery(Estudante.objects.filter(pk=OuterRef('estudante_id')).values('turma_id')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_parecermembro'),
+        ('refeitorio', '0004_resumodiariorefeicao'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registrorefeicao',
+            name='turma',
+            field=models.ForeignKey(blank=True, help_text='Turma do estudante no check-in (chave do resumo diário)', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='refeicoes', to='core.turma'),
+        ),
+        migrations.RunPython(popular_turma, migrations.RunPython.noop),
+    ]
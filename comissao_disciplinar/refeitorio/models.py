@@ -2,7 +2,7 @@ from django.db import models
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from auditlog.registry import auditlog
-from core.models import Estudante, Servidor
+from core.models import Estudante, Servidor, Turma
 
 
 class ConfigRefeitorio(models.Model):
@@ -54,13 +54,31 @@ class RegistroRefeicao(models.Model):
         blank=True,
         related_name='refeicoes'
     )
+    turma = models.ForeignKey(
+        Turma,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='refeicoes',
+        help_text="Turma do estudante no check-in (chave do resumo diário)"
+    )
 
     tipo_refeicao = models.CharField(max_length=20)
-    data_hora = models.DateTimeField(auto_now_add=True)
+    data_hora = models.DateTimeField(default=timezone.now)
+    data_servico = models.DateField(
+        null=True,
+        blank=True,
+        help_text="Dia (horário local) da refeição. Garante um registro por pessoa, refeição e dia."
+    )
 
     # Dados extras para auditoria
     codigo_barras_usado = models.CharField(max_length=50, blank=True)
     ip_acesso = models.GenericIPAddressField(null=True, blank=True)
+    quiosque = models.CharField(
+        max_length=50,
+        blank=True,
+        help_text="Identificador do totem (registros enviados em lote)"
+    )
 
     class Meta:
         verbose_name = "Registro de Refeição"
@@ -70,6 +88,16 @@ class RegistroRefeicao(models.Model):
             models.Index(fields=['data_hora', 'estudante']),
             models.Index(fields=['data_hora', 'servidor']),
         ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['estudante', 'tipo_refeicao', 'data_servico'],
+                name='unique_refeicao_estudante_dia'
+            ),
+            models.UniqueConstraint(
+                fields=['servidor', 'tipo_refeicao', 'data_servico'],
+                name='unique_refeicao_servidor_dia'
+            ),
+        ]
 
     def __str__(self):
         pessoa = self.estudante or self.servidor
@@ -83,6 +111,12 @@ class RegistroRefeicao(models.Model):
         if self.estudante and self.servidor:
             raise ValidationError('Não pode informar ambos estudante e servidor.')
 
+    def save(self, *args, **kwargs):
+        # Fixa a turma do check-in: trocar o estudante de turma não move refeições já servidas
+        if self.estudante_id and self.turma_id is None and not self.pk:
+            self.turma_id = self.estudante.turma_id
+        super().save(*args, **kwargs)
+
     @property
     def pessoa(self):
         """Retorna o objeto pessoa (estudante ou servidor)"""
@@ -138,16 +172,61 @@ class BloqueioAcesso(models.Model):
         if self.estudante and self.servidor:
             raise ValidationError('Não pode informar ambos.')
 
-    def esta_ativo(self):
-        """Verifica se o bloqueio está vigente"""
+    def esta_ativo(self, data=None):
+        """Verifica se o bloqueio está vigente (hoje ou na data informada)"""
         if not self.ativo:
             return False
-        hoje = timezone.now().date()
+        hoje = data or timezone.now().date()
         if self.data_fim:
             return self.data_inicio <= hoje <= self.data_fim
         return self.data_inicio <= hoje
 
 
+class ResumoDiarioRefeicao(models.Model):
+    """
+    Totais pré-agregados por dia × refeição × turma × tipo de pessoa
+
+    Mantido a cada registro (ver refeitorio.services.acumular_resumo) e
+    reconstruído pelo comando reconstruir_resumo_refeitorio.
+    """
+    TIPO_PESSOA_CHOICES = [
+        ('ESTUDANTE', 'Estudante'),
+        ('SERVIDOR', 'Servidor'),
+    ]
+
+    data = models.DateField()
+    tipo_refeicao = models.CharField(max_length=20)
+    turma = models.ForeignKey(
+        Turma,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='resumos_refeitorio'
+    )
+    tipo_pessoa = models.CharField(max_length=10, choices=TIPO_PESSOA_CHOICES)
+    quantidade = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Resumo Diário de Refeições"
+        verbose_name_plural = "Resumos Diários de Refeições"
+        ordering = ['-data', 'tipo_refeicao']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['data', 'tipo_refeicao', 'turma', 'tipo_pessoa'],
+                condition=models.Q(turma__isnull=False),
+                name='unique_resumo_refeicao_turma'
+            ),
+            models.UniqueConstraint(
+                fields=['data', 'tipo_refeicao', 'tipo_pessoa'],
+                condition=models.Q(turma__isnull=True),
+                name='unique_resumo_refeicao_sem_turma'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.data:%d/%m/%Y} - {self.tipo_refeicao} - {self.get_tipo_pessoa_display()}: {self.quantidade}"
+
+
 # Registrar no auditlog
 auditlog.register(RegistroRefeicao)
 auditlog.register(ConfigRefeitorio)
@@ -0,0 +1,567 @@
+"""
+Serviços do refeitório
+
+Estruturas em memória usadas pelo totem de check-in: índice de
+identificação e controle de refeições já servidas.
+"""
+import logging
+import threading
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction, IntegrityError
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.models import Estudante, Servidor
+from core.utils_cache import incrementar_versao, obter_versao
+from .models import BloqueioAcesso, ConfigRefeitorio, RegistroRefeicao, ResumoDiarioRefeicao
+
+logger = logging.getLogger(__name__)
+
+
+CHAVE_VERSAO_INDICE = 'refeitorio:indice_identidade:versao'
+CHAVE_VERSAO_CONFIG = 'refeitorio:config:versao'
+CHAVE_VERSAO_REGISTROS = 'refeitorio:registros:versao'
+
+
+# ====================
+# ÍNDICE DE IDENTIFICAÇÃO
+# ====================
+
+
+def normalizar_codigo(codigo):
+    """Remove espaços e formatação (. - /) de matrícula, CPF ou SIAPE"""
+    if not codigo:
+        return ''
+    return str(codigo).strip().replace('.', '').replace('-', '').replace('/', '')
+
+
+class IndiceIdentidade:
+    """
+    Índice por processo: código de barras normalizado → pessoa e bloqueios.
+
+    A versão fica no cache compartilhado, assim uma alteração feita em
+    qualquer worker invalida o índice de todos os outros.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versao = None
+        self._estudantes = {}
+        self._servidores = {}
+        self._bloqueios = {}
+
+    def invalidar(self):
+        """Marca o índice como desatualizado em todos os processos"""
+        incrementar_versao(CHAVE_VERSAO_INDICE)
+
+    def _carregar(self, versao):
+        estudantes = {}
+        servidores = {}
+        bloqueios = {}
+
+        for estudante in Estudante.objects.select_related('turma__curso'):
+            for codigo in (estudante.matricula_sga, estudante.cpf):
+                chave = normalizar_codigo(codigo)
+                if chave:
+                    estudantes.setdefault(chave, estudante)
+
+        for servidor in Servidor.objects.all():
+            chave = normalizar_codigo(servidor.siape)
+            if chave:
+                servidores.setdefault(chave, servidor)
+
+        for bloqueio in BloqueioAcesso.objects.filter(ativo=True).order_by('-criado_em'):
+            if bloqueio.estudante_id:
+                bloqueios.setdefault(('estudante', bloqueio.estudante_id), []).append(bloqueio)
+            elif bloqueio.servidor_id:
+                bloqueios.setdefault(('servidor', bloqueio.servidor_id), []).append(bloqueio)
+
+        self._estudantes = estudantes
+        self._servidores = servidores
+        self._bloqueios = bloqueios
+        self._versao = versao
+        logger.info(
+            f"Índice do refeitório carregado: {len(estudantes)} códigos de estudantes, "
+            f"{len(servidores)} de servidores, {len(bloqueios)} pessoas bloqueadas"
+        )
+
+    def _garantir_atualizado(self):
+        versao = obter_versao(CHAVE_VERSAO_INDICE)
+        if self._versao == versao:
+            return
+        with self._lock:
+            if self._versao != versao:
+                self._carregar(versao)
+
+    def buscar_pessoa(self, codigo):
+        """
+        Resolve o código lido no totem
+
+        Returns:
+            tuple: (pessoa, tipo_pessoa) ou (None, None)
+        """
+        chave = normalizar_codigo(codigo)
+        if not chave:
+            return None, None
+
+        self._garantir_atualizado()
+
+        estudante = self._estudantes.get(chave)
+        if estudante:
+            return estudante, 'estudante'
+        servidor = self._servidores.get(chave)
+        if servidor:
+            return servidor, 'servidor'
+        return None, None
+
+    def bloqueio_vigente(self, pessoa, tipo_pessoa, data=None):
+        """Retorna o bloqueio vigente da pessoa (hoje ou na data), se houver"""
+        self._garantir_atualizado()
+        for bloqueio in self._bloqueios.get((tipo_pessoa, pessoa.pk), []):
+            if bloqueio.esta_ativo(data):
+                return bloqueio
+        return None
+
+
+indice_identidade = IndiceIdentidade()
+
+
+# ====================
+# CONTROLE DE REFEIÇÕES SERVIDAS
+# ====================
+
+class ControleRefeicoes:
+    """
+    Conjunto por processo das pessoas que já comeram na janela atual.
+
+    A janela é (tipo de refeição, dia). O conjunto é carregado do banco
+    quando a janela abre neste processo e atualizado a cada registro.
+    Registros feitos por outros workers são barrados pela constraint
+    única de RegistroRefeicao (tipo_refeicao, data_servico).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versao_config = None
+        self._configs = []
+        self._janela = None
+        self._consumidos = set()
+
+    # --- Configurações (horários) ---
+    def invalidar_configuracoes(self):
+        """Força recarregar os horários em todos os processos"""
+        incrementar_versao(CHAVE_VERSAO_CONFIG)
+
+    def config_atual(self, agora=None):
+        """Retorna a ConfigRefeitorio ativa no horário informado"""
+        versao = obter_versao(CHAVE_VERSAO_CONFIG)
+        if self._versao_config != versao:
+            with self._lock:
+                if self._versao_config != versao:
+                    self._configs = list(ConfigRefeitorio.objects.filter(ativo=True))
+                    self._versao_config = versao
+
+        agora = timezone.localtime(agora or timezone.now())
+        horario = agora.time()
+        for config in self._configs:
+            if config.horario_inicio <= horario <= config.horario_fim:
+                return config
+        return None
+
+    # --- Refeições servidas ---
+    def invalidar_registros(self):
+        """Força recarregar a janela (ex.: registro excluído pelo admin)"""
+        incrementar_versao(CHAVE_VERSAO_REGISTROS)
+
+    def _garantir_janela(self, tipo_refeicao, data):
+        janela = (tipo_refeicao, data, obter_versao(CHAVE_VERSAO_REGISTROS))
+        if self._janela == janela:
+            return
+        with self._lock:
+            if self._janela == janela:
+                return
+            consumidos = set()
+            registros = RegistroRefeicao.objects.filter(
+                tipo_refeicao=tipo_refeicao,
+                data_hora__date=data
+            ).values_list('estudante_id', 'servidor_id')
+            for estudante_id, servidor_id in registros:
+                if estudante_id:
+                    consumidos.add(('estudante', estudante_id))
+                elif servidor_id:
+                    consumidos.add(('servidor', servidor_id))
+            self._consumidos = consumidos
+            self._janela = janela
+
+    def ja_comeu(self, pessoa, tipo_pessoa, tipo_refeicao, data):
+        """Verifica se a pessoa já tem registro nesta refeição e dia"""
+        self._garantir_janela(tipo_refeicao, data)
+        return (tipo_pessoa, pessoa.pk) in self._consumidos
+
+    def consumidos_em(self, janelas):
+        """
+        Pessoas que já comeram nas janelas informadas
+
+        Usa o conjunto em memória para a janela atual e uma única consulta
+        para as demais (registros offline de outras refeições/dias).
+
+        Returns:
+            set: {(tipo_refeicao, data, tipo_pessoa, pk)}
+        """
+        consumidos = set()
+        outras = set()
+        for tipo_refeicao, data in janelas:
+            if self.janela_atual_inclui(tipo_refeicao, data):
+                consumidos.update((tipo_refeicao, data) + chave for chave in self._consumidos)
+            else:
+                outras.add((tipo_refeicao, data))
+
+        if outras:
+            registros = RegistroRefeicao.objects.filter(
+                tipo_refeicao__in={tipo for tipo, _ in outras},
+                data_hora__date__in={data for _, data in outras}
+            ).annotate(
+                dia=TruncDate('data_hora')
+            ).values_list('tipo_refeicao', 'dia', 'estudante_id', 'servidor_id')
+            for tipo_refeicao, dia, estudante_id, servidor_id in registros:
+                if estudante_id:
+                    consumidos.add((tipo_refeicao, dia, 'estudante', estudante_id))
+                elif servidor_id:
+                    consumidos.add((tipo_refeicao, dia, 'servidor', servidor_id))
+        return consumidos
+
+    def janela_atual_inclui(self, tipo_refeicao, data):
+        """Indica se (refeição, dia) é a janela já carregada neste processo"""
+        return bool(self._janela) and self._janela[:2] == (tipo_refeicao, data)
+
+    def marcar(self, pessoa, tipo_pessoa, tipo_refeicao, data):
+        """Inclui a pessoa no conjunto após um registro bem-sucedido"""
+        self._garantir_janela(tipo_refeicao, data)
+        self._consumidos.add((tipo_pessoa, pessoa.pk))
+
+
+controle_refeicoes = ControleRefeicoes()
+
+
+# ====================
+# CHECK-IN EM LOTE (TOTEM OFFLINE)
+# ====================
+
+TOLERANCIA_RELOGIO_TOTEM = timedelta(minutes=5)
+
+
+def _idade_maxima_lote():
+    """Leituras offline mais antigas que isto são recusadas (endpoint público)"""
+    return timedelta(hours=getattr(settings, 'REFEITORIO_LOTE_IDADE_MAXIMA', 48))
+
+
+def _interpretar_data_hora(valor):
+    """Converte o timestamp ISO 8601 enviado pelo totem"""
+    if not valor:
+        return None
+    try:
+        data_hora = parse_datetime(str(valor))
+    except ValueError:
+        return None
+    if data_hora and timezone.is_naive(data_hora):
+        data_hora = timezone.make_aware(data_hora)
+    return data_hora
+
+
+def registrar_checkins_em_lote(itens, ip_acesso=None):
+    """
+    Valida e registra check-ins capturados offline pelos totens
+
+    Aplica as mesmas regras de validar_checkin (cadastro, bloqueio,
+    horário e refeição já realizada) no horário de cada leitura e grava
+    os válidos com um único bulk_create. Leituras mais antigas que
+    REFEITORIO_LOTE_IDADE_MAXIMA horas são recusadas.
+
+    Args:
+        itens: lista de dicts com 'barcode', 'timestamp' e 'quiosque'
+        ip_acesso: IP de quem enviou o lote
+
+    Returns:
+        list: um dict de resultado por item, na ordem recebida
+    """
+    agora = timezone.now()
+    mais_antiga = agora - _idade_maxima_lote()
+    resultados = []
+    pendentes = []
+
+    for posicao, item in enumerate(itens):
+        if not isinstance(item, dict):
+            item = {}
+        barcode = str(item.get('barcode') or '').strip()
+        quiosque = str(item.get('quiosque') or item.get('kiosk') or '')[:50]
+        resultado = {'indice': posicao, 'barcode': barcode, 'quiosque': quiosque, 'status': 'erro'}
+        resultados.append(resultado)
+
+        data_hora = _interpretar_data_hora(item.get('timestamp'))
+        if not barcode or not data_hora or data_hora > agora + TOLERANCIA_RELOGIO_TOTEM:
+            resultado['mensagem'] = 'Código ou horário inválido'
+            continue
+        if data_hora < mais_antiga:
+            resultado['mensagem'] = 'Leitura antiga demais'
+            continue
+
+        pessoa, tipo_pessoa = indice_identidade.buscar_pessoa(barcode)
+        if not pessoa:
+            resultado['mensagem'] = 'Não cadastrado'
+            continue
+        resultado['nome'] = pessoa.nome
+
+        local = timezone.localtime(data_hora)
+        bloqueio = indice_identidade.bloqueio_vigente(pessoa, tipo_pessoa, local.date())
+        if bloqueio:
+            resultado['mensagem'] = 'ACESSO BLOQUEADO'
+            continue
+
+        config = controle_refeicoes.config_atual(local)
+        if not config:
+            resultado['mensagem'] = 'Fora do horário'
+            continue
+
+        pendentes.append((resultado, pessoa, tipo_pessoa, config, local, barcode, quiosque))
+
+    # Refeição já realizada: banco/memória + duplicados dentro do próprio lote
+    consumidos = controle_refeicoes.consumidos_em(
+        {(config.nome, local.date()) for _, _, _, config, local, _, _ in pendentes}
+    )
+    novos = []
+    for resultado, pessoa, tipo_pessoa, config, local, barcode, quiosque in pendentes:
+        chave = (config.nome, local.date(), tipo_pessoa, pessoa.pk)
+        if chave in consumidos:
+            resultado['mensagem'] = 'Já realizou esta refeição'
+            continue
+        consumidos.add(chave)
+
+        resultado['tipo_refeicao'] = config.get_nome_display()
+        novos.append((resultado, pessoa, tipo_pessoa, RegistroRefeicao(
+            **{tipo_pessoa: pessoa},
+            turma_id=pessoa.turma_id if tipo_pessoa == 'estudante' else None,
+            tipo_refeicao=config.nome,
+            data_hora=local,
+            data_servico=local.date(),
+            codigo_barras_usado=barcode[:50],
+            ip_acesso=ip_acesso,
+            quiosque=quiosque,
+        )))
+
+    if not novos:
+        return resultados
+
+    try:
+        with transaction.atomic():
+            RegistroRefeicao.objects.bulk_create([registro for _, _, _, registro in novos])
+        gravados = novos
+        # bulk_create não dispara post_save: resumo atualizado aqui
+        acumular_resumo([registro for _, _, _, registro in novos])
+    except IntegrityError:
+        # Outro worker registrou alguém do lote no meio tempo: grava um a um
+        logger.warning("Conflito no check-in em lote; gravando itens individualmente")
+        gravados = []
+        for novo in novos:
+            resultado, pessoa, tipo_pessoa, registro = novo
+            try:
+                with transaction.atomic():
+                    registro.save()
+                gravados.append(novo)
+            except IntegrityError:
+                resultado['mensagem'] = 'Já realizou esta refeição'
+
+    for resultado, pessoa, tipo_pessoa, registro in gravados:
+        resultado['status'] = 'ok'
+        resultado['mensagem'] = 'Refeição registrada'
+
+    # Conflitos também entram no conjunto: a pessoa comeu de qualquer forma
+    for resultado, pessoa, tipo_pessoa, registro in novos:
+        if controle_refeicoes.janela_atual_inclui(registro.tipo_refeicao, registro.data_servico):
+            controle_refeicoes.marcar(pessoa, tipo_pessoa, registro.tipo_refeicao, registro.data_servico)
+
+    return resultados
+
+
+# ====================
+# FEED AO VIVO (TOTEM E DASHBOARD)
+# ====================
+
+MAXIMO_EVENTOS_FEED = 50
+
+
+def contadores_do_dia(data=None):
+    """
+    Contadores por tipo de refeição, lidos do ResumoDiarioRefeicao (1 query)
+
+    Returns:
+        dict: total, estudantes, servidores e por_tipo {tipo: {...}}
+    """
+    data = data or timezone.localdate()
+    valores = {
+        (item['tipo_refeicao'], item['tipo_pessoa']): item['total']
+        for item in ResumoDiarioRefeicao.objects.filter(data=data).values(
+            'tipo_refeicao', 'tipo_pessoa'
+        ).annotate(total=Sum('quantidade')).order_by()
+    }
+
+    por_tipo = {}
+    for tipo, nome in ConfigRefeitorio.TIPO_REFEICAO_CHOICES:
+        estudantes = valores.get((tipo, 'ESTUDANTE'), 0)
+        servidores = valores.get((tipo, 'SERVIDOR'), 0)
+        por_tipo[tipo] = {
+            'nome': nome,
+            'estudantes': estudantes,
+            'servidores': servidores,
+            'total': estudantes + servidores,
+        }
+
+    return {
+        'data': data.isoformat(),
+        'total': sum(item['total'] for item in por_tipo.values()),
+        'estudantes': sum(item['estudantes'] for item in por_tipo.values()),
+        'servidores': sum(item['servidores'] for item in por_tipo.values()),
+        'por_tipo': por_tipo,
+    }
+
+
+def _evento_checkin(registro, completo):
+    local = timezone.localtime(registro.data_hora)
+    evento = {
+        'id': registro.pk,
+        'tipo_pessoa': 'Estudante' if registro.estudante_id else 'Servidor',
+        'tipo_refeicao': registro.tipo_refeicao,
+        'tipo_refeicao_display': dict(ConfigRefeitorio.TIPO_REFEICAO_CHOICES).get(
+            registro.tipo_refeicao, registro.tipo_refeicao
+        ),
+        'data': local.date().isoformat(),
+        'horario': local.strftime('%H:%M:%S'),
+    }
+    if completo:
+        estudante = registro.estudante
+        evento['nome'] = registro.pessoa.nome if registro.pessoa else ''
+        evento['turma'] = estudante.turma.nome if estudante and estudante.turma_id else ''
+    return evento
+
+
+def ultimo_checkin_id():
+    """Maior id de RegistroRefeicao (ponto de partida do feed)"""
+    return RegistroRefeicao.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+
+
+def checkins_desde(ultimo_id, completo=False):
+    """
+    Registros gravados depois de ultimo_id, em ordem (no máximo 50)
+
+    Sem `completo` (totem), o evento não traz nome nem turma.
+    """
+    registros = RegistroRefeicao.objects.filter(pk__gt=ultimo_id).order_by('pk')
+    if completo:
+        registros = registros.select_related('estudante__turma', 'servidor')
+    return [_evento_checkin(registro, completo) for registro in registros[:MAXIMO_EVENTOS_FEED]]
+
+
+# ====================
+# RESUMO DIÁRIO (RELATÓRIOS)
+# ====================
+
+def _chave_resumo(registro):
+    data = registro.data_servico or timezone.localtime(registro.data_hora).date()
+    if registro.estudante_id:
+        return (data, registro.tipo_refeicao, registro.turma_id, 'ESTUDANTE')
+    return (data, registro.tipo_refeicao, None, 'SERVIDOR')
+
+
+def acumular_resumo(registros, sinal=1):
+    """
+    Soma (ou subtrai, com sinal=-1) os registros no ResumoDiarioRefeicao
+
+    Agrupa os registros por chave e faz um UPDATE por grupo; cria a linha
+    quando ainda não existe.
+    """
+    contagem = Counter(_chave_resumo(registro) for registro in registros)
+    for (data, tipo_refeicao, turma_id, tipo_pessoa), quantidade in contagem.items():
+        linhas = ResumoDiarioRefeicao.objects.filter(
+            data=data,
+            tipo_refeicao=tipo_refeicao,
+            turma_id=turma_id,
+            tipo_pessoa=tipo_pessoa,
+        )
+        if sinal < 0:
+            linhas.filter(quantidade__gte=quantidade).update(quantidade=F('quantidade') - quantidade)
+            continue
+        if linhas.update(quantidade=F('quantidade') + quantidade):
+            continue
+        try:
+            with transaction.atomic():
+                ResumoDiarioRefeicao.objects.create(
+                    data=data,
+                    tipo_refeicao=tipo_refeicao,
+                    turma_id=turma_id,
+                    tipo_pessoa=tipo_pessoa,
+                    quantidade=quantidade,
+                )
+        except IntegrityError:
+            # Criada por outro worker entre o UPDATE e o INSERT
+            linhas.update(quantidade=F('quantidade') + quantidade)
+
+
+def agregar_resumos(registros):
+    """
+    Calcula as linhas de resumo a partir de um queryset de RegistroRefeicao
+
+    Returns:
+        list: instâncias não salvas de ResumoDiarioRefeicao
+    """
+    registros = registros.annotate(dia=TruncDate('data_hora'))
+    resumos = [
+        ResumoDiarioRefeicao(
+            data=item['dia'],
+            tipo_refeicao=item['tipo_refeicao'],
+            turma_id=item['turma'],
+            tipo_pessoa='ESTUDANTE',
+            quantidade=item['total'],
+        )
+        for item in registros.filter(estudante__isnull=False).values(
+            'dia', 'tipo_refeicao', 'turma'
+        ).annotate(total=Count('id')).order_by()
+    ]
+    resumos += [
+        ResumoDiarioRefeicao(
+            data=item['dia'],
+            tipo_refeicao=item['tipo_refeicao'],
+            tipo_pessoa='SERVIDOR',
+            quantidade=item['total'],
+        )
+        for item in registros.filter(servidor__isnull=False).values(
+            'dia', 'tipo_refeicao'
+        ).annotate(total=Count('id')).order_by()
+    ]
+    return resumos
+
+
+@transaction.atomic
+def reconstruir_resumo(data_inicio=None, data_fim=None):
+    """
+    Recalcula o ResumoDiarioRefeicao a partir dos registros brutos
+
+    Returns:
+        int: quantidade de linhas de resumo gravadas
+    """
+    registros = RegistroRefeicao.objects.all()
+    resumos = ResumoDiarioRefeicao.objects.all()
+    if data_inicio:
+        registros = registros.filter(data_hora__date__gte=data_inicio)
+        resumos = resumos.filter(data__gte=data_inicio)
+    if data_fim:
+        registros = registros.filter(data_hora__date__lte=data_fim)
+        resumos = resumos.filter(data__lte=data_fim)
+
+    resumos.delete()
+    novos = agregar_resumos(registros)
+    ResumoDiarioRefeicao.objects.bulk_create(novos, batch_size=1000)
+    return len(novos)
@@ -0,0 +1,40 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from core.models import Estudante, Servidor, Turma
+from .models import BloqueioAcesso, ConfigRefeitorio, RegistroRefeicao
+from .services import (
+    indice_identidade, controle_refeicoes, acumular_resumo,
+)
+
+
+@receiver(post_save, sender=Estudante)
+@receiver(post_delete, sender=Estudante)
+@receiver(post_save, sender=Servidor)
+@receiver(post_delete, sender=Servidor)
+@receiver(post_save, sender=Turma)
+@receiver(post_save, sender=BloqueioAcesso)
+@receiver(post_delete, sender=BloqueioAcesso)
+def invalidar_indice_identidade(sender, instance, **kwargs):
+    """Invalida o índice do totem quando pessoas ou bloqueios mudam"""
+    indice_identidade.invalidar()
+
+
+@receiver(post_save, sender=ConfigRefeitorio)
+@receiver(post_delete, sender=ConfigRefeitorio)
+def invalidar_configuracoes_refeitorio(sender, instance, **kwargs):
+    """Recarrega os horários das refeições no totem"""
+    controle_refeicoes.invalidar_configuracoes()
+
+
+@receiver(post_delete, sender=RegistroRefeicao)
+def invalidar_refeicoes_servidas(sender, instance, **kwargs):
+    """Registro excluído: a pessoa pode voltar a registrar a refeição"""
+    controle_refeicoes.invalidar_registros()
+    acumular_resumo([instance], sinal=-1)
+
+
+@receiver(post_save, sender=RegistroRefeicao)
+def publicar_registro_refeicao(sender, instance, created, **kwargs):
+    """Novo check-in: atualiza o resumo diário (fonte dos contadores)"""
+    if created:
+        acumular_resumo([instance])
@@ -1,3 +1,310 @@
-from django.test import TestCase
+import json
+from datetime import time, timedelta
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.contrib.auth.models import User
+from core.models import Campus, Curso, Turma, Estudante, Servidor
+from .models import BloqueioAcesso, ConfigRefeitorio, RegistroRefeicao, ResumoDiarioRefeicao
+from .services import (
+    indice_identidade, controle_refeicoes, normalizar_codigo,
+    contadores_do_dia, checkins_desde, ultimo_checkin_id, reconstruir_resumo,
+)
 
-# Create your tests here.
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class RefeitorioBaseTestCase(TestCase):
+    def setUp(self):
+        self.campus = Campus.objects.create(nome='Campus Teste', sigla='CT')
+        self.curso = Curso.objects.create(nome='Informática', campus=self.campus, codigo='INF')
+        self.turma = Turma.objects.create(
+            nome='1A', curso=self.curso, ano=2025, periodo='2025.1', semestre=0
+        )
+        self.estudante = Estudante.objects.create(
+            matricula_sga='2025001',
+            nome='Estudante Teste',
+            cpf='123.456.789-00',
+            email='estudante@test.com',
+            turma=self.turma,
+            campus=self.campus,
+            curso=self.curso,
+            data_ingresso=timezone.now().date(),
+        )
+        self.user = User.objects.create_user('servidor', 'servidor@test.com', 'pass')
+        self.servidor = Servidor.objects.create(
+            user=self.user,
+            siape='1234567',
+            nome='Servidor Teste',
+            email='servidor@test.com',
+            campus=self.campus,
+        )
+        indice_identidade.invalidar()
+        controle_refeicoes.invalidar_registros()
+
+
+class IndiceIdentidadeTestCase(RefeitorioBaseTestCase):
+    def test_normalizar_codigo(self):
+        self.assertEqual(normalizar_codigo(' 123.456.789-00 '), '12345678900')
+        self.assertEqual(normalizar_codigo(None), '')
+
+    def test_buscar_por_matricula_cpf_e_siape(self):
+        self.assertEqual(indice_identidade.buscar_pessoa('2025001'), (self.estudante, 'estudante'))
+        self.assertEqual(indice_identidade.buscar_pessoa('12345678900'), (self.estudante, 'estudante'))
+        self.assertEqual(indice_identidade.buscar_pessoa('1234567'), (self.servidor, 'servidor'))
+        self.assertEqual(indice_identidade.buscar_pessoa('9999'), (None, None))
+
+    def test_busca_aquecida_nao_consulta_banco(self):
+        indice_identidade.buscar_pessoa('2025001')
+        with self.assertNumQueries(0):
+            pessoa, tipo = indice_identidade.buscar_pessoa('123.456.789-00')
+            indice_identidade.bloqueio_vigente(pessoa, tipo)
+
+    def test_invalidacao_por_bloqueio(self):
+        self.assertIsNone(indice_identidade.bloqueio_vigente(self.estudante, 'estudante'))
+        BloqueioAcesso.objects.create(
+            estudante=self.estudante, motivo='Teste', criado_por=self.servidor
+        )
+        bloqueio = indice_identidade.bloqueio_vigente(self.estudante, 'estudante')
+        self.assertEqual(bloqueio.motivo, 'Teste')
+
+    def test_invalidacao_por_alteracao_de_estudante(self):
+        indice_identidade.buscar_pessoa('2025001')
+        self.estudante.matricula_sga = '2025999'
+        self.estudante.save()
+        self.assertEqual(indice_identidade.buscar_pessoa('2025001'), (None, None))
+        self.assertEqual(indice_identidade.buscar_pessoa('2025999'), (self.estudante, 'estudante'))
+
+
+class ValidarCheckinTestCase(RefeitorioBaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.config = ConfigRefeitorio.objects.create(
+            nome='ALMOCO', horario_inicio=time(0, 0), horario_fim=time(23, 59, 59)
+        )
+
+    def scan(self, barcode):
+        return self.client.post(
+            reverse('refeitorio:validar_checkin'), {'barcode': barcode}, secure=True
+        )
+
+    def test_registra_e_rejeita_duplicado(self):
+        response = self.scan('2025001')
+        self.assertTemplateUsed(response, 'refeitorio/partials/sucesso.html')
+        registro = RegistroRefeicao.objects.get()
+        self.assertEqual(registro.data_servico, timezone.localdate())
+
+        with self.assertNumQueries(0):
+            response = self.scan('123.456.789-00')
+        self.assertContains(response, 'Já realizou esta refeição')
+        self.assertEqual(RegistroRefeicao.objects.count(), 1)
+
+    def test_duplicado_de_outro_worker_barrado_pela_constraint(self):
+        self.scan('1234567')
+        # Registro feito por outro processo, fora do conjunto local
+        RegistroRefeicao.objects.create(
+            estudante=self.estudante, tipo_refeicao='ALMOCO', data_servico=timezone.localdate()
+        )
+        response = self.scan('2025001')
+        self.assertContains(response, 'Já realizou esta refeição')
+        self.assertEqual(RegistroRefeicao.objects.filter(estudante=self.estudante).count(), 1)
+
+    def test_bloqueio_ativo(self):
+        BloqueioAcesso.objects.create(
+            estudante=self.estudante, motivo='Suspensão', criado_por=self.servidor
+        )
+        response = self.scan('2025001')
+        self.assertContains(response, 'ACESSO BLOQUEADO')
+        self.assertFalse(RegistroRefeicao.objects.exists())
+
+
+class CheckinLoteTestCase(RefeitorioBaseTestCase):
+    def setUp(self):
+        super().setUp()
+        ConfigRefeitorio.objects.create(
+            nome='ALMOCO', horario_inicio=time(0, 0), horario_fim=time(23, 59, 59)
+        )
+
+    def enviar(self, registros):
+        return self.client.post(
+            reverse('refeitorio:api_checkin_lote'),
+            json.dumps({'quiosque': 'totem-1', 'registros': registros}),
+            content_type='application/json',
+            secure=True,
+        )
+
+    def test_lote_com_resultados_por_item(self):
+        agora = timezone.localtime()
+        ontem = agora - timedelta(days=1)
+        response = self.enviar([
+            {'barcode': '2025001', 'timestamp': agora.isoformat()},
+            {'barcode': '123.456.789-00', 'timestamp': agora.isoformat()},
+            {'barcode': '1234567', 'timestamp': ontem.isoformat(), 'quiosque': 'totem-2'},
+            {'barcode': '0000', 'timestamp': agora.isoformat()},
+            {'barcode': '2025001', 'timestamp': 'ontem'},
+        ])
+        dados = response.json()
+        self.assertEqual(dados['registrados'], 2)
+        status = [r['status'] for r in dados['resultados']]
+        self.assertEqual(status, ['ok', 'erro', 'ok', 'erro', 'erro'])
+        self.assertEqual(dados['resultados'][1]['mensagem'], 'Já realizou esta refeição')
+        self.assertEqual(dados['resultados'][3]['mensagem'], 'Não cadastrado')
+
+        registro_servidor = RegistroRefeicao.objects.get(servidor=self.servidor)
+        self.assertEqual(registro_servidor.data_servico, ontem.date())
+        self.assertEqual(registro_servidor.quiosque, 'totem-2')
+
+    def test_lote_recusa_leituras_antigas(self):
+        agora = timezone.localtime()
+        dados = self.enviar([
+            {'barcode': '2025001', 'timestamp': (agora - timedelta(days=90)).isoformat()},
+            {'barcode': '1234567', 'timestamp': (agora - timedelta(hours=47)).isoformat()},
+        ]).json()
+        self.assertEqual([r['status'] for r in dados['resultados']], ['erro', 'ok'])
+        self.assertEqual(dados['resultados'][0]['mensagem'], 'Leitura antiga demais')
+        self.assertFalse(RegistroRefeicao.objects.filter(estudante=self.estudante).exists())
+
+        with override_settings(REFEITORIO_LOTE_IDADE_MAXIMA=1):
+            dados = self.enviar([
+                {'barcode': '2025001', 'timestamp': (agora - timedelta(hours=2)).isoformat()},
+            ]).json()
+        self.assertEqual(dados['resultados'][0]['mensagem'], 'Leitura antiga demais')
+
+    def test_lote_respeita_registros_existentes(self):
+        agora = timezone.localtime()
+        RegistroRefeicao.objects.create(
+            estudante=self.estudante, tipo_refeicao='ALMOCO', data_servico=agora.date()
+        )
+        dados = self.enviar([{'barcode': '2025001', 'timestamp': agora.isoformat()}]).json()
+        self.assertEqual(dados['registrados'], 0)
+        self.assertEqual(RegistroRefeicao.objects.count(), 1)
+
+    def test_json_invalido(self):
+        response = self.client.post(
+            reverse('refeitorio:api_checkin_lote'), 'x', content_type='application/json', secure=True
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class FeedAoVivoTestCase(RefeitorioBaseTestCase):
+    def test_contadores_lidos_do_resumo(self):
+        RegistroRefeicao.objects.create(estudante=self.estudante, tipo_refeicao='ALMOCO')
+        RegistroRefeicao.objects.create(servidor=self.servidor, tipo_refeicao='ALMOCO')
+        with self.assertNumQueries(1):
+            contadores = contadores_do_dia()
+        self.assertEqual(contadores['por_tipo']['ALMOCO']['servidores'], 1)
+        self.assertEqual(contadores['total'], 2)
+
+        RegistroRefeicao.objects.filter(servidor=self.servidor).delete()
+        self.assertEqual(contadores_do_dia()['total'], 1)
+
+    def test_checkins_desde_ultimo_id(self):
+        inicio = ultimo_checkin_id()
+        registro = RegistroRefeicao.objects.create(estudante=self.estudante, tipo_refeicao='JANTAR')
+        eventos = checkins_desde(inicio, completo=True)
+        self.assertEqual([evento['id'] for evento in eventos], [registro.pk])
+        self.assertEqual((eventos[0]['nome'], eventos[0]['turma']), ('Estudante Teste', '1A'))
+        self.assertNotIn('codigo', eventos[0])
+        self.assertNotIn('nome', checkins_desde(inicio)[0])
+        self.assertEqual(checkins_desde(registro.pk), [])
+
+    def test_feed_exige_login_ou_token(self):
+        url = reverse('refeitorio:api_feed')
+        self.assertEqual(self.client.get(url, secure=True).status_code, 403)
+        with override_settings(REFEITORIO_TOKEN_QUIOSQUE='totem-secreto'):
+            self.assertEqual(self.client.get(url, {'token': 'errado'}, secure=True).status_code, 403)
+            dados = self.client.get(url, {'token': 'totem-secreto'}, secure=True).json()
+            RegistroRefeicao.objects.create(estudante=self.estudante, tipo_refeicao='ALMOCO')
+            dados = self.client.get(
+                url, {'token': 'totem-secreto', 'desde': dados['ultimo_id']}, secure=True
+            ).json()
+        self.assertEqual(len(dados['eventos']), 1)
+        self.assertNotIn('nome', dados['eventos'][0])
+
+    def test_feed_responde_com_novos_registros(self):
+        self.client.force_login(self.user)
+        url = reverse('refeitorio:api_feed')
+        inicial = self.client.get(url, secure=True).json()
+        self.assertEqual((inicial['eventos'], inicial['contadores']['total']), ([], 0))
+
+        registro = RegistroRefeicao.objects.create(estudante=self.estudante, tipo_refeicao='ALMOCO')
+        dados = self.client.get(url, {'desde': inicial['ultimo_id']}, secure=True).json()
+        self.assertEqual(dados['ultimo_id'], registro.pk)
+        self.assertEqual(dados['eventos'][0]['nome'], 'Estudante Teste')
+        self.assertEqual(dados['contadores']['total'], 1)
+
+        # Sem registros novos responde na hora, sem esperar
+        vazio = self.client.get(url, {'desde': registro.pk}, secure=True).json()
+        self.assertEqual((vazio['ultimo_id'], vazio['eventos']), (registro.pk, []))
+
+
+class ResumoDiarioTestCase(RefeitorioBaseTestCase):
+    def test_resumo_mantido_a_cada_registro(self):
+        RegistroRefeicao.objects.create(estudante=self.estudante, tipo_refeicao='ALMOCO')
+        RegistroRefeicao.objects.create(servidor=self.servidor, tipo_refeicao='ALMOCO')
+        outro = RegistroRefeicao.objects.create(estudante=self.estudante, tipo_refeicao='JANTAR')
+
+        resumo = ResumoDiarioRefeicao.objects.get(tipo_refeicao='ALMOCO', tipo_pessoa='ESTUDANTE')
+        self.assertEqual((resumo.turma, resumo.quantidade), (self.turma, 1))
+        self.assertEqual(ResumoDiarioRefeicao.objects.get(tipo_pessoa='SERVIDOR').quantidade, 1)
+
+        outro.delete()
+        self.assertEqual(ResumoDiarioRefeicao.objects.get(tipo_refeicao='JANTAR').quantidade, 0)
+
+    def test_reconstruir_resumo(self):
+        RegistroRefeicao.objects.create(estudante=self.estudante, tipo_refeicao='ALMOCO')
+        ResumoDiarioRefeicao.objects.update(quantidade=99)
+        self.assertEqual(reconstruir_resumo(), 1)
+        self.assertEqual(ResumoDiarioRefeicao.objects.get().quantidade, 1)
+
+    def test_troca_de_turma_mantem_a_refeicao_na_turma_do_checkin(self):
+        antigo = RegistroRefeicao.objects.create(estudante=self.estudante, tipo_refeicao='ALMOCO')
+        nova = Turma.objects.create(nome='2A', curso=self.curso, ano=2025, periodo='2025.1', semestre=0)
+        self.estudante.turma = nova
+        self.estudante.save()
+        RegistroRefeicao.objects.create(estudante=self.estudante, tipo_refeicao='JANTAR')
+        self.assertEqual(antigo.turma, self.turma)
+
+        incremental = set(ResumoDiarioRefeicao.objects.values_list('tipo_refeicao', 'turma__nome', 'quantidade'))
+        self.assertEqual(incremental, {('ALMOCO', '1A', 1), ('JANTAR', '2A', 1)})
+        reconstruir_resumo()
+        self.assertEqual(
+            set(ResumoDiarioRefeicao.objects.values_list('tipo_refeicao', 'turma__nome', 'quantidade')),
+            incremental,
+        )
+
+        antigo.delete()
+        self.assertEqual(ResumoDiarioRefeicao.objects.get(tipo_refeicao='ALMOCO').quantidade, 0)
+
+    def test_relatorio_periodo_le_do_resumo(self):
+        RegistroRefeicao.objects.create(estudante=self.estudante, tipo_refeicao='ALMOCO')
+        RegistroRefeicao.objects.create(servidor=self.servidor, tipo_refeicao='ALMOCO')
+        self.client.force_login(self.user)
+        hoje = timezone.localdate().isoformat()
+        response = self.client.get(
+            reverse('refeitorio:relatorio'), {'data_inicio': hoje, 'data_fim': hoje}, secure=True
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total'], 2)
+        self.assertEqual(response.context['total_estudantes'], 1)
+        self.assertEqual(list(response.context['por_turma']), [{'turma__nome': '1A', 'total': 1}])
+
+        response = self.client.get(reverse('refeitorio:dashboard'), secure=True)
+        self.assertEqual(response.context['total_hoje'], 2)
+
+
+class ExportacaoRefeitorioTestCase(RefeitorioBaseTestCase):
+    def test_exportar_csv_streaming(self):
+        RegistroRefeicao.objects.create(
+            estudante=self.estudante, tipo_refeicao='ALMOCO', codigo_barras_usado='2025001'
+        )
+        RegistroRefeicao.objects.create(
+            servidor=self.servidor, tipo_refeicao='JANTAR', codigo_barras_usado='1234567'
+        )
+        self.client.force_login(self.user)
+        hoje = timezone.localdate().isoformat()
+        response = self.client.get(
+            reverse('refeitorio:exportar_csv'), {'data_inicio': hoje, 'data_fim': hoje}, secure=True
+        )
+        conteudo = b''.join(response.streaming_content).decode('utf-8')
+        self.assertIn('Estudante Teste,Estudante,Almoço,1A,2025001', conteudo)
+        self.assertIn('Servidor Teste,Servidor,Jantar,Servidor,1234567', conteudo)
@@ -7,6 +7,7 @@ urlpatterns = [
     # Kiosk (público)
     path('checkin/', views.checkin_screen, name='checkin_screen'),
     path('validar/', views.validar_checkin, name='validar_checkin'),
+    path('validar-lote/', views.api_checkin_lote, name='api_checkin_lote'),
 
     # Administrativo (requer login)
     path('dashboard/', views.dashboard, name='dashboard'),
@@ -16,6 +17,7 @@ urlpatterns = [
     # API
     path('api/stats/', views.api_estatisticas_hoje, name='api_stats'),
     path('api/ultimos-acessos/', views.api_ultimos_acessos_kiosk, name='api_ultimos_acessos'),
+    path('api/feed/', views.api_feed, name='api_feed'),
 
     #CSV
     path('exportar-csv/', views.exportar_csv, name='exportar_csv'),
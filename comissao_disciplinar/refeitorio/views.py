@@ -2,14 +2,22 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.http import JsonResponse, HttpResponse
 from django.utils import timezone
-from django.db.models import Count, Q
+from django.db import transaction, IntegrityError
+from django.db.models import Count, Q, Sum, Case, When, Value
+from django.db.models.functions import Coalesce
 from django.contrib import messages
 from django.conf import settings
+from django.utils.crypto import constant_time_compare
 from datetime import timedelta, datetime
-from .models import RegistroRefeicao, ConfigRefeitorio, BloqueioAcesso
+from .models import RegistroRefeicao, ConfigRefeitorio, BloqueioAcesso, ResumoDiarioRefeicao
+from .services import (
+    indice_identidade, controle_refeicoes, registrar_checkins_em_lote,
+    contadores_do_dia, checkins_desde, ultimo_checkin_id,
+)
 from core.models import Estudante, Servidor
+from core.utils_exportacao import exportar_queryset
 import logging
-import csv
+import json
 #from django.http import HttpResponse
 
 logger = logging.getLogger(__name__)
@@ -61,6 +69,8 @@ def checkin_screen(request):
         'config_atual': config_atual,
         'total_refeicao_atual': total_refeicao_atual,
         'ultimos_acessos': ultimos_acessos,
+        'feed_liberado': is_servidor(request.user) or _token_quiosque_valido(request),
+        'token_quiosque': request.GET.get('token') if _token_quiosque_valido(request) else None,
     }
 
     return render(request, 'refeitorio/checkin_screen.html', context)
@@ -79,41 +89,23 @@ def validar_checkin(request):
             'detalhes': 'Aproxime novamente o cartão do leitor'
         })
 
-    # Limpar formatação de CPF (remover . e -)
-    barcode_clean = barcode.replace('.', '').replace('-', '').replace('/', '')
+    # 1. Buscar pessoa (estudante ou servidor) no índice em memória
+    # Busca por matrícula, SIAPE ou CPF, com ou sem formatação
+    pessoa, tipo_pessoa = indice_identidade.buscar_pessoa(barcode)
 
-    # 1. Buscar pessoa (estudante ou servidor)
-    # Busca por matrícula, SIAPE ou CPF
-    estudante = Estudante.objects.filter(
-        Q(matricula_sga=barcode) |
-        Q(matricula_sga=barcode_clean) |
-        Q(cpf=barcode) |
-        Q(cpf=barcode_clean)
-    ).first()
-
-    servidor = Servidor.objects.filter(
-        Q(siape=barcode) |
-        Q(siape=barcode_clean) #|
-        #Q(cpf=barcode) |
-        #Q(cpf=barcode_clean)
-    ).first()
-
-    if not estudante and not servidor:
+    if not pessoa:
         return render(request, 'refeitorio/partials/erro.html', {
             'mensagem': 'Não cadastrado',
             'detalhes': f'Matrícula/SIAPE {barcode} não encontrada'
         })
 
-    pessoa = estudante or servidor
-    tipo_pessoa = 'estudante' if estudante else 'servidor'
+    estudante = pessoa if tipo_pessoa == 'estudante' else None
+    servidor = pessoa if tipo_pessoa == 'servidor' else None
 
     # 2. Verificar bloqueio
-    bloqueio = BloqueioAcesso.objects.filter(
-        Q(**{tipo_pessoa: pessoa}),
-        ativo=True
-    ).first()
+    bloqueio = indice_identidade.bloqueio_vigente(pessoa, tipo_pessoa)
 
-    if bloqueio and bloqueio.esta_ativo():
+    if bloqueio:
         return render(request, 'refeitorio/partials/erro.html', {
             'mensagem': 'ACESSO BLOQUEADO',
             'detalhes': bloqueio.motivo,
@@ -122,14 +114,8 @@ def validar_checkin(request):
             'iniciais': pessoa.get_iniciais() if estudante else None,
         })
 
-    agora = timezone.now()
-    agora = timezone.localtime(agora)
-    agora_time = timezone.localtime(agora).time()
-    config_atual = ConfigRefeitorio.objects.filter(
-        ativo=True,
-        horario_inicio__lte=agora_time,
-        horario_fim__gte=agora_time
-    ).first()
+    agora = timezone.localtime(timezone.now())
+    config_atual = controle_refeicoes.config_atual(agora)
 
     if not config_atual:
         return render(request, 'refeitorio/partials/erro.html', {
@@ -140,31 +126,33 @@ def validar_checkin(request):
             'iniciais': pessoa.get_iniciais() if estudante else None,
         })
 
-    # 4. Verificar se já comeu (mesmo tipo de refeição)
-    limite_tempo = agora - timedelta(hours=config_atual.intervalo_minimo_horas)
-
-    ja_comeu = RegistroRefeicao.objects.filter(
-        Q(**{tipo_pessoa: pessoa}),
-        tipo_refeicao=config_atual.nome,
-        data_hora__gte=limite_tempo
-    ).exists()
-
-    if ja_comeu:
-        return render(request, 'refeitorio/partials/erro.html', {
-            'mensagem': 'Já realizou esta refeição',
-            'detalhes': f'{config_atual.get_nome_display()} já registrado',
-            'nome': pessoa.nome,
-            'foto_url': pessoa.get_foto_url_proxy() if estudante else None,
-            'iniciais': pessoa.get_iniciais() if estudante else None,
-        })
+    # 4. Verificar se já comeu (mesmo tipo de refeição no dia)
+    erro_ja_comeu = {
+        'mensagem': 'Já realizou esta refeição',
+        'detalhes': f'{config_atual.get_nome_display()} já registrado',
+        'nome': pessoa.nome,
+        'foto_url': pessoa.get_foto_url_proxy() if estudante else None,
+        'iniciais': pessoa.get_iniciais() if estudante else None,
+    }
 
-    # 5. Registrar acesso
-    registro = RegistroRefeicao.objects.create(
-        **{tipo_pessoa: pessoa},
-        tipo_refeicao=config_atual.nome,
-        codigo_barras_usado=barcode,
-        ip_acesso=request.META.get('REMOTE_ADDR')
-    )
+    if controle_refeicoes.ja_comeu(pessoa, tipo_pessoa, config_atual.nome, agora.date()):
+        return render(request, 'refeitorio/partials/erro.html', erro_ja_comeu)
+
+    # 5. Registrar acesso (constraint única barra registro feito por outro worker)
+    try:
+        with transaction.atomic():
+            registro = RegistroRefeicao.objects.create(
+                **{tipo_pessoa: pessoa},
+                tipo_refeicao=config_atual.nome,
+                data_servico=agora.date(),
+                codigo_barras_usado=barcode,
+                ip_acesso=request.META.get('REMOTE_ADDR')
+            )
+    except IntegrityError:
+        controle_refeicoes.marcar(pessoa, tipo_pessoa, config_atual.nome, agora.date())
+        return render(request, 'refeitorio/partials/erro.html', erro_ja_comeu)
+
+    controle_refeicoes.marcar(pessoa, tipo_pessoa, config_atual.nome, agora.date())
 
     # Contexto para sucesso
     context = {
@@ -195,24 +183,80 @@ def validar_checkin(request):
     return render(request, 'refeitorio/partials/sucesso.html', context)
 
 
+LIMITE_CHECKIN_LOTE = 500
+
+
+def api_checkin_lote(request):
+    """
+    Recebe check-ins capturados offline pelo totem
+
+    Corpo JSON: {"quiosque": "totem-1", "registros": [{"barcode": "...",
+    "timestamp": "2025-03-10T12:01:33-03:00"}, ...]}. Cada registro pode
+    trazer seu próprio "quiosque". Retorna um resultado por item.
+    """
+    if request.method != 'POST':
+        return HttpResponse(status=405)
+
+    try:
+        dados = json.loads(request.body or b'{}')
+    except (ValueError, UnicodeDecodeError):
+        return JsonResponse({'erro': 'JSON inválido'}, status=400)
+
+    if isinstance(dados, list):
+        dados = {'registros': dados}
+    registros = dados.get('registros') if isinstance(dados, dict) else None
+    if not isinstance(registros, list):
+        return JsonResponse({'erro': 'Informe a lista "registros"'}, status=400)
+    if len(registros) > LIMITE_CHECKIN_LOTE:
+        return JsonResponse({'erro': f'Máximo de {LIMITE_CHECKIN_LOTE} registros por lote'}, status=400)
+
+    quiosque = dados.get('quiosque', '')
+    itens = [
+        {**item, 'quiosque': item.get('quiosque') or item.get('kiosk') or quiosque}
+        if isinstance(item, dict) else item
+        for item in registros
+    ]
+
+    resultados = registrar_checkins_em_lote(itens, ip_acesso=request.META.get('REMOTE_ADDR'))
+    registrados = sum(1 for r in resultados if r['status'] == 'ok')
+    logger.info(f"Check-in em lote ({quiosque}): {registrados}/{len(resultados)} registrados")
+
+    return JsonResponse({
+        'registrados': registrados,
+        'rejeitados': len(resultados) - registrados,
+        'resultados': resultados,
+    })
+
+
 # === DASHBOARD ADMINISTRATIVO ===
+SOMAS_RESUMO = {
+    'total': Sum('quantidade'),
+    'estudantes': Sum('quantidade', filter=Q(tipo_pessoa='ESTUDANTE')),
+    'servidores': Sum('quantidade', filter=Q(tipo_pessoa='SERVIDOR')),
+}
+
+
+
 @login_required
 @user_passes_test(is_servidor)
 def dashboard(request):
     """Dashboard do refeitório"""
-    hoje = timezone.now().date()
+    hoje = timezone.localdate()
 
-    # Estatísticas do dia
-    refeicoes_hoje = RegistroRefeicao.objects.filter(data_hora__date=hoje)
-    total_hoje = refeicoes_hoje.count()
-    estudantes_hoje = refeicoes_hoje.filter(estudante__isnull=False).count()
-    servidores_hoje = refeicoes_hoje.filter(servidor__isnull=False).count()
+    # Estatísticas do dia (resumo pré-agregado)
+    resumos_hoje = ResumoDiarioRefeicao.objects.filter(data=hoje)
+    totais = resumos_hoje.aggregate(**SOMAS_RESUMO)
+    total_hoje = totais['total'] or 0
+    estudantes_hoje = totais['estudantes'] or 0
+    servidores_hoje = totais['servidores'] or 0
 
     # Por tipo de refeição
-    por_tipo = refeicoes_hoje.values('tipo_refeicao').annotate(
-        total=Count('id')
+    por_tipo = resumos_hoje.values('tipo_refeicao').annotate(
+        total=Sum('quantidade')
     ).order_by('-total')
 
+    refeicoes_hoje = RegistroRefeicao.objects.filter(data_hora__date=hoje)
+
     # Últimos registros
     ultimos_registros = refeicoes_hoje.select_related(
         'estudante', 'servidor'
@@ -264,7 +308,13 @@ def relatorio_periodo(request):
     }
 
     if data_inicio and data_fim:
-        # Base query
+        # Totais e gráficos: resumo pré-agregado
+        resumos = ResumoDiarioRefeicao.objects.filter(
+            data__gte=data_inicio,
+            data__lte=data_fim
+        )
+
+        # Lista detalhada e rankings: registros brutos
         registros = RegistroRefeicao.objects.filter(
             data_hora__date__gte=data_inicio,
             data_hora__date__lte=data_fim
@@ -272,49 +322,44 @@ def relatorio_periodo(request):
 
         # Aplicar filtros adicionais
         if tipo_refeicao:
+            resumos = resumos.filter(tipo_refeicao=tipo_refeicao)
             registros = registros.filter(tipo_refeicao=tipo_refeicao)
 
         if turma_id:
+            resumos = resumos.filter(turma_id=turma_id)
             registros = registros.filter(estudante__turma_id=turma_id)
 
         if tipo_pessoa == 'estudante':
+            resumos = resumos.filter(tipo_pessoa='ESTUDANTE')
             registros = registros.filter(estudante__isnull=False)
         elif tipo_pessoa == 'servidor':
+            resumos = resumos.filter(tipo_pessoa='SERVIDOR')
             registros = registros.filter(servidor__isnull=False)
 
         # Ordenar
         registros = registros.order_by('-data_hora')
 
-        from django.core.paginator import Paginator
-
         # Estatísticas gerais
-        total = registros.count()
-        total_estudantes = registros.filter(estudante__isnull=False).count()
-        total_servidores = registros.filter(servidor__isnull=False).count()
+        totais = resumos.aggregate(**SOMAS_RESUMO)
+        total = totais['total'] or 0
+        total_estudantes = totais['estudantes'] or 0
+        total_servidores = totais['servidores'] or 0
 
         # Por dia
-        por_dia = registros.values('data_hora__date').annotate(
-            total=Count('id'),
-            estudantes=Count('id', filter=Q(estudante__isnull=False)),
-            servidores=Count('id', filter=Q(servidor__isnull=False))
-        ).order_by('data_hora__date')
+        por_dia = resumos.values('data').annotate(**SOMAS_RESUMO).order_by('data')
 
         # Por tipo de refeição
-        por_tipo = registros.values('tipo_refeicao').annotate(
-            total=Count('id'),
-            estudantes=Count('id', filter=Q(estudante__isnull=False)),
-            servidores=Count('id', filter=Q(servidor__isnull=False))
-        ).order_by('-total')
+        por_tipo = resumos.values('tipo_refeicao').annotate(**SOMAS_RESUMO).order_by('-total')
 
         # Por turma (se for filtro de estudantes)
         por_turma = None
         if tipo_pessoa != 'servidor':
-            por_turma = registros.filter(
-                estudante__isnull=False
+            por_turma = resumos.filter(
+                tipo_pessoa='ESTUDANTE'
             ).values(
-                'estudante__turma__nome'
+                'turma__nome'
             ).annotate(
-                total=Count('id')
+                total=Sum('quantidade')
             ).order_by('-total')[:10]
 
         # Top 10 usuários
@@ -366,9 +411,7 @@ def relatorio_periodo(request):
 @login_required
 @user_passes_test(is_servidor)
 def exportar_csv(request):
-    """Exporta todos os registros filtrados para CSV"""
-    import csv
-    from django.http import HttpResponse
+    """Exporta todos os registros filtrados (CSV ou XLSX, em streaming)"""
     TIPOS_MAP = dict(ConfigRefeitorio.TIPO_REFEICAO_CHOICES)
 
     # Reaplicar mesmos filtros do relatório
@@ -377,15 +420,15 @@ def exportar_csv(request):
     tipo_refeicao = request.GET.get('tipo_refeicao')
     turma_id = request.GET.get('turma')
     tipo_pessoa = request.GET.get('tipo_pessoa', 'todos')
+    formato = request.GET.get('formato', 'csv')
 
     if not data_inicio or not data_fim:
         return HttpResponse('Parâmetros inválidos', status=400)
 
-    # Mesma query do relatório, mas SEM [:100]
     registros = RegistroRefeicao.objects.filter(
         data_hora__date__gte=data_inicio,
         data_hora__date__lte=data_fim
-    ).select_related('estudante', 'servidor', 'estudante__turma', 'estudante__turma__curso')
+    )
 
     if tipo_refeicao:
         registros = registros.filter(tipo_refeicao=tipo_refeicao)
@@ -396,27 +439,29 @@ def exportar_csv(request):
     elif tipo_pessoa == 'servidor':
         registros = registros.filter(servidor__isnull=False)
 
-    registros = registros.order_by('-data_hora')
-
-    # Criar CSV
-    response = HttpResponse(content_type='text/csv; charset=utf-8')
-    response['Content-Disposition'] = f'attachment; filename="refeitorio_{data_inicio}_{data_fim}.csv"'
-    response.write('\ufeff')  # BOM para UTF-8
-
-    writer = csv.writer(response)
-    writer.writerow(['Data/Hora', 'Nome', 'Tipo', 'Refeição', 'Turma/Cargo', 'Matrícula/SIAPE'])
-
-    for reg in registros:
-        writer.writerow([
-            reg.data_hora.strftime('%d/%m/%Y %H:%M'),
-            reg.pessoa.nome,
-            reg.tipo_pessoa,
-            TIPOS_MAP.get(reg.tipo_refeicao, reg.tipo_refeicao),  # ← Aqui
-            reg.estudante.turma.nome if reg.estudante and reg.estudante.turma else 'Servidor',
-            reg.codigo_barras_usado
-        ])
-
-    return response
+    registros = registros.annotate(
+        nome_pessoa=Coalesce('estudante__nome', 'servidor__nome'),
+        tipo=Case(
+            When(estudante__isnull=False, then=Value('Estudante')),
+            default=Value('Servidor')
+        ),
+        turma_cargo=Coalesce('estudante__turma__nome', Value('Servidor')),
+    ).order_by('-data_hora')
+
+    return exportar_queryset(
+        registros,
+        colunas=[
+            ('data_hora', 'Data/Hora'),
+            ('nome_pessoa', 'Nome'),
+            ('tipo', 'Tipo'),
+            ('tipo_refeicao', 'Refeição'),
+            ('turma_cargo', 'Turma/Cargo'),
+            ('codigo_barras_usado', 'Matrícula/SIAPE'),
+        ],
+        nome_arquivo=f'refeitorio_{data_inicio}_{data_fim}',
+        formato=formato,
+        transformacoes={'tipo_refeicao': lambda valor: TIPOS_MAP.get(valor, valor)},
+    )
 
 
 @login_required
@@ -438,19 +483,54 @@ def gerenciar_bloqueios(request):
 @login_required
 def api_estatisticas_hoje(request):
     """Retorna estatísticas do dia em JSON"""
-    hoje = timezone.now().date()
-    refeicoes = RegistroRefeicao.objects.filter(data_hora__date=hoje)
+    contadores = contadores_do_dia()
 
     data = {
-        'total': refeicoes.count(),
-        'estudantes': refeicoes.filter(estudante__isnull=False).count(),
-        'servidores': refeicoes.filter(servidor__isnull=False).count(),
-        'ultima_atualizacao': timezone.now().strftime('%H:%M:%S')
+        'total': contadores['total'],
+        'estudantes': contadores['estudantes'],
+        'servidores': contadores['servidores'],
+        'por_tipo': contadores['por_tipo'],
+        'ultima_atualizacao': timezone.localtime().strftime('%H:%M:%S')
     }
 
     return JsonResponse(data)
 
 
+def _token_quiosque_valido(request):
+    """Token do totem (?token=) conferido com REFEITORIO_TOKEN_QUIOSQUE"""
+    token = getattr(settings, 'REFEITORIO_TOKEN_QUIOSQUE', None)
+    return bool(token) and constant_time_compare(request.GET.get('token', ''), token)
+
+
+def api_feed(request):
+    """
+    Feed ao vivo para o totem e o dashboard (polling curto)
+
+    Responde na hora, sem prender o worker: o último id, os contadores do
+    dia e, com ?desde=<id>, os registros de id maior. O cliente repete a
+    consulta a cada poucos segundos. Servidores logados recebem nome e
+    turma; o totem (token) recebe só o aviso de novo check-in.
+    """
+    completo = request.user.is_authenticated and is_servidor(request.user)
+    if not completo and not _token_quiosque_valido(request):
+        return JsonResponse({'erro': 'Acesso negado'}, status=403)
+
+    if 'desde' not in request.GET:
+        return JsonResponse({'ultimo_id': ultimo_checkin_id(), 'eventos': [], 'contadores': contadores_do_dia()})
+
+    try:
+        ultimo_id = int(request.GET['desde'])
+    except ValueError:
+        return JsonResponse({'erro': 'Parâmetros inválidos'}, status=400)
+
+    eventos = checkins_desde(ultimo_id, completo)
+    return JsonResponse({
+        'ultimo_id': eventos[-1]['id'] if eventos else ultimo_id,
+        'eventos': eventos,
+        'contadores': contadores_do_dia(),
+    })
+
+
 def api_ultimos_acessos_kiosk(request):
     """API pública para atualização dos últimos acessos no kiosk"""
     agora = timezone.now()
@@ -481,7 +561,10 @@ def api_ultimos_acessos_kiosk(request):
         data_hora__gte=inicio_refeicao
     )
 
-    total_refeicao_atual = registros_refeicao.count()
+    # Contador lido do resumo diário (sem COUNT nos registros a cada atualização)
+    total_refeicao_atual = contadores_do_dia(agora.date())['por_tipo'].get(
+        config_atual.nome, {}
+    ).get('total', 0)
 
     # Últimos 10 acessos
     ultimos_acessos = registros_refeicao.select_related(
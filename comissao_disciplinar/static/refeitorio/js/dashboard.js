@@ -1,6 +1,4 @@
-// Auto-atualização do dashboard a cada 30s
-let updateInterval;
-
+// Auto-atualização do dashboard
 function atualizarEstatisticas() {
     fetch('/refeitorio/api/stats/')
         .then(response => response.json())
@@ -14,14 +12,40 @@ function atualizarEstatisticas() {
         .catch(error => console.error('Erro ao atualizar:', error));
 }
 
+function mostrarContadores(data) {
+    document.getElementById('total-hoje').textContent = data.total;
+    document.getElementById('estudantes-hoje').textContent = data.estudantes;
+    document.getElementById('servidores-hoje').textContent = data.servidores;
+}
+
+// Feed ao vivo: o servidor responde na hora e a próxima consulta sai em
+// INTERVALO_FEED (o worker não fica preso esperando check-ins)
+const INTERVALO_FEED = 5000;
+let feedAtivo = true;
+
+function acompanharFeed(desde) {
+    if (!feedAtivo) return;
+    const url = desde === undefined ? '/refeitorio/api/feed/' : '/refeitorio/api/feed/?desde=' + desde;
+    fetch(url)
+        .then(response => {
+            if (!response.ok) throw new Error(response.status);
+            return response.json();
+        })
+        .then(data => {
+            mostrarContadores(data.contadores);
+            setTimeout(() => acompanharFeed(data.ultimo_id), INTERVALO_FEED);
+        })
+        .catch(error => {
+            console.error('Feed indisponível:', error);
+            setTimeout(() => acompanharFeed(desde), 30000);
+        });
+}
+
 // Iniciar atualização automática
 document.addEventListener('DOMContentLoaded', function() {
-    // Atualizar a cada 30 segundos
-    updateInterval = setInterval(atualizarEstatisticas, 30000);
-
-    // Limpar intervalo ao sair da página
+    acompanharFeed();
     window.addEventListener('beforeunload', function() {
-        clearInterval(updateInterval);
+        feedAtivo = false;
     });
 });
 